@@ -1,6 +1,11 @@
 import mysql.connector
 from mysql.connector import errorcode
 import os # Para leer variables de entorno (opcional)
+import datetime
+import re
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,16 +21,34 @@ DB_CONFIG = {
     "database": os.getenv("DB_NAME", "restaurant_db")
 }
 
-def get_db_connection():
+# --- CONFIGURACIÓN DEL POOL DE CONEXIONES ---
+# Tamaño máximo de conexiones abiertas que se mantienen reutilizables por proceso.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+# Segundos que una conexión puede estar ociosa en el pool antes de cerrarla y abrir una nueva.
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+# Segundos de inactividad a partir de los cuales se hace ping antes de entregar la conexión.
+DB_POOL_PING_AFTER_SECONDS = int(os.getenv("DB_POOL_PING_AFTER_SECONDS", 30))
+# Segundos máximos de espera por una conexión libre cuando el pool está agotado.
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 10))
+
+# --- CONFIGURACIÓN DE LA CACHÉ DE RESULTADOS ---
+# Solo se cachean las lecturas que lo piden (fetch_all/fetch_one con cache_tables=...).
+DB_QUERY_CACHE_ENABLED = os.getenv("DB_QUERY_CACHE_ENABLED", "1") == "1"
+# Número máximo de resultados guardados; al superarlo se descarta el menos usado recientemente.
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", 256))
+# Vigencia máxima de un resultado. Los cambios de este proceso lo invalidan al confirmarse y los de
+# otras terminales al llegar su evento (app/events.py); el TTL cubre las tablas sin eventos.
+DB_QUERY_CACHE_TTL_SECONDS = float(os.getenv("DB_QUERY_CACHE_TTL_SECONDS", 60))
+
+
+def _open_raw_connection():
     """
-    Establece y devuelve una conexión a la base de datos MySQL.
+    Abre una conexión nueva (handshake TCP + autenticación completo) contra MySQL.
     Returns:
         mysql.connector.connection_cext.CMySQLConnection: Objeto de conexión o None si falla.
     """
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        # print("Conexión a la base de datos establecida exitosamente.")
-        return conn
+        return mysql.connector.connect(**DB_CONFIG)
     except mysql.connector.Error as err:
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             print("Error de acceso: Usuario o contraseña incorrectos.")
@@ -35,10 +58,426 @@ def get_db_connection():
             print(f"Error al conectar con la base de datos: {err}")
         return None
 
+
+# --- CACHÉ DE RESULTADOS DE CONSULTAS ---
+_WRITE_STATEMENT_PATTERN = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+IGNORE)?|DELETE\s+FROM)\s+`?(\w+)`?",
+    re.IGNORECASE)
+_SCHEMA_STATEMENT_PATTERN = re.compile(r"^\s*(?:ALTER|CREATE|DROP|TRUNCATE|RENAME)\b", re.IGNORECASE)
+_ALL_TABLES = "*"
+
+def written_table(query):
+    """
+    Tabla que modifica una sentencia (en minúsculas), '*' si cambia el esquema, o None si es una lectura.
+    Ej.: written_table("UPDATE Mesa SET estado = %s ...") -> 'mesa'
+    """
+    if not isinstance(query, str):
+        return None
+    match = _WRITE_STATEMENT_PATTERN.match(query)
+    if match:
+        return match.group(1).lower()
+    if _SCHEMA_STATEMENT_PATTERN.match(query):
+        return _ALL_TABLES
+    return None
+
+
+class QueryResultCache:
+    """
+    Resultados de lecturas indexados por (sql, parámetros) y etiquetados con las tablas que leen.
+    LRU acotada a 'max_entries', con vigencia 'ttl_seconds'. invalidate_tables() descarta todo lo que
+    lee alguna de las tablas indicadas. Lleva contadores de aciertos/fallos para medir su efecto.
+    """
+    _MISS = object()
+
+    def __init__(self, max_entries=DB_QUERY_CACHE_SIZE, ttl_seconds=DB_QUERY_CACHE_TTL_SECONDS):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # clave -> (resultado, tablas, momento_de_carga)
+        self._keys_by_table = {} # tabla -> set(claves)
+        self._generation = 0 # Aumenta con cada invalidación; evita guardar lecturas que empezaron antes
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        """Resultado guardado para 'key', o QueryResultCache._MISS si no hay uno vigente."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return self._MISS
+
+    def put(self, key, tables, result, generation):
+        with self._lock:
+            if generation != self._generation:
+                return # Alguna de las tablas pudo cambiar mientras se leía
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, tables, time.monotonic())
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tables(self, tables):
+        tables = {table.lower() for table in tables if table}
+        if not tables:
+            return
+        with self._lock:
+            self._generation += 1
+            if _ALL_TABLES in tables:
+                keys = list(self._entries)
+            else:
+                keys = set()
+                for table in tables:
+                    keys.update(self._keys_by_table.get(table, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        self.invalidate_tables([_ALL_TABLES])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'aciertos': self.hits, 'fallos': self.misses,
+                'tasa_aciertos': (self.hits / lookups) if lookups else 0.0,
+                'entradas': len(self._entries), 'descartes_lru': self.evictions,
+                'invalidaciones': self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+
+_query_cache = QueryResultCache()
+
+def get_query_cache():
+    """Caché de resultados del proceso (ver fetch_all/fetch_one con cache_tables)."""
+    return _query_cache
+
+def invalidate_cached_tables(tables):
+    """Descarta los resultados cacheados que leen alguna de las tablas (p. ej. al recibir un evento de otra terminal)."""
+    _query_cache.invalidate_tables(tables)
+
+
+class _WriteTrackingCursor:
+    """Cursor que anota las tablas modificadas para invalidar la caché al confirmar la conexión."""
+    def __init__(self, cursor, written_tables):
+        self._cursor = cursor
+        self._written_tables = written_tables
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        table = written_table(operation)
+        if table:
+            self._written_tables.add(table)
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        table = written_table(operation)
+        if table:
+            self._written_tables.add(table)
+        return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """
+    Envoltorio sobre una conexión real del pool.
+    Se comporta como la conexión de mysql.connector (cursor, commit, rollback, etc.),
+    pero close() la devuelve al pool en lugar de cerrar el socket.
+    Las escrituras hechas con sus cursores invalidan la caché de resultados al hacer commit().
+    """
+    def __init__(self, pool, raw_connection):
+        self._pool = pool
+        self._raw = raw_connection
+        self._released = False
+        self._written_tables = set()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return _WriteTrackingCursor(self._raw.cursor(*args, **kwargs), self._written_tables)
+
+    def commit(self):
+        try:
+            self._raw.commit()
+        finally:
+            written_tables = set(self._written_tables)
+            self._written_tables.clear()
+            _query_cache.invalidate_tables(written_tables)
+
+    def rollback(self):
+        self._written_tables.clear() # Nada de lo escrito llegó a confirmarse
+        self._raw.rollback()
+
+    def is_connected(self):
+        if self._released:
+            return False
+        return self._raw.is_connected()
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL compartido por todo el proceso.
+    - Reutiliza conexiones ya autenticadas (LIFO, para mantener "calientes" las más recientes).
+    - Recicla las conexiones que llevan más de 'recycle_seconds' ociosas.
+    - Verifica con ping las conexiones ociosas más de 'ping_after_seconds' antes de entregarlas.
+    """
+    def __init__(self, size=DB_POOL_SIZE, recycle_seconds=DB_POOL_RECYCLE_SECONDS,
+                 ping_after_seconds=DB_POOL_PING_AFTER_SECONDS, timeout_seconds=DB_POOL_TIMEOUT_SECONDS,
+                 connect_function=_open_raw_connection):
+        self.size = max(1, int(size))
+        self.recycle_seconds = recycle_seconds
+        self.ping_after_seconds = ping_after_seconds
+        self.timeout_seconds = timeout_seconds
+        self._connect = connect_function
+        self._idle = [] # Lista de tuplas (conexion, momento_en_que_se_devolvio)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _is_healthy(self, raw_connection, idle_seconds):
+        if idle_seconds > self.recycle_seconds:
+            return False
+        try:
+            if idle_seconds > self.ping_after_seconds:
+                raw_connection.ping(reconnect=False)
+            return raw_connection.is_connected()
+        except mysql.connector.Error:
+            return False
+
+    def _discard(self, raw_connection):
+        try:
+            raw_connection.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """
+        Entrega una conexión del pool (o abre una nueva si no hay ociosas).
+        Returns:
+            PooledConnection: La conexión envuelta, o None si no se pudo obtener.
+        """
+        if not self._slots.acquire(timeout=timeout if timeout is not None else self.timeout_seconds):
+            print("Error: Tiempo de espera agotado al obtener una conexión del pool.")
+            return None
+        try:
+            while True:
+                with self._lock:
+                    idle_entry = self._idle.pop() if self._idle else None
+                if idle_entry is None:
+                    break
+                raw_connection, released_at = idle_entry
+                if self._is_healthy(raw_connection, time.monotonic() - released_at):
+                    return PooledConnection(self, raw_connection)
+                self._discard(raw_connection)
+
+            raw_connection = self._connect()
+            if raw_connection is None:
+                self._slots.release()
+                return None
+            return PooledConnection(self, raw_connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, raw_connection):
+        """Devuelve una conexión al pool, deshaciendo cualquier transacción que haya quedado abierta."""
+        try:
+            if raw_connection.is_connected():
+                if getattr(raw_connection, "in_transaction", False):
+                    raw_connection.rollback()
+                with self._lock:
+                    self._idle.append((raw_connection, time.monotonic()))
+            else:
+                self._discard(raw_connection)
+        except mysql.connector.Error:
+            self._discard(raw_connection)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """Cierra todas las conexiones ociosas (ej. al salir de la aplicación)."""
+        with self._lock:
+            idle_entries, self._idle = self._idle, []
+        for raw_connection, _ in idle_entries:
+            self._discard(raw_connection)
+
+
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+def get_connection_pool():
+    """Devuelve el pool de conexiones del proceso, creándolo en el primer uso."""
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = ConnectionPool()
+    return _connection_pool
+
+def get_db_connection():
+    """
+    Obtiene una conexión a la base de datos MySQL desde el pool del proceso.
+    Llamar a close() sobre la conexión la devuelve al pool.
+    Si el hilo actual está dentro de un bloque 'with transaction()', se devuelve la
+    conexión de esa transacción, de modo que toda la operación comparte una única conexión.
+    Returns:
+        PooledConnection: Objeto de conexión o None si falla.
+    """
+    active_transaction = get_current_transaction()
+    if active_transaction is not None:
+        return TransactionBoundConnection(active_transaction)
+    return get_connection_pool().acquire()
+
+
+# --- UNIDAD DE TRABAJO (TRANSACCIONES MULTI-SENTENCIA) ---
+_transaction_state = threading.local()
+
+def get_current_transaction():
+    """Devuelve la transacción activa en el hilo actual, o None si no hay ninguna."""
+    return getattr(_transaction_state, "current", None)
+
+
+class TransactionBoundConnection:
+    """
+    Vista de la conexión de una transacción activa para el código que gestiona su propia conexión
+    (get_db_connection / commit / rollback / close). commit() y close() no tienen efecto porque
+    los decide la transacción externa; rollback() marca la transacción para deshacerse al final.
+    """
+    def __init__(self, active_transaction):
+        self._transaction = active_transaction
+
+    def __getattr__(self, name):
+        return getattr(self._transaction.connection, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self._transaction.mark_failed()
+
+    def close(self):
+        pass
+
+
+class Transaction:
+    """
+    Unidad de trabajo: una sola conexión y un solo commit para varias sentencias.
+    Se usa con 'with db.transaction() as tx:'. Dentro del bloque, db.fetch_one, db.fetch_all,
+    db.execute_query y get_db_connection (y por tanto las funciones de los modelos) usan
+    automáticamente esta misma conexión. Al salir se hace commit, o rollback si hubo una
+    excepción o alguna sentencia falló.
+    """
+    def __init__(self):
+        self.connection = None
+        self.cursor = None
+        self.failed = False
+        self._depth = 0
+
+    def mark_failed(self):
+        self.failed = True
+
+    def fetch_one(self, query, params=None):
+        self.cursor.execute(query, params)
+        return self.cursor.fetchone()
+
+    def fetch_all(self, query, params=None):
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+
+    def execute(self, query, params=None):
+        """Ejecuta una sentencia y devuelve lastrowid (INSERT) o rowcount (UPDATE/DELETE)."""
+        self.cursor.execute(query, params)
+        return self.cursor.lastrowid if self.cursor.lastrowid else self.cursor.rowcount
+
+    def executemany(self, query, params_seq):
+        """Ejecuta una sentencia para varias filas (los INSERT se agrupan en uno multi-fila)."""
+        self.cursor.executemany(query, params_seq)
+        return self.cursor.rowcount
+
+    def __enter__(self):
+        if self._depth == 0:
+            self.connection = get_connection_pool().acquire()
+            if not self.connection:
+                raise mysql.connector.Error("No se pudo establecer la conexión a la base de datos.")
+            # Con buffer: fetch_one sobre una consulta de varias filas no deja resultados sin leer que
+            # harían fallar la siguiente sentencia o el cierre del cursor
+            self.cursor = self.connection.cursor(dictionary=True, buffered=True)
+            _transaction_state.current = self
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._depth -= 1
+        if exc_type is not None:
+            self.failed = True
+        if self._depth > 0:
+            return False # Transacción anidada: decide la transacción externa
+
+        _transaction_state.current = None
+        try:
+            if self.failed:
+                if exc_type is not None:
+                    print(f"Ocurrió una excepción en la transacción: {exc_val}. Haciendo rollback...")
+                self.connection.rollback()
+            else:
+                self.connection.commit()
+        finally:
+            # La conexión vuelve al pool aunque falle el cierre del cursor: si no, su hueco se pierde
+            try:
+                if self.cursor:
+                    self.cursor.close()
+            finally:
+                self.connection.close()
+        return False
+
+
+def transaction():
+    """
+    Abre (o se une a) la unidad de trabajo del hilo actual.
+    Ejemplo:
+        with db.transaction() as tx:
+            mesa = tx.fetch_one("SELECT estado FROM Mesa WHERE id_mesa = %s FOR UPDATE", (id_mesa,))
+            ...
+    Returns:
+        Transaction: La transacción activa (la existente si ya hay una en curso).
+    """
+    return get_current_transaction() or Transaction()
+
 class DatabaseConnection:
     """
     Clase para manejar la conexión a la base de datos usando un context manager.
-    Esto asegura que la conexión se cierre automáticamente.
+    Esto asegura que la conexión se devuelva automáticamente al pool.
     """
     def __init__(self):
         self.connection = None
@@ -57,57 +496,90 @@ class DatabaseConnection:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.connection:
-            if exc_type is not None: # Si ocurrió una excepción dentro del bloque 'with'
-                print(f"Ocurrió una excepción: {exc_val}. Haciendo rollback...")
-                self.connection.rollback()
-            else:
-                self.connection.commit() # Confirmar cambios si no hubo excepciones
-            
-            if self.cursor:
-                self.cursor.close()
-            self.connection.close()
-            # print("Conexión a la base de datos cerrada.")
+            try:
+                if exc_type is not None: # Si ocurrió una excepción dentro del bloque 'with'
+                    print(f"Ocurrió una excepción: {exc_val}. Haciendo rollback...")
+                    self.connection.rollback()
+                else:
+                    self.connection.commit() # Confirmar cambios si no hubo excepciones
+            finally:
+                # Aunque fallen el commit o el cierre del cursor, la conexión se devuelve al pool
+                try:
+                    if self.cursor:
+                        self.cursor.close()
+                finally:
+                    self.connection.close()
 
 # --- FUNCIONES DE OPERACIONES COMUNES ---
 
-def fetch_all(query, params=None):
+def _copy_rows(result):
+    """Copia las filas para que quien las reciba pueda modificarlas sin alterar la caché."""
+    if isinstance(result, list):
+        return [dict(row) for row in result]
+    return dict(result) if result is not None else None
+
+def _cached_read(kind, query, params, cache_tables, read_function):
+    """Sirve la lectura desde la caché de resultados si se pidió y es posible; si no, la ejecuta."""
+    if not cache_tables or not DB_QUERY_CACHE_ENABLED or get_current_transaction() is not None:
+        return read_function() # Dentro de una transacción se lee siempre de la BD (ve sus propias escrituras)
+    key = (kind, query, tuple(params) if params else None)
+    try:
+        cached = _query_cache.get(key)
+    except TypeError: # Parámetros no hashables: no se cachea
+        return read_function()
+    if cached is not QueryResultCache._MISS:
+        return _copy_rows(cached)
+    generation = _query_cache.generation
+    result = read_function()
+    if result is not None:
+        _query_cache.put(key, frozenset(table.lower() for table in cache_tables), _copy_rows(result), generation)
+    return result
+
+def fetch_all(query, params=None, cache_tables=None):
     """
     Ejecuta una consulta SELECT y devuelve todas las filas.
     Args:
         query (str): La consulta SQL a ejecutar.
         params (tuple, optional): Parámetros para la consulta SQL. Defaults to None.
+        cache_tables (iterable, optional): Tablas que lee la consulta. Si se indican, el resultado se
+            guarda en la caché de resultados y se reutiliza hasta que se escriba en alguna de ellas.
     Returns:
         list: Una lista de diccionarios, donde cada diccionario representa una fila.
               None si ocurre un error.
     """
-    results = None
-    try:
-        with DatabaseConnection() as cursor:
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-    except mysql.connector.Error as err:
-        print(f"Error al ejecutar fetch_all: {err}")
-        print(f"Consulta: {query}, Parámetros: {params}")
-    return results
+    def read():
+        results = None
+        try:
+            with DatabaseConnection() as cursor:
+                cursor.execute(query, params)
+                results = cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al ejecutar fetch_all: {err}")
+            print(f"Consulta: {query}, Parámetros: {params}")
+        return results
+    return _cached_read("all", query, params, cache_tables, read)
 
-def fetch_one(query, params=None):
+def fetch_one(query, params=None, cache_tables=None):
     """
     Ejecuta una consulta SELECT y devuelve una sola fila.
     Args:
         query (str): La consulta SQL a ejecutar.
         params (tuple, optional): Parámetros para la consulta SQL. Defaults to None.
+        cache_tables (iterable, optional): Como en fetch_all.
     Returns:
         dict: Un diccionario que representa la fila, o None si no se encuentra o hay error.
     """
-    result = None
-    try:
-        with DatabaseConnection() as cursor:
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-    except mysql.connector.Error as err:
-        print(f"Error al ejecutar fetch_one: {err}")
-        print(f"Consulta: {query}, Parámetros: {params}")
-    return result
+    def read():
+        result = None
+        try:
+            with DatabaseConnection() as cursor:
+                cursor.execute(query, params)
+                result = cursor.fetchone()
+        except mysql.connector.Error as err:
+            print(f"Error al ejecutar fetch_one: {err}")
+            print(f"Consulta: {query}, Parámetros: {params}")
+        return result
+    return _cached_read("one", query, params, cache_tables, read)
 
 def execute_query(query, params=None):
     """
@@ -136,6 +608,60 @@ def execute_query(query, params=None):
     return result_id_or_count
 
 
+
+# --- FILTROS POR RANGO DE FECHAS ---
+def to_date(value):
+    """Convierte un date, datetime o texto 'YYYY-MM-DD' en datetime.date."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+def day_range(start_date=None, end_date=None):
+    """
+    Convierte un rango de días inclusivo [start_date, end_date] en límites de timestamp semiabiertos:
+    desde el inicio de start_date hasta el inicio del día siguiente a end_date (excluido).
+    Returns:
+        tuple: (inicio datetime o None, fin_exclusivo datetime o None)
+    """
+    range_start = datetime.datetime.combine(to_date(start_date), datetime.time.min) if start_date else None
+    range_end = datetime.datetime.combine(to_date(end_date) + datetime.timedelta(days=1), datetime.time.min) if end_date else None
+    return range_start, range_end
+
+def date_range_conditions(column, start_date=None, end_date=None):
+    """
+    Construye las condiciones WHERE de un filtro por días sobre una columna DATETIME/TIMESTAMP sin
+    envolver la columna en DATE(), para que MySQL pueda usar su índice:
+        column >= inicio AND column < fin_exclusivo
+    Returns:
+        tuple: (lista de condiciones SQL, lista de parámetros)
+    """
+    range_start, range_end = day_range(start_date, end_date)
+    conditions = []
+    params = []
+    if range_start:
+        conditions.append(f"{column} >= %s")
+        params.append(range_start)
+    if range_end:
+        conditions.append(f"{column} < %s")
+        params.append(range_end)
+    return conditions, params
+
+def keyset_before_condition(date_column, id_column, after=None):
+    """
+    Condición de paginación por cursor (keyset) para listados ordenados por (fecha DESC, id DESC).
+    'after' es el par (fecha, id) de la última fila de la página anterior; la siguiente página empieza
+    justo después de ella sin OFFSET, apoyándose en el índice (fecha, id).
+    Returns:
+        tuple: (condición SQL o None, lista de parámetros)
+    """
+    if not after:
+        return None, []
+    after_date, after_id = after
+    condition = f"({date_column} < %s OR ({date_column} = %s AND {id_column} < %s))"
+    return condition, [after_date, after_date, after_id]
+
 # --- EJEMPLOS DE USO (SOLO PARA PRUEBAS DIRECTAS DE ESTE ARCHIVO) ---
 if __name__ == "__main__":
     print("Probando el módulo db.py...")
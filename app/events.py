@@ -0,0 +1,255 @@
+# app/events.py
+# Notificaciones de cambios entre terminales (pub/sub local, sin broker externo).
+#
+# Las funciones de escritura de los modelos publican eventos compactos, por ejemplo
+#     publish(TOPIC_TABLE, "M01", {"estado": "ocupada"})
+# y las vistas se suscriben a los temas que muestran (ver app/views/change_listener.py).
+#
+# Backends (variable de entorno CHANGE_EVENTS_BACKEND):
+#   'mysql' (por defecto): el evento se inserta en la tabla EventoCambio dentro de la misma
+#       transacción que el cambio, así solo se notifica lo confirmado. Un único hilo por proceso
+#       lee los eventos nuevos por id y los reparte a los suscriptores del proceso.
+#   'local': los eventos se reparten en memoria dentro del proceso, sin tocar la BD. Sirve para
+#       pruebas o para una sola terminal (ver use_local_backend()).
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+
+try:
+    from app import db
+except ImportError:
+    try:
+        from . import db
+    except ImportError:
+        try:
+            import db
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en events.py: {e}")
+            db = None
+
+# Temas de los eventos (la 'id_entidad' del evento es el id de la fila afectada).
+TOPIC_ORDER = "comanda"
+TOPIC_ORDER_ITEM = "detalle_comanda"
+TOPIC_INGREDIENT = "ingrediente"
+TOPIC_TABLE = "mesa"
+TOPIC_RECIPE = "receta" # id_entidad: id_plato cuya receta cambió
+TOPIC_DISH = "plato" # id_entidad: id_plato creado, modificado o eliminado
+TOPIC_STATION = "estacion" # id_entidad: id_estacion; cambió el enrutado de platos a estaciones
+
+# Tablas que cambian con cada tema. Al llegar un evento (posiblemente de otra terminal) se descartan
+# de la caché de resultados de db los que leen esas tablas.
+_TABLES_BY_TOPIC = {
+    TOPIC_ORDER: ("Comanda", "Mesa", "Factura"),
+    TOPIC_ORDER_ITEM: ("DetalleComanda",),
+    TOPIC_INGREDIENT: ("Ingrediente", "MovimientoStock", "ReservaStock"),
+    TOPIC_TABLE: ("Mesa",),
+    TOPIC_RECIPE: ("Receta",),
+    TOPIC_DISH: ("Plato",),
+    TOPIC_STATION: ("EstacionCocina", "EstacionCategoria", "Plato", "DetalleComanda"),
+}
+
+CHANGE_EVENTS_BACKEND = os.getenv("CHANGE_EVENTS_BACKEND", "mysql")
+# Cada cuánto el hilo del proceso consulta EventoCambio (una consulta por proceso, no por vista).
+EVENT_POLL_INTERVAL_SECONDS = float(os.getenv("CHANGE_EVENTS_POLL_SECONDS", 0.5))
+# Un id de evento que falta (transacción aún sin confirmar o deshecha) se sigue esperando este tiempo.
+EVENT_GAP_TIMEOUT_SECONDS = 5
+# Los eventos se borran pasado este tiempo; cada proceso lo revisa cada EVENT_PURGE_EVERY_SECONDS.
+EVENT_RETENTION_HOURS = 24
+EVENT_PURGE_EVERY_SECONDS = 600
+
+_INSERT_EVENT_QUERY = "INSERT INTO EventoCambio (tema, id_entidad, datos) VALUES (%s, %s, %s)"
+
+
+class LocalEventBus:
+    """Suscriptores del proceso. Los callbacks se llaman en el hilo que reparte el evento."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {} # token -> (temas, callback)
+        self._tokens = itertools.count(1)
+
+    def subscribe(self, topics, callback):
+        """Registra callback(evento) para los temas indicados. Devuelve un token para unsubscribe()."""
+        with self._lock:
+            token = next(self._tokens)
+            self._subscribers[token] = (frozenset(topics), callback)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def dispatch(self, event):
+        with self._lock:
+            callbacks = [callback for topics, callback in self._subscribers.values() if event['tema'] in topics]
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                traceback.print_exc()
+
+
+def _decode_event_data(raw_data):
+    if raw_data is None:
+        return {}
+    if isinstance(raw_data, (bytes, bytearray)):
+        raw_data = raw_data.decode("utf-8")
+    if isinstance(raw_data, str):
+        return json.loads(raw_data) if raw_data else {}
+    return raw_data
+
+
+class ChangeLogPoller:
+    """
+    Hilo que lee los eventos nuevos de EventoCambio y los reparte al bus del proceso.
+
+    Los ids AUTO_INCREMENT se asignan al insertar pero se hacen visibles al confirmar, así que un
+    id menor puede aparecer después de uno mayor. Se guarda el último id a partir del cual no hay
+    huecos; los eventos posteriores ya repartidos se recuerdan para no repetirlos, y un hueco que
+    no se llena en EVENT_GAP_TIMEOUT_SECONDS (transacción deshecha) se da por perdido.
+    """
+    def __init__(self, bus):
+        self.bus = bus
+        self._low_water_id = None # Todos los ids <= este ya se repartieron o se descartaron
+        self._delivered_ids = set() # Ids > _low_water_id ya repartidos
+        self._gap_first_seen = {} # id que falta -> time.monotonic() en que se detectó el hueco
+        self._last_purge = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="eventos-cambio", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error al leer eventos de cambio: {e}")
+            self._stop.wait(EVENT_POLL_INTERVAL_SECONDS)
+
+    def poll_once(self):
+        if not db: return
+        if self._low_water_id is None:
+            # Al arrancar solo interesan los eventos nuevos, no el histórico
+            row = db.fetch_one("SELECT COALESCE(MAX(id_evento), 0) AS ultimo FROM EventoCambio")
+            if row is None:
+                return
+            self._low_water_id = int(row['ultimo'])
+            return
+
+        rows = db.fetch_all("""
+            SELECT id_evento, tema, id_entidad, datos FROM EventoCambio
+            WHERE id_evento > %s ORDER BY id_evento ASC
+        """, (self._low_water_id,))
+        if rows is None:
+            return
+        for row in rows:
+            event_id = int(row['id_evento'])
+            if event_id in self._delivered_ids:
+                continue
+            self._delivered_ids.add(event_id)
+            db.invalidate_cached_tables(_TABLES_BY_TOPIC.get(row['tema'], ()))
+            self.bus.dispatch({
+                'id_evento': event_id,
+                'tema': row['tema'],
+                'id_entidad': row['id_entidad'],
+                'datos': _decode_event_data(row['datos']),
+            })
+        self._advance_low_water()
+        self._purge_old_events()
+
+    def _advance_low_water(self):
+        if not self._delivered_ids:
+            return
+        now = time.monotonic()
+        max_delivered = max(self._delivered_ids)
+        next_id = self._low_water_id + 1
+        while next_id <= max_delivered:
+            if next_id in self._delivered_ids:
+                self._delivered_ids.discard(next_id)
+            else:
+                first_seen = self._gap_first_seen.setdefault(next_id, now)
+                if now - first_seen < EVENT_GAP_TIMEOUT_SECONDS:
+                    break # Puede ser una transacción que aún no confirmó
+            self._gap_first_seen.pop(next_id, None)
+            self._low_water_id = next_id
+            next_id += 1
+
+    def _purge_old_events(self):
+        now = time.monotonic()
+        if now - self._last_purge < EVENT_PURGE_EVERY_SECONDS:
+            return
+        self._last_purge = now
+        db.execute_query("DELETE FROM EventoCambio WHERE fecha_hora < NOW(6) - INTERVAL %s HOUR", (EVENT_RETENTION_HOURS,))
+
+
+_bus = LocalEventBus()
+_poller = None
+_poller_lock = threading.Lock()
+_local_event_ids = itertools.count(1)
+
+
+def use_local_backend():
+    """Cambia a reparto en memoria (pruebas o una sola terminal). Detiene el hilo de EventoCambio."""
+    global CHANGE_EVENTS_BACKEND
+    CHANGE_EVENTS_BACKEND = "local"
+    with _poller_lock:
+        if _poller is not None:
+            _poller.stop()
+
+
+def subscribe(topics, callback):
+    """
+    Suscribe callback(evento) a los temas indicados. El evento es un dict con 'id_evento', 'tema',
+    'id_entidad' y 'datos'. Con el backend 'mysql' el callback se llama desde el hilo lector,
+    no desde el de Tk (las vistas usan ChangeListener). Devuelve el token para unsubscribe().
+    """
+    global _poller
+    token = _bus.subscribe(topics, callback)
+    if CHANGE_EVENTS_BACKEND == "mysql":
+        with _poller_lock:
+            if _poller is None:
+                _poller = ChangeLogPoller(_bus)
+            _poller.start()
+    return token
+
+
+def unsubscribe(token):
+    # El hilo lector sigue activo aunque no queden suscriptores: entre sesiones (login) se vuelve
+    # a necesitar enseguida y mantiene el último id leído.
+    _bus.unsubscribe(token)
+
+
+def publish(topic, entity_id=None, data=None, cursor=None):
+    """
+    Publica un cambio. Debe llamarse después de la escritura y antes del commit: con el backend
+    'mysql' el evento se inserta con 'cursor' si se indica, o con la transacción activa del hilo
+    (db.transaction()), y se confirma o deshace junto con el cambio. Un fallo al registrar el
+    evento solo se informa; no anula la operación.
+    """
+    if CHANGE_EVENTS_BACKEND == "local":
+        _bus.dispatch({'id_evento': next(_local_event_ids), 'tema': topic,
+                       'id_entidad': None if entity_id is None else str(entity_id), 'datos': data or {}})
+        return
+    if not db: return
+
+    params = (topic, None if entity_id is None else str(entity_id), json.dumps(data or {}, default=str))
+    if cursor is None:
+        active_transaction = db.get_current_transaction()
+        cursor = active_transaction.cursor if active_transaction else None
+    try:
+        if cursor is not None:
+            cursor.execute(_INSERT_EVENT_QUERY, params)
+        else:
+            db.execute_query(_INSERT_EVENT_QUERY, params)
+    except Exception as e:
+        print(f"Advertencia: No se pudo registrar el evento '{topic}' ({entity_id}): {e}")
@@ -0,0 +1,229 @@
+# app/models/billing_model.py
+# Facturación: cálculo de la cuenta, alta de la Factura, cierre de la Comanda y liberación de la Mesa.
+#
+# La cuenta sale de una sola agregación sobre DetalleComanda.subtotal_detalle (las líneas que pasaron
+# por cocina; las pendientes o canceladas no se cobran). Reglas:
+#     descuentos = subtotal * porcentaje / 100 + monto fijo, como máximo el subtotal
+#                  (método de pago 'cortesia': todo el subtotal)
+#     impuestos  = (subtotal - descuentos) * BILLING_TAX_RATE
+#     total_factura = subtotal + impuestos - descuentos (columna generada de Factura)
+# con redondeo a céntimos (mitad hacia arriba, igual que ROUND de MySQL sobre DECIMAL).
+#
+# Factura, Comanda, Mesa, reservas de stock y eventos se escriben en la misma transacción.
+import datetime
+import os
+import traceback
+from decimal import Decimal, ROUND_HALF_UP
+
+try:
+    from app import db
+    from app import events
+    from app.models import stock_model
+except ImportError:
+    try:
+        from .. import db
+        from .. import events
+        from . import stock_model
+    except ImportError:
+        try:
+            import db
+            import events
+            import stock_model
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en billing_model.py: {e}")
+            db = events = stock_model = None
+
+# Tasa de impuesto sobre la base (subtotal - descuentos).
+BILLING_TAX_RATE = Decimal(os.getenv("BILLING_TAX_RATE", "0.19"))
+PAYMENT_METHODS = ('efectivo', 'tarjeta_credito', 'tarjeta_debito', 'transferencia', 'online', 'cortesia', 'otro')
+# Comandas que se pueden facturar una a una y las que el cierre de turno factura por defecto.
+BILLABLE_ORDER_STATUSES = ('servida',)
+SHIFT_CLOSE_ORDER_STATUSES = ('lista para servir', 'servida')
+# Líneas que se cobran: las que llegaron a cocina.
+BILLABLE_ITEM_STATUSES = ('en preparacion', 'listo', 'entregado')
+
+CENT = Decimal("0.01")
+
+# Subtotal facturable por comanda (una fila por comanda, aunque no tenga líneas cobrables).
+_ORDER_SUBTOTALS_QUERY = """
+SELECT c.id_comanda, c.id_mesa, COALESCE(SUM(dc.subtotal_detalle), 0) AS subtotal, COUNT(dc.id_detalle_comanda) AS lineas
+FROM Comanda c
+LEFT JOIN DetalleComanda dc ON dc.id_comanda = c.id_comanda AND dc.estado_plato IN ({item_statuses})
+WHERE {where}
+GROUP BY c.id_comanda, c.id_mesa
+"""
+
+# Mesas de entre las indicadas que hay que liberar: ocupadas y ya sin ninguna comanda activa.
+_TABLES_TO_FREE_QUERY = """
+SELECT id_mesa FROM Mesa
+WHERE id_mesa IN ({tables}) AND estado <> 'libre'
+  AND id_mesa NOT IN (SELECT c.id_mesa FROM Comanda c WHERE c.estado_comanda NOT IN ('facturada', 'cancelada'))
+FOR UPDATE
+"""
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+def invoice_id_for_order(order_id_value):
+    """Id de la factura única de una comanda: 'FAC-<id_comanda>' (con la cuenta dividida, split_bill_model añade '-<n>')."""
+    return f"FAC-{order_id_value}"
+
+def compute_bill_totals(subtotal, payment_method=None, discount_percent=0, discount_amount=0):
+    """
+    Aplica las reglas de descuento e impuesto a un subtotal.
+    Returns:
+        dict: {'subtotal', 'descuentos', 'impuestos', 'total'} como Decimal con dos decimales.
+    """
+    subtotal = Decimal(str(subtotal)).quantize(CENT, rounding=ROUND_HALF_UP)
+    if payment_method == 'cortesia':
+        discounts = subtotal
+    else:
+        discounts = subtotal * Decimal(str(discount_percent or 0)) / 100 + Decimal(str(discount_amount or 0))
+        discounts = min(subtotal, max(Decimal(0), discounts)).quantize(CENT, rounding=ROUND_HALF_UP)
+    taxes = ((subtotal - discounts) * BILLING_TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+    return {'subtotal': subtotal, 'descuentos': discounts, 'impuestos': taxes, 'total': subtotal + taxes - discounts}
+
+def _close_orders(tx, order_ids, table_ids, closed_at, final_status='facturada'):
+    """Cierra las comandas, libera sus mesas y sus reservas de stock y publica los eventos, en la transacción tx."""
+    tx.execute(f"UPDATE Comanda SET estado_comanda = %s, fecha_hora_cierre = %s WHERE id_comanda IN ({_placeholders(order_ids)})",
+               (final_status, closed_at, *order_ids))
+    table_ids = sorted(set(table_id for table_id in table_ids if table_id))
+    freed_tables = []
+    if table_ids:
+        freed_tables = [row['id_mesa'] for row in tx.fetch_all(_TABLES_TO_FREE_QUERY.format(tables=_placeholders(table_ids)),
+                                                               tuple(table_ids))]
+    if freed_tables:
+        tx.execute(f"UPDATE Mesa SET estado = 'libre' WHERE id_mesa IN ({_placeholders(freed_tables)})", tuple(freed_tables))
+    if stock_model:
+        # Las líneas que nunca se enviaron a cocina dejan de retener stock
+        reserved_orders = tx.fetch_all(f"SELECT DISTINCT id_comanda FROM ReservaStock WHERE id_comanda IN ({_placeholders(order_ids)})",
+                                       tuple(order_ids))
+        for row in reserved_orders:
+            stock_model._release_reservations(tx.cursor, id_comanda=row['id_comanda'])
+    for table_id in freed_tables:
+        events.publish(events.TOPIC_TABLE, table_id, {'estado': 'libre'})
+    return freed_tables
+
+def bill_order(order_id_value, payment_method, customer_id_value=None, payment_reference=None,
+               discount_percent=0, discount_amount=0):
+    """
+    Factura una comanda: calcula la cuenta, inserta la Factura (pagada), cierra la Comanda como
+    'facturada' y libera su Mesa, todo en una transacción.
+    Returns:
+        dict: {'exito': bool, 'mensaje': str, 'factura': {'id_factura', 'subtotal', 'descuentos',
+               'impuestos', 'total', 'metodo_pago'} o None}, o None si hubo un error de BD.
+    """
+    if not db: return None
+    if payment_method not in PAYMENT_METHODS:
+        return {'exito': False, 'factura': None,
+                'mensaje': f"Método de pago '{payment_method}' no válido ({', '.join(PAYMENT_METHODS)})."}
+    try:
+        with db.transaction() as tx:
+            order_info = tx.fetch_one("SELECT id_mesa, estado_comanda, id_cliente FROM Comanda WHERE id_comanda = %s FOR UPDATE",
+                                      (order_id_value,))
+            if not order_info:
+                return {'exito': False, 'factura': None, 'mensaje': f"Comanda '{order_id_value}' no encontrada."}
+            if order_info['estado_comanda'] not in BILLABLE_ORDER_STATUSES:
+                return {'exito': False, 'factura': None,
+                        'mensaje': f"La comanda '{order_id_value}' no se puede facturar (estado: {order_info['estado_comanda']})."}
+
+            subtotal_row = tx.fetch_one(
+                _ORDER_SUBTOTALS_QUERY.format(item_statuses=_placeholders(BILLABLE_ITEM_STATUSES), where="c.id_comanda = %s"),
+                (*BILLABLE_ITEM_STATUSES, order_id_value))
+            totals = compute_bill_totals(subtotal_row['subtotal'], payment_method, discount_percent, discount_amount)
+            issued_at = datetime.datetime.now()
+            invoice_id = invoice_id_for_order(order_id_value)
+            tx.execute("""
+                INSERT INTO Factura (id_factura, id_comanda, id_cliente_factura, fecha_hora_emision, subtotal, impuestos,
+                                     descuentos, metodo_pago, referencia_pago, estado_factura)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'pagada')
+            """, (invoice_id, order_id_value, customer_id_value or order_info['id_cliente'], issued_at, totals['subtotal'],
+                  totals['impuestos'], totals['descuentos'], payment_method, payment_reference))
+            _close_orders(tx, [order_id_value], [order_info['id_mesa']], issued_at)
+            events.publish(events.TOPIC_ORDER, order_id_value, {'estado': 'facturada', 'id_mesa': order_info['id_mesa'],
+                                                                'id_factura': invoice_id})
+
+        invoice = dict(totals, id_factura=invoice_id, metodo_pago=payment_method)
+        return {'exito': True, 'factura': invoice,
+                'mensaje': f"Comanda '{order_id_value}' facturada ({invoice_id}): total {invoice['total']:.2f}."}
+
+    except Exception as e:
+        print(f"Excepción al facturar la comanda '{order_id_value}': {e}")
+        traceback.print_exc()
+        return None
+
+def close_shift_orders(payment_method='efectivo', order_statuses=SHIFT_CLOSE_ORDER_STATUSES, opened_before=None):
+    """
+    Cierre de fin de turno: factura de una vez todas las comandas que quedaron en los estados indicados
+    (abiertas antes de 'opened_before', si se indica), sin descuentos manuales, con un INSERT ... SELECT
+    agregado y un UPDATE por tabla, en una sola transacción.
+    Returns:
+        dict: {'exito': bool, 'mensaje': str, 'comandas': [id_comanda, ...], 'mesas_liberadas': [id_mesa, ...],
+               'total': Decimal}, o None si hubo un error de BD.
+    """
+    if not db: return None
+    if payment_method not in PAYMENT_METHODS:
+        return {'exito': False, 'comandas': [], 'mesas_liberadas': [], 'total': Decimal(0),
+                'mensaje': f"Método de pago '{payment_method}' no válido."}
+    order_statuses = tuple(order_statuses)
+    where = f"c.estado_comanda IN ({_placeholders(order_statuses)})"
+    params = order_statuses
+    if opened_before is not None:
+        where += " AND c.fecha_hora_apertura < %s"
+        params += (opened_before,)
+
+    try:
+        with db.transaction() as tx:
+            orders = tx.fetch_all(f"""
+                SELECT c.id_comanda, c.id_mesa FROM Comanda c
+                WHERE {where} AND NOT EXISTS (SELECT 1 FROM Factura f WHERE f.id_comanda = c.id_comanda)
+                ORDER BY c.id_comanda
+                FOR UPDATE
+            """, params)
+            if not orders:
+                return {'exito': True, 'comandas': [], 'mesas_liberadas': [], 'total': Decimal(0),
+                        'mensaje': "No hay comandas pendientes de cerrar."}
+
+            order_ids = [order['id_comanda'] for order in orders]
+            issued_at = datetime.datetime.now()
+            courtesy = payment_method == 'cortesia' # Mismas reglas que compute_bill_totals, sin descuentos manuales
+            subtotals = _ORDER_SUBTOTALS_QUERY.format(item_statuses=_placeholders(BILLABLE_ITEM_STATUSES),
+                                                      where=f"c.id_comanda IN ({_placeholders(order_ids)})")
+            tx.execute(f"""
+                INSERT INTO Factura (id_factura, id_comanda, fecha_hora_emision, subtotal, impuestos, descuentos,
+                                     metodo_pago, estado_factura)
+                SELECT CONCAT('FAC-', t.id_comanda), t.id_comanda, %s, t.subtotal,
+                       CASE WHEN %s THEN 0 ELSE ROUND(t.subtotal * %s, 2) END,
+                       CASE WHEN %s THEN t.subtotal ELSE 0 END,
+                       %s, 'pagada'
+                FROM ({subtotals}) AS t
+            """, (issued_at, courtesy, BILLING_TAX_RATE, courtesy, payment_method, *BILLABLE_ITEM_STATUSES, *order_ids))
+            freed_tables = _close_orders(tx, order_ids, [order['id_mesa'] for order in orders], issued_at)
+            total_row = tx.fetch_one(f"SELECT COALESCE(SUM(total_factura), 0) AS total FROM Factura WHERE id_comanda IN ({_placeholders(order_ids)})",
+                                     tuple(order_ids))
+            for order in orders:
+                events.publish(events.TOPIC_ORDER, order['id_comanda'], {'estado': 'facturada', 'id_mesa': order['id_mesa'],
+                                                                         'id_factura': invoice_id_for_order(order['id_comanda'])})
+
+        return {'exito': True, 'comandas': order_ids, 'mesas_liberadas': freed_tables, 'total': total_row['total'],
+                'mensaje': f"{len(order_ids)} comandas facturadas, {len(freed_tables)} mesas liberadas."}
+
+    except Exception as e:
+        print(f"Excepción en el cierre de turno: {e}")
+        traceback.print_exc()
+        return None
+
+def get_invoice_for_order(order_id_value):
+    """Factura única (sin pagador) de una comanda, o None. Con la cuenta dividida, ver get_invoices_for_order."""
+    if not db: return None
+    return db.fetch_one("SELECT * FROM Factura WHERE id_comanda = %s AND pagador IS NULL", (order_id_value,))
+
+def get_invoices_for_order(order_id_value):
+    """
+    Todas las facturas de una comanda: la única de bill_order o una por pagador de split_bill_model.bill_split.
+    Returns:
+        list: Filas de Factura ordenadas por pagador (la factura sin pagador primero), o None si hay error.
+    """
+    if not db: return None
+    return db.fetch_all("SELECT * FROM Factura WHERE id_comanda = %s ORDER BY pagador_clave, id_factura", (order_id_value,))
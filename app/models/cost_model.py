@@ -0,0 +1,96 @@
+# app/models/cost_model.py
+# Costo de receta y margen por plato, materializados en la tabla CostoPlato.
+#
+# costo_receta = SUM(Receta.cantidad_stock * Producto.costo_unitario) de las líneas del plato
+#     (cantidad_stock es la cantidad de la receta en la unidad del producto, ver unit_model)
+# margen = Plato.precio_venta - costo_receta
+#
+# El recálculo es siempre una sola sentencia INSERT ... SELECT ... ON DUPLICATE KEY UPDATE: para todo
+# el menú o solo para los platos afectados por un cambio (receta, costo de un producto o precio de un
+# plato). Los modelos que hacen esos cambios lo llaman dentro de su misma transacción.
+try:
+    from app import db
+except ImportError:
+    try:
+        from .. import db
+    except ImportError:
+        try:
+            import db
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en cost_model.py: {e}")
+            db = None
+
+_COST_ROLLUP_QUERY = """
+INSERT INTO CostoPlato (id_plato, costo_receta, precio_venta, margen, margen_porcentaje, lineas_receta, fecha_calculo)
+SELECT calc.id_plato, calc.costo_receta, calc.precio_venta, calc.margen, calc.margen_porcentaje, calc.lineas_receta, NOW()
+FROM (
+    SELECT pl.id_plato,
+           COALESCE(SUM(r.cantidad_stock * pr.costo_unitario), 0) AS costo_receta,
+           pl.precio_venta,
+           pl.precio_venta - COALESCE(SUM(r.cantidad_stock * pr.costo_unitario), 0) AS margen,
+           CASE WHEN pl.precio_venta > 0
+                THEN (pl.precio_venta - COALESCE(SUM(r.cantidad_stock * pr.costo_unitario), 0)) / pl.precio_venta * 100
+           END AS margen_porcentaje,
+           COUNT(r.id_receta) AS lineas_receta
+    FROM Plato pl
+    LEFT JOIN Receta r ON r.id_plato = pl.id_plato
+    LEFT JOIN Ingrediente i ON i.id_ingrediente = r.id_ingrediente
+    LEFT JOIN Producto pr ON pr.id_producto = i.id_producto
+    {where}
+    GROUP BY pl.id_plato, pl.precio_venta
+) AS calc
+ON DUPLICATE KEY UPDATE
+    costo_receta = calc.costo_receta, precio_venta = calc.precio_venta, margen = calc.margen,
+    margen_porcentaje = calc.margen_porcentaje, lineas_receta = calc.lineas_receta, fecha_calculo = NOW()
+"""
+
+
+def recalculate_dish_costs(dish_ids=None):
+    """
+    Recalcula costo y margen de los platos indicados, o de todo el menú si no se indican,
+    en una sola pasada set-based.
+    Args:
+        dish_ids (iterable, optional): IDs de plato a recalcular. Una lista vacía no hace nada.
+    Returns:
+        int: Filas afectadas según MySQL, o None si hay error.
+    """
+    if not db: return None
+    if dish_ids is None:
+        return db.execute_query(_COST_ROLLUP_QUERY.format(where=""))
+    dish_ids = sorted(set(dish_id for dish_id in dish_ids if dish_id))
+    if not dish_ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(dish_ids))
+    return db.execute_query(_COST_ROLLUP_QUERY.format(where=f"WHERE pl.id_plato IN ({placeholders})"), tuple(dish_ids))
+
+def recalculate_costs_for_product(product_id_value):
+    """Recalcula solo los platos cuya receta usa el producto indicado (p. ej. tras cambiar su costo_unitario)."""
+    if not db: return None
+    where = """WHERE pl.id_plato IN (
+        SELECT ru.id_plato FROM Receta ru
+        JOIN Ingrediente iu ON iu.id_ingrediente = ru.id_ingrediente
+        WHERE iu.id_producto = %s
+    )"""
+    return db.execute_query(_COST_ROLLUP_QUERY.format(where=where), (product_id_value,))
+
+def get_dish_costs():
+    """
+    Returns:
+        dict: {id_plato: {'costo_receta', 'precio_venta', 'margen', 'margen_porcentaje', 'lineas_receta', 'fecha_calculo'}},
+              o None si hay error.
+    """
+    if not db: return None
+    rows = db.fetch_all("""
+        SELECT id_plato, costo_receta, precio_venta, margen, margen_porcentaje, lineas_receta, fecha_calculo
+        FROM CostoPlato
+    """)
+    if rows is None:
+        return None
+    return {row['id_plato']: row for row in rows}
+
+def get_dish_cost(dish_id_value):
+    if not db or not dish_id_value: return None
+    return db.fetch_one("""
+        SELECT id_plato, costo_receta, precio_venta, margen, margen_porcentaje, lineas_receta, fecha_calculo
+        FROM CostoPlato WHERE id_plato = %s
+    """, (dish_id_value,))
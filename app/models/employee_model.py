@@ -77,7 +77,7 @@ def get_all_employees_list():
     """
     if not db: return None
     query_string = "SELECT id_empleado, nombre, apellido, rol, estado FROM Empleados ORDER BY nombre, apellido"
-    return db.fetch_all(query_string)
+    return db.fetch_all(query_string, cache_tables=("Empleados",))
 
 def update_employee_details(employee_id_value, data_to_update_dict):
     """
@@ -0,0 +1,112 @@
+# app/models/kitchen_analytics_model.py
+# Tiempos de cocina a partir del registro de transiciones de estado (TransicionDetalleComanda).
+#
+# Por cada línea de comanda que llegó a 'listo' dentro de la ventana consultada:
+#     ticket      = de 'pendiente' (pedido) a 'listo'
+#     preparación = de 'en preparacion' a 'listo' (si la línea pasó por ese estado)
+# y por grupo (plato, estación o franja horaria del pedido) los percentiles p50/p90/p99, calculados en
+# la BD con funciones de ventana (ROW_NUMBER/COUNT OVER) y método del rango más cercano: el pN es el
+# valor en la posición CEIL(N/100 * n) de los tiempos ordenados del grupo.
+try:
+    from app import db
+except ImportError:
+    try:
+        from .. import db
+    except ImportError:
+        try:
+            import db
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en kitchen_analytics_model.py: {e}")
+            db = None
+
+PERCENTILES = (50, 90, 99)
+
+# Agrupaciones disponibles: (clave del grupo, etiqueta a mostrar) como expresiones SQL sobre
+# 'ti' (tiempos por línea), 'p' (Plato), 'dc' (DetalleComanda) y 'e' (EstacionCocina).
+# La estación es la que tenía la línea al pedirse (DetalleComanda.id_estacion, ver station_model).
+GROUPINGS = {
+    'plato': ("ti.id_plato", "p.nombre_plato"),
+    'estacion': ("COALESCE(dc.id_estacion, '')", "COALESCE(e.nombre, 'Sin estación')"),
+    'hora': ("DATE_FORMAT(ti.hora_pedido, '%Y-%m-%d %H:00')", "DATE_FORMAT(ti.hora_pedido, '%d/%m %H:00')"),
+}
+
+_TIMES_QUERY = """
+WITH lineas_listas AS (
+    SELECT DISTINCT id_detalle_comanda
+    FROM TransicionDetalleComanda
+    WHERE estado_nuevo = 'listo' AND fecha_hora >= %s AND fecha_hora < %s
+),
+tiempos AS (
+    SELECT t.id_detalle_comanda, t.id_plato,
+           MIN(CASE WHEN t.estado_nuevo = 'pendiente' THEN t.fecha_hora END) AS hora_pedido,
+           MIN(CASE WHEN t.estado_nuevo = 'en preparacion' THEN t.fecha_hora END) AS hora_inicio,
+           MIN(CASE WHEN t.estado_nuevo = 'listo' THEN t.fecha_hora END) AS hora_listo
+    FROM TransicionDetalleComanda t
+    JOIN lineas_listas l ON l.id_detalle_comanda = t.id_detalle_comanda
+    GROUP BY t.id_detalle_comanda, t.id_plato
+),
+duraciones AS (
+    SELECT {group_key} AS grupo, {group_label} AS etiqueta,
+           TIMESTAMPDIFF(SECOND, ti.hora_pedido, ti.hora_listo) AS ticket,
+           TIMESTAMPDIFF(SECOND, ti.hora_inicio, ti.hora_listo) AS preparacion
+    FROM tiempos ti
+    JOIN Plato p ON p.id_plato = ti.id_plato
+    JOIN DetalleComanda dc ON dc.id_detalle_comanda = ti.id_detalle_comanda
+    LEFT JOIN EstacionCocina e ON e.id_estacion = dc.id_estacion
+    WHERE ti.hora_pedido IS NOT NULL
+),
+ordenados AS (
+    SELECT grupo, etiqueta, ticket, preparacion,
+           ROW_NUMBER() OVER (PARTITION BY grupo ORDER BY ticket) AS pos_ticket,
+           COUNT(*) OVER (PARTITION BY grupo) AS n_ticket,
+           ROW_NUMBER() OVER (PARTITION BY grupo ORDER BY preparacion IS NULL, preparacion) AS pos_prep,
+           COUNT(preparacion) OVER (PARTITION BY grupo) AS n_prep
+    FROM duraciones
+)
+SELECT grupo, MAX(etiqueta) AS etiqueta, MAX(n_ticket) AS lineas, {percentile_columns}
+FROM ordenados
+GROUP BY grupo
+ORDER BY {order_by}
+"""
+
+
+def _percentile_columns():
+    columns = []
+    for percentile in PERCENTILES:
+        fraction = percentile / 100
+        columns.append(f"MIN(CASE WHEN pos_ticket >= CEIL({fraction} * n_ticket) THEN ticket END) AS ticket_p{percentile}")
+        columns.append(f"MIN(CASE WHEN preparacion IS NOT NULL AND pos_prep >= CEIL({fraction} * n_prep) THEN preparacion END) AS prep_p{percentile}")
+    return ",\n       ".join(columns)
+
+def get_kitchen_time_percentiles(group_by='plato', start=None, end=None):
+    """
+    Percentiles de los tiempos de ticket y de preparación de las líneas que quedaron listas en [start, end).
+    Args:
+        group_by (str): 'plato', 'estacion' o 'hora' (franja horaria del pedido, para ver las horas punta).
+        start (datetime): Inicio de la ventana (incluido).
+        end (datetime): Fin de la ventana (excluido).
+    Returns:
+        list: [{'grupo', 'etiqueta', 'lineas', 'ticket_p50', 'prep_p50', 'ticket_p90', ...}, ...] con los
+              tiempos en segundos (None si ninguna línea del grupo tiene ese tiempo). Los grupos más lentos
+              (p90 de ticket) primero, salvo 'hora', que va en orden cronológico. None si hay error.
+    """
+    if not db: return None
+    if group_by not in GROUPINGS:
+        print(f"Error: Agrupación de tiempos de cocina '{group_by}' no válida ({', '.join(GROUPINGS)}).")
+        return None
+    if start is None or end is None:
+        print("Error: Se requiere una ventana de tiempo (start, end) para los tiempos de cocina.")
+        return None
+    group_key, group_label = GROUPINGS[group_by]
+    order_by = "grupo ASC" if group_by == 'hora' else f"ticket_p{PERCENTILES[1]} DESC, grupo ASC"
+    query = _TIMES_QUERY.format(group_key=group_key, group_label=group_label,
+                                percentile_columns=_percentile_columns(), order_by=order_by)
+    return db.fetch_all(query, (start, end))
+
+def get_item_transitions(order_detail_id_value):
+    """Historial de estados de una línea de comanda, del más antiguo al más reciente."""
+    if not db: return None
+    return db.fetch_all("""
+        SELECT estado_nuevo, fecha_hora FROM TransicionDetalleComanda
+        WHERE id_detalle_comanda = %s ORDER BY fecha_hora ASC, id_transicion ASC
+    """, (order_detail_id_value,))
@@ -0,0 +1,75 @@
+# app/models/kitchen_scheduler_model.py
+# Programación de la cocina: escalona el inicio de los platos de cada comanda para que terminen juntos.
+#
+# Para las líneas activas ('pendiente' o 'en preparacion') de una comanda:
+#   - Una línea ya disparada (hora_disparo <= ahora) termina en hora_disparo + su tiempo de preparación.
+#   - Una línea sin disparar podría terminar, como pronto, en ahora + su tiempo de preparación.
+#   - El objetivo de la comanda es el mayor de esos finales; cada línea sin disparar pasa a dispararse en
+#     objetivo - su tiempo de preparación.
+# Así un principal de 40 min se dispara ya y la ensalada de 2 min de la misma mesa 38 min después.
+#
+# Se reprograma solo la comanda afectada (al añadir una línea, enviarla a cocina o cambiar su estado),
+# con un único UPDATE, dentro de la transacción del cambio. La cola de cocina se ordena por hora_disparo.
+# El objetivo supone puestos libres y solo queda reflejado en hora_disparo (hora_disparo + preparación).
+# hora_entrega_estimada la escribe únicamente order_model.estimate_order_etas, con la cola real de cada
+# estación, para que los lectores no vean alternar las dos estimaciones.
+import datetime
+import os
+
+# Tiempo de preparación supuesto para los platos sin tiempo_preparacion_min.
+DEFAULT_PREP_MINUTES = int(os.getenv("KITCHEN_DEFAULT_PREP_MINUTES", 10))
+
+SCHEDULED_STATUSES = ('pendiente', 'en preparacion')
+
+# Orden de la cola de cocina: primero lo que hay que disparar antes; lo no programado, al final por antigüedad.
+KITCHEN_QUEUE_ORDER_SQL = "dc.hora_disparo IS NULL, dc.hora_disparo ASC, dc.hora_pedido ASC, dc.id_detalle_comanda ASC"
+
+_SCHEDULE_ORDERS_QUERY = """
+UPDATE DetalleComanda dc
+JOIN Plato p ON p.id_plato = dc.id_plato
+JOIN (
+    SELECT d.id_comanda,
+           MAX(CASE WHEN d.hora_disparo IS NOT NULL AND d.hora_disparo <= %s THEN d.hora_disparo ELSE %s END
+               + INTERVAL COALESCE(pl.tiempo_preparacion_min, %s) MINUTE) AS objetivo
+    FROM DetalleComanda d
+    JOIN Plato pl ON pl.id_plato = d.id_plato
+    WHERE d.id_comanda IN ({orders}) AND d.estado_plato IN ('pendiente', 'en preparacion')
+    GROUP BY d.id_comanda
+) o ON o.id_comanda = dc.id_comanda
+SET dc.hora_disparo = CASE WHEN dc.hora_disparo IS NOT NULL AND dc.hora_disparo <= %s THEN dc.hora_disparo
+                           ELSE o.objetivo - INTERVAL COALESCE(p.tiempo_preparacion_min, %s) MINUTE END
+WHERE dc.estado_plato IN ('pendiente', 'en preparacion')
+"""
+
+
+def schedule_orders(cursor, order_ids, now=None):
+    """
+    Recalcula hora_disparo de las líneas activas de las comandas indicadas.
+    Asume que el cursor está dentro de la transacción del cambio que motiva la reprogramación.
+    Returns:
+        int: Líneas reprogramadas.
+    """
+    order_ids = sorted(set(order_id for order_id in order_ids if order_id))
+    if not order_ids:
+        return 0
+    now = (now or datetime.datetime.now()).replace(microsecond=0)
+    query = _SCHEDULE_ORDERS_QUERY.format(orders=", ".join(["%s"] * len(order_ids)))
+    cursor.execute(query, (now, now, DEFAULT_PREP_MINUTES, *order_ids, now, DEFAULT_PREP_MINUTES))
+    return cursor.rowcount
+
+def mark_lines_fired(cursor, detail_ids, now=None):
+    """
+    Registra que el cocinero empezó ya las líneas indicadas (hora_disparo = ahora si aún no había llegado),
+    para que la reprogramación las trate como en marcha. Llamar antes de schedule_orders.
+    """
+    detail_ids = sorted(set(detail_ids))
+    if not detail_ids:
+        return 0
+    now = (now or datetime.datetime.now()).replace(microsecond=0)
+    cursor.execute(f"""
+        UPDATE DetalleComanda
+        SET hora_disparo = %s
+        WHERE id_detalle_comanda IN ({", ".join(["%s"] * len(detail_ids))})
+          AND (hora_disparo IS NULL OR hora_disparo > %s)
+    """, (now, *detail_ids, now))
+    return cursor.rowcount
@@ -0,0 +1,188 @@
+# app/models/menu_availability_model.py
+# Índice en memoria de las porciones que se pueden preparar ahora de cada plato.
+#
+# Porciones de un plato = mínimo, sobre las líneas de su receta, de (cantidad_disponible - reservado) /
+# cantidad necesaria, redondeado hacia abajo (lo reservado es lo de las líneas pendientes, ver ReservaStock).
+# Se calcula para todos los platos a la vez con una única consulta sobre Receta ⋈ Ingrediente y luego
+# se mantiene al día con los eventos de app.events:
+#   - 'ingrediente' trae las cantidades o reservas nuevas: solo se recalculan los platos que usan esos ingredientes.
+#   - 'receta' marca la receta del plato para recargarla en la siguiente consulta del índice.
+# Así la toma de comandas puede marcar los platos agotados sin consultar el stock en cada clic.
+import math
+import threading
+
+try:
+    from app import db
+    from app import events
+except ImportError:
+    try:
+        from .. import db
+        from .. import events
+    except ImportError:
+        try:
+            import db
+            import events
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db o events en menu_availability_model.py: {e}")
+            db = events = None
+
+# Margen para que 0.3 / 0.1 cuente como 3 porciones y no 2 por el redondeo de coma flotante.
+_PORTION_EPSILON = 1e-9
+
+_RECIPE_STOCK_QUERY = """
+    SELECT r.id_plato, r.id_ingrediente, r.cantidad_stock AS cantidad_necesaria, i.cantidad_disponible,
+           COALESCE(rs.reservado, 0) AS cantidad_reservada
+    FROM Receta r
+    JOIN Ingrediente i ON r.id_ingrediente = i.id_ingrediente
+    LEFT JOIN (
+        SELECT id_ingrediente, SUM(cantidad_reservada) AS reservado
+        FROM ReservaStock GROUP BY id_ingrediente
+    ) rs ON rs.id_ingrediente = r.id_ingrediente
+"""
+
+
+class MenuAvailabilityIndex:
+    """
+    Porciones disponibles por plato, con índices receta (plato -> ingredientes) e inverso
+    (ingrediente -> platos) para recalcular solo lo afectado por cada cambio de stock.
+    Es seguro usarlo desde el hilo lector de eventos y desde los hilos de las vistas.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._needed_by_dish = {} # id_plato -> {id_ingrediente: cantidad por porción, en la unidad del stock}
+        self._dishes_by_ingredient = {} # id_ingrediente -> set(id_plato)
+        self._stock = {} # id_ingrediente -> cantidad_disponible
+        self._reserved = {} # id_ingrediente -> total reservado por líneas pendientes
+        self._portions = {} # id_plato -> porciones (int)
+        self._stale_dishes = set() # Platos cuya receta cambió y hay que recargar
+        self._loaded = False
+        self._subscription = None
+
+    def load(self):
+        """Recalcula todo el índice con una sola consulta. Devuelve False si la consulta falla."""
+        if not db: return False
+        rows = db.fetch_all(_RECIPE_STOCK_QUERY)
+        if rows is None:
+            print("Error: No se pudo cargar la disponibilidad del menú.")
+            return False
+        with self._lock:
+            self._needed_by_dish = {}
+            self._dishes_by_ingredient = {}
+            self._stock = {}
+            self._reserved = {}
+            self._store_recipe_rows(rows)
+            self._portions = {id_plato: self._compute_portions(id_plato) for id_plato in self._needed_by_dish}
+            self._stale_dishes.clear()
+            self._loaded = True
+        self._subscribe_to_changes()
+        return True
+
+    def get_available_portions(self, dish_ids=None, refresh=False):
+        """
+        Args:
+            dish_ids (iterable, optional): Platos a consultar; todos los del índice si no se indica.
+            refresh (bool): Recalcular todo desde la BD antes de responder (por ejemplo, al abrir la vista).
+        Returns:
+            dict: {id_plato: porciones}. Un plato sin receta no aparece (no tiene límite de stock).
+                  None si el índice no se pudo cargar.
+        """
+        if (refresh or not self._loaded) and not self.load():
+            return None
+        self._reload_stale_recipes()
+        with self._lock:
+            if dish_ids is None:
+                return dict(self._portions)
+            return {id_plato: self._portions[id_plato] for id_plato in dish_ids if id_plato in self._portions}
+
+    def apply_stock_changes(self, quantities_by_ingredient=None, reserved_by_ingredient=None):
+        """
+        Registra las cantidades disponibles y/o los totales reservados nuevos (absolutos) de algunos
+        ingredientes y recalcula solo los platos que los usan. Aplicar dos veces el mismo cambio no
+        tiene efecto adicional.
+        Returns:
+            dict: {id_plato: porciones} de los platos afectados.
+        """
+        affected_dishes = set()
+        with self._lock:
+            if not self._loaded:
+                return {}
+            for values, target in ((quantities_by_ingredient, self._stock), (reserved_by_ingredient, self._reserved)):
+                for id_ingrediente, cantidad in (values or {}).items():
+                    if id_ingrediente in self._dishes_by_ingredient:
+                        target[id_ingrediente] = float(cantidad)
+                        affected_dishes.update(self._dishes_by_ingredient[id_ingrediente])
+            for id_plato in affected_dishes:
+                self._portions[id_plato] = self._compute_portions(id_plato)
+            return {id_plato: self._portions[id_plato] for id_plato in affected_dishes}
+
+    def mark_recipe_changed(self, id_plato):
+        with self._lock:
+            self._stale_dishes.add(id_plato)
+
+    def _store_recipe_rows(self, rows):
+        for row in rows:
+            id_plato, id_ingrediente = row['id_plato'], row['id_ingrediente']
+            self._needed_by_dish.setdefault(id_plato, {})[id_ingrediente] = float(row['cantidad_necesaria'])
+            self._dishes_by_ingredient.setdefault(id_ingrediente, set()).add(id_plato)
+            self._stock[id_ingrediente] = float(row['cantidad_disponible'])
+            self._reserved[id_ingrediente] = float(row['cantidad_reservada'])
+
+    def _compute_portions(self, id_plato):
+        needed_by_ingredient = self._needed_by_dish.get(id_plato)
+        if not needed_by_ingredient:
+            return None
+        return max(0, min(
+            math.floor((self._stock.get(id_ingrediente, 0.0) - self._reserved.get(id_ingrediente, 0.0)) / needed + _PORTION_EPSILON)
+            for id_ingrediente, needed in needed_by_ingredient.items()
+        ))
+
+    def _reload_stale_recipes(self):
+        with self._lock:
+            stale_dishes = sorted(self._stale_dishes)
+            self._stale_dishes.clear()
+        if not stale_dishes:
+            return
+        placeholders = ", ".join(["%s"] * len(stale_dishes))
+        rows = db.fetch_all(f"{_RECIPE_STOCK_QUERY} WHERE r.id_plato IN ({placeholders})", tuple(stale_dishes))
+        with self._lock:
+            if rows is None:
+                self._stale_dishes.update(stale_dishes) # Se reintenta en la siguiente consulta
+                return
+            for id_plato in stale_dishes:
+                for id_ingrediente in self._needed_by_dish.pop(id_plato, {}):
+                    self._dishes_by_ingredient.get(id_ingrediente, set()).discard(id_plato)
+                self._portions.pop(id_plato, None)
+            self._store_recipe_rows(rows)
+            for id_plato in stale_dishes:
+                if id_plato in self._needed_by_dish:
+                    self._portions[id_plato] = self._compute_portions(id_plato)
+
+    def _subscribe_to_changes(self):
+        with self._lock:
+            if self._subscription is not None or not events:
+                return
+            self._subscription = events.subscribe([events.TOPIC_INGREDIENT, events.TOPIC_RECIPE], self._on_change_event)
+
+    def _on_change_event(self, event):
+        if event['tema'] == events.TOPIC_INGREDIENT:
+            self.apply_stock_changes(event['datos'].get('cantidades'), event['datos'].get('reservadas'))
+        elif event['tema'] == events.TOPIC_RECIPE and event['id_entidad']:
+            self.mark_recipe_changed(event['id_entidad'])
+
+
+_index = MenuAvailabilityIndex()
+
+
+def get_available_portions(dish_ids=None, refresh=False):
+    """Porciones que se pueden preparar ahora, {id_plato: porciones}. Ver MenuAvailabilityIndex."""
+    return _index.get_available_portions(dish_ids, refresh)
+
+
+def apply_stock_changes(quantities_by_ingredient=None, reserved_by_ingredient=None):
+    """Aplica las cantidades y reservas de un evento 'ingrediente'. Devuelve {id_plato: porciones} de los platos afectados."""
+    return _index.apply_stock_changes(quantities_by_ingredient, reserved_by_ingredient)
+
+
+def mark_recipe_changed(id_plato):
+    """Marca la receta de un plato para recargarla en la siguiente consulta del índice."""
+    _index.mark_recipe_changed(id_plato)
@@ -3,20 +3,135 @@ import datetime
 import uuid # Para generar IDs
 import random
 import string
+import os
+import threading
+import time
 import traceback
 
 # Ajusta las rutas de importación según tu estructura de proyecto.
 try:
     from app import db # Si db.py está en app/
+    from app import events
+    from app.models import cost_model
+    from app.models import station_model
 except ImportError:
     try:
         from .. import db
+        from .. import events
+        from . import cost_model
+        from . import station_model
     except ImportError:
         try:
             import db # Si está en el mismo nivel o app está en PYTHONPATH
+            import events
+            import cost_model
+            import station_model
         except ImportError:
             print("Error CRÍTICO: No se pudo importar el módulo db.py en menu_model.py.")
-            db = None
+            db = events = cost_model = station_model = None
+
+# Catálogo de platos en memoria para la toma de comandas (ver DishCatalogCache).
+MENU_CACHE_TTL_SECONDS = int(os.getenv("MENU_CACHE_TTL_SECONDS", 300))
+# Invalidar también cuando otra terminal cambia el menú (eventos 'plato' de app.events).
+MENU_CACHE_CROSS_PROCESS = os.getenv("MENU_CACHE_CROSS_PROCESS", "1") == "1"
+
+
+class DishCatalogCache:
+    """
+    Copia en memoria de la tabla Plato, indexada por id y por categoría. Se carga entera con una
+    sola consulta y se vuelve a cargar cuando vence el TTL o cuando se invalida: al crear, modificar
+    o eliminar un plato en este proceso y, si MENU_CACHE_CROSS_PROCESS está activo, al recibir el
+    evento 'plato' de otra terminal. 'version' aumenta con cada invalidación.
+    """
+    def __init__(self, ttl_seconds=MENU_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_category = {}
+        self._ordered_ids = [] # Orden de get_all_dishes_list (categoría, nombre)
+        self._loaded_at = None
+        self._subscription = None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self.version += 1
+
+    def get_dish(self, dish_id_value):
+        """Copia de la fila del plato, o None si no existe o no se pudo cargar el catálogo."""
+        if not self._ensure_loaded():
+            return None
+        with self._lock:
+            dish = self._by_id.get(dish_id_value)
+            return dict(dish) if dish else None
+
+    def get_dishes(self, active_only=False, category=None):
+        """Copias de las filas ordenadas por categoría y nombre, o None si no se pudo cargar el catálogo."""
+        if not self._ensure_loaded():
+            return None
+        with self._lock:
+            dish_ids = self._by_category.get(category, []) if category else self._ordered_ids
+            return [dict(self._by_id[dish_id]) for dish_id in dish_ids
+                    if not active_only or self._by_id[dish_id].get('activo')]
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return True
+            version_before_load = self.version
+        rows = db.fetch_all("SELECT * FROM Plato ORDER BY categoria, nombre_plato") if db else None
+        if rows is None:
+            print("Error: No se pudo cargar el catálogo de platos.")
+            return False
+        with self._lock:
+            self._by_id = {row['id_plato']: row for row in rows}
+            self._ordered_ids = [row['id_plato'] for row in rows]
+            self._by_category = {}
+            for row in rows:
+                self._by_category.setdefault(row['categoria'], []).append(row['id_plato'])
+            # Si se invalidó mientras se leía, lo leído puede ser anterior al cambio: se sirve pero no se da por vigente
+            self._loaded_at = time.monotonic() if self.version == version_before_load else None
+        self._subscribe_to_changes()
+        return True
+
+    def _subscribe_to_changes(self):
+        if not MENU_CACHE_CROSS_PROCESS or not events:
+            return
+        with self._lock:
+            if self._subscription is None:
+                self._subscription = events.subscribe([events.TOPIC_DISH], lambda event: self.invalidate())
+
+
+_dish_catalog = DishCatalogCache()
+
+
+def _publish_dish_changed(dish_id_value):
+    """
+    Avisa a las demás terminales de que el menú cambió. Se llama dentro de la transacción de la
+    escritura, para que el evento se confirme o se deshaga con ella; el catálogo de este proceso se
+    invalida después del commit.
+    """
+    if events:
+        events.publish(events.TOPIC_DISH, dish_id_value)
+
+def get_cached_dish(dish_id_value):
+    """
+    Como get_dish_by_id, pero servido desde el catálogo en memoria (toma de comandas). Un id que no
+    está en el catálogo se busca en la BD por si el plato se creó después de la última carga.
+    """
+    if not dish_id_value:
+        return None
+    dish = _dish_catalog.get_dish(dish_id_value)
+    return dish if dish is not None else get_dish_by_id(dish_id_value)
+
+def get_cached_dishes_by_category(category_value):
+    """Platos activos de una categoría desde el catálogo en memoria."""
+    return _dish_catalog.get_dishes(active_only=True, category=category_value)
+
+def invalidate_dish_catalog():
+    """Fuerza que la siguiente lectura del catálogo vuelva a consultar la BD."""
+    _dish_catalog.invalidate()
 
 def generate_dish_id(length=10):
     """Genera un ID único para un nuevo plato. Ejemplo: PLATO-AB12C"""
@@ -71,9 +186,16 @@ def create_dish(dish_data_dict):
     )
     
     try:
-        result_db = db.execute_query(query_string, params)
+        with db.transaction():
+            result_db = db.execute_query(query_string, params)
+            # Costo y margen iniciales (sin receta el costo es 0); si falla, la transacción se deshace
+            if result_db is not None and cost_model.recalculate_dish_costs([generated_id]) is None:
+                result_db = None
+            if result_db is not None:
+                _publish_dish_changed(generated_id)
         if result_db is not None: # Para INSERT, puede ser lastrowid o rowcount
             print(f"Plato '{generated_id}' ('{dish_data_dict['nombre_plato']}') creado exitosamente.")
+            _dish_catalog.invalidate()
             return generated_id # Devolver el ID generado
         else:
             print(f"No se pudo crear el plato '{dish_data_dict['nombre_plato']}'. db.execute_query devolvió None.")
@@ -99,16 +221,11 @@ def get_all_dishes_list():
     return db.fetch_all(query_string)
 
 def get_active_dishes():
+    """Platos activos ordenados por categoría y nombre, servidos desde el catálogo en memoria."""
     if not db:
         print("Error: Módulo db no disponible en menu_model.")
         return None
-    query_string = """
-        SELECT id_plato, nombre_plato, precio_venta, categoria, descripcion, tiempo_preparacion_min, imagen_url
-        FROM Plato 
-        WHERE activo = TRUE 
-        ORDER BY categoria, nombre_plato
-    """ # Devolver más campos si son útiles para la vista de toma de comandas
-    return db.fetch_all(query_string)
+    return _dish_catalog.get_dishes(active_only=True)
 
 def update_dish_details(dish_id_value, data_to_update_dict):
     if not db: return None
@@ -144,7 +261,19 @@ def update_dish_details(dish_id_value, data_to_update_dict):
     parameters_list.append(dish_id_value)
     
     try:
-        return db.execute_query(query_string, tuple(parameters_list))
+        with db.transaction():
+            rows_affected = db.execute_query(query_string, tuple(parameters_list))
+            if rows_affected and 'precio_venta' in data_to_update_dict: # El margen depende del precio
+                if cost_model.recalculate_dish_costs([dish_id_value]) is None:
+                    return None # La transacción ya quedó marcada para deshacerse
+            if rows_affected and 'categoria' in data_to_update_dict: # Las líneas activas siguen a la nueva categoría
+                if station_model.reroute_active_lines(dish_ids=[dish_id_value]) is None:
+                    return None
+            if rows_affected:
+                _publish_dish_changed(dish_id_value)
+        if rows_affected:
+            _dish_catalog.invalidate()
+        return rows_affected
     except Exception as e:
         print(f"Excepción al actualizar plato '{dish_id_value}': {e}")
         traceback.print_exc()
@@ -159,7 +288,18 @@ def delete_dish_by_id(dish_id_value):
     # La restricción FK en Receta (ON DELETE CASCADE) debería eliminar las recetas asociadas.
     # La restricción FK en DetalleComanda (ON DELETE RESTRICT) impedirá borrar si está en una comanda.
     query_string = "DELETE FROM Plato WHERE id_plato = %s"
-    return db.execute_query(query_string, (dish_id_value,))
+    try:
+        with db.transaction():
+            rows_affected = db.execute_query(query_string, (dish_id_value,))
+            if rows_affected:
+                _publish_dish_changed(dish_id_value)
+        if rows_affected:
+            _dish_catalog.invalidate()
+        return rows_affected
+    except Exception as e:
+        print(f"Excepción al eliminar plato '{dish_id_value}': {e}")
+        traceback.print_exc()
+        return None
 
 
 # --- Ejemplo de uso y pruebas ---
@@ -1,33 +1,53 @@
 # app/models/order_model.py
 import datetime
+import heapq
+import os
 import sys
+import threading
+import time
 import traceback
 
 try:
     from app import db
+    from app import events
     from app.models import table_model
     from app.models import menu_model
     from app.models import stock_model as app_stock_model
     from app.models import recipe_model as app_recipe_model
+    from app.models import kitchen_scheduler_model
+    from app.models import station_model
+    from app.models import kitchen_analytics_model
+    from app.models import split_bill_model
 except ImportError:
     print("ADVERTENCIA DE IMPORTACIÓN en order_model.py: No se pudieron cargar módulos desde 'app.' Intentando fallback relativo...")
     try:
         from .. import db
+        from .. import events
         from . import table_model
         from . import menu_model
         from . import stock_model as app_stock_model
         from . import recipe_model as app_recipe_model
+        from . import kitchen_scheduler_model
+        from . import station_model
+        from . import kitchen_analytics_model
+        from . import split_bill_model
     except ImportError:
         print("ADVERTENCIA DE IMPORTACIÓN en order_model.py: Falló fallback relativo. Intentando importación directa...")
         try:
             import db
+            import events
             import table_model
             import menu_model
             import stock_model as app_stock_model
             import recipe_model as app_recipe_model
+            import kitchen_scheduler_model
+            import station_model
+            import kitchen_analytics_model
+            import split_bill_model
         except ImportError as e:
             print(f"Error CRÍTICO: No se pudieron importar módulos esenciales en order_model.py: {e}")
-            db = table_model = menu_model = app_stock_model = app_recipe_model = None
+            db = events = table_model = menu_model = app_stock_model = app_recipe_model = None
+            kitchen_scheduler_model = station_model = kitchen_analytics_model = split_bill_model = None
 
 
 def generate_order_id():
@@ -40,14 +60,6 @@ def create_new_order(table_id_value, employee_id_value, customer_id_value=None,
         print("Error: Módulos db o table_model no disponibles en order_model (create_new_order).")
         return None
 
-    current_table_info = table_model.get_table_by_id(table_id_value)
-    if not current_table_info:
-        print(f"Error: Mesa '{table_id_value}' no encontrada.")
-        return None
-    if current_table_info.get('estado') not in ('libre', 'reservada'):
-        print(f"Error: Mesa '{table_id_value}' no está libre o reservada (estado actual: {current_table_info.get('estado')}).")
-        return None
-
     order_id = generate_order_id()
     default_order_status = 'abierta'
     order_query = """
@@ -60,40 +72,39 @@ def create_new_order(table_id_value, employee_id_value, customer_id_value=None,
         num_people, default_order_status, current_timestamp
     )
 
-    conn = None
-    cursor = None
     try:
-        conn = db.get_db_connection()
-        if not conn:
-            print("ERROR: No se pudo obtener conexión a BD en create_new_order.")
-            return None
-        cursor = conn.cursor()
-
-        cursor.execute(order_query, order_params)
-
-        # Actualizar el estado de la mesa dentro de la misma transacción de la comanda
-        cursor.execute("UPDATE Mesa SET estado = %s WHERE id_mesa = %s", ('ocupada', table_id_value))
-        update_table_rows_affected = cursor.rowcount # Usamos cursor.rowcount para la mesa
+        # Una sola conexión y un solo commit: la mesa queda bloqueada (FOR UPDATE) desde la
+        # verificación de su estado hasta que se marca como 'ocupada', evitando que dos
+        # terminales abran comanda sobre la misma mesa a la vez.
+        with db.transaction() as tx:
+            current_table_info = tx.fetch_one("SELECT id_mesa, estado FROM Mesa WHERE id_mesa = %s FOR UPDATE", (table_id_value,))
+            if not current_table_info:
+                print(f"Error: Mesa '{table_id_value}' no encontrada.")
+                return None
+            if current_table_info.get('estado') not in ('libre', 'reservada'):
+                print(f"Error: Mesa '{table_id_value}' no está libre o reservada (estado actual: {current_table_info.get('estado')}).")
+                return None
+
+            tx.execute(order_query, order_params)
+
+            # Actualizar el estado de la mesa dentro de la misma transacción de la comanda
+            update_table_rows_affected = tx.execute("UPDATE Mesa SET estado = %s WHERE id_mesa = %s", ('ocupada', table_id_value))
+            if update_table_rows_affected == 0:
+                print(f"ADVERTENCIA: Comanda '{order_id}' creada, PERO la mesa '{table_id_value}' ya estaba 'ocupada' o no se pudo actualizar.")
+            else:
+                print(f"INFO: Mesa '{table_id_value}' actualizada a 'ocupada'. (Filas afectadas: {update_table_rows_affected})")
 
-        if update_table_rows_affected == 0:
-             print(f"ADVERTENCIA: Comanda '{order_id}' creada, PERO la mesa '{table_id_value}' ya estaba 'ocupada' o no se pudo actualizar.")
-        else:
-             print(f"INFO: Mesa '{table_id_value}' actualizada a 'ocupada'. (Filas afectadas: {update_table_rows_affected})")
+            events.publish(events.TOPIC_ORDER, order_id, {'estado': default_order_status, 'id_mesa': table_id_value,
+                                                          'id_empleado_mesero': employee_id_value})
+            events.publish(events.TOPIC_TABLE, table_id_value, {'estado': 'ocupada'})
 
-        conn.commit()
         print(f"INFO: Comanda '{order_id}' creada. Mesa '{table_id_value}' debería estar 'ocupada'.")
         return order_id
 
     except Exception as e:
         print(f"Excepción al crear comanda o actualizar mesa: {e}")
         traceback.print_exc()
-        if conn:
-            conn.rollback()
         return None
-    finally:
-        if cursor: cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
 
 def add_dish_to_order(order_id_value, dish_id_value, quantity_value, observations_value=""):
     if not db or not menu_model:
@@ -103,33 +114,65 @@ def add_dish_to_order(order_id_value, dish_id_value, quantity_value, observation
         print("Error: La cantidad debe ser un entero mayor que cero.")
         return None
 
-    dish_info = menu_model.get_dish_by_id(dish_id_value)
-    if not dish_info or not dish_info.get('activo', False):
-        print(f"Error: Plato con ID '{dish_id_value}' no encontrado o no está activo.")
-        return None
-
-    price_at_moment = dish_info.get('precio_venta')
-    if price_at_moment is None:
-        print(f"Error: No se pudo obtener el precio para el plato '{dish_id_value}'.")
-        return None
-
-    order_status_info = db.fetch_one("SELECT estado_comanda FROM Comanda WHERE id_comanda = %s", (order_id_value,))
-    if not order_status_info or order_status_info.get('estado_comanda') != 'abierta':
-        print(f"Error: No se pueden añadir platos. La comanda '{order_id_value}' no está abierta (estado: {order_status_info.get('estado_comanda', 'DESCONOCIDO')}).")
-        return None
-
     default_dish_status_in_order = 'pendiente'
-    detail_query = """
+    # La estación de cocina se resuelve al insertar (ver station_model)
+    detail_query = f"""
     INSERT INTO DetalleComanda
-        (id_comanda, id_plato, cantidad, precio_unitario_momento, estado_plato, observaciones_plato, hora_pedido)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
+        (id_comanda, id_plato, id_estacion, cantidad, precio_unitario_momento, estado_plato, observaciones_plato, hora_pedido)
+    VALUES (%s, %s, {station_model.STATION_FOR_DISH_ID_SUBQUERY}, %s, %s, %s, %s, %s)
     """
-    current_timestamp = datetime.datetime.now()
-    detail_params = (
-        order_id_value, dish_id_value, quantity_value, price_at_moment,
-        default_dish_status_in_order, observations_value, current_timestamp
-    )
-    return db.execute_query(detail_query, detail_params)
+
+    try:
+        # Verificación de la comanda e inserción en una sola transacción. El precio y 'activo' del
+        # plato salen del catálogo en memoria de menu_model, sin consultar la BD.
+        with db.transaction() as tx:
+            dish_info = menu_model.get_cached_dish(dish_id_value)
+            if not dish_info or not dish_info.get('activo', False):
+                print(f"Error: Plato con ID '{dish_id_value}' no encontrado o no está activo.")
+                return None
+
+            price_at_moment = dish_info.get('precio_venta')
+            if price_at_moment is None:
+                print(f"Error: No se pudo obtener el precio para el plato '{dish_id_value}'.")
+                return None
+
+            order_status_info = tx.fetch_one("SELECT estado_comanda FROM Comanda WHERE id_comanda = %s FOR UPDATE", (order_id_value,))
+            if not order_status_info or order_status_info.get('estado_comanda') != 'abierta':
+                estado_actual = order_status_info.get('estado_comanda') if order_status_info else 'DESCONOCIDO'
+                print(f"Error: No se pueden añadir platos. La comanda '{order_id_value}' no está abierta (estado: {estado_actual}).")
+                return None
+
+            current_timestamp = datetime.datetime.now()
+            detail_params = (
+                order_id_value, dish_id_value, dish_id_value, quantity_value, price_at_moment,
+                default_dish_status_in_order, observations_value, current_timestamp
+            )
+            new_detail_id = tx.execute(detail_query, detail_params)
+            _record_item_transitions(tx.cursor, [(new_detail_id, dish_id_value)], default_dish_status_in_order, current_timestamp)
+
+            # Reserva del stock de la receta hasta que la línea se envíe a cocina o se cancele
+            if app_stock_model:
+                recipe_rows = tx.fetch_all("SELECT id_ingrediente, cantidad_stock FROM Receta WHERE id_plato = %s", (dish_id_value,))
+                required_by_ingredient = {row['id_ingrediente']: float(row['cantidad_stock']) * quantity_value for row in recipe_rows}
+                shortages = app_stock_model._reserve_stock_for_order_item(tx.cursor, new_detail_id, order_id_value, required_by_ingredient)
+                if shortages:
+                    missing_text = ", ".join(f"{m['nombre_ingrediente']} (disponible: {m['available']}, requerido: {m['needed']} {m['unit']})"
+                                             for m in shortages.values())
+                    print(f"Error: Stock insuficiente para reservar el plato '{dish_id_value}' en la comanda '{order_id_value}': {missing_text}")
+                    tx.mark_failed()
+                    return None
+
+            # La nueva línea puede retrasar el objetivo de la comanda: se reprograman sus líneas activas
+            kitchen_scheduler_model.schedule_orders(tx.cursor, [order_id_value], current_timestamp)
+            # Si la cuenta ya está dividida, la línea se reparte entre los pagadores existentes
+            split_bill_model.split_new_line(tx.cursor, new_detail_id)
+            events.publish(events.TOPIC_ORDER_ITEM, new_detail_id, {'id_comanda': order_id_value, 'estado': default_dish_status_in_order})
+            return new_detail_id
+
+    except Exception as e:
+        print(f"Excepción al añadir plato '{dish_id_value}' a la comanda '{order_id_value}': {e}")
+        traceback.print_exc()
+        return None
 
 def get_order_by_id(order_id_value):
     if not db: return None
@@ -141,7 +184,7 @@ def get_order_by_id(order_id_value):
     order_details_query = """
     SELECT dc.id_detalle_comanda, dc.id_plato, p.nombre_plato, dc.cantidad,
            dc.precio_unitario_momento, dc.subtotal_detalle, dc.estado_plato, dc.observaciones_plato,
-           dc.hora_pedido
+           dc.hora_pedido, dc.hora_entrega_estimada
     FROM DetalleComanda dc
     JOIN Plato p ON dc.id_plato = p.id_plato
     WHERE dc.id_comanda = %s
@@ -222,6 +265,11 @@ def update_order_status(order_id_value, new_status_value):
                     print(f"ADVERTENCIA: Comanda '{order_id_value}' finalizada, PERO la mesa '{table_id_associated}' ya estaba 'libre' o no se pudo actualizar.")
                 else:
                     print(f"INFO: Mesa '{table_id_associated}' actualizada a 'libre'. (Filas afectadas: {update_mesa_rows_affected})")
+                    events.publish(events.TOPIC_TABLE, table_id_associated, {'estado': 'libre'}, cursor=cursor)
+            if new_status_value in ['facturada', 'cancelada'] and app_stock_model:
+                # Las líneas que nunca se enviaron a cocina dejan de retener stock
+                app_stock_model._release_reservations(cursor, id_comanda=order_id_value)
+            events.publish(events.TOPIC_ORDER, order_id_value, {'estado': new_status_value, 'id_mesa': table_id_associated}, cursor=cursor)
             conn.commit()
             return rows_affected
         else:
@@ -235,12 +283,12 @@ def update_order_status(order_id_value, new_status_value):
         if conn: conn.rollback()
         return None
     finally:
-        if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
+        try:
+            if cursor: cursor.close()
+        finally:
+            if conn: conn.close() # Devuelve la conexión al pool aunque se haya caído
 
 def update_order_item_status(order_detail_id_value, new_item_status_value, id_employee_responsible=None):
-    print(f"\nDEBUG: update_order_item_status - DetalleID: {order_detail_id_value}, NuevoEstado: {new_item_status_value}, EmpleadoResp: {id_employee_responsible}")
-
     if not db or not app_stock_model or not app_recipe_model:
         print("ERROR CRÍTICO: Módulos db, stock_model o recipe_model no están disponibles en update_order_item_status.")
         return None
@@ -269,86 +317,60 @@ def update_order_item_status(order_detail_id_value, new_item_status_value, id_em
         id_plato = item_info['id_plato']
         cantidad_pedida = int(item_info['cantidad'])
         id_comanda_ref = item_info['id_comanda']
-        print(f"DEBUG: Info del ítem: PlatoID={id_plato}, CantPedida={cantidad_pedida}, EstadoActual={current_status}, ComandaRef={id_comanda_ref}")
 
         if current_status == new_item_status_value:
-            print(f"INFO: Plato {order_detail_id_value} ya está en estado '{new_item_status_value}'. No se requiere actualización.")
             conn.commit() # Si no hay cambio, igualmente se confirma el "no cambio"
             return True # Consideramos que ya está en el estado deseado, así que es un "éxito"
 
-
         if new_item_status_value == 'en preparacion' and current_status == 'pendiente':
-            print(f"INFO: Plato ID {id_plato} (Detalle: {order_detail_id_value}) pasando a 'en preparacion'. Intentando descontar stock.")
-
-            cursor.execute("""
-                SELECT r.id_ingrediente, r.cantidad_necesaria, p.nombre AS nombre_ingrediente, p.unidad_medida as unidad_stock
-                FROM Receta r
-                JOIN Ingrediente i ON r.id_ingrediente = i.id_ingrediente
-                JOIN Producto p ON i.id_producto = p.id_producto
-                WHERE r.id_plato = %s
-            """, (id_plato,))
-            recipe_items = cursor.fetchall()
-
-            if not recipe_items:
-                print(f"ADVERTENCIA: No se encontró receta para el plato ID {id_plato}. No se descontará stock.")
-            else:
-                for ingrediente_receta in recipe_items:
-                    id_ingrediente_a_descontar = ingrediente_receta['id_ingrediente']
-                    cantidad_necesaria_por_plato = float(ingrediente_receta['cantidad_necesaria'])
-                    nombre_ingrediente_log = ingrediente_receta['nombre_ingrediente']
-                    unidad_stock_ingrediente = ingrediente_receta['unidad_stock']
-
-                    cantidad_total_a_descontar = cantidad_necesaria_por_plato * cantidad_pedida
-
-                    cursor.execute("SELECT cantidad_disponible FROM Ingrediente WHERE id_ingrediente = %s FOR UPDATE", (id_ingrediente_a_descontar,))
-                    ing_stock_info = cursor.fetchone()
-                    if not ing_stock_info:
-                        print(f"ERROR CRÍTICO: Ingrediente '{nombre_ingrediente_log}' (ID: {id_ingrediente_a_descontar}) no encontrado en la tabla Ingrediente para descuento.")
-                        conn.rollback()
-                        return False # Retornar False para indicar que la operación no pudo completarse
-
-                    stock_actual_ing = float(ing_stock_info['cantidad_disponible'])
-
-                    if stock_actual_ing < cantidad_total_a_descontar:
-                        print(f"ERROR: Stock insuficiente para '{nombre_ingrediente_log}' (ID: {id_ingrediente_a_descontar}). "
-                              f"Disponible: {stock_actual_ing}, Requerido: {cantidad_total_a_descontar} {unidad_stock_ingrediente}")
-                        conn.rollback()
-                        return False # Retornar False para indicar que la operación no pudo completarse
-
-                    nuevo_stock_ing = stock_actual_ing - cantidad_total_a_descontar
-
-                    cursor.execute("UPDATE Ingrediente SET cantidad_disponible = %s, ultima_actualizacion = %s WHERE id_ingrediente = %s",
-                                   (nuevo_stock_ing, datetime.datetime.now(), id_ingrediente_a_descontar))
-                    print(f"  UPDATE Ingrediente ejecutado para '{id_ingrediente_a_descontar}'. Filas afectadas: {cursor.rowcount}")
-
-                    log_desc = f"Consumo por Comanda {id_comanda_ref}, Plato: {id_plato}, Detalle: {order_detail_id_value}"
-                    if hasattr(app_stock_model, '_log_stock_movement'):
-                         app_stock_model._log_stock_movement(
-                            cursor, id_ingrediente_a_descontar, "CONSUMO_COMANDA",
-                            -cantidad_total_a_descontar,
-                            stock_actual_ing, nuevo_stock_ing,
-                            id_referencia_origen=str(order_detail_id_value),
-                            descripcion_motivo=log_desc,
-                            id_empleado_responsable=id_employee_responsible
-                        )
-                    else:
-                        print(f"ADVERTENCIA: _stock_model._log_stock_movement no encontrado. No se pudo loguear el movimiento para {id_ingrediente_a_descontar}.")
-                    print(f"  Stock de '{nombre_ingrediente_log}' actualizado a {nuevo_stock_ing}.")
-
-        elif new_item_status_value == 'cancelado' and current_status == 'en preparacion':
-            print(f"INFO: Plato ID {id_plato} (Detalle: {order_detail_id_value}) pasando a 'cancelado' desde 'en preparacion'.")
-            print("ADVERTENCIA: Se necesitaría lógica para REINGRESAR stock de ingredientes si el plato se cancela DESPUÉS de estar 'en preparacion'.")
-
-        print(f"DEBUG: Actualizando estado del plato DetalleID {order_detail_id_value} a '{new_item_status_value}'")
-        query_update_status = "UPDATE DetalleComanda SET estado_plato = %s WHERE id_detalle_comanda = %s"
-        cursor.execute(query_update_status, (new_item_status_value, order_detail_id_value))
-        rows_affected_detail = cursor.rowcount
-        print(f"DEBUG: UPDATE DetalleComanda ejecutado. Filas afectadas: {rows_affected_detail}")
-
-        if rows_affected_detail > 0:
-            print("DEBUG: Realizando commit porque el estado del plato cambió y stock se gestionó.")
+            # cantidad_stock: la cantidad de la receta ya convertida a la unidad del stock (unit_model)
+            cursor.execute("SELECT id_ingrediente, cantidad_stock FROM Receta WHERE id_plato = %s", (id_plato,))
+            required_by_ingredient = {
+                row['id_ingrediente']: float(row['cantidad_stock']) * cantidad_pedida
+                for row in cursor.fetchall()
+            }
+
+            if required_by_ingredient:
+                # Bloqueo de todos los ingredientes en una sentencia, descuento con un UPDATE y un INSERT multi-fila
+                stock_by_ingredient = app_stock_model._lock_ingredients_for_update(cursor, required_by_ingredient)
+                # La reserva de esta misma línea no cuenta como stock ocupado: es la que se va a consumir
+                reserved_by_others = app_stock_model._reserved_by_ingredient(cursor, required_by_ingredient,
+                                                                             exclude_detail_ids=[order_detail_id_value])
+                shortages = app_stock_model._find_stock_shortages(
+                    required_by_ingredient, app_stock_model._net_of_reservations(stock_by_ingredient, reserved_by_others))
+                if shortages:
+                    missing_text = ", ".join(f"{m['nombre_ingrediente']} (disponible: {m['available']}, requerido: {m['needed']} {m['unit']})"
+                                             for m in shortages.values())
+                    print(f"ERROR: Stock insuficiente para el plato {id_plato} (Detalle: {order_detail_id_value}): {missing_text}")
+                    conn.rollback()
+                    return False # Retornar False para indicar que la operación no pudo completarse
+
+                app_stock_model._apply_stock_consumption(
+                    cursor, required_by_ingredient, stock_by_ingredient, "CONSUMO_COMANDA",
+                    id_referencia_origen=str(order_detail_id_value),
+                    descripcion_motivo=f"Consumo por Comanda {id_comanda_ref}, Plato: {id_plato}, Detalle: {order_detail_id_value}",
+                    id_empleado_responsable=id_employee_responsible
+                )
+
+        transition_timestamp = datetime.datetime.now()
+        if new_item_status_value == 'entregado':
+            cursor.execute("UPDATE DetalleComanda SET estado_plato = %s, hora_entrega_real = %s WHERE id_detalle_comanda = %s",
+                           (new_item_status_value, transition_timestamp, order_detail_id_value))
+        else:
+            cursor.execute("UPDATE DetalleComanda SET estado_plato = %s WHERE id_detalle_comanda = %s",
+                           (new_item_status_value, order_detail_id_value))
+
+        if cursor.rowcount > 0:
+            _record_item_transitions(cursor, [(order_detail_id_value, id_plato)], new_item_status_value, transition_timestamp)
+            if current_status == 'pendiente':
+                # Enviada a cocina: la reserva ya se convirtió en consumo. Cancelada: el stock vuelve a estar libre.
+                app_stock_model._release_reservations(cursor, detail_ids=[order_detail_id_value])
+            if new_item_status_value == 'en preparacion':
+                kitchen_scheduler_model.mark_lines_fired(cursor, [order_detail_id_value], transition_timestamp)
+            kitchen_scheduler_model.schedule_orders(cursor, [id_comanda_ref], transition_timestamp)
+            events.publish(events.TOPIC_ORDER_ITEM, order_detail_id_value,
+                           {'id_comanda': id_comanda_ref, 'estado': new_item_status_value}, cursor=cursor)
             conn.commit()
-            print("DEBUG: Commit realizado.")
             return True
         else:
             print(f"ADVERTENCIA: No se pudo actualizar el estado de DetalleComanda {order_detail_id_value} a '{new_item_status_value}', pero no hubo error de DB.")
@@ -359,13 +381,145 @@ def update_order_item_status(order_detail_id_value, new_item_status_value, id_em
         print(f"EXCEPCIÓN en update_order_item_status: {e}")
         traceback.print_exc()
         if conn:
-            print("DEBUG: Realizando rollback debido a excepción...")
             conn.rollback()
         return None
     finally:
-        if cursor: cursor.close()
-        if conn and conn.is_connected(): conn.close()
-        print(f"DEBUG: Conexión cerrada en update_order_item_status para DetalleID: {order_detail_id_value}")
+        try:
+            if cursor: cursor.close()
+        finally:
+            if conn: conn.close() # Devuelve la conexión al pool aunque se haya caído
+
+def _sql_placeholders(values):
+    """Devuelve '%s, %s, ...' para una cláusula IN con tantos marcadores como valores."""
+    return ", ".join(["%s"] * len(values))
+
+def _record_item_transitions(cursor, lines, new_status, timestamp=None):
+    """
+    Registra en TransicionDetalleComanda que las líneas pasaron a 'new_status' (un INSERT multi-fila).
+    Asume que el cursor está dentro de la transacción del cambio de estado, así el registro se
+    confirma o deshace junto con él. Los tiempos de cocina salen de aquí (kitchen_analytics_model).
+    Args:
+        lines (list): [(id_detalle_comanda, id_plato), ...]
+    """
+    if not lines:
+        return
+    timestamp = timestamp or datetime.datetime.now()
+    params = []
+    for id_detalle_comanda, id_plato in lines:
+        params.extend([id_detalle_comanda, id_plato, new_status, timestamp])
+    cursor.execute(f"""
+        INSERT INTO TransicionDetalleComanda (id_detalle_comanda, id_plato, estado_nuevo, fecha_hora)
+        VALUES {", ".join(["(%s, %s, %s, %s)"] * len(lines))}
+    """, tuple(params))
+
+def send_order_to_kitchen(order_id_value, id_employee_responsible=None):
+    """
+    Envía a cocina todos los platos 'pendiente' de una comanda en una sola transacción.
+    El stock necesario se agrega por ingrediente para todas las líneas, se verifica una sola vez
+    y se descuenta en bloque; si falta algún ingrediente no se descuenta nada ni se mueve ninguna línea.
+    Returns:
+        dict: {'exito': bool, 'mensaje': str, 'lineas': [{'id_detalle_comanda', 'nombre_plato', 'exito', 'mensaje'}, ...]}
+              o None si hubo un error de BD.
+    """
+    if not db or not app_stock_model:
+        print("ERROR CRÍTICO: Módulos db o stock_model no están disponibles en send_order_to_kitchen.")
+        return None
+
+    try:
+        with db.transaction() as tx:
+            order_info = tx.fetch_one("SELECT estado_comanda FROM Comanda WHERE id_comanda = %s FOR UPDATE", (order_id_value,))
+            if not order_info:
+                return {'exito': False, 'mensaje': f"Comanda '{order_id_value}' no encontrada.", 'lineas': []}
+            if order_info['estado_comanda'] not in ('abierta', 'en preparacion'):
+                return {'exito': False, 'lineas': [],
+                        'mensaje': f"La comanda '{order_id_value}' no se puede enviar a cocina (estado: {order_info['estado_comanda']})."}
+
+            pending_lines = tx.fetch_all("""
+                SELECT dc.id_detalle_comanda, dc.id_plato, dc.cantidad, p.nombre_plato
+                FROM DetalleComanda dc
+                JOIN Plato p ON dc.id_plato = p.id_plato
+                WHERE dc.id_comanda = %s AND dc.estado_plato = 'pendiente'
+                ORDER BY dc.id_detalle_comanda ASC
+                FOR UPDATE
+            """, (order_id_value,))
+            if not pending_lines:
+                return {'exito': False, 'mensaje': f"La comanda '{order_id_value}' no tiene platos pendientes.", 'lineas': []}
+
+            dish_ids = sorted({line['id_plato'] for line in pending_lines})
+            recipe_rows = tx.fetch_all(f"""
+                SELECT r.id_plato, r.id_ingrediente, r.cantidad_stock
+                FROM Receta r
+                WHERE r.id_plato IN ({_sql_placeholders(dish_ids)})
+            """, tuple(dish_ids))
+
+            recipes_by_dish = {}
+            for row in recipe_rows:
+                recipes_by_dish.setdefault(row['id_plato'], []).append(row)
+
+            # Requerimiento total por ingrediente, sumando todas las líneas de la comanda
+            required_by_ingredient = {}
+            for line in pending_lines:
+                for recipe_item in recipes_by_dish.get(line['id_plato'], []):
+                    required = float(recipe_item['cantidad_stock']) * int(line['cantidad'])
+                    required_by_ingredient[recipe_item['id_ingrediente']] = required_by_ingredient.get(recipe_item['id_ingrediente'], 0.0) + required
+
+            detail_ids = [line['id_detalle_comanda'] for line in pending_lines]
+            stock_by_ingredient = app_stock_model._lock_ingredients_for_update(tx.cursor, required_by_ingredient)
+            # Lo reservado por estas mismas líneas es justo lo que se va a consumir; solo restan las demás reservas
+            reserved_by_others = app_stock_model._reserved_by_ingredient(tx.cursor, required_by_ingredient, exclude_detail_ids=detail_ids)
+            shortages = app_stock_model._find_stock_shortages(
+                required_by_ingredient, app_stock_model._net_of_reservations(stock_by_ingredient, reserved_by_others))
+            short_ingredients = {
+                id_ingrediente: f"{m['nombre_ingrediente']} (disponible: {m['available']}, requerido: {m['needed']} {m['unit']})".strip()
+                for id_ingrediente, m in shortages.items()
+            }
+
+            lines_result = []
+            for line in pending_lines:
+                line_shortages = [short_ingredients[r['id_ingrediente']]
+                                  for r in recipes_by_dish.get(line['id_plato'], [])
+                                  if r['id_ingrediente'] in short_ingredients]
+                if line_shortages:
+                    line_message = "Stock insuficiente: " + "; ".join(line_shortages)
+                elif not recipes_by_dish.get(line['id_plato']):
+                    line_message = "Sin receta registrada; no se descuenta stock."
+                else:
+                    line_message = "Enviado a cocina."
+                lines_result.append({
+                    'id_detalle_comanda': line['id_detalle_comanda'],
+                    'nombre_plato': line['nombre_plato'],
+                    'exito': not line_shortages,
+                    'mensaje': line_message,
+                })
+
+            if short_ingredients:
+                tx.mark_failed() # No se descuenta nada ni se mueve ninguna línea
+                return {'exito': False, 'lineas': lines_result,
+                        'mensaje': f"Stock insuficiente para enviar la comanda '{order_id_value}' a cocina."}
+
+            app_stock_model._apply_stock_consumption(
+                tx.cursor, required_by_ingredient, stock_by_ingredient, "CONSUMO_COMANDA",
+                id_referencia_origen=str(order_id_value),
+                descripcion_motivo=f"Consumo por envío a cocina de Comanda {order_id_value}",
+                id_empleado_responsable=id_employee_responsible
+            )
+            app_stock_model._release_reservations(tx.cursor, detail_ids=detail_ids) # Reserva convertida en consumo
+
+            tx.execute(f"UPDATE DetalleComanda SET estado_plato = 'en preparacion' WHERE id_detalle_comanda IN ({_sql_placeholders(detail_ids)})",
+                       tuple(detail_ids))
+            _record_item_transitions(tx.cursor, [(line['id_detalle_comanda'], line['id_plato']) for line in pending_lines], 'en preparacion')
+            kitchen_scheduler_model.mark_lines_fired(tx.cursor, detail_ids)
+            kitchen_scheduler_model.schedule_orders(tx.cursor, [order_id_value])
+            tx.execute("UPDATE Comanda SET estado_comanda = 'en preparacion' WHERE id_comanda = %s", (order_id_value,))
+            events.publish(events.TOPIC_ORDER, order_id_value, {'estado': 'en preparacion', 'detalles_en_preparacion': detail_ids})
+
+        return {'exito': True, 'lineas': lines_result,
+                'mensaje': f"Comanda '{order_id_value}' enviada a cocina ({len(lines_result)} platos)."}
+
+    except Exception as e:
+        print(f"EXCEPCIÓN en send_order_to_kitchen para la comanda '{order_id_value}': {e}")
+        traceback.print_exc()
+        return None
 
 def get_active_orders_summary():
     if not db:
@@ -388,7 +542,12 @@ def get_active_orders_summary():
     return None
 
 def get_orders_history(start_date=None, end_date=None, table_id=None,
-                       employee_id=None, customer_id=None, order_status=None, limit=100):
+                       employee_id=None, customer_id=None, order_status=None, limit=100, after=None):
+    """
+    Historial de comandas, de la más reciente a la más antigua.
+    Para paginar, 'after' recibe el cursor (fecha_hora_apertura, id_comanda) de la última fila
+    recibida (ver get_orders_history_cursor) y se devuelve la página siguiente.
+    """
     if not db: return None
 
     query_base = """
@@ -406,12 +565,9 @@ def get_orders_history(start_date=None, end_date=None, table_id=None,
     conditions = []
     params = []
 
-    if start_date:
-        conditions.append("DATE(c.fecha_hora_apertura) >= %s")
-        params.append(start_date)
-    if end_date:
-        conditions.append("DATE(c.fecha_hora_apertura) <= %s")
-        params.append(end_date)
+    date_conditions, date_params = db.date_range_conditions("c.fecha_hora_apertura", start_date, end_date)
+    conditions.extend(date_conditions)
+    params.extend(date_params)
     if table_id:
         conditions.append("c.id_mesa = %s")
         params.append(table_id)
@@ -424,6 +580,10 @@ def get_orders_history(start_date=None, end_date=None, table_id=None,
     if order_status:
         conditions.append("c.estado_comanda = %s")
         params.append(order_status)
+    keyset_condition, keyset_params = db.keyset_before_condition("c.fecha_hora_apertura", "c.id_comanda", after)
+    if keyset_condition:
+        conditions.append(keyset_condition)
+        params.extend(keyset_params)
 
     if conditions:
         query_base += " WHERE " + " AND ".join(conditions)
@@ -435,9 +595,18 @@ def get_orders_history(start_date=None, end_date=None, table_id=None,
 
     return db.fetch_all(query_base, tuple(params))
 
-def get_dishes_for_kitchen_view():
+def get_orders_history_cursor(order_row):
+    """Cursor de paginación (fecha_hora_apertura, id_comanda) de una fila de get_orders_history."""
+    return (order_row['fecha_hora_apertura'], order_row['id_comanda'])
+
+def get_dishes_for_kitchen_view(station_id=None):
+    """
+    Líneas activas de cocina en orden de prioridad: primero las que hay que disparar antes.
+    Con station_id, solo las de esa estación (índice idx_detalle_estacion_cola).
+    """
     if not db: return None
-    query = """
+    station_filter, params = _kitchen_station_filter(station_id)
+    query = f"""
     SELECT
         dc.id_detalle_comanda,
         dc.id_comanda,
@@ -447,14 +616,265 @@ def get_dishes_for_kitchen_view():
         dc.estado_plato,
         dc.observaciones_plato,
         dc.hora_pedido,
+        dc.hora_disparo,
+        dc.hora_entrega_estimada,
+        dc.id_estacion,
+        co.id_mesa
+    FROM DetalleComanda dc
+    JOIN Plato p ON dc.id_plato = p.id_plato
+    JOIN Comanda co ON dc.id_comanda = co.id_comanda
+    WHERE dc.estado_plato IN ('pendiente', 'en preparacion'){station_filter}
+    ORDER BY {kitchen_scheduler_model.KITCHEN_QUEUE_ORDER_SQL};
+    """
+    return db.fetch_all(query, params or None)
+
+def _kitchen_station_filter(station_id):
+    """Condición adicional (' AND ...') y parámetros para limitar una consulta de cocina a una estación."""
+    if not station_id:
+        return "", ()
+    return " AND dc.id_estacion = %s", (station_id,)
+
+# Estados de línea que se muestran en la pantalla de cocina.
+KITCHEN_ACTIVE_STATUSES = ('pendiente', 'en preparacion')
+# Margen hacia atrás al aplicar el cursor: una transacción que modificó una línea antes del último
+# sondeo pero confirmó después tiene una fecha_modificacion anterior al cursor. Las líneas del margen
+# se reenvían en cada sondeo, lo que es inocuo porque la vista las aplica por id.
+KITCHEN_FEED_OVERLAP = datetime.timedelta(seconds=5)
+
+_KITCHEN_LINE_COLUMNS = """
+        dc.id_detalle_comanda,
+        dc.id_comanda,
+        dc.id_plato,
+        p.nombre_plato,
+        dc.cantidad,
+        dc.estado_plato,
+        dc.observaciones_plato,
+        dc.hora_pedido,
+        dc.hora_disparo,
+        dc.hora_entrega_estimada,
+        dc.id_estacion,
+        dc.fecha_modificacion,
         co.id_mesa
+"""
+
+def get_kitchen_changes_since(cursor=None, station_id=None):
+    """
+    Feed incremental para la pantalla de cocina.
+
+    Args:
+        cursor (datetime, optional): Cursor devuelto por la llamada anterior. None pide una
+            instantánea completa de las líneas activas.
+        station_id (str, optional): Limita el feed a una estación (ver station_model). Si se
+            reenruta una línea a otra estación, la pantalla de la anterior la quita al recibir
+            el evento TOPIC_STATION y pedir una instantánea.
+
+    Returns:
+        dict: {'completo': bool, 'cursor': datetime | None, 'lineas': [dict, ...]}
+            Con 'completo' True, 'lineas' son todas las líneas activas en orden de prioridad
+            (hora_disparo, ver kitchen_scheduler_model; la vista reemplaza su lista).
+            Si no, son las líneas añadidas o modificadas desde el cursor, en cualquier estado: las que
+            ya no están en KITCHEN_ACTIVE_STATUSES deben quitarse de la vista.
+        None: Si hay un error de base de datos.
+    """
+    if not db: return None
+    station_filter, station_params = _kitchen_station_filter(station_id)
+    if cursor is None:
+        max_row = db.fetch_one("SELECT MAX(fecha_modificacion) AS cursor FROM DetalleComanda")
+        if max_row is None:
+            return None
+        query = f"""
+        SELECT {_KITCHEN_LINE_COLUMNS}
+        FROM DetalleComanda dc
+        JOIN Plato p ON dc.id_plato = p.id_plato
+        JOIN Comanda co ON dc.id_comanda = co.id_comanda
+        WHERE dc.estado_plato IN ({_sql_placeholders(KITCHEN_ACTIVE_STATUSES)}){station_filter}
+        ORDER BY {kitchen_scheduler_model.KITCHEN_QUEUE_ORDER_SQL};
+        """
+        lines = db.fetch_all(query, KITCHEN_ACTIVE_STATUSES + station_params)
+        if lines is None:
+            return None
+        return {'completo': True, 'cursor': max_row['cursor'], 'lineas': lines}
+
+    query = f"""
+    SELECT {_KITCHEN_LINE_COLUMNS}
     FROM DetalleComanda dc
     JOIN Plato p ON dc.id_plato = p.id_plato
     JOIN Comanda co ON dc.id_comanda = co.id_comanda
-    WHERE dc.estado_plato IN ('pendiente', 'en preparacion')
-    ORDER BY dc.hora_pedido ASC, dc.id_comanda ASC, dc.id_detalle_comanda ASC;
+    WHERE dc.fecha_modificacion >= %s{station_filter}
+    ORDER BY dc.fecha_modificacion ASC, dc.id_detalle_comanda ASC;
+    """
+    lines = db.fetch_all(query, (cursor - KITCHEN_FEED_OVERLAP,) + station_params)
+    if lines is None:
+        return None
+    new_cursor = max([cursor] + [line['fecha_modificacion'] for line in lines])
+    return {'completo': False, 'cursor': new_cursor, 'lineas': lines}
+
+# --- Hora de entrega estimada (ETA) según la cola de cada estación ---
+# Líneas que cada estación prepara a la vez.
+KITCHEN_STATION_CAPACITY = int(os.getenv("KITCHEN_STATION_CAPACITY", 3))
+# Tiempo de preparación observado por plato (mediana de 'en preparacion' -> 'listo' en esta ventana);
+# con menos muestras se usa Plato.tiempo_preparacion_min. Se recalcula cada ETA_HISTORY_TTL_SECONDS.
+ETA_HISTORY_WINDOW = datetime.timedelta(days=14)
+ETA_HISTORY_MIN_SAMPLES = 5
+ETA_HISTORY_TTL_SECONDS = 600
+# hora_entrega_estimada solo se reescribe si la estimación se movió al menos esto. Es la única escritura
+# de esa columna (kitchen_scheduler_model solo programa hora_disparo).
+ETA_WRITE_THRESHOLD = datetime.timedelta(seconds=60)
+# Cada cuántas sincronizaciones incrementales se vuelve a leer la cola completa (líneas borradas).
+ETA_QUEUE_RESYNC_EVERY = 20
+
+
+class KitchenQueueModel:
+    """
+    Copia en memoria de las líneas activas de cocina, mantenida con el feed incremental
+    get_kitchen_changes_since: cada estimación cuesta una consulta de cambios, no releer la cocina.
+
+    La estimación simula cada estación con KITCHEN_STATION_CAPACITY puestos: las líneas ya disparadas
+    (hora_disparo <= ahora) ocupan un puesto hasta terminar; las demás, en el orden de la cola, empiezan
+    cuando queda un puesto libre y no antes de su hora_disparo. La ETA de una línea es la del final
+    más tardío de su comanda, porque los platos de la mesa salen juntos (kitchen_scheduler_model).
     """
-    return db.fetch_all(query)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lines = {} # id_detalle_comanda -> fila del feed de cocina
+        self._cursor = None
+        self._syncs_since_resync = 0
+        self._prep_seconds_by_dish = {} # id_plato -> segundos observados
+        self._history_loaded_at = None # time.monotonic()
+
+    def _sync(self):
+        if self._syncs_since_resync >= ETA_QUEUE_RESYNC_EVERY:
+            self._cursor = None
+        changes = get_kitchen_changes_since(self._cursor)
+        if changes is None:
+            return False
+        if changes['completo']:
+            self._lines = {}
+            self._syncs_since_resync = 0
+        else:
+            self._syncs_since_resync += 1
+        for line in changes['lineas']:
+            if line['estado_plato'] in KITCHEN_ACTIVE_STATUSES:
+                self._lines[line['id_detalle_comanda']] = line
+            else:
+                self._lines.pop(line['id_detalle_comanda'], None)
+        self._cursor = changes['cursor']
+        return True
+
+    def _refresh_prep_history(self, now):
+        if self._history_loaded_at is not None and time.monotonic() - self._history_loaded_at < ETA_HISTORY_TTL_SECONDS:
+            return
+        rows = kitchen_analytics_model.get_kitchen_time_percentiles('plato', now - ETA_HISTORY_WINDOW, now) if kitchen_analytics_model else None
+        if rows is None:
+            return # Se siguen usando los tiempos anteriores o los del menú
+        self._prep_seconds_by_dish = {
+            row['grupo']: int(row['prep_p50']) for row in rows
+            if row.get('prep_p50') is not None and int(row.get('lineas') or 0) >= ETA_HISTORY_MIN_SAMPLES
+        }
+        self._history_loaded_at = time.monotonic()
+
+    def _prep_seconds(self, line):
+        observed = self._prep_seconds_by_dish.get(line['id_plato'])
+        if observed is not None:
+            return observed
+        dish = menu_model.get_cached_dish(line['id_plato']) if menu_model else None
+        minutes = (dish or {}).get('tiempo_preparacion_min') or kitchen_scheduler_model.DEFAULT_PREP_MINUTES
+        return int(minutes) * 60
+
+    def _estimate(self, now):
+        """{id_detalle_comanda: ETA} de todas las líneas activas."""
+        lines_by_station = {}
+        for line in self._lines.values():
+            lines_by_station.setdefault(line.get('id_estacion'), []).append(line)
+
+        finish_by_line = {}
+        for station_lines in lines_by_station.values():
+            started = [line for line in station_lines if line.get('hora_disparo') and line['hora_disparo'] <= now]
+            waiting = [line for line in station_lines if not (line.get('hora_disparo') and line['hora_disparo'] <= now)]
+            free_at = []
+            for line in started:
+                finish = max(now, line['hora_disparo'] + datetime.timedelta(seconds=self._prep_seconds(line)))
+                finish_by_line[line['id_detalle_comanda']] = finish
+                free_at.append(finish)
+            free_at.extend([now] * (KITCHEN_STATION_CAPACITY - len(free_at)))
+            heapq.heapify(free_at)
+            while len(free_at) > KITCHEN_STATION_CAPACITY: # Más líneas en marcha que puestos: esperar a que sobren
+                heapq.heappop(free_at)
+            waiting.sort(key=lambda line: (line.get('hora_disparo') is None, line.get('hora_disparo') or now,
+                                           line.get('hora_pedido') or now, line['id_detalle_comanda']))
+            for line in waiting:
+                start = max(heapq.heappop(free_at), line.get('hora_disparo') or now)
+                finish = start + datetime.timedelta(seconds=self._prep_seconds(line))
+                finish_by_line[line['id_detalle_comanda']] = finish
+                heapq.heappush(free_at, finish)
+
+        eta_by_order = {}
+        for detail_id, finish in finish_by_line.items():
+            order_id = self._lines[detail_id]['id_comanda']
+            eta_by_order[order_id] = max(eta_by_order.get(order_id, finish), finish)
+        return {detail_id: eta_by_order[self._lines[detail_id]['id_comanda']].replace(microsecond=0)
+                for detail_id in finish_by_line}
+
+    def _write_etas(self, etas):
+        changed = []
+        for detail_id, eta in etas.items():
+            stored = self._lines[detail_id].get('hora_entrega_estimada')
+            if stored is None or abs(stored - eta) >= ETA_WRITE_THRESHOLD:
+                changed.append((detail_id, eta))
+        if not changed:
+            return True
+        params = []
+        for detail_id, eta in changed:
+            params.extend([detail_id, eta])
+        params.extend(detail_id for detail_id, _ in changed)
+        # fecha_modificacion se deja igual: una ETA nueva no es un cambio de la línea para el feed de cocina,
+        # del que se alimenta este mismo modelo
+        updated = db.execute_query(f"""
+            UPDATE DetalleComanda
+            SET hora_entrega_estimada = CASE id_detalle_comanda {" ".join(["WHEN %s THEN %s"] * len(changed))} END,
+                fecha_modificacion = fecha_modificacion
+            WHERE id_detalle_comanda IN ({_sql_placeholders(changed)})
+        """, tuple(params))
+        if updated is None:
+            return False
+        for detail_id, eta in changed:
+            self._lines[detail_id]['hora_entrega_estimada'] = eta
+        return True
+
+    def estimate(self, order_id_value=None, write=True):
+        now = datetime.datetime.now()
+        with self._lock:
+            if not self._sync():
+                return None
+            self._refresh_prep_history(now)
+            etas = self._estimate(now)
+            if order_id_value is not None:
+                etas = {detail_id: eta for detail_id, eta in etas.items()
+                        if self._lines[detail_id]['id_comanda'] == order_id_value}
+            if write and not self._write_etas(etas):
+                return None
+            return etas
+
+
+_kitchen_queue = KitchenQueueModel()
+
+def estimate_order_etas(order_id_value=None, write=True):
+    """
+    Hora de entrega estimada de las líneas activas de una comanda (de todas si no se indica),
+    según la cola actual de cada estación, el tiempo de preparación observado de cada plato y la
+    programación de kitchen_scheduler_model (ver KitchenQueueModel).
+    Con write=True guarda en DetalleComanda.hora_entrega_estimada las que cambiaron al menos
+    ETA_WRITE_THRESHOLD.
+    Returns:
+        dict: {id_detalle_comanda: datetime}, o None si hay error de BD.
+    """
+    if not db: return None
+    try:
+        return _kitchen_queue.estimate(order_id_value, write)
+    except Exception as e:
+        print(f"Excepción al estimar la hora de entrega (comanda '{order_id_value}'): {e}")
+        traceback.print_exc()
+        return None
 
 if __name__ == '__main__':
     if not all([db, table_model, menu_model, app_stock_model, app_recipe_model]):
@@ -4,15 +4,21 @@ import datetime
 # Ajusta las rutas de importación según tu estructura de proyecto.
 try:
     from .. import db
+    from .. import events
+    from . import cost_model
+    from . import unit_model
     # No necesitamos menu_model o stock_model directamente aquí si solo manejamos la tabla Receta
     # y asumimos que los IDs de plato e ingrediente son válidos y existen.
     # Las validaciones de existencia de plato/ingrediente se harían antes de llamar a estas funciones.
 except ImportError:
     try:
         import db
+        import events
+        import cost_model
+        import unit_model
     except ImportError:
         print("Error: No se pudo importar el módulo db.py en recipe_model.py.")
-        db = None
+        db = events = cost_model = unit_model = None
 
 def add_ingredient_to_recipe(dish_id_value, ingredient_id_value, quantity_needed, unit_of_measure, instructions=""):
     """
@@ -22,6 +28,7 @@ def add_ingredient_to_recipe(dish_id_value, ingredient_id_value, quantity_needed
         ingredient_id_value (str): ID del ingrediente (de la tabla Ingrediente).
         quantity_needed (float): Cantidad del ingrediente necesaria.
         unit_of_measure (str): Unidad de medida para esta cantidad en la receta (ej. 'g', 'ml', 'unidad').
+            Debe ser la del stock del ingrediente o convertible a ella (ver unit_model).
         instructions (str, optional): Instrucciones específicas para este ingrediente en la receta.
     Returns:
         int: El ID de la entrada de receta creada (id_receta), o None si falla.
@@ -35,13 +42,27 @@ def add_ingredient_to_recipe(dish_id_value, ingredient_id_value, quantity_needed
     # Esto se maneja mejor con una restricción UNIQUE en la BD, y aquí se captura el error si ocurre.
     
     query = """
-    INSERT INTO Receta (id_plato, id_ingrediente, cantidad_necesaria, unidad_medida_receta, instrucciones_paso)
-    VALUES (%s, %s, %s, %s, %s)
+    INSERT INTO Receta (id_plato, id_ingrediente, cantidad_necesaria, cantidad_stock, unidad_medida_receta, instrucciones_paso)
+    VALUES (%s, %s, %s, %s, %s, %s)
     """
-    params = (dish_id_value, ingredient_id_value, quantity_needed, unit_of_measure, instructions)
+    # cantidad_stock provisional (NOT NULL); _normalize_recipe_entry la convierte en la misma transacción
+    params = (dish_id_value, ingredient_id_value, quantity_needed, quantity_needed, unit_of_measure, instructions)
     
-    # db.execute_query devuelve el lastrowid para INSERTs, que es id_receta
-    return db.execute_query(query, params)
+    try:
+        # tx.execute devuelve el lastrowid para INSERTs, que es id_receta
+        with db.transaction() as tx:
+            recipe_entry_id = tx.execute(query, params)
+            if not _normalize_recipe_entry(recipe_entry_id):
+                tx.mark_failed()
+                return None
+            if cost_model.recalculate_dish_costs([dish_id_value]) is None:
+                tx.mark_failed() # Sin costo actualizado no se guarda el cambio de receta
+                return None
+            events.publish(events.TOPIC_RECIPE, dish_id_value, {'id_ingrediente': ingredient_id_value})
+        return recipe_entry_id
+    except Exception as e:
+        print(f"Error al añadir el ingrediente '{ingredient_id_value}' a la receta del plato '{dish_id_value}': {e}")
+        return None
 
 def get_recipe_for_dish(dish_id_value):
     """
@@ -107,7 +128,7 @@ def update_recipe_ingredient(recipe_entry_id, new_quantity=None, new_unit=None,
     params.append(recipe_entry_id)
 
     query = f"UPDATE Receta SET {', '.join(set_clauses)} WHERE id_receta = %s"
-    return db.execute_query(query, tuple(params))
+    return _execute_recipe_entry_change(recipe_entry_id, query, tuple(params))
 
 def remove_ingredient_from_recipe(recipe_entry_id):
     """
@@ -119,7 +140,40 @@ def remove_ingredient_from_recipe(recipe_entry_id):
     """
     if not db: return None
     query = "DELETE FROM Receta WHERE id_receta = %s"
-    return db.execute_query(query, (recipe_entry_id,))
+    return _execute_recipe_entry_change(recipe_entry_id, query, (recipe_entry_id,))
+
+def _normalize_recipe_entry(recipe_entry_id):
+    """Convierte la cantidad de una línea de receta a la unidad del stock. False si no se puede."""
+    unconvertible = unit_model.normalize_recipe_lines(recipe_entry_ids=[recipe_entry_id])
+    if unconvertible is None:
+        print(f"Error: No se pudieron convertir las unidades de la entrada de receta '{recipe_entry_id}'.")
+        return False
+    if unconvertible:
+        print(f"Error de unidades en la receta: {unit_model.describe_unconvertible_lines(unconvertible)}.")
+        return False
+    return True
+
+def _execute_recipe_entry_change(recipe_entry_id, query, params):
+    """
+    Ejecuta un cambio sobre una línea de receta, vuelve a convertir su cantidad a la unidad del stock,
+    recalcula el costo del plato al que pertenece y publica su evento, todo en la misma transacción.
+    """
+    try:
+        with db.transaction() as tx:
+            recipe_row = tx.fetch_one("SELECT id_plato, id_ingrediente FROM Receta WHERE id_receta = %s", (recipe_entry_id,))
+            rows_affected = tx.execute(query, params)
+            if recipe_row and rows_affected:
+                if not _normalize_recipe_entry(recipe_entry_id):
+                    tx.mark_failed()
+                    return None
+                if cost_model.recalculate_dish_costs([recipe_row['id_plato']]) is None:
+                    tx.mark_failed()
+                    return None
+                events.publish(events.TOPIC_RECIPE, recipe_row['id_plato'], {'id_ingrediente': recipe_row['id_ingrediente']})
+        return rows_affected
+    except Exception as e:
+        print(f"Error al modificar la entrada de receta '{recipe_entry_id}': {e}")
+        return None
 
 # --- Ejemplo de uso y pruebas ---
 if __name__ == '__main__':
@@ -0,0 +1,362 @@
+# app/models/split_bill_model.py
+# División de la cuenta de una comanda entre pagadores (asientos o nombres), en céntimos enteros.
+#
+# Cada línea de la comanda se asigna a uno o varios pagadores con un peso ('partes'); su subtotal en
+# céntimos se reparte con el método del mayor resto: cada pagador recibe el cociente entero de su
+# fracción y los céntimos sobrantes van a las fracciones con mayor resto, así las partes de una línea
+# suman exactamente su subtotal. El reparto se guarda por línea en DivisionCuenta: asignar o añadir
+# una línea solo recalcula esa línea, y los totales por pagador son una agregación. Una línea añadida a
+# una comanda con la cuenta ya dividida se reparte entre sus pagadores en la misma transacción del alta
+# (split_new_line, desde order_model.add_dish_to_order); luego se puede reasignar con assign_line.
+#
+# Por pagador, con aritmética entera y redondeo mitad hacia arriba (las mismas reglas de billing_model):
+#     descuentos = subtotal * porcentaje / 100 (todo el subtotal con 'cortesia')
+#     impuestos  = (subtotal - descuentos) * BILLING_TAX_RATE
+# y al facturar se inserta una Factura por pagador, en la misma transacción que cierra la comanda.
+import datetime
+import traceback
+from decimal import Decimal
+
+try:
+    from app import db
+    from app import events
+    from app.models import billing_model
+except ImportError:
+    try:
+        from .. import db
+        from .. import events
+        from . import billing_model
+    except ImportError:
+        try:
+            import db
+            import events
+            import billing_model
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en split_bill_model.py: {e}")
+            db = events = billing_model = None
+
+_INSERT_SHARE_QUERY = """
+INSERT INTO DivisionCuenta (id_detalle_comanda, pagador, id_comanda, partes, importe_centimos)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Subtotal en céntimos por pagador de las líneas facturables de una comanda
+_PAYER_SUBTOTALS_QUERY = """
+SELECT dv.pagador, SUM(dv.importe_centimos) AS subtotal_centimos
+FROM DivisionCuenta dv
+JOIN DetalleComanda dc ON dc.id_detalle_comanda = dv.id_detalle_comanda
+WHERE dv.id_comanda = %s AND dc.estado_plato IN ({item_statuses})
+GROUP BY dv.pagador
+ORDER BY dv.pagador
+"""
+
+# Líneas facturables de una comanda que aún no tienen pagador
+_UNASSIGNED_LINES_QUERY = """
+SELECT dc.id_detalle_comanda, dc.subtotal_detalle, p.nombre_plato
+FROM DetalleComanda dc
+JOIN Plato p ON p.id_plato = dc.id_plato
+WHERE dc.id_comanda = %s AND dc.estado_plato IN ({item_statuses})
+  AND NOT EXISTS (SELECT 1 FROM DivisionCuenta dv WHERE dv.id_detalle_comanda = dc.id_detalle_comanda)
+ORDER BY dc.id_detalle_comanda
+"""
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+def to_cents(amount):
+    """Importe DECIMAL(…, 2) a céntimos enteros."""
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+def _divide_half_up(numerator, denominator):
+    """numerator / denominator redondeado a entero, mitad hacia arriba (valores no negativos)."""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+def allocate_cents(total_cents, shares):
+    """
+    Reparte total_cents según los pesos con el método del mayor resto.
+    Args:
+        shares (list): [(pagador, partes), ...]; el orden desempata los restos iguales.
+    Returns:
+        dict: {pagador: céntimos}, que suman exactamente total_cents.
+    """
+    total_parts = sum(parts for _, parts in shares)
+    allocation = {payer: total_cents * parts // total_parts for payer, parts in shares}
+    leftover = total_cents - sum(allocation.values())
+    by_remainder = sorted(range(len(shares)), key=lambda index: (-(total_cents * shares[index][1] % total_parts), index))
+    for index in by_remainder[:leftover]:
+        allocation[shares[index][0]] += 1
+    return allocation
+
+def compute_payer_totals(subtotal_cents, payment_method=None, discount_percent=0):
+    """
+    Descuento, impuestos y total de un pagador, en céntimos enteros.
+    Returns:
+        dict: {'subtotal_centimos', 'descuentos_centimos', 'impuestos_centimos', 'total_centimos'}
+    """
+    if payment_method == 'cortesia':
+        discount_cents = subtotal_cents
+    else:
+        percent_num, percent_den = Decimal(str(discount_percent or 0)).as_integer_ratio()
+        discount_cents = min(subtotal_cents, _divide_half_up(subtotal_cents * percent_num, percent_den * 100))
+    tax_num, tax_den = billing_model.BILLING_TAX_RATE.as_integer_ratio()
+    tax_cents = _divide_half_up((subtotal_cents - discount_cents) * tax_num, tax_den)
+    return {'subtotal_centimos': subtotal_cents, 'descuentos_centimos': discount_cents,
+            'impuestos_centimos': tax_cents, 'total_centimos': subtotal_cents - discount_cents + tax_cents}
+
+def _normalize_shares(shares):
+    """{pagador: partes} o [pagador, ...] (partes iguales) -> [(pagador, partes), ...] o None si no es válido."""
+    if isinstance(shares, dict):
+        normalized = [(str(payer).strip(), int(parts)) for payer, parts in shares.items()]
+    else:
+        normalized = [(str(payer).strip(), 1) for payer in shares]
+    if not normalized or any(not payer or parts <= 0 for payer, parts in normalized):
+        return None
+    if len({payer for payer, _ in normalized}) != len(normalized):
+        return None
+    return normalized
+
+def _share_rows(line, shares):
+    allocation = allocate_cents(to_cents(line['subtotal_detalle']), shares)
+    return [(line['id_detalle_comanda'], payer, line['id_comanda'], parts, allocation[payer]) for payer, parts in shares]
+
+def _check_order_open(tx, order_id_value):
+    order_info = tx.fetch_one("SELECT estado_comanda FROM Comanda WHERE id_comanda = %s FOR UPDATE", (order_id_value,))
+    if not order_info:
+        print(f"Error: Comanda '{order_id_value}' no encontrada.")
+        return False
+    if order_info['estado_comanda'] in ('facturada', 'cancelada'):
+        print(f"Error: La comanda '{order_id_value}' ya está cerrada ({order_info['estado_comanda']}); no se puede dividir.")
+        return False
+    return True
+
+def assign_lines(order_detail_ids, shares):
+    """
+    Asigna varias líneas de comanda a los mismos pagadores, sustituyendo su reparto anterior, en una
+    sola transacción: o se reasignan todas o ninguna. Solo se recalculan esas líneas.
+    Args:
+        shares: {pagador: partes} para fracciones desiguales, o [pagador, ...] para partes iguales.
+    Returns:
+        dict: {id_detalle_comanda: {pagador: céntimos}}, o None si hay error (no se cambia nada).
+    """
+    if not db: return None
+    shares = _normalize_shares(shares)
+    if shares is None:
+        print("Error: El reparto debe tener al menos un pagador, sin repetir, con partes mayores que cero.")
+        return None
+    detail_ids = sorted({int(detail_id) for detail_id in order_detail_ids})
+    if not detail_ids:
+        return {}
+    try:
+        with db.transaction() as tx:
+            lines = tx.fetch_all(f"""
+                SELECT id_detalle_comanda, id_comanda, subtotal_detalle, estado_plato
+                FROM DetalleComanda WHERE id_detalle_comanda IN ({_placeholders(detail_ids)})
+                ORDER BY id_detalle_comanda
+                FOR UPDATE
+            """, tuple(detail_ids))
+            missing = set(detail_ids) - {line['id_detalle_comanda'] for line in lines}
+            if missing:
+                print(f"Error: Detalles de comanda no encontrados: {', '.join(map(str, sorted(missing)))}.")
+                return None
+            for order_id_value in sorted({line['id_comanda'] for line in lines}):
+                if not _check_order_open(tx, order_id_value):
+                    tx.mark_failed()
+                    return None
+            rows = [row for line in lines for row in _share_rows(line, shares)]
+            tx.execute(f"DELETE FROM DivisionCuenta WHERE id_detalle_comanda IN ({_placeholders(detail_ids)})", tuple(detail_ids))
+            tx.executemany(_INSERT_SHARE_QUERY, rows)
+        allocation = {}
+        for detail_id, payer, _, _, cents in rows:
+            allocation.setdefault(detail_id, {})[payer] = cents
+        return allocation
+    except Exception as e:
+        print(f"Excepción al asignar las líneas {detail_ids} a pagadores: {e}")
+        traceback.print_exc()
+        return None
+
+def assign_line(order_detail_id_value, shares):
+    """
+    Asigna una línea de comanda a uno o varios pagadores (ver assign_lines).
+    Returns:
+        dict: {pagador: céntimos} de la línea, o None si hay error.
+    """
+    allocation = assign_lines([order_detail_id_value], shares)
+    return None if allocation is None else allocation.get(int(order_detail_id_value))
+
+def split_new_line(cursor, order_detail_id_value):
+    """
+    Reparte a partes iguales una línea recién añadida entre los pagadores que ya tiene su comanda.
+    No hace nada si la cuenta de la comanda no está dividida. Asume que el cursor está dentro de la
+    transacción del alta de la línea.
+    Returns:
+        int: Filas de reparto insertadas.
+    """
+    cursor.execute("""
+        SELECT dc.id_detalle_comanda, dc.id_comanda, dc.subtotal_detalle
+        FROM DetalleComanda dc WHERE dc.id_detalle_comanda = %s
+    """, (order_detail_id_value,))
+    line = cursor.fetchone()
+    if not line:
+        return 0
+    cursor.execute("SELECT DISTINCT pagador FROM DivisionCuenta WHERE id_comanda = %s ORDER BY pagador", (line['id_comanda'],))
+    shares = [(row['pagador'], 1) for row in cursor.fetchall()]
+    if not shares:
+        return 0
+    rows = _share_rows(line, shares)
+    cursor.executemany(_INSERT_SHARE_QUERY, rows)
+    return len(rows)
+
+def split_unassigned_lines(order_id_value, payers):
+    """
+    Reparte a partes iguales entre 'payers' las líneas de la comanda que aún no tienen pagador
+    (p. ej. las que había antes de dividir la cuenta). Las ya asignadas no se tocan.
+    Returns:
+        int: Líneas repartidas, o None si hay error.
+    """
+    if not db: return None
+    shares = _normalize_shares(payers)
+    if shares is None:
+        print("Error: Se requiere al menos un pagador, sin repetir.")
+        return None
+    try:
+        with db.transaction() as tx:
+            if not _check_order_open(tx, order_id_value):
+                tx.mark_failed()
+                return None
+            lines = tx.fetch_all("""
+                SELECT dc.id_detalle_comanda, dc.id_comanda, dc.subtotal_detalle
+                FROM DetalleComanda dc
+                WHERE dc.id_comanda = %s AND dc.estado_plato <> 'cancelado'
+                  AND NOT EXISTS (SELECT 1 FROM DivisionCuenta dv WHERE dv.id_detalle_comanda = dc.id_detalle_comanda)
+                FOR UPDATE
+            """, (order_id_value,))
+            rows = [row for line in lines for row in _share_rows(line, shares)]
+            if rows:
+                tx.executemany(_INSERT_SHARE_QUERY, rows)
+        return len(lines)
+    except Exception as e:
+        print(f"Excepción al repartir las líneas sin pagador de la comanda '{order_id_value}': {e}")
+        traceback.print_exc()
+        return None
+
+def clear_split(order_id_value):
+    """Quita el reparto de todas las líneas de la comanda. Devuelve las filas borradas o None si hay error."""
+    if not db: return None
+    return db.execute_query("DELETE FROM DivisionCuenta WHERE id_comanda = %s", (order_id_value,))
+
+def get_split_summary(order_id_value, payment_method=None, discount_percent=0):
+    """
+    Estado de la división de la cuenta.
+    Returns:
+        dict: {
+            'pagadores': [{'pagador', 'subtotal_centimos', 'descuentos_centimos', 'impuestos_centimos', 'total_centimos'}, ...],
+            'lineas': [{'id_detalle_comanda', 'nombre_plato', 'cantidad', 'subtotal_detalle', 'estado_plato',
+                        'reparto': {pagador: céntimos}}, ...],
+            'sin_asignar': [id_detalle_comanda facturables sin pagador, ...],
+        }
+        o None si hay error.
+    """
+    if not db: return None
+    item_statuses = billing_model.BILLABLE_ITEM_STATUSES
+    payer_rows = db.fetch_all(_PAYER_SUBTOTALS_QUERY.format(item_statuses=_placeholders(item_statuses)),
+                              (order_id_value, *item_statuses))
+    line_rows = db.fetch_all("""
+        SELECT dc.id_detalle_comanda, p.nombre_plato, dc.cantidad, dc.subtotal_detalle, dc.estado_plato,
+               dv.pagador, dv.importe_centimos
+        FROM DetalleComanda dc
+        JOIN Plato p ON p.id_plato = dc.id_plato
+        LEFT JOIN DivisionCuenta dv ON dv.id_detalle_comanda = dc.id_detalle_comanda
+        WHERE dc.id_comanda = %s AND dc.estado_plato <> 'cancelado'
+        ORDER BY dc.id_detalle_comanda, dv.pagador
+    """, (order_id_value,))
+    if payer_rows is None or line_rows is None:
+        return None
+
+    lines = {}
+    for row in line_rows:
+        line = lines.setdefault(row['id_detalle_comanda'], {
+            'id_detalle_comanda': row['id_detalle_comanda'], 'nombre_plato': row['nombre_plato'],
+            'cantidad': row['cantidad'], 'subtotal_detalle': row['subtotal_detalle'],
+            'estado_plato': row['estado_plato'], 'reparto': {},
+        })
+        if row['pagador'] is not None:
+            line['reparto'][row['pagador']] = int(row['importe_centimos'])
+    return {
+        'pagadores': [dict(compute_payer_totals(int(row['subtotal_centimos']), payment_method, discount_percent), pagador=row['pagador'])
+                      for row in payer_rows],
+        'lineas': list(lines.values()),
+        'sin_asignar': [line['id_detalle_comanda'] for line in lines.values()
+                        if not line['reparto'] and line['estado_plato'] in item_statuses],
+    }
+
+def bill_split(order_id_value, payment_method, discount_percent=0, payment_methods_by_payer=None):
+    """
+    Factura la comanda por separado: una Factura por pagador ('FAC-<id_comanda>-<n>'), cierra la
+    comanda y libera la mesa, en una transacción. Todas las líneas facturables deben tener pagador.
+    Args:
+        payment_methods_by_payer (dict, optional): {pagador: metodo_pago} para quien no pague con payment_method.
+    Returns:
+        dict: {'exito': bool, 'mensaje': str, 'facturas': [{'id_factura', 'pagador', 'metodo_pago', 'subtotal',
+               'descuentos', 'impuestos', 'total'}, ...]}, o None si hubo un error de BD.
+    """
+    if not db or not billing_model: return None
+    payment_methods_by_payer = payment_methods_by_payer or {}
+    invalid_methods = {method for method in [payment_method, *payment_methods_by_payer.values()]
+                       if method not in billing_model.PAYMENT_METHODS}
+    if invalid_methods:
+        return {'exito': False, 'facturas': [], 'mensaje': f"Método de pago no válido: {', '.join(sorted(map(str, invalid_methods)))}."}
+
+    item_statuses = billing_model.BILLABLE_ITEM_STATUSES
+    try:
+        with db.transaction() as tx:
+            order_info = tx.fetch_one("SELECT id_mesa, estado_comanda FROM Comanda WHERE id_comanda = %s FOR UPDATE", (order_id_value,))
+            if not order_info:
+                return {'exito': False, 'facturas': [], 'mensaje': f"Comanda '{order_id_value}' no encontrada."}
+            if order_info['estado_comanda'] not in billing_model.BILLABLE_ORDER_STATUSES:
+                return {'exito': False, 'facturas': [],
+                        'mensaje': f"La comanda '{order_id_value}' no se puede facturar (estado: {order_info['estado_comanda']})."}
+
+            unassigned = tx.fetch_all(_UNASSIGNED_LINES_QUERY.format(item_statuses=_placeholders(item_statuses)),
+                                      (order_id_value, *item_statuses))
+            if unassigned:
+                names = ", ".join(line['nombre_plato'] for line in unassigned)
+                return {'exito': False, 'facturas': [], 'mensaje': f"Hay platos sin pagador asignado: {names}."}
+            payer_rows = tx.fetch_all(_PAYER_SUBTOTALS_QUERY.format(item_statuses=_placeholders(item_statuses)),
+                                      (order_id_value, *item_statuses))
+            if not payer_rows:
+                return {'exito': False, 'facturas': [], 'mensaje': f"La comanda '{order_id_value}' no tiene la cuenta dividida."}
+
+            issued_at = datetime.datetime.now()
+            invoices, invoice_rows = [], []
+            for number, row in enumerate(payer_rows, start=1):
+                method = payment_methods_by_payer.get(row['pagador'], payment_method)
+                totals = compute_payer_totals(int(row['subtotal_centimos']), method, discount_percent)
+                invoice = {
+                    'id_factura': f"{billing_model.invoice_id_for_order(order_id_value)}-{number}",
+                    'pagador': row['pagador'], 'metodo_pago': method,
+                    'subtotal': Decimal(totals['subtotal_centimos']) / 100,
+                    'descuentos': Decimal(totals['descuentos_centimos']) / 100,
+                    'impuestos': Decimal(totals['impuestos_centimos']) / 100,
+                    'total': Decimal(totals['total_centimos']) / 100,
+                }
+                invoices.append(invoice)
+                invoice_rows.append((invoice['id_factura'], order_id_value, invoice['pagador'], issued_at, invoice['subtotal'],
+                                     invoice['impuestos'], invoice['descuentos'], method))
+            tx.executemany("""
+                INSERT INTO Factura (id_factura, id_comanda, pagador, fecha_hora_emision, subtotal, impuestos, descuentos,
+                                     metodo_pago, estado_factura)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'pagada')
+            """, invoice_rows)
+            billing_model._close_orders(tx, [order_id_value], [order_info['id_mesa']], issued_at)
+            events.publish(events.TOPIC_ORDER, order_id_value, {'estado': 'facturada', 'id_mesa': order_info['id_mesa'],
+                                                                'id_factura': [invoice['id_factura'] for invoice in invoices]})
+
+        total = sum(invoice['total'] for invoice in invoices)
+        return {'exito': True, 'facturas': invoices,
+                'mensaje': f"Comanda '{order_id_value}' facturada en {len(invoices)} cuentas: total {total:.2f}."}
+
+    except Exception as e:
+        print(f"Excepción al facturar por separado la comanda '{order_id_value}': {e}")
+        traceback.print_exc()
+        return None
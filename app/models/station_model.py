@@ -0,0 +1,143 @@
+# app/models/station_model.py
+# Estaciones de cocina y enrutado de los platos.
+#
+# Cada plato va a la estación indicada en Plato.id_estacion o, si no tiene, a la de su categoría
+# (EstacionCategoria). La estación se resuelve al añadir la línea a la comanda y se guarda en
+# DetalleComanda.id_estacion, así cada pantalla de cocina lee su parte de la cola con el índice
+# (id_estacion, estado_plato, hora_disparo) sin volver a resolverla. Al cambiar la configuración se
+# reenrutan las líneas activas afectadas y se publica un evento TOPIC_STATION.
+import traceback
+
+try:
+    from app import db
+    from app import events
+except ImportError:
+    try:
+        from .. import db
+        from .. import events
+    except ImportError:
+        try:
+            import db
+            import events
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en station_model.py: {e}")
+            db = events = None
+
+# Estación de un plato 'p' (con EstacionCategoria como 'ec'), para consultas que ya unen ambas tablas.
+STATION_FOR_DISH_SQL = "COALESCE(p.id_estacion, ec.id_estacion)"
+
+# Subconsulta para el valor de DetalleComanda.id_estacion al insertar una línea (parámetro: id_plato).
+STATION_FOR_DISH_ID_SUBQUERY = f"""(
+    SELECT {STATION_FOR_DISH_SQL} FROM Plato p
+    LEFT JOIN EstacionCategoria ec ON ec.categoria = p.categoria
+    WHERE p.id_plato = %s
+)"""
+
+_REROUTE_ACTIVE_LINES_QUERY = f"""
+UPDATE DetalleComanda dc
+JOIN Plato p ON p.id_plato = dc.id_plato
+LEFT JOIN EstacionCategoria ec ON ec.categoria = p.categoria
+SET dc.id_estacion = {STATION_FOR_DISH_SQL}
+WHERE dc.estado_plato IN ('pendiente', 'en preparacion') AND {{where}}
+"""
+
+
+def get_stations():
+    """
+    Returns:
+        list: [{'id_estacion', 'nombre', 'orden'}, ...] en el orden configurado, o None si hay error.
+    """
+    if not db: return None
+    return db.fetch_all("SELECT id_estacion, nombre, orden FROM EstacionCocina ORDER BY orden, nombre",
+                        cache_tables=("EstacionCocina",))
+
+def get_category_stations():
+    """
+    Returns:
+        dict: {categoria: id_estacion}, o None si hay error.
+    """
+    if not db: return None
+    rows = db.fetch_all("SELECT categoria, id_estacion FROM EstacionCategoria", cache_tables=("EstacionCategoria",))
+    if rows is None:
+        return None
+    return {row['categoria']: row['id_estacion'] for row in rows}
+
+def get_dish_stations():
+    """
+    Returns:
+        list: Platos con su estación propia ('id_estacion_plato', None si sigue a la categoría) y la
+              resultante ('id_estacion'), ordenados por categoría y nombre. None si hay error.
+    """
+    if not db: return None
+    return db.fetch_all(f"""
+        SELECT p.id_plato, p.nombre_plato, p.categoria, p.id_estacion AS id_estacion_plato,
+               {STATION_FOR_DISH_SQL} AS id_estacion
+        FROM Plato p
+        LEFT JOIN EstacionCategoria ec ON ec.categoria = p.categoria
+        ORDER BY p.categoria, p.nombre_plato
+    """)
+
+def reroute_active_lines(dish_ids=None, category_value=None):
+    """
+    Vuelve a resolver la estación de las líneas activas de los platos (o de la categoría) indicados,
+    con un solo UPDATE. Se usa dentro de la transacción del cambio de configuración.
+    Returns:
+        int: Líneas afectadas, o None si hay error.
+    """
+    if not db: return None
+    if dish_ids is not None:
+        dish_ids = sorted(set(dish_id for dish_id in dish_ids if dish_id))
+        if not dish_ids:
+            return 0
+        where, params = f"dc.id_plato IN ({', '.join(['%s'] * len(dish_ids))})", tuple(dish_ids)
+    elif category_value is not None:
+        where, params = "p.categoria = %s", (category_value,)
+    else:
+        where, params = "1 = 1", None
+    return db.execute_query(_REROUTE_ACTIVE_LINES_QUERY.format(where=where), params)
+
+def set_category_station(category_value, station_id_value):
+    """Asigna la estación por defecto de una categoría y reenruta las líneas activas de sus platos."""
+    if not db: return None
+    if not category_value or not station_id_value:
+        print("Error: Se requieren la categoría y la estación.")
+        return None
+    try:
+        with db.transaction():
+            if db.execute_query("""
+                INSERT INTO EstacionCategoria (categoria, id_estacion) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE id_estacion = VALUES(id_estacion)
+            """, (category_value, station_id_value)) is None:
+                return None
+            rerouted = reroute_active_lines(category_value=category_value)
+            if rerouted is None:
+                return None
+            events.publish(events.TOPIC_STATION, station_id_value, {'categoria': category_value})
+        return True
+    except Exception as e:
+        print(f"Excepción al asignar la estación '{station_id_value}' a la categoría '{category_value}': {e}")
+        traceback.print_exc()
+        return None
+
+def set_dish_station(dish_id_value, station_id_value=None):
+    """
+    Asigna una estación propia a un plato (None: vuelve a la de su categoría) y reenruta sus líneas activas.
+    """
+    if not db: return None
+    if not dish_id_value:
+        print("Error: Se requiere el ID del plato.")
+        return None
+    try:
+        with db.transaction():
+            updated = db.execute_query("UPDATE Plato SET id_estacion = %s WHERE id_plato = %s", (station_id_value, dish_id_value))
+            if updated is None:
+                return None
+            if reroute_active_lines(dish_ids=[dish_id_value]) is None:
+                return None
+            events.publish(events.TOPIC_STATION, station_id_value, {'id_plato': dish_id_value})
+            events.publish(events.TOPIC_DISH, dish_id_value, {'id_estacion': station_id_value})
+        return True
+    except Exception as e:
+        print(f"Excepción al asignar la estación del plato '{dish_id_value}': {e}")
+        traceback.print_exc()
+        return None
@@ -9,22 +9,31 @@ import traceback
 # Ajusta la ruta de importación para db.py y supplier_model.py según tu estructura
 try:
     from app import db
+    from app import events
     from app.models import supplier_model # Necesario para validar proveedor en create/update product
     from . import recipe_model # Si está en el mismo paquete (app/models)
+    from app.models import cost_model
+    from app.models import unit_model
 except ImportError:
     # Fallback si la estructura es diferente o se ejecuta directamente
     print("Advertencia: Falló la importación principal en stock_model.py. Intentando fallback...")
     try:
         from .. import db # Si este archivo está en app/models/ y db.py en app/
+        from .. import events
         from . import supplier_model # Si supplier_model está en el mismo directorio (app/models)
         from . import recipe_model # Si recipe_model está en el mismo directorio (app/models)
+        from . import cost_model
+        from . import unit_model
     except ImportError:
         try:
             import db
+            import events
             import supplier_model # Si están en una ruta accesible por PYTHONPATH
+            import cost_model
+            import unit_model
         except ImportError as e:
             print(f"Error CRÍTICO: No se pudo importar db.py o supplier_model.py en stock_model.py: {e}")
-            db = supplier_model = None
+            db = events = supplier_model = cost_model = unit_model = None
 
 def check_stock_for_dish(id_plato, quantity_to_prepare):
     """
@@ -37,78 +46,78 @@ def check_stock_for_dish(id_plato, quantity_to_prepare):
                   'can_prepare': bool, 
                   'missing_items': list of dicts [{'nombre_ingrediente', 'id_ingrediente', 'needed', 'available', 'unit'}]
               }
-              Retorna None si hay un error crítico (ej. modelo de receta no disponible).
+              Retorna None si hay un error crítico (ej. base de datos no disponible).
     """
-    if not db or not recipe_model:
-        print("Error en check_stock_for_dish: db o recipe_model no disponibles.")
-        return None # Error crítico
+    return check_stock_for_items([(id_plato, quantity_to_prepare)])
 
-    if quantity_to_prepare <= 0:
+
+def check_stock_for_items(items):
+    """
+    Verifica el stock para varios platos a la vez (por ejemplo, un carrito de platos). Los ingredientes
+    compartidos entre platos se suman antes de compararlos con lo disponible, descontado lo ya reservado
+    por líneas pendientes de las comandas, y todo se resuelve con una única consulta agregada
+    (Receta ⋈ Ingrediente ⋈ Producto) en lugar de leer la receta y luego cada ingrediente. Las
+    cantidades de la receta se toman de Receta.cantidad_stock, ya convertidas a la unidad del stock.
+    Args:
+        items (list): Lista de tuplas (id_plato, cantidad). Un mismo plato puede repetirse.
+    Returns:
+        dict: El mismo formato que check_stock_for_dish, con 'needed' acumulado para todo el conjunto.
+              Retorna None si hay un error crítico.
+    """
+    if not db:
+        print("Error en check_stock_for_items: db no disponible.")
+        return None
+
+    quantity_by_dish = {}
+    for id_plato, quantity in items:
+        if id_plato and quantity and quantity > 0:
+            quantity_by_dish[id_plato] = quantity_by_dish.get(id_plato, 0) + quantity
+    if not quantity_by_dish:
         return {'can_prepare': True, 'missing_items': []} # No se necesita nada
 
-    dish_recipe = recipe_model.get_recipe_for_dish(id_plato)
-    if dish_recipe is None: # Error al obtener la receta
-        print(f"Error: No se pudo obtener la receta para el plato {id_plato} al verificar stock.")
+    dish_ids = sorted(quantity_by_dish)
+    case_sql = " ".join(["WHEN %s THEN %s"] * len(dish_ids))
+    placeholders = ", ".join(["%s"] * len(dish_ids))
+    params = []
+    for id_plato in dish_ids:
+        params.extend([id_plato, quantity_by_dish[id_plato]])
+    params.extend(dish_ids)
+    query = f"""
+    SELECT r.id_ingrediente, p.nombre AS nombre_ingrediente, p.unidad_medida AS unidad_stock,
+           i.cantidad_disponible - COALESCE(rs.reservado, 0) AS cantidad_disponible,
+           SUM(r.cantidad_stock * CASE r.id_plato {case_sql} END) AS cantidad_necesaria_total
+    FROM Receta r
+    JOIN Ingrediente i ON r.id_ingrediente = i.id_ingrediente
+    JOIN Producto p ON i.id_producto = p.id_producto
+    LEFT JOIN (
+        SELECT id_ingrediente, SUM(cantidad_reservada) AS reservado
+        FROM ReservaStock GROUP BY id_ingrediente
+    ) rs ON rs.id_ingrediente = r.id_ingrediente
+    WHERE r.id_plato IN ({placeholders})
+    GROUP BY r.id_ingrediente, p.nombre, p.unidad_medida, i.cantidad_disponible, rs.reservado
+    """
+    ingredient_rows = db.fetch_all(query, tuple(params))
+    if ingredient_rows is None: # Error al obtener las recetas
+        print(f"Error: No se pudo obtener la receta de los platos {dish_ids} al verificar stock.")
         return {'can_prepare': False, 'missing_items': [{'nombre_ingrediente': 'Error de Receta', 'needed': 0, 'available': 0, 'unit': ''}]}
-    if not dish_recipe: # Receta vacía
-        print(f"Info: El plato {id_plato} no tiene ingredientes definidos en su receta. Se asume que se puede preparar.")
-        return {'can_prepare': True, 'missing_items': []}
 
     missing_or_insufficient_items = []
-    can_prepare_all = True
-
-    for item_receta in dish_recipe:
-        id_ingrediente = item_receta.get('id_ingrediente')
-        nombre_ingrediente = item_receta.get('nombre_ingrediente', id_ingrediente) # Usar nombre si está disponible
-        cantidad_necesaria_por_unidad = float(item_receta.get('cantidad_necesaria', 0))
-        unidad_receta = item_receta.get('unidad_medida_receta', '')
-
-        total_needed_for_order = cantidad_necesaria_por_unidad * quantity_to_prepare
+    for row in ingredient_rows:
+        nombre_ingrediente = row.get('nombre_ingrediente') or row['id_ingrediente']
+        unit_stock = row.get('unidad_stock') or ''
+        total_needed = float(row.get('cantidad_necesaria_total') or 0)
+        available_stock = float(row.get('cantidad_disponible') or 0)
 
-        # Obtener stock actual del ingrediente
-        # get_ingredient_by_id devuelve más info, incluyendo unidad_medida del stock
-        ingredient_stock_info = get_ingredient_by_id(id_ingrediente) 
-
-        if not ingredient_stock_info:
-            print(f"Advertencia: Ingrediente '{nombre_ingrediente}' (ID: {id_ingrediente}) de la receta no encontrado en la tabla Ingrediente.")
+        if available_stock < total_needed:
             missing_or_insufficient_items.append({
                 'nombre_ingrediente': nombre_ingrediente,
-                'id_ingrediente': id_ingrediente,
-                'needed': total_needed_for_order,
-                'available': 0, # No se encontró, así que disponible es 0
-                'unit': unidad_receta # Usar unidad de receta para el mensaje
-            })
-            can_prepare_all = False
-            continue
-
-        available_stock = float(ingredient_stock_info.get('cantidad_disponible', 0))
-        unit_stock = ingredient_stock_info.get('unidad_medida', '') # Unidad en la que se mide el stock
-
-        # IMPORTANTE: Conversión de Unidades
-        # Aquí es donde necesitarías lógica de conversión si unidad_receta != unit_stock
-        # Ejemplo simple: si receta es 'g' y stock es 'kg', convertir needed a kg.
-        # Esta parte puede volverse compleja y requiere un sistema de conversión de unidades.
-        # Por ahora, asumiremos que las unidades son compatibles o que la cantidad_necesaria
-        # en la receta ya está en la unidad base del stock.
-        # Si no son compatibles, esta verificación podría dar falsos positivos/negativos.
-        if unidad_receta.lower() != unit_stock.lower():
-            print(f"ADVERTENCIA DE UNIDADES: Para '{nombre_ingrediente}', la receta usa '{unidad_receta}' y el stock está en '{unit_stock}'. "
-                  "La verificación de stock puede ser incorrecta sin conversión de unidades.")
-            # Aquí podrías añadir lógica de conversión o marcarlo como un problema.
-            # Por ahora, si las unidades son diferentes, podríamos considerarlo un riesgo y añadirlo a faltantes.
-            # O simplemente proceder y esperar que las cantidades sean relativas a la misma base.
-
-        if available_stock < total_needed_for_order:
-            missing_or_insufficient_items.append({
-                'nombre_ingrediente': nombre_ingrediente,
-                'id_ingrediente': id_ingrediente,
-                'needed': total_needed_for_order,
+                'id_ingrediente': row['id_ingrediente'],
+                'needed': total_needed,
                 'available': available_stock,
-                'unit': unit_stock # Mostrar la unidad del stock disponible
+                'unit': unit_stock # cantidad_stock ya está en la unidad del stock (ver unit_model)
             })
-            can_prepare_all = False
 
-    return {'can_prepare': can_prepare_all, 'missing_items': missing_or_insufficient_items}
+    return {'can_prepare': not missing_or_insufficient_items, 'missing_items': missing_or_insufficient_items}
 
 
 def generate_product_id(length=10):
@@ -142,6 +151,189 @@ def _log_stock_movement(cursor, id_ingrediente, tipo_movimiento, cantidad_cambio
         traceback.print_exc() # Imprimir traceback para más detalles del error de logueo
 
 
+def _lock_ingredients_for_update(cursor, ingredient_ids):
+    """
+    Bloquea (FOR UPDATE) todos los ingredientes indicados con una sola sentencia, siempre en orden
+    de id_ingrediente para que dos cocinas que consumen a la vez no se interbloqueen.
+    Returns:
+        dict: {id_ingrediente: {'id_ingrediente', 'cantidad_disponible', 'nombre_ingrediente', 'unidad_stock'}}
+    """
+    ingredient_ids = sorted(set(ingredient_ids))
+    if not ingredient_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(ingredient_ids))
+    cursor.execute(f"""
+        SELECT i.id_ingrediente, i.cantidad_disponible, p.nombre AS nombre_ingrediente, p.unidad_medida AS unidad_stock
+        FROM Ingrediente i
+        JOIN Producto p ON i.id_producto = p.id_producto
+        WHERE i.id_ingrediente IN ({placeholders})
+        ORDER BY i.id_ingrediente
+        FOR UPDATE
+    """, tuple(ingredient_ids))
+    return {row['id_ingrediente']: row for row in cursor.fetchall()}
+
+def _find_stock_shortages(required_by_ingredient, stock_by_ingredient):
+    """
+    Compara lo requerido con lo bloqueado por _lock_ingredients_for_update.
+    Returns:
+        dict: {id_ingrediente: {'nombre_ingrediente', 'id_ingrediente', 'needed', 'available', 'unit'}} de los que faltan.
+    """
+    shortages = {}
+    for id_ingrediente, needed in required_by_ingredient.items():
+        stock_row = stock_by_ingredient.get(id_ingrediente)
+        available = float(stock_row['cantidad_disponible']) if stock_row else 0.0
+        if available < needed:
+            shortages[id_ingrediente] = {
+                'nombre_ingrediente': stock_row['nombre_ingrediente'] if stock_row else id_ingrediente,
+                'id_ingrediente': id_ingrediente,
+                'needed': needed,
+                'available': available,
+                'unit': stock_row['unidad_stock'] if stock_row else '',
+            }
+    return shortages
+
+def _apply_stock_consumption(cursor, required_by_ingredient, stock_by_ingredient, tipo_movimiento,
+                             id_referencia_origen=None, descripcion_motivo="", id_empleado_responsable=None):
+    """
+    Descuenta en bloque las cantidades de ingredientes ya bloqueados: un único UPDATE con CASE y un
+    único INSERT multi-fila en MovimientoStock, en lugar de UPDATE + INSERT por ingrediente.
+    Asume que el cursor ya está abierto, dentro de la transacción que hizo el bloqueo, y que
+    el stock ya se verificó con _find_stock_shortages.
+    """
+    ingredient_ids = sorted(id_ing for id_ing, needed in required_by_ingredient.items() if needed)
+    if not ingredient_ids:
+        return 0
+    current_timestamp = datetime.datetime.now()
+
+    case_sql = " ".join(["WHEN %s THEN %s"] * len(ingredient_ids))
+    placeholders = ", ".join(["%s"] * len(ingredient_ids))
+    update_params = []
+    for id_ingrediente in ingredient_ids:
+        update_params.extend([id_ingrediente, required_by_ingredient[id_ingrediente]])
+    update_params.append(current_timestamp)
+    update_params.extend(ingredient_ids)
+    cursor.execute(f"""
+        UPDATE Ingrediente
+        SET cantidad_disponible = cantidad_disponible - CASE id_ingrediente {case_sql} END,
+            ultima_actualizacion = %s
+        WHERE id_ingrediente IN ({placeholders})
+    """, tuple(update_params))
+
+    log_params = []
+    for id_ingrediente in ingredient_ids:
+        needed = required_by_ingredient[id_ingrediente]
+        stock_before = float(stock_by_ingredient[id_ingrediente]['cantidad_disponible'])
+        log_params.extend([
+            id_ingrediente, tipo_movimiento, -needed, stock_before, stock_before - needed,
+            id_referencia_origen, descripcion_motivo, id_empleado_responsable, current_timestamp
+        ])
+    values_sql = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(ingredient_ids))
+    cursor.execute(f"""
+        INSERT INTO MovimientoStock
+            (id_ingrediente, tipo_movimiento, cantidad_cambio, cantidad_anterior, cantidad_nueva,
+             id_referencia_origen, descripcion_motivo, id_empleado_responsable, fecha_hora)
+        VALUES {values_sql}
+    """, tuple(log_params))
+
+    events.publish(events.TOPIC_INGREDIENT, None, {'cantidades': {
+        id_ing: float(stock_by_ingredient[id_ing]['cantidad_disponible']) - required_by_ingredient[id_ing]
+        for id_ing in ingredient_ids
+    }}, cursor=cursor)
+    return len(ingredient_ids)
+
+
+
+# --- Reservas de stock (ReservaStock) ---
+# Al añadir un plato a una comanda abierta se reserva lo que pide su receta. Las reservas se restan de
+# cantidad_disponible en las verificaciones de stock y en la disponibilidad del menú; al enviar la línea
+# a cocina la reserva se convierte en consumo y al cancelar la línea o la comanda se libera.
+
+def _reserved_by_ingredient(cursor, ingredient_ids, exclude_detail_ids=()):
+    """Total reservado por ingrediente, sin contar las reservas de las líneas 'exclude_detail_ids'."""
+    ingredient_ids = sorted(set(ingredient_ids))
+    if not ingredient_ids:
+        return {}
+    query = f"""
+        SELECT id_ingrediente, SUM(cantidad_reservada) AS reservado
+        FROM ReservaStock
+        WHERE id_ingrediente IN ({", ".join(["%s"] * len(ingredient_ids))})
+    """
+    params = list(ingredient_ids)
+    if exclude_detail_ids:
+        query += f" AND id_detalle_comanda NOT IN ({', '.join(['%s'] * len(exclude_detail_ids))})"
+        params.extend(exclude_detail_ids)
+    cursor.execute(query + " GROUP BY id_ingrediente", tuple(params))
+    return {row['id_ingrediente']: float(row['reservado']) for row in cursor.fetchall()}
+
+def _net_of_reservations(stock_by_ingredient, reserved_by_ingredient):
+    """Copia de las filas de _lock_ingredients_for_update con lo reservado ya restado de cantidad_disponible."""
+    return {
+        id_ingrediente: dict(stock_row, cantidad_disponible=float(stock_row['cantidad_disponible']) - reserved_by_ingredient.get(id_ingrediente, 0.0))
+        for id_ingrediente, stock_row in stock_by_ingredient.items()
+    }
+
+def _publish_reserved_totals(cursor, ingredient_ids):
+    """Publica el total reservado actual de los ingredientes indicados (lo usa el índice de disponibilidad del menú)."""
+    totals = _reserved_by_ingredient(cursor, ingredient_ids)
+    events.publish(events.TOPIC_INGREDIENT, None, {'reservadas': {
+        id_ingrediente: totals.get(id_ingrediente, 0.0) for id_ingrediente in sorted(set(ingredient_ids))
+    }}, cursor=cursor)
+
+def _reserve_stock_for_order_item(cursor, id_detalle_comanda, id_comanda, required_by_ingredient):
+    """
+    Reserva lo que necesita una línea de comanda. Los ingredientes se bloquean (FOR UPDATE) solo durante
+    la transacción del alta, no hasta el envío a cocina, para que dos terminales no reserven a la vez
+    el mismo stock.
+    Returns:
+        dict: Faltantes con el formato de _find_stock_shortages, calculados sobre lo disponible menos lo
+              ya reservado; vacío si se reservó todo. Con faltantes no se reserva nada.
+    """
+    ingredient_ids = sorted(id_ing for id_ing, needed in required_by_ingredient.items() if needed)
+    if not ingredient_ids:
+        return {}
+    stock_by_ingredient = _lock_ingredients_for_update(cursor, ingredient_ids)
+    reserved_by_ingredient = _reserved_by_ingredient(cursor, ingredient_ids)
+    shortages = _find_stock_shortages(required_by_ingredient, _net_of_reservations(stock_by_ingredient, reserved_by_ingredient))
+    if shortages:
+        return shortages
+
+    values_sql = ", ".join(["(%s, %s, %s, %s)"] * len(ingredient_ids))
+    params = []
+    for id_ingrediente in ingredient_ids:
+        params.extend([id_detalle_comanda, id_comanda, id_ingrediente, required_by_ingredient[id_ingrediente]])
+    cursor.execute(f"""
+        INSERT INTO ReservaStock (id_detalle_comanda, id_comanda, id_ingrediente, cantidad_reservada)
+        VALUES {values_sql}
+    """, tuple(params))
+    _publish_reserved_totals(cursor, ingredient_ids)
+    return {}
+
+def _release_reservations(cursor, detail_ids=None, id_comanda=None):
+    """
+    Borra las reservas de las líneas indicadas o de toda una comanda (línea cancelada, comanda cancelada
+    o facturada, o reserva convertida en consumo al enviar a cocina).
+    Returns:
+        dict: {id_ingrediente: cantidad liberada}.
+    """
+    if detail_ids:
+        condition, params = f"id_detalle_comanda IN ({', '.join(['%s'] * len(detail_ids))})", tuple(detail_ids)
+    elif id_comanda:
+        condition, params = "id_comanda = %s", (id_comanda,)
+    else:
+        return {}
+    cursor.execute(f"""
+        SELECT id_ingrediente, SUM(cantidad_reservada) AS reservado
+        FROM ReservaStock WHERE {condition}
+        GROUP BY id_ingrediente
+    """, params)
+    released = {row['id_ingrediente']: float(row['reservado']) for row in cursor.fetchall()}
+    if not released:
+        return {}
+    cursor.execute(f"DELETE FROM ReservaStock WHERE {condition}", params)
+    _publish_reserved_totals(cursor, released)
+    return released
+
+
 # --- Funciones para Productos (insumos generales) ---
 def create_product(product_data_dict):
     if not db:
@@ -186,7 +378,10 @@ def create_product(product_data_dict):
     )
     
     try:
-        result_db = db.execute_query(query, params)
+        with db.transaction():
+            result_db = db.execute_query(query, params)
+            if result_db is not None and unit_model.normalize_product_unit(generated_id) is None:
+                result_db = None # La transacción ya quedó marcada para deshacerse
         if result_db is not None:
             print(f"Producto '{generated_id}' ('{nombre_producto}') creado exitosamente.")
             return generated_id
@@ -245,7 +440,23 @@ def update_product_details(product_id_value, data_to_update_dict):
     query = f"UPDATE Producto SET {', '.join(set_clauses)} WHERE id_producto = %s"
     
     try:
-        return db.execute_query(query, tuple(params_values))
+        with db.transaction() as tx:
+            rows_affected = db.execute_query(query, tuple(params_values))
+            if rows_affected and 'unidad_medida' in data_to_update_dict:
+                # Las recetas que usan el producto pasan a convertirse a la nueva unidad del stock
+                unconvertible = unit_model.normalize_product_unit(product_id_value)
+                if unconvertible is None:
+                    return None
+                if unconvertible:
+                    print(f"Error: La nueva unidad de '{product_id_value}' no es compatible con sus recetas: "
+                          f"{unit_model.describe_unconvertible_lines(unconvertible)}.")
+                    tx.mark_failed()
+                    return None
+            if rows_affected and data_to_update_dict.keys() & {'costo_unitario', 'unidad_medida'}:
+                # Solo los platos cuya receta usa este producto; si falla, se deshace también el cambio de costo
+                if cost_model.recalculate_costs_for_product(product_id_value) is None:
+                    return None
+        return rows_affected
     except Exception as e:
         print(f"Excepción al actualizar producto '{product_id_value}': {e}")
         traceback.print_exc()
@@ -306,8 +517,10 @@ def add_or_update_ingredient_as_product(id_producto, initial_quantity=0.0, id_em
         if conn: conn.rollback()
         return None
     finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
+        try:
+            if cursor: cursor.close()
+        finally:
+            if conn: conn.close()
 
 def get_ingredient_by_id(ingredient_id_value):
     if not db: return None
@@ -329,7 +542,7 @@ def get_all_ingredients_list():
     JOIN Producto p ON i.id_producto = p.id_producto
     ORDER BY p.nombre
     """
-    return db.fetch_all(query)
+    return db.fetch_all(query, cache_tables=("Ingrediente", "Producto"))
 
 def update_ingredient_stock(ingredient_id_value, quantity_change, is_deduction=True, 
                             reason_type="CONSUMO_COMANDA", custom_reason_desc="", 
@@ -358,8 +571,15 @@ def update_ingredient_stock(ingredient_id_value, quantity_change, is_deduction=T
         actual_qty_to_log = quantity_change
         
         if is_deduction:
-            if current_stock < quantity_change:
-                print(f"Error: Stock insuficiente para '{ingredient_name}'. Disponible: {current_stock}, Requerido: {quantity_change}")
+            # Lo reservado para líneas pendientes de las comandas no se puede mermar ni ajustar: se
+            # descuenta al enviarlas a cocina (mismo cálculo que _reserve_stock_for_order_item)
+            reserved = _reserved_by_ingredient(cursor, [ingredient_id_value]).get(ingredient_id_value, 0.0)
+            shortages = _find_stock_shortages({ingredient_id_value: quantity_change}, {ingredient_id_value: {
+                'cantidad_disponible': current_stock - reserved, 'nombre_ingrediente': ingredient_name, 'unidad_stock': ''}})
+            if shortages:
+                print(f"Error: Stock insuficiente para '{ingredient_name}'. Disponible: {current_stock}, "
+                      f"reservado para comandas: {reserved}, libre: {shortages[ingredient_id_value]['available']}, "
+                      f"Requerido: {quantity_change}")
                 conn.rollback()
                 return None 
             new_stock = current_stock - quantity_change
@@ -380,7 +600,8 @@ def update_ingredient_stock(ingredient_id_value, quantity_change, is_deduction=T
                            id_referencia_origen=id_reference,
                            descripcion_motivo=final_reason_desc,
                            id_empleado_responsable=id_employee)
-        
+
+        events.publish(events.TOPIC_INGREDIENT, ingredient_id_value, {'cantidades': {ingredient_id_value: new_stock}}, cursor=cursor)
         conn.commit()
         print(f"INFO: Stock para '{ingredient_name}' actualizado a {new_stock}. Razón: {final_reason_desc}")
         return rows_affected_ingredient
@@ -391,10 +612,17 @@ def update_ingredient_stock(ingredient_id_value, quantity_change, is_deduction=T
         if conn: conn.rollback()
         return None
     finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
+        try:
+            if cursor: cursor.close()
+        finally:
+            if conn: conn.close()
 
-def get_stock_movements_history(ingredient_id=None, start_date=None, end_date=None, movement_type=None, limit=100):
+def get_stock_movements_history(ingredient_id=None, start_date=None, end_date=None, movement_type=None, limit=100, after=None):
+    """
+    Historial de movimientos de stock, del más reciente al más antiguo.
+    Para paginar, 'after' recibe el cursor (fecha_hora, id_movimiento) de la última fila
+    recibida (ver get_stock_movements_history_cursor) y se devuelve la página siguiente.
+    """
     if not db: return None
     
     query_base = """
@@ -415,15 +643,16 @@ def get_stock_movements_history(ingredient_id=None, start_date=None, end_date=No
     if ingredient_id:
         conditions.append("ms.id_ingrediente = %s")
         params.append(ingredient_id)
-    if start_date:
-        conditions.append("DATE(ms.fecha_hora) >= %s") # Comparar solo fecha
-        params.append(start_date)
-    if end_date:
-        conditions.append("DATE(ms.fecha_hora) <= %s") # Comparar solo fecha
-        params.append(end_date)
+    date_conditions, date_params = db.date_range_conditions("ms.fecha_hora", start_date, end_date) # Rango semiabierto por días
+    conditions.extend(date_conditions)
+    params.extend(date_params)
     if movement_type:
         conditions.append("ms.tipo_movimiento = %s")
         params.append(movement_type)
+    keyset_condition, keyset_params = db.keyset_before_condition("ms.fecha_hora", "ms.id_movimiento", after)
+    if keyset_condition:
+        conditions.append(keyset_condition)
+        params.extend(keyset_params)
         
     if conditions:
         query_base += " WHERE " + " AND ".join(conditions)
@@ -435,6 +664,10 @@ def get_stock_movements_history(ingredient_id=None, start_date=None, end_date=No
         
     return db.fetch_all(query_base, tuple(params))
 
+def get_stock_movements_history_cursor(movement_row):
+    """Cursor de paginación (fecha_hora, id_movimiento) de una fila de get_stock_movements_history."""
+    return (movement_row['fecha_hora'], movement_row['id_movimiento'])
+
 def get_low_stock_ingredients_summary(limit=5):
     if not db: return None
     query_string = """
@@ -461,14 +694,15 @@ def get_recent_stock_movements_summary(limit=5):
 
 def get_todays_stock_movements_count():
     if not db: return None
-    today_date = datetime.date.today().strftime('%Y-%m-%d')
-    
-    query = """
+    today_date = datetime.date.today()
+    date_conditions, date_params = db.date_range_conditions("fecha_hora", today_date, today_date)
+
+    query = f"""
     SELECT COUNT(*) as count 
     FROM MovimientoStock 
-    WHERE DATE(fecha_hora) = %s
+    WHERE {" AND ".join(date_conditions)}
     """
-    result = db.fetch_one(query, (today_date,))
+    result = db.fetch_one(query, tuple(date_params))
     if result:
         return result.get('count', 0)
     return None
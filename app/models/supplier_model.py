@@ -91,7 +91,7 @@ def get_all_suppliers_list():
     """ Obtiene una lista de todos los proveedores. """
     if not db: return None
     query_string = "SELECT id_proveedor, nombre, telefono, correo, producto_suministra FROM Proveedores ORDER BY nombre"
-    return db.fetch_all(query_string)
+    return db.fetch_all(query_string, cache_tables=("Proveedores",))
 
 def update_supplier_details(supplier_id_value, data_to_update_dict):
     """ Actualiza la información de un proveedor existente. """
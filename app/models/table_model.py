@@ -3,12 +3,14 @@
 # Ajusta las rutas de importación según tu estructura de proyecto.
 try:
     from .. import db # Si db.py está en app/
+    from .. import events
 except ImportError:
     try:
         import db # Si está en el mismo nivel o app está en PYTHONPATH
+        import events
     except ImportError:
         print("Error: No se pudo importar el módulo db.py en table_model.py.")
-        db = None
+        db = events = None
 
 def create_table(table_data_dict):
     """
@@ -101,7 +103,7 @@ def get_all_tables_list():
     """
     if not db: return None
     query_string = "SELECT id_mesa, capacidad, estado, ubicacion, pos_x, pos_y FROM Mesa ORDER BY id_mesa"
-    return db.fetch_all(query_string)
+    return db.fetch_all(query_string, cache_tables=("Mesa",))
 
 def update_table_details(table_id_value, data_to_update_dict):
     """
@@ -158,7 +160,16 @@ def update_table_status(table_id_value, new_status_value):
         return None
         
     query_string = "UPDATE Mesa SET estado = %s WHERE id_mesa = %s"
-    return db.execute_query(query_string, (new_status_value, table_id_value))
+    try:
+        # El evento para las demás terminales se confirma junto con el cambio de estado
+        with db.transaction() as tx:
+            rows_affected = tx.execute(query_string, (new_status_value, table_id_value))
+            if rows_affected:
+                events.publish(events.TOPIC_TABLE, table_id_value, {'estado': new_status_value})
+        return rows_affected
+    except Exception as e:
+        print(f"Error en el modelo (mesas) al actualizar el estado de '{table_id_value}': {e}")
+        return None
 
 def delete_table_by_id(table_id_value):
     """
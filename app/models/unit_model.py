@@ -0,0 +1,117 @@
+# app/models/unit_model.py
+# Conversión de unidades de medida entre recetas y stock.
+#
+# La tabla UnidadMedida da a cada unidad una dimensión (masa, volumen, conteo...) y su factor a la
+# unidad base de esa dimensión (g, ml, unidad). Los factores se copian a Producto.factor_base y a
+# Receta.factor_base, y cada línea de receta guarda su cantidad ya convertida:
+#     Receta.cantidad_base  = cantidad_necesaria * factor de la unidad de la receta
+#     Receta.cantidad_stock = cantidad_base / factor de la unidad del stock del producto
+# Así la verificación de stock, las reservas, el descuento al enviar a cocina, la disponibilidad del
+# menú y el costo de los platos usan directamente cantidad_stock, sin convertir fila por fila.
+#
+# Las columnas se recalculan con un UPDATE por lote al escribir una línea de receta o al cambiar la
+# unidad de un producto, dentro de la misma transacción que el cambio. Una línea cuya unidad no se puede
+# convertir conserva cantidad_stock = cantidad_necesaria (como en la migración 0006) y se devuelve para
+# que quien la escribe rechace el cambio; cantidad_stock nunca queda en NULL (migración 0011).
+try:
+    from app import db
+except ImportError:
+    try:
+        from .. import db
+    except ImportError:
+        try:
+            import db
+        except ImportError as e:
+            print(f"Error CRÍTICO: No se pudo importar db en unit_model.py: {e}")
+            db = None
+
+_NORMALIZE_RECIPE_LINES_QUERY = """
+UPDATE Receta r
+JOIN Ingrediente i ON i.id_ingrediente = r.id_ingrediente
+JOIN Producto p ON p.id_producto = i.id_producto
+LEFT JOIN UnidadMedida ur ON ur.unidad = r.unidad_medida_receta
+LEFT JOIN UnidadMedida up ON up.unidad = p.unidad_medida
+SET r.factor_base = ur.factor_base,
+    r.cantidad_base = r.cantidad_necesaria * COALESCE(ur.factor_base, 1),
+    r.cantidad_stock = CASE
+        WHEN r.unidad_medida_receta = p.unidad_medida THEN r.cantidad_necesaria
+        WHEN ur.dimension = up.dimension THEN r.cantidad_necesaria * ur.factor_base / up.factor_base
+        ELSE r.cantidad_necesaria
+    END
+WHERE {where}
+"""
+
+_UNCONVERTIBLE_LINES_QUERY = """
+SELECT r.id_receta, r.id_plato, r.id_ingrediente, r.unidad_medida_receta, p.nombre AS nombre_ingrediente,
+       p.unidad_medida AS unidad_stock
+FROM Receta r
+JOIN Ingrediente i ON i.id_ingrediente = r.id_ingrediente
+JOIN Producto p ON p.id_producto = i.id_producto
+LEFT JOIN UnidadMedida ur ON ur.unidad = r.unidad_medida_receta
+LEFT JOIN UnidadMedida up ON up.unidad = p.unidad_medida
+WHERE r.unidad_medida_receta <> p.unidad_medida
+  AND (ur.dimension IS NULL OR up.dimension IS NULL OR ur.dimension <> up.dimension)
+  AND {where}
+"""
+
+
+def _recipe_filter(dish_ids=None, product_id_value=None, recipe_entry_ids=None):
+    if recipe_entry_ids:
+        recipe_entry_ids = sorted(set(recipe_entry_ids))
+        return f"r.id_receta IN ({', '.join(['%s'] * len(recipe_entry_ids))})", tuple(recipe_entry_ids)
+    if dish_ids:
+        dish_ids = sorted(set(dish_ids))
+        return f"r.id_plato IN ({', '.join(['%s'] * len(dish_ids))})", tuple(dish_ids)
+    if product_id_value:
+        return "i.id_producto = %s", (product_id_value,)
+    return "1 = 1", ()
+
+def normalize_recipe_lines(dish_ids=None, product_id_value=None, recipe_entry_ids=None):
+    """
+    Recalcula factor_base, cantidad_base y cantidad_stock de las líneas de receta indicadas (por líneas,
+    por platos o por producto; todas si no se indica nada) con un solo UPDATE.
+    Returns:
+        list: Líneas cuya unidad no se puede convertir a la del stock (unidad desconocida o de otra
+              dimensión), con 'nombre_ingrediente', 'unidad_medida_receta' y 'unidad_stock'.
+              Vacía si todas se convirtieron. None si hay error.
+    """
+    if not db: return None
+    where, params = _recipe_filter(dish_ids, product_id_value, recipe_entry_ids)
+    if db.execute_query(_NORMALIZE_RECIPE_LINES_QUERY.format(where=where), params or None) is None:
+        return None
+    return db.fetch_all(_UNCONVERTIBLE_LINES_QUERY.format(where=where), params or None)
+
+def normalize_product_unit(product_id_value):
+    """
+    Copia a Producto.factor_base el factor de su unidad de stock y reconvierte las líneas de receta
+    que usan el producto.
+    Returns:
+        list: Las líneas que dejaron de ser convertibles (ver normalize_recipe_lines), o None si hay error.
+    """
+    if not db: return None
+    updated = db.execute_query("""
+        UPDATE Producto p
+        LEFT JOIN UnidadMedida u ON u.unidad = p.unidad_medida
+        SET p.factor_base = u.factor_base
+        WHERE p.id_producto = %s
+    """, (product_id_value,))
+    if updated is None:
+        return None
+    return normalize_recipe_lines(product_id_value=product_id_value)
+
+def describe_unconvertible_lines(lines):
+    """Texto para el usuario con las líneas devueltas por normalize_recipe_lines."""
+    return "; ".join(
+        f"{line['nombre_ingrediente']}: '{line['unidad_medida_receta']}' no se puede convertir a '{line['unidad_stock']}'"
+        for line in lines
+    )
+
+def get_units():
+    """
+    Returns:
+        list: Filas de UnidadMedida (unidad, dimension, factor_base) ordenadas por dimensión y factor,
+              o None si hay error.
+    """
+    if not db: return None
+    return db.fetch_all("SELECT unidad, dimension, factor_base FROM UnidadMedida ORDER BY dimension, factor_base, unidad",
+                        cache_tables=("UnidadMedida",))
@@ -1,4 +1,5 @@
 # app/views/admin_dashboard_view.py
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 
@@ -11,33 +12,43 @@ from .stock_management_view import StockManagementView
 from .supplier_view import SupplierView
 from .admin_home_tab_view import AdminHomeTabView
 from .order_history_view import OrderHistoryView
-
-class AdminDashboardView(tk.Tk):
-    def __init__(self, admin_user_info):
-        super().__init__()
+from .kitchen_times_view import KitchenTimesView
+from .station_config_view import StationConfigView
+
+# Tras mostrarse el panel, construir las demás pestañas en segundo plano (una cada intervalo),
+# para que al visitarlas ya tengan sus datos cargados. False = solo al seleccionarlas.
+PREFETCH_REMAINING_TABS = True
+PREFETCH_TAB_INTERVAL_MS = 400
+
+class AdminDashboardView(ttk.Frame):
+    def __init__(self, parent_container, admin_user_info, on_logout=None, startup_started_at=None, *args, **kwargs):
+        """
+        Args:
+            parent_container: Ventana raíz (o contenedor) donde se coloca el panel.
+            admin_user_info (dict): Datos del administrador que inició sesión.
+            on_logout (callable, optional): Se llama al cerrar sesión; si no se indica, se cierra la ventana.
+            startup_started_at (float, optional): time.perf_counter() del inicio de sesión; si se indica,
+                se imprime el tiempo hasta que el panel se pinta por primera vez.
+        """
+        super().__init__(parent_container, *args, **kwargs)
+        self.on_logout = on_logout
+        self.startup_started_at = startup_started_at
 
         # Comprobación crítica de módulos (incluyendo la nueva)
         if not all([EmployeeView, TableView, OrderTakingView, StockManagementView, SupplierView, DishRecipeManagementView, AdminHomeTabView, OrderHistoryView]):
-            self.withdraw() 
             messagebox.showerror("Error Crítico de Módulo", 
                                  "Uno o más módulos de vista esenciales no están disponibles.\n" +
                                  "El dashboard no puede cargarse.")
-            self.destroy()
+            ttk.Label(self, text="Error crítico: faltan módulos de vista del panel de administrador.", foreground="red").pack(padx=10, pady=10)
             return
         # ... (resto del __init__ sin cambios) ...
         self.admin_user_info = admin_user_info
-        self.title(f"Panel de Administrador - Restaurante (Usuario: {self.admin_user_info.get('nombre', 'Admin')})")
-        self.geometry("1000x750")
-
-        style = ttk.Style(self)
-        available_themes = style.theme_names()
-        if 'clam' in available_themes:
-            style.theme_use('clam')
-        elif 'vista' in available_themes: 
-            style.theme_use('vista')
+        window = self.winfo_toplevel()
+        window.title(f"Panel de Administrador - Restaurante (Usuario: {self.admin_user_info.get('nombre', 'Admin')})")
+        window.geometry("1000x750")
         
         self._create_main_widgets()
-        self.protocol("WM_DELETE_WINDOW", self._on_closing)
+        self.bind("<Map>", self._on_first_map)
 
 
     def _create_main_widgets(self):
@@ -51,95 +62,93 @@ class AdminDashboardView(tk.Tk):
         self.notebook = ttk.Notebook(main_content_frame)
         self.notebook.pack(expand=True, fill='both')
 
-        # --- Pestaña de Inicio/Resumen (NUEVA) ---
-        self.home_tab = AdminHomeTabView(self.notebook) # Usar la clase directamente
-        self.notebook.add(self.home_tab, text='Inicio')
-        # No necesitas .pack() aquí porque AdminHomeTabView es un Frame y se llenará
-
-        # --- Pestaña de Gestión de Empleados ---
-        self.employee_management_tab = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.employee_management_tab, text='Gestión de Empleados')
-        
-        if EmployeeView:
-            employee_view_instance = EmployeeView(self.employee_management_tab)
-            employee_view_instance.pack(expand=True, fill=tk.BOTH)
-        else:
-            ttk.Label(self.employee_management_tab, text="Error al cargar la vista de empleados.").pack()
-
-        # --- Pestaña NUEVA: Historial de Comandas ---
-        self.order_history_management_tab = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.order_history_management_tab, text='Historial de Comandas')
-        
-        if OrderHistoryView:
-            order_history_view_instance = OrderHistoryView(self.order_history_management_tab)
-            order_history_view_instance.pack(expand=True, fill=tk.BOTH)
-        else:
-            ttk.Label(self.order_history_management_tab, text="Error al cargar la vista de historial de comandas.").pack()
+        # Las pestañas se crean vacías; cada vista (y sus consultas iniciales) se construye
+        # la primera vez que se selecciona su pestaña.
+        self._tab_factories = {} # marco de la pestaña -> (clase de vista, kwargs, mensaje de error)
+        self._built_tabs = set()
+
+        self.home_tab = self._add_lazy_tab('Inicio', AdminHomeTabView, padding=None,
+                                           error_message="Error al cargar la pestaña de inicio.")
+        self.employee_management_tab = self._add_lazy_tab('Gestión de Empleados', EmployeeView,
+                                                          error_message="Error al cargar la vista de empleados.")
+        self.order_history_management_tab = self._add_lazy_tab('Historial de Comandas', OrderHistoryView,
+                                                               error_message="Error al cargar la vista de historial de comandas.")
+        self.table_management_tab = self._add_lazy_tab('Gestión de Mesas', TableView,
+                                                       error_message="Error al cargar la vista de gestión de mesas.")
+        self.order_taking_tab_admin = self._add_lazy_tab('Toma de Comandas (Admin)', OrderTakingView,
+                                                         view_args=(self.admin_user_info,),
+                                                         error_message="Error al cargar la vista de toma de comandas.")
+        self.menu_management_tab = self._add_lazy_tab('Gestión de Menú', DishRecipeManagementView,
+                                                      error_message="Error al cargar la vista de gestión de menú.")
+        self.stock_management_tab = self._add_lazy_tab('Gestión de Stock', StockManagementView,
+                                                       error_message="Error al cargar la vista de gestión de stock.")
+        self.supplier_management_tab = self._add_lazy_tab('Gestión de Proveedores', SupplierView,
+                                                          error_message="Error al cargar la vista de gestión de proveedores.")
+        self.kitchen_times_tab = self._add_lazy_tab('Tiempos de Cocina', KitchenTimesView,
+                                                    error_message="Error al cargar la vista de tiempos de cocina.")
+        self.station_config_tab = self._add_lazy_tab('Estaciones de Cocina', StationConfigView,
+                                                     error_message="Error al cargar la vista de estaciones de cocina.")
+
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._build_tab(self.notebook.select()) # La pestaña visible al abrir (Inicio)
 
-        # --- Pestaña de Gestión de Mesas ---
-        self.table_management_tab = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.table_management_tab, text='Gestión de Mesas')
-        
-        if TableView:
-            table_view_instance = TableView(self.table_management_tab)
-            table_view_instance.pack(expand=True, fill=tk.BOTH)
-        else:
-            ttk.Label(self.table_management_tab, text="Error al cargar la vista de gestión de mesas.").pack()
+        logout_button = ttk.Button(main_content_frame, text="Cerrar Sesión", command=self._logout)
+        logout_button.pack(pady=10, side=tk.BOTTOM, anchor="se")
 
-        # --- Pestaña de Toma de Comandas (para que el admin también pueda) ---
-        self.order_taking_tab_admin = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.order_taking_tab_admin, text='Toma de Comandas (Admin)')
-        
-        if OrderTakingView:
-            order_view_instance_admin = OrderTakingView(self.order_taking_tab_admin, self.admin_user_info)
-            order_view_instance_admin.pack(expand=True, fill=tk.BOTH)
+    def _add_lazy_tab(self, title, view_class, view_args=(), padding="5", error_message=""):
+        """Añade una pestaña vacía; la vista se instancia en _build_tab al seleccionarla."""
+        tab_frame = ttk.Frame(self.notebook, padding=padding) if padding else ttk.Frame(self.notebook)
+        self.notebook.add(tab_frame, text=title)
+        self._tab_factories[str(tab_frame)] = (view_class, view_args, error_message)
+        return tab_frame
+
+    def _build_tab(self, tab_name):
+        """Construye la vista de la pestaña (una sola vez). Devuelve True si la construyó ahora."""
+        if not tab_name or tab_name in self._built_tabs or tab_name not in self._tab_factories:
+            return False
+        self._built_tabs.add(tab_name)
+        view_class, view_args, error_message = self._tab_factories[tab_name]
+        tab_frame = self.nametowidget(tab_name)
+        if view_class:
+            view_class(tab_frame, *view_args).pack(expand=True, fill=tk.BOTH)
         else:
-            ttk.Label(self.order_taking_tab_admin, text="Error al cargar la vista de toma de comandas.").pack()
-        
-        # --- Pestaña de Gestión de Menú ---
-        self.menu_management_tab = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.menu_management_tab, text='Gestión de Menú')
-        
-        if DishRecipeManagementView:
-            dish_recipe_view_instance = DishRecipeManagementView(self.menu_management_tab)
-            dish_recipe_view_instance.pack(expand=True, fill=tk.BOTH)
-        else:
-            ttk.Label(self.menu_management_tab, text="Error al cargar la vista de gestión de menú.").pack()
+            ttk.Label(tab_frame, text=error_message).pack()
+        return True
 
-        # --- Pestaña de Gestión de Stock ---
-        self.stock_management_tab = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.stock_management_tab, text='Gestión de Stock')
-        
-        if StockManagementView:
-            stock_view_instance = StockManagementView(self.stock_management_tab)
-            stock_view_instance.pack(expand=True, fill=tk.BOTH)
-        else:
-            ttk.Label(self.stock_management_tab, text="Error al cargar la vista de gestión de stock.").pack()
+    def _on_tab_changed(self, event=None):
+        self._build_tab(self.notebook.select())
 
-        # --- Pestaña de Gestión de Proveedores ---
-        self.supplier_management_tab = ttk.Frame(self.notebook, padding="5")
-        self.notebook.add(self.supplier_management_tab, text='Gestión de Proveedores')
-        
-        if SupplierView:
-            supplier_view_instance = SupplierView(self.supplier_management_tab)
-            supplier_view_instance.pack(expand=True, fill=tk.BOTH)
-        else:
-            ttk.Label(self.supplier_management_tab, text="Error al cargar la vista de gestión de proveedores.").pack()
+    def _prefetch_next_tab(self):
+        """Construye en ratos libres las pestañas aún no visitadas, una por turno para no bloquear la ventana."""
+        if not self.winfo_exists(): # Se cerró sesión antes de terminar
+            return
+        for tab_name in self.notebook.tabs():
+            if self._build_tab(tab_name):
+                self.after(PREFETCH_TAB_INTERVAL_MS, self._prefetch_next_tab)
+                return
 
+    def _on_first_map(self, event=None):
+        if event is not None and event.widget is not self:
+            return
+        self.unbind("<Map>")
+        # after_idle se ejecuta cuando Tk ha procesado el dibujado pendiente de la ventana
+        self.after_idle(self._on_first_paint)
 
-        logout_button = ttk.Button(main_content_frame, text="Cerrar Sesión", command=self._logout)
-        logout_button.pack(pady=10, side=tk.BOTTOM, anchor="se")
+    def _on_first_paint(self):
+        if self.startup_started_at is not None:
+            elapsed_ms = (time.perf_counter() - self.startup_started_at) * 1000
+            print(f"Panel de administrador visible en {elapsed_ms:.1f} ms desde el inicio de sesión.")
+        if PREFETCH_REMAINING_TABS:
+            self.after(PREFETCH_TAB_INTERVAL_MS, self._prefetch_next_tab)
 
     # ... (resto de _logout y _on_closing sin cambios) ...
     def _logout(self):
         if messagebox.askokcancel("Cerrar Sesión", "¿Está seguro de que desea cerrar la sesión?"):
-            self.destroy()
-            print("Cierre de sesión solicitado. main_app.py debería manejar el reinicio del login.")
-
-    def _on_closing(self):
-        if messagebox.askokcancel("Salir", "¿Está seguro de que desea salir de la aplicación?"):
-            self.destroy()
-            print("Cierre de aplicación solicitado.")
+            print("Cierre de sesión solicitado.")
+            if self.on_logout:
+                self.on_logout() # La ventana raíz vuelve a mostrar el login
+            else:
+                self.winfo_toplevel().destroy()
 
 
 # Para probar este dashboard de forma aislada (main_test de AdminDashboardView)
@@ -160,8 +169,10 @@ def main_test(admin_info_for_test=None):
         root_error.destroy()
         return
 
-    dashboard_app = AdminDashboardView(admin_info_for_test)
-    dashboard_app.mainloop()
+    root = tk.Tk()
+    dashboard_app = AdminDashboardView(root, admin_info_for_test)
+    dashboard_app.pack(expand=True, fill=tk.BOTH)
+    root.mainloop()
 
 if __name__ == '__main__':
     print("Ejecutando prueba aislada del AdminDashboardView...")
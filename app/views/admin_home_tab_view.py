@@ -5,13 +5,23 @@ from tkinter import ttk, messagebox
 # Importar modelos necesarios
 try:
     from ..models import table_model, order_model, stock_model
+    from .. import events
+    from .background_tasks import BackgroundTaskRunner
+    from .change_listener import ChangeListener
 except ImportError:
     # Fallback para ejecución directa o estructura diferente
     try:
         from models import table_model, order_model, stock_model
+        import events
+        from views.background_tasks import BackgroundTaskRunner
+        from views.change_listener import ChangeListener
     except ImportError:
         print("Error crítico: No se pudieron importar los modelos en AdminHomeTabView.")
-        table_model = order_model = stock_model = None
+        table_model = order_model = stock_model = events = BackgroundTaskRunner = ChangeListener = None
+
+# Tras un evento de cambio se espera este tiempo antes de recalcular el resumen, para agrupar
+# en una sola consulta las ráfagas de cambios (ej. una comanda enviada a cocina).
+EVENT_REFRESH_DELAY_MS = 2000
 
 class AdminHomeTabView(ttk.Frame):
     def __init__(self, parent_container, *args, **kwargs):
@@ -42,7 +52,12 @@ class AdminHomeTabView(ttk.Frame):
         self.recent_stock_movements_var = tk.StringVar(value="Cargando movimientos...") # Para el Text widget
 
         self._create_widgets()
+        # Llamadas a los modelos fuera del hilo de Tk; el botón de refrescar se deshabilita mientras tanto
+        self.tasks = BackgroundTaskRunner(self, on_busy_change=lambda busy: self.refresh_button.config(state=tk.DISABLED if busy else tk.NORMAL))
         self.refresh_data() # Cargar datos al iniciar
+        self._event_refresh_job = None
+        self.changes = ChangeListener(self, [events.TOPIC_TABLE, events.TOPIC_ORDER, events.TOPIC_INGREDIENT],
+                                      self._on_change_events)
 
     def _create_widgets(self):
         main_frame = ttk.Frame(self, padding="15")
@@ -113,14 +128,38 @@ class AdminHomeTabView(ttk.Frame):
         refresh_button_frame = ttk.Frame(main_frame) # Frame para centrar el botón
         refresh_button_frame.grid(row=2, column=0, columnspan=2, pady=20) # <--- columnspan=2
         
-        refresh_button = ttk.Button(refresh_button_frame, text="Refrescar Datos", command=self.refresh_data)
-        refresh_button.pack() # .pack() dentro de su propio frame para centrarlo
+        self.refresh_button = ttk.Button(refresh_button_frame, text="Refrescar Datos", command=self.refresh_data)
+        self.refresh_button.pack() # .pack() dentro de su propio frame para centrarlo
+
+
+    def refresh_data(self, show_busy=True):
+        self.tasks.submit("resumen", self._fetch_summary_data, on_success=self._show_summary_data, show_busy=show_busy)
+
+    def _on_change_events(self, received):
+        if self._event_refresh_job is None:
+            self._event_refresh_job = self.after(EVENT_REFRESH_DELAY_MS, self._refresh_after_events)
 
+    def _refresh_after_events(self):
+        self._event_refresh_job = None
+        self.refresh_data(show_busy=False) # Actualización automática: sin cursor de espera
+
+    def _fetch_summary_data(self):
+        """Se ejecuta en segundo plano: solo consulta los modelos, no toca widgets."""
+        data = {}
+        if table_model:
+            data['tables'] = table_model.get_tables_status_summary()
+        if order_model:
+            data['orders'] = order_model.get_active_orders_summary()
+        if stock_model:
+            data['low_stock'] = stock_model.get_low_stock_ingredients_summary(limit=5) # Mostrar hasta 5 ítems
+            data['todays_moves_count'] = stock_model.get_todays_stock_movements_count()
+            data['recent_moves'] = stock_model.get_recent_stock_movements_summary(limit=3) # Mostrar últimos 3-5
+        return data
 
-    def refresh_data(self):
+    def _show_summary_data(self, data):
         # Actualizar Resumen de Mesas
         if table_model:
-            tables_data = table_model.get_tables_status_summary()
+            tables_data = data.get('tables')
             if tables_data:
                 for status, var in self.tables_summary_vars.items():
                     var.set(str(tables_data.get(status, 0)))
@@ -129,7 +168,7 @@ class AdminHomeTabView(ttk.Frame):
         
         # Actualizar Resumen de Comandas
         if order_model:
-            orders_data = order_model.get_active_orders_summary()
+            orders_data = data.get('orders')
             if orders_data:
                 for status, var in self.orders_summary_vars.items():
                     var.set(str(orders_data.get(status, 0)))
@@ -138,7 +177,7 @@ class AdminHomeTabView(ttk.Frame):
 
         # Actualizar Resumen de Stock Bajo
         if stock_model:
-            stock_data = stock_model.get_low_stock_ingredients_summary(limit=5) # Mostrar hasta 5 ítems
+            stock_data = data.get('low_stock')
             if stock_data:
                 self.low_stock_count_var.set(str(stock_data.get('count', 0)))
                 
@@ -161,13 +200,13 @@ class AdminHomeTabView(ttk.Frame):
                 self.low_stock_items_text.config(state=tk.DISABLED)
             
              # --- NUEVO: Actualizar Resumen de Movimientos de Stock ---
-            todays_moves_count = stock_model.get_todays_stock_movements_count()
+            todays_moves_count = data.get('todays_moves_count')
             if todays_moves_count is not None:
                 self.stock_movements_today_var.set(str(todays_moves_count))
             else:
                 self.stock_movements_today_var.set("Error")
 
-            recent_moves_data = stock_model.get_recent_stock_movements_summary(limit=3) # Mostrar últimos 3-5
+            recent_moves_data = data.get('recent_moves')
             if recent_moves_data is not None:
                 recent_moves_text_content = ""
                 if recent_moves_data:
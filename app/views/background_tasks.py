@@ -0,0 +1,157 @@
+# app/views/background_tasks.py
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Hilos compartidos por todas las vistas para las llamadas a los modelos (cada una usa una conexión del pool de db).
+BACKGROUND_WORKERS = 4
+# Cada cuántos milisegundos el hilo de Tk revisa si hay resultados listos mientras haya tareas en curso.
+POLL_INTERVAL_MS = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+_busy_runners_by_window = {} # ventana -> número de runners ocupados (varias vistas comparten ventana)
+
+def get_executor():
+    """Devuelve el pool de hilos compartido por las vistas, creándolo en el primer uso."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="vista-bd")
+    return _executor
+
+def shutdown_executor():
+    """Detiene el pool de hilos (al salir de la aplicación). Las tareas en cola se descartan."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class BackgroundTaskRunner:
+    """
+    Ejecuta llamadas a los modelos fuera del hilo de Tk y entrega el resultado de vuelta en el hilo
+    de Tk mediante after(), para que una consulta lenta no congele la ventana.
+
+    Cada tarea tiene una clave (ej. "detalle_comanda"): si se lanza otra con la misma clave antes de
+    que termine la anterior, el resultado de la anterior se descarta (petición obsoleta). Mientras
+    haya tareas en curso el cursor de la ventana pasa a 'watch' y se llama a on_busy_change(True).
+
+    Ejemplo:
+        self.tasks = BackgroundTaskRunner(self)
+        self.tasks.submit("platos_cocina", order_model.get_dishes_for_kitchen_view,
+                          on_success=self._show_pending_dishes)
+    """
+    def __init__(self, widget, on_busy_change=None):
+        self.widget = widget
+        self.on_busy_change = on_busy_change
+        self._results = queue.Queue()
+        self._generations = {}
+        self._pending = {} # clave -> (generación, future, on_success, on_error, show_busy)
+        self._polling = False
+        self._busy = False
+        # Al destruir la vista (ej. al cerrar sesión en la ventana raíz) se descartan sus tareas,
+        # para que el cursor de la ventana no quede en 'watch'.
+        widget.bind("<Destroy>", self._on_widget_destroyed, add="+")
+
+    @property
+    def busy(self):
+        return self._busy
+
+    def submit(self, key, function, *args, on_success=None, on_error=None, show_busy=True, **kwargs):
+        """
+        Lanza function(*args, **kwargs) en segundo plano. on_success(resultado) u on_error(excepción)
+        se llaman en el hilo de Tk, y solo si esta sigue siendo la última tarea lanzada con esa clave.
+        Con show_busy=False (ej. sondeos periódicos) la tarea no cambia el cursor ni el estado 'busy'.
+        """
+        self.cancel(key)
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+
+        future = get_executor().submit(self._run_in_worker, key, generation, function, args, kwargs)
+        self._pending[key] = (generation, future, on_success, on_error, show_busy)
+        self._set_busy(self._has_busy_tasks())
+        self._ensure_polling()
+        return future
+
+    def cancel(self, key):
+        """Descarta la tarea en curso con esa clave (si aún no empezó, no llega a ejecutarse)."""
+        pending = self._pending.pop(key, None)
+        if pending:
+            self._generations[key] = pending[0] + 1
+            pending[1].cancel()
+        self._set_busy(self._has_busy_tasks())
+
+    def cancel_all(self):
+        for key in list(self._pending):
+            self.cancel(key)
+
+    def _on_widget_destroyed(self, event):
+        if event.widget is self.widget:
+            self.on_busy_change = None # Los widgets de la vista ya no existen
+            self.cancel_all()
+
+    def _run_in_worker(self, key, generation, function, args, kwargs):
+        try:
+            self._results.put((key, generation, True, function(*args, **kwargs)))
+        except Exception as e:
+            traceback.print_exc()
+            self._results.put((key, generation, False, e))
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(POLL_INTERVAL_MS, self._poll_results)
+
+    def _poll_results(self):
+        self._polling = False
+        try:
+            if not self.widget.winfo_exists():
+                return
+        except Exception: # La ventana ya fue destruida
+            return
+
+        while True:
+            try:
+                key, generation, succeeded, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            pending = self._pending.get(key)
+            if not pending or pending[0] != generation:
+                continue # Resultado de una petición obsoleta o cancelada
+            del self._pending[key]
+            _, _, on_success, on_error, _ = pending
+            try:
+                if succeeded:
+                    if on_success:
+                        on_success(value)
+                elif on_error:
+                    on_error(value)
+                else:
+                    print(f"Error en tarea de segundo plano '{key}': {value}")
+            except Exception:
+                traceback.print_exc()
+
+        self._set_busy(self._has_busy_tasks())
+        if self._pending:
+            self._ensure_polling()
+
+    def _has_busy_tasks(self):
+        return any(pending[4] for pending in self._pending.values())
+
+    def _set_busy(self, busy):
+        if busy == self._busy:
+            return
+        self._busy = busy
+        try:
+            window = self.widget.winfo_toplevel()
+            busy_runners = _busy_runners_by_window.get(window, 0) + (1 if busy else -1)
+            _busy_runners_by_window[window] = max(busy_runners, 0)
+            window.config(cursor="watch" if busy_runners > 0 else "")
+        except Exception: # La ventana ya fue destruida
+            pass
+        if self.on_busy_change:
+            self.on_busy_change(busy)
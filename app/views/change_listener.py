@@ -0,0 +1,67 @@
+# app/views/change_listener.py
+import queue
+
+try:
+    from app import events
+except ImportError:
+    try:
+        from .. import events
+    except ImportError:
+        try:
+            import events
+        except ImportError as e:
+            print(f"Error: No se pudo importar app.events en change_listener.py: {e}")
+            events = None
+
+# Cada cuánto el hilo de Tk recoge los eventos recibidos (no consulta la BD, solo una cola local).
+LISTENER_DRAIN_INTERVAL_MS = 250
+
+
+class ChangeListener:
+    """
+    Entrega a una vista, en el hilo de Tk, los eventos de cambio de app.events de los temas indicados.
+    Los eventos que llegan entre dos revisiones se entregan juntos en una lista, para que la vista
+    pueda aplicar varios cambios (o una sola recarga) de una vez. Se da de baja al destruir la vista.
+
+    Ejemplo:
+        self.changes = ChangeListener(self, [events.TOPIC_TABLE], self._on_table_changes)
+    """
+    def __init__(self, widget, topics, on_events):
+        self.widget = widget
+        self.on_events = on_events
+        self._queue = queue.Queue()
+        self._token = events.subscribe(topics, self._queue.put) if events else None
+        self._job = widget.after(LISTENER_DRAIN_INTERVAL_MS, self._drain)
+        widget.bind("<Destroy>", self._on_widget_destroyed, add="+")
+
+    def close(self):
+        if self._token is not None:
+            events.unsubscribe(self._token)
+            self._token = None
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception: # La ventana ya fue destruida
+                pass
+            self._job = None
+
+    def _on_widget_destroyed(self, event):
+        if event.widget is self.widget:
+            self.close()
+
+    def _drain(self):
+        self._job = None
+        if self._token is None:
+            return
+        received = []
+        while True:
+            try:
+                received.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if received:
+            try:
+                self.on_events(received)
+            except Exception as e:
+                print(f"Error al aplicar eventos de cambio en la vista: {e}")
+        self._job = self.widget.after(LISTENER_DRAIN_INTERVAL_MS, self._drain)
@@ -1,41 +1,78 @@
 # app/views/cook_dashboard_view.py
+import datetime
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 
 # Importar modelos necesarios
 try:
     from ..models import order_model, recipe_model, stock_model # stock_model es opcional aquí
+    from ..models import station_model
+    from .. import events
+    from .background_tasks import BackgroundTaskRunner
+    from .change_listener import ChangeListener
+    from .kitchen_times_view import KitchenTimesView
 except ImportError:
     try:
         from models import order_model, recipe_model, stock_model
+        from models import station_model
+        import events
+        from views.background_tasks import BackgroundTaskRunner
+        from views.change_listener import ChangeListener
+        from views.kitchen_times_view import KitchenTimesView
     except ImportError:
         print("Error crítico: No se pudieron importar los modelos en CookDashboardView.")
-        order_model = recipe_model = stock_model = None
-
-class CookDashboardView(tk.Tk):
-    def __init__(self, cook_user_info):
-        super().__init__()
+        order_model = recipe_model = stock_model = station_model = events = BackgroundTaskRunner = ChangeListener = KitchenTimesView = None
+
+# Los cambios de comandas llegan como eventos (app.events) y disparan la consulta incremental al
+# momento; el sondeo periódico queda como respaldo. Cada cuántos sondeos se pide una instantánea
+# completa (recoge líneas borradas, que el feed incremental no ve).
+KITCHEN_POLL_INTERVAL_MS = 15000
+KITCHEN_FULL_RESYNC_EVERY_POLLS = 20
+# Estación de cocina de esta terminal (id de EstacionCocina, ej. 'barra'): el panel arranca mostrando
+# solo sus líneas. Sin definir, muestra todas; se puede cambiar desde el propio panel.
+KITCHEN_STATION = os.getenv("KITCHEN_STATION") or None
+ALL_STATIONS_LABEL = "Todas las estaciones"
+
+class CookDashboardView(ttk.Frame):
+    def __init__(self, parent_container, cook_user_info, on_logout=None, *args, **kwargs):
+        """
+        Args:
+            parent_container: Ventana raíz (o contenedor) donde se coloca el panel.
+            cook_user_info (dict): Datos del cocinero que inició sesión.
+            on_logout (callable, optional): Se llama al cerrar sesión; si no se indica, se cierra la ventana.
+        """
+        super().__init__(parent_container, *args, **kwargs)
+        self.on_logout = on_logout
 
         if not order_model or not recipe_model: # stock_model es opcional
-            self.withdraw()
             messagebox.showerror("Error Crítico de Módulo",
                                  "No se pudieron cargar modelos esenciales para el dashboard de Cocina.")
-            self.destroy()
+            ttk.Label(self, text="Error crítico: los modelos de cocina no están disponibles.", foreground="red").pack(padx=10, pady=10)
             return
 
         self.cook_user_info = cook_user_info
-        self.title(f"Panel de Cocina - Restaurante (Cocinero: {self.cook_user_info.get('nombre', 'Cocinero')})")
-        self.geometry("900x700")
-
-        style = ttk.Style(self)
-        if 'clam' in style.theme_names(): style.theme_use('clam')
+        window = self.winfo_toplevel()
+        window.title(f"Panel de Cocina - Restaurante (Cocinero: {self.cook_user_info.get('nombre', 'Cocinero')})")
+        window.geometry("900x700")
 
         self.selected_dish_detail_id = None # Para el id_detalle_comanda del plato seleccionado
         self.selected_dish_id_for_recipe = None # Para el id_plato para ver receta
+        self.tasks = BackgroundTaskRunner(self) # Llamadas a los modelos fuera del hilo de Tk
+        self.kitchen_feed_cursor = None # Cursor de order_model.get_kitchen_changes_since
+        self._kitchen_polls_since_resync = 0
+        self._kitchen_poll_job = None
+        self._kitchen_line_priority = {} # iid -> clave de orden de la cola (ver _kitchen_priority_key)
+        self.station_id = KITCHEN_STATION # None = todas las estaciones
+        self.station_ids_by_name = {ALL_STATIONS_LABEL: None}
+        self.station_var = tk.StringVar(value=ALL_STATIONS_LABEL)
 
         self._create_main_widgets()
-        self.protocol("WM_DELETE_WINDOW", self._on_closing)
+        self.changes = ChangeListener(self, [events.TOPIC_ORDER, events.TOPIC_ORDER_ITEM, events.TOPIC_STATION],
+                                      self._on_kitchen_events)
         self.load_pending_dishes()
+        if station_model:
+            self.tasks.submit("estaciones", station_model.get_stations, on_success=self._show_stations, show_busy=False)
 
     def _create_main_widgets(self):
         main_notebook = ttk.Notebook(self)
@@ -50,6 +87,12 @@ class CookDashboardView(tk.Tk):
         recipes_tab = ttk.Frame(main_notebook, padding="10")
         main_notebook.add(recipes_tab, text='Consultar Recetas')
         self._create_recipes_lookup_widgets(recipes_tab)
+
+        # --- Pestaña: Tiempos de Cocina (percentiles por plato/estación/hora) ---
+        if KitchenTimesView:
+            kitchen_times_tab = ttk.Frame(main_notebook, padding="10")
+            main_notebook.add(kitchen_times_tab, text='Tiempos de Cocina')
+            KitchenTimesView(kitchen_times_tab).pack(expand=True, fill=tk.BOTH)
         
         # --- (Opcional) Pestaña: Alertas de Stock ---
         # ...
@@ -63,11 +106,20 @@ class CookDashboardView(tk.Tk):
 
     def _create_kitchen_orders_widgets(self, parent_tab):
         # Frame para la lista de platos pendientes y acciones
+        station_frame = ttk.Frame(parent_tab)
+        station_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(station_frame, text="Estación:").pack(side=tk.LEFT, padx=5)
+        self.station_combobox = ttk.Combobox(station_frame, textvariable=self.station_var, values=[ALL_STATIONS_LABEL],
+                                             state="readonly", width=25)
+        self.station_combobox.pack(side=tk.LEFT, padx=5)
+        self.station_combobox.bind("<<ComboboxSelected>>", self._on_station_selected)
+
         orders_panel = ttk.Frame(parent_tab)
         orders_panel.pack(expand=True, fill=tk.BOTH)
 
         # Treeview para mostrar los platos
-        cols = ("id_detalle", "id_comanda", "plato_nombre", "cantidad", "estado_plato", "observaciones", "hora_pedido")
+        cols = ("id_detalle", "id_comanda", "plato_nombre", "cantidad", "estado_plato", "observaciones", "hora_pedido",
+                "hora_disparo", "entrega_estimada")
         self.pending_dishes_treeview = ttk.Treeview(orders_panel, columns=cols, show="headings", selectmode="browse", height=15)
         
         self.pending_dishes_treeview.heading("id_detalle", text="ID Detalle")
@@ -77,6 +129,8 @@ class CookDashboardView(tk.Tk):
         self.pending_dishes_treeview.heading("estado_plato", text="Estado Actual")
         self.pending_dishes_treeview.heading("observaciones", text="Observaciones")
         self.pending_dishes_treeview.heading("hora_pedido", text="Hora Pedido")
+        self.pending_dishes_treeview.heading("hora_disparo", text="Disparar")
+        self.pending_dishes_treeview.heading("entrega_estimada", text="Entrega Est.")
 
         self.pending_dishes_treeview.column("id_detalle", width=70, anchor="center")
         self.pending_dishes_treeview.column("id_comanda", width=100, anchor="w")
@@ -85,6 +139,10 @@ class CookDashboardView(tk.Tk):
         self.pending_dishes_treeview.column("estado_plato", width=120, anchor="w")
         self.pending_dishes_treeview.column("observaciones", width=200, anchor="w")
         self.pending_dishes_treeview.column("hora_pedido", width=120, anchor="w")
+        self.pending_dishes_treeview.column("hora_disparo", width=80, anchor="center")
+        self.pending_dishes_treeview.column("entrega_estimada", width=90, anchor="center")
+        # Líneas cuya hora de disparo ya llegó: ya toca cocinarlas
+        self.pending_dishes_treeview.tag_configure("disparar", foreground="red", font=("Arial", 9, "bold"))
 
         tree_scroll = ttk.Scrollbar(orders_panel, orient=tk.VERTICAL, command=self.pending_dishes_treeview.yview)
         self.pending_dishes_treeview.configure(yscrollcommand=tree_scroll.set)
@@ -144,37 +202,142 @@ class CookDashboardView(tk.Tk):
 
 
     def load_pending_dishes(self):
-        if not order_model: return
-        for item in self.pending_dishes_treeview.get_children():
-            self.pending_dishes_treeview.delete(item)
-        
-        self.selected_dish_detail_id = None
-        self.update_to_preparing_btn.config(state=tk.DISABLED)
-        self.update_to_ready_btn.config(state=tk.DISABLED)
+        """Recarga completa de la lista (al abrir el panel y con 'Refrescar Pedidos')."""
+        self.kitchen_feed_cursor = None
+        self._poll_kitchen_changes()
 
-        # Esta función necesita ser creada en order_model.py
-        # Debería devolver detalles de platos 'pendiente' o 'en preparacion'
-        pending_items = order_model.get_dishes_for_kitchen_view() # <--- NUEVA FUNCIÓN EN EL MODELO
-        
-        if pending_items:
-            for item in pending_items:
-                hora_pedido_f = item.get('hora_pedido', '').strftime('%H:%M:%S (%d/%m)') if item.get('hora_pedido') else 'N/A'
-                self.pending_dishes_treeview.insert("", tk.END, 
-                    iid=item['id_detalle_comanda'], # Usar id_detalle_comanda como iid
-                    values=(
-                        item.get('id_detalle_comanda', ''),
-                        item.get('id_comanda', ''),
-                        item.get('nombre_plato', 'Desconocido'),
-                        item.get('cantidad', 0),
-                        item.get('estado_plato', 'pendiente'),
-                        item.get('observaciones_plato', ''),
-                        hora_pedido_f
-                ))
-        elif pending_items == []:
-            # messagebox.showinfo("Cocina", "No hay platos pendientes en este momento.") # Puede ser molesto
-            print("No hay platos pendientes para cocina.")
-        else: # None indica error
-            messagebox.showerror("Error", "No se pudieron cargar los platos para la cocina.")
+    def _show_stations(self, stations):
+        if stations is None:
+            messagebox.showerror("Error", "No se pudieron cargar las estaciones de cocina.")
+            return
+        self.station_ids_by_name = {ALL_STATIONS_LABEL: None}
+        self.station_ids_by_name.update({station['nombre']: station['id_estacion'] for station in stations})
+        self.station_combobox['values'] = list(self.station_ids_by_name)
+        station_name = next((name for name, station_id in self.station_ids_by_name.items() if station_id == self.station_id), None)
+        if station_name is None: # KITCHEN_STATION no existe: se muestran todas
+            print(f"Advertencia: La estación de cocina '{self.station_id}' no existe; se muestran todas.")
+            station_name = ALL_STATIONS_LABEL
+            self.station_id = None
+            self.load_pending_dishes()
+        self.station_var.set(station_name)
+
+    def _on_station_selected(self, event=None):
+        station_id = self.station_ids_by_name.get(self.station_var.get())
+        if station_id != self.station_id:
+            self.station_id = station_id
+            self.load_pending_dishes()
+
+    def _on_kitchen_events(self, received):
+        # Un cambio de enrutado puede llevarse líneas a otra estación: el feed incremental de esta
+        # estación ya no las ve, así que se pide una instantánea.
+        if any(event['tema'] == events.TOPIC_STATION for event in received):
+            self.load_pending_dishes()
+        else:
+            self._poll_kitchen_changes()
+
+    def _poll_kitchen_changes(self):
+        """Pide a la BD solo las líneas nuevas o cambiadas desde el último sondeo."""
+        if self._kitchen_poll_job:
+            self.after_cancel(self._kitchen_poll_job)
+            self._kitchen_poll_job = None
+        if not order_model or not self.winfo_exists(): return
+        if self._kitchen_polls_since_resync >= KITCHEN_FULL_RESYNC_EVERY_POLLS:
+            self.kitchen_feed_cursor = None
+        full_load = self.kitchen_feed_cursor is None
+        self.tasks.submit("platos_cocina", order_model.get_kitchen_changes_since, self.kitchen_feed_cursor, self.station_id,
+                          on_success=lambda changes: self._apply_kitchen_changes(changes, full_load),
+                          on_error=lambda error: self._schedule_kitchen_poll(),
+                          show_busy=full_load) # Los sondeos periódicos no cambian el cursor del ratón
+
+    def _schedule_kitchen_poll(self):
+        self._kitchen_poll_job = self.after(KITCHEN_POLL_INTERVAL_MS, self._poll_kitchen_changes)
+
+    def _apply_kitchen_changes(self, changes, full_load):
+        if changes is None:
+            if full_load:
+                messagebox.showerror("Error", "No se pudieron cargar los platos para la cocina.")
+            self._schedule_kitchen_poll()
+            return
+
+        treeview = self.pending_dishes_treeview
+        if changes['completo']:
+            self._kitchen_polls_since_resync = 0
+            active_ids = {str(line['id_detalle_comanda']) for line in changes['lineas']}
+            stale_ids = [iid for iid in treeview.get_children() if iid not in active_ids]
+            if stale_ids:
+                treeview.delete(*stale_ids)
+                for iid in stale_ids:
+                    self._kitchen_line_priority.pop(iid, None)
+            if not changes['lineas']:
+                print("No hay platos pendientes para cocina.")
+        else:
+            self._kitchen_polls_since_resync += 1
+
+        # Se actualiza en el sitio: filas nuevas se insertan, las cambiadas se modifican y las que
+        # ya no están pendientes/en preparación se quitan, sin reconstruir la lista.
+        for line in changes['lineas']:
+            iid = str(line['id_detalle_comanda'])
+            if (line.get('estado_plato') not in order_model.KITCHEN_ACTIVE_STATUSES
+                    or (self.station_id and line.get('id_estacion') != self.station_id)):
+                if treeview.exists(iid):
+                    treeview.delete(iid)
+                self._kitchen_line_priority.pop(iid, None)
+                continue
+            self._kitchen_line_priority[iid] = self._kitchen_priority_key(line)
+            values = self._kitchen_line_values(line)
+            if treeview.exists(iid):
+                if tuple(str(v) for v in treeview.item(iid, "values")) != tuple(str(v) for v in values):
+                    treeview.item(iid, values=values)
+            else:
+                treeview.insert("", tk.END, iid=iid, values=values) # Usar id_detalle_comanda como iid
+
+        self._sort_kitchen_queue()
+        self.kitchen_feed_cursor = changes['cursor']
+        self._on_dish_selected_for_status_update() # La fila seleccionada pudo cambiar de estado o desaparecer
+        self._schedule_kitchen_poll()
+
+    @staticmethod
+    def _kitchen_priority_key(item):
+        # Mismo orden que la cola del modelo (kitchen_scheduler_model.KITCHEN_QUEUE_ORDER_SQL)
+        fire_at = item.get('hora_disparo')
+        return (fire_at is None, fire_at or datetime.datetime.min, item.get('hora_pedido') or datetime.datetime.min,
+                int(item.get('id_detalle_comanda') or 0))
+
+    def _sort_kitchen_queue(self):
+        """
+        Ordena la lista por hora de disparo (las filas del feed incremental llegan en cualquier orden)
+        y resalta las líneas cuya hora de disparo ya llegó.
+        """
+        treeview = self.pending_dishes_treeview
+        current_order = list(treeview.get_children())
+        priority = self._kitchen_line_priority
+        ordered = sorted(current_order, key=lambda iid: priority.get(iid, (True, datetime.datetime.max)))
+        if ordered != current_order:
+            for index, iid in enumerate(ordered):
+                treeview.move(iid, "", index)
+        now = datetime.datetime.now()
+        for iid in ordered:
+            key = priority.get(iid)
+            due = key is not None and not key[0] and key[1] <= now
+            tags = ("disparar",) if due else ()
+            if tuple(treeview.item(iid, "tags") or ()) != tags:
+                treeview.item(iid, tags=tags)
+
+    def _kitchen_line_values(self, item):
+        hora_pedido_f = item.get('hora_pedido', '').strftime('%H:%M:%S (%d/%m)') if item.get('hora_pedido') else 'N/A'
+        hora_disparo_f = item['hora_disparo'].strftime('%H:%M') if item.get('hora_disparo') else '-'
+        entrega_f = item['hora_entrega_estimada'].strftime('%H:%M') if item.get('hora_entrega_estimada') else '-'
+        return (
+            item.get('id_detalle_comanda', ''),
+            item.get('id_comanda', ''),
+            item.get('nombre_plato', 'Desconocido'),
+            item.get('cantidad', 0),
+            item.get('estado_plato', 'pendiente'),
+            item.get('observaciones_plato', '') or '',
+            hora_pedido_f,
+            hora_disparo_f,
+            entrega_f
+        )
 
     def _on_dish_selected_for_status_update(self, event=None):
         selected = self.pending_dishes_treeview.selection()
@@ -211,12 +374,17 @@ class CookDashboardView(tk.Tk):
 
         if messagebox.askyesno("Confirmar Cambio de Estado", 
                                f"¿Marcar el plato seleccionado como '{new_status.upper()}'?"):
-            result = order_model.update_order_item_status(self.selected_dish_detail_id, new_status)
-            if result is not None and result > 0:
-                messagebox.showinfo("Éxito", f"Estado del plato actualizado a '{new_status}'.")
-                self.load_pending_dishes() # Recargar la lista
-            else:
-                messagebox.showerror("Error", "No se pudo actualizar el estado del plato.")
+            self.update_to_preparing_btn.config(state=tk.DISABLED)
+            self.update_to_ready_btn.config(state=tk.DISABLED)
+            self.tasks.submit("estado_plato", order_model.update_order_item_status, self.selected_dish_detail_id, new_status,
+                              on_success=lambda result: self._on_dish_status_updated(result, new_status))
+
+    def _on_dish_status_updated(self, result, new_status):
+        if result is not None and result > 0:
+            messagebox.showinfo("Éxito", f"Estado del plato actualizado a '{new_status}'.")
+        else:
+            messagebox.showerror("Error", "No se pudo actualizar el estado del plato.")
+        self._poll_kitchen_changes() # Trae el cambio de estado sin esperar al próximo sondeo
                 
     def _show_recipe_for_selected_dish_from_orders(self):
         selected_items = self.pending_dishes_treeview.selection()
@@ -235,27 +403,31 @@ class CookDashboardView(tk.Tk):
         
         # Búsqueda simple de id_plato por nombre (esto requiere que los nombres de plato sean únicos)
         # En un sistema real, es mejor tener el ID.
-        found_dish_id = None
-        if recipe_model: # Usamos recipe_model o menu_model para buscar
+        def find_dish_id():
             # Esto es ineficiente, idealmente ya tendrías el id_plato
             all_dishes_temp = order_model.db.fetch_all("SELECT id_plato, nombre_plato FROM Plato WHERE nombre_plato = %s", (dish_name_for_recipe,))
-            if all_dishes_temp:
-                found_dish_id = all_dishes_temp[0]['id_plato']
-        
-        if not found_dish_id:
-            messagebox.showerror("Error Receta", f"No se pudo determinar el ID del plato '{dish_name_for_recipe}' para buscar su receta.")
-            return
+            return all_dishes_temp[0]['id_plato'] if all_dishes_temp else None
 
-        self.display_recipe(found_dish_id, dish_name_for_recipe)
+        def on_dish_id_found(found_dish_id):
+            if not found_dish_id:
+                messagebox.showerror("Error Receta", f"No se pudo determinar el ID del plato '{dish_name_for_recipe}' para buscar su receta.")
+                return
+            self.display_recipe(found_dish_id, dish_name_for_recipe)
+
+        if recipe_model: # Usamos recipe_model o menu_model para buscar
+            self.tasks.submit("receta", find_dish_id, on_success=on_dish_id_found)
 
 
     def display_recipe(self, dish_id, dish_name):
         if not recipe_model: return
+        # Misma clave que la búsqueda del plato: si el cocinero cambia de plato, la receta anterior se descarta
+        self.tasks.submit("receta", recipe_model.get_recipe_for_dish, dish_id,
+                          on_success=lambda recipe_items: self._show_recipe(dish_id, dish_name, recipe_items))
+
+    def _show_recipe(self, dish_id, dish_name, recipe_items):
         self.recipe_display_text.config(state=tk.NORMAL)
         self.recipe_display_text.delete("1.0", tk.END)
 
-        recipe_items = recipe_model.get_recipe_for_dish(dish_id)
-        
         display_str = f"--- RECETA PARA: {dish_name.upper()} (ID: {dish_id}) ---\n\n"
         if recipe_items:
             for item in recipe_items:
@@ -276,12 +448,11 @@ class CookDashboardView(tk.Tk):
 
     def _logout(self):
         if messagebox.askokcancel("Cerrar Sesión", "¿Está seguro de que desea cerrar la sesión?"):
-            self.destroy()
-            # main_app.py se encargará de volver al login
-
-    def _on_closing(self):
-        if messagebox.askokcancel("Salir", "¿Está seguro de que desea salir de la aplicación?"):
-            self.destroy()
+            self.tasks.cancel_all()
+            if self.on_logout:
+                self.on_logout() # La ventana raíz vuelve a mostrar el login
+            else:
+                self.winfo_toplevel().destroy()
 
 
 # Para probar esta vista de forma aislada
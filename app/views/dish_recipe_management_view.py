@@ -5,18 +5,21 @@ import traceback # Para imprimir tracebacks completos
 
 # Ajusta las rutas de importación según tu estructura de proyecto.
 try:
-    from app.models import menu_model, recipe_model, stock_model
+    from app.models import menu_model, recipe_model, stock_model, cost_model, unit_model
+    from app.views.background_tasks import BackgroundTaskRunner
 except ImportError:
     # Fallback si la estructura es diferente o se ejecuta directamente
     print("Advertencia: Falló la importación principal en DishRecipeManagementView. Intentando fallback...")
     try:
-        from ..models import menu_model, recipe_model, stock_model
+        from ..models import menu_model, recipe_model, stock_model, cost_model, unit_model
+        from .background_tasks import BackgroundTaskRunner
     except ImportError:
         try:
-            from models import menu_model, recipe_model, stock_model
+            from models import menu_model, recipe_model, stock_model, cost_model, unit_model
+            from views.background_tasks import BackgroundTaskRunner
         except ImportError as e:
             print(f"Error CRÍTICO: No se pudieron importar modelos en DishRecipeManagementView: {e}")
-            menu_model = recipe_model = stock_model = None
+            menu_model = recipe_model = stock_model = cost_model = unit_model = BackgroundTaskRunner = None
 
 class DishRecipeManagementView(ttk.Frame):
     def __init__(self, parent_container, *args, **kwargs):
@@ -46,10 +49,13 @@ class DishRecipeManagementView(ttk.Frame):
         # self.recipe_instructions_var no se usa, se accede directo al Text widget
 
         self.selected_recipe_entry_id = None
+        self.dish_costs = {} # id_plato -> fila de CostoPlato (costo de receta y margen)
+        self.tasks = BackgroundTaskRunner(self) # Consultas a los modelos fuera del hilo de Tk
 
         self._create_layout()
         self._load_all_dishes_to_treeview()
         self._load_available_ingredients_to_combobox()
+        self._load_units_to_combobox()
         self._clear_dish_form_fields() # Estado inicial
 
     def _create_layout(self):
@@ -109,18 +115,22 @@ class DishRecipeManagementView(ttk.Frame):
         tree_frame = ttk.LabelFrame(parent_frame, text="Listado de Platos del Menú", padding=(10,5))
         tree_frame.pack(pady=10, fill=tk.BOTH, expand=True)
 
-        cols = ("id_plato", "nombre_plato", "categoria", "precio_venta", "activo")
+        cols = ("id_plato", "nombre_plato", "categoria", "precio_venta", "costo", "margen", "activo")
         self.dishes_treeview = ttk.Treeview(tree_frame, columns=cols, show="headings", selectmode="browse", height=10)
         self.dishes_treeview.heading("id_plato", text="ID")
         self.dishes_treeview.heading("nombre_plato", text="Nombre")
         self.dishes_treeview.heading("categoria", text="Categoría")
         self.dishes_treeview.heading("precio_venta", text="Precio")
+        self.dishes_treeview.heading("costo", text="Costo")
+        self.dishes_treeview.heading("margen", text="Margen")
         self.dishes_treeview.heading("activo", text="Activo")
 
         self.dishes_treeview.column("id_plato", width=100, anchor="w", stretch=tk.NO) # Ajustado ancho
         self.dishes_treeview.column("nombre_plato", width=200, anchor="w")
         self.dishes_treeview.column("categoria", width=100, anchor="w")
         self.dishes_treeview.column("precio_venta", width=70, anchor="e")
+        self.dishes_treeview.column("costo", width=70, anchor="e")
+        self.dishes_treeview.column("margen", width=110, anchor="e")
         self.dishes_treeview.column("activo", width=60, anchor="center", stretch=tk.NO) # Ajustado ancho
 
         scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.dishes_treeview.yview)
@@ -140,6 +150,9 @@ class DishRecipeManagementView(ttk.Frame):
     def _create_recipe_display_treeview(self, parent_frame):
         recipe_display_frame = ttk.LabelFrame(parent_frame, text="Receta del Plato Seleccionado", padding=(10,5))
         recipe_display_frame.pack(pady=5, fill=tk.BOTH, expand=True)
+
+        self.dish_cost_label = ttk.Label(recipe_display_frame, text="", font=("Arial", 10, "bold"), anchor="w")
+        self.dish_cost_label.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
         
         recipe_cols = ("id_receta", "nombre_ingrediente", "cantidad_necesaria", "unidad_medida_receta", "instrucciones") # Añadir instrucciones
         self.recipe_treeview = ttk.Treeview(recipe_display_frame, columns=recipe_cols, show="headings", selectmode="browse", height=8)
@@ -199,6 +212,9 @@ class DishRecipeManagementView(ttk.Frame):
 
     def _load_all_dishes_to_treeview(self):
         if not menu_model: return
+        self.tasks.submit("platos", menu_model.get_all_dishes_list, on_success=self._show_dishes_in_treeview)
+
+    def _show_dishes_in_treeview(self, dishes):
         current_selection_id = None
         if self.dishes_treeview.selection():
             current_selection_id = self.dishes_treeview.selection()[0]
@@ -206,12 +222,12 @@ class DishRecipeManagementView(ttk.Frame):
         for item in self.dishes_treeview.get_children():
             self.dishes_treeview.delete(item)
         
-        dishes = menu_model.get_all_dishes_list()
         if dishes:
             for dish in dishes:
                 self.dishes_treeview.insert("", tk.END, iid=dish['id_plato'], values=(
                     dish.get("id_plato", ""), dish.get("nombre_plato", ""),
                     dish.get("categoria", ""), f"{dish.get('precio_venta', 0.0):.2f}",
+                    *self._dish_cost_cells(dish['id_plato']),
                     "Sí" if dish.get("activo") else "No"
                 ))
         elif dishes is None:
@@ -220,10 +236,58 @@ class DishRecipeManagementView(ttk.Frame):
         if current_selection_id and self.dishes_treeview.exists(current_selection_id):
             self.dishes_treeview.selection_set(current_selection_id)
             self.dishes_treeview.focus(current_selection_id)
+        self._refresh_dish_costs()
+
+    def _refresh_dish_costs(self):
+        """Vuelve a leer costo y margen materializados (CostoPlato) de todos los platos."""
+        if not cost_model: return
+        self.tasks.submit("costos_platos", cost_model.get_dish_costs, on_success=self._show_dish_costs, show_busy=False)
+
+    def _show_dish_costs(self, dish_costs):
+        if dish_costs is None:
+            self.dish_cost_label.config(text="Costo y margen no disponibles.", foreground="red")
+            return
+        self.dish_costs = dish_costs
+        for dish_id in self.dishes_treeview.get_children():
+            costo, margen = self._dish_cost_cells(dish_id)
+            self.dishes_treeview.set(dish_id, "costo", costo)
+            self.dishes_treeview.set(dish_id, "margen", margen)
+        self._update_dish_cost_label()
+
+    def _dish_cost_cells(self, dish_id):
+        cost_row = self.dish_costs.get(dish_id)
+        if not cost_row:
+            return ("", "")
+        margin_text = f"{cost_row['margen']:.2f}"
+        if cost_row.get('margen_porcentaje') is not None:
+            margin_text += f" ({cost_row['margen_porcentaje']:.0f}%)"
+        return (f"{cost_row['costo_receta']:.2f}", margin_text)
+
+    def _update_dish_cost_label(self):
+        cost_row = self.dish_costs.get(self._selected_dish_id_for_edit) if self._selected_dish_id_for_edit else None
+        if not cost_row:
+            self.dish_cost_label.config(text="")
+            return
+        costo, margen = self._dish_cost_cells(self._selected_dish_id_for_edit)
+        self.dish_cost_label.config(
+            text=f"Costo de receta: ${costo}   Margen: ${margen}   ({cost_row['lineas_receta']} ingredientes)",
+            foreground="red" if cost_row['margen'] < 0 else "black"
+        )
 
     def _load_available_ingredients_to_combobox(self):
         if not stock_model: return
-        ingredients = stock_model.get_all_ingredients_list()
+        self.tasks.submit("ingredientes", stock_model.get_all_ingredients_list, on_success=self._show_ingredients_in_combobox)
+
+    def _load_units_to_combobox(self):
+        if not unit_model: return
+        self.tasks.submit("unidades", unit_model.get_units, on_success=self._show_units_in_combobox, show_busy=False)
+
+    def _show_units_in_combobox(self, units):
+        # Solo las unidades con conversión conocida (UnidadMedida); si la consulta falla se deja la lista fija
+        if units:
+            self.recipe_unit_combobox['values'] = [unit['unidad'] for unit in units]
+
+    def _show_ingredients_in_combobox(self, ingredients):
         ingredient_names_with_ids = []
         self.ingredient_name_to_id_map = {} # Reiniciar mapeo
         if ingredients:
@@ -253,6 +317,7 @@ class DishRecipeManagementView(ttk.Frame):
         
         self._clear_recipe_section()
         self._update_recipe_buttons_state()
+        self._update_dish_cost_label()
         self.dish_name_entry.focus()
 
     def _clear_recipe_ingredient_form(self):
@@ -290,7 +355,13 @@ class DishRecipeManagementView(ttk.Frame):
             return
 
         self._selected_dish_id_for_edit = selected_items[0]
-        dish_data = menu_model.get_dish_by_id(self._selected_dish_id_for_edit)
+        # Si se selecciona otro plato antes de que llegue la respuesta, la anterior se descarta
+        self.tasks.cancel("receta")
+        self.tasks.submit("plato_seleccionado", menu_model.get_dish_by_id, self._selected_dish_id_for_edit,
+                          on_success=self._show_selected_dish)
+        self._update_recipe_buttons_state()
+
+    def _show_selected_dish(self, dish_data):
         if dish_data:
             self.dish_id_var.set(dish_data.get("id_plato", ""))
             self.dish_name_var.set(dish_data.get("nombre_plato", ""))
@@ -300,6 +371,7 @@ class DishRecipeManagementView(ttk.Frame):
             self.dish_prep_time_var.set(dish_data.get("tiempo_preparacion_min", 0))
             self.dish_is_active_var.set(dish_data.get("activo", True))
             self._load_recipe_for_selected_dish()
+            self._update_dish_cost_label()
             self.dish_name_entry.focus()
         else:
             messagebox.showerror("Error", f"No se pudieron cargar los detalles del plato {self._selected_dish_id_for_edit}.")
@@ -311,8 +383,12 @@ class DishRecipeManagementView(ttk.Frame):
         if not self._selected_dish_id_for_edit or not recipe_model:
             self._update_recipe_buttons_state()
             return
-        
-        recipe_items = recipe_model.get_recipe_for_dish(self._selected_dish_id_for_edit)
+        dish_id = self._selected_dish_id_for_edit
+        self.tasks.submit("receta", recipe_model.get_recipe_for_dish, dish_id,
+                          on_success=lambda recipe_items: self._show_recipe_in_treeview(dish_id, recipe_items))
+
+    def _show_recipe_in_treeview(self, dish_id, recipe_items):
+        self._clear_recipe_section()
         if recipe_items:
             for item in recipe_items:
                 self.recipe_treeview.insert("", tk.END, iid=item['id_receta'], values=(
@@ -322,7 +398,7 @@ class DishRecipeManagementView(ttk.Frame):
                     item.get('instrucciones_paso', '') # Añadir instrucciones al treeview
                 ))
         elif recipe_items is None:
-            messagebox.showerror("Error", f"No se pudo cargar la receta para el plato {self._selected_dish_id_for_edit}.")
+            messagebox.showerror("Error", f"No se pudo cargar la receta para el plato {dish_id}.")
         self._update_recipe_buttons_state()
 
     def _on_recipe_ingredient_selected(self, event=None):
@@ -333,8 +409,10 @@ class DishRecipeManagementView(ttk.Frame):
             return
 
         self.selected_recipe_entry_id = self.recipe_treeview.item(selected_items[0], "values")[0]
-        
-        full_recipe = recipe_model.get_recipe_for_dish(self._selected_dish_id_for_edit)
+        self.tasks.submit("ingrediente_receta", recipe_model.get_recipe_for_dish, self._selected_dish_id_for_edit,
+                          on_success=self._show_selected_recipe_ingredient)
+
+    def _show_selected_recipe_ingredient(self, full_recipe):
         selected_recipe_item_data = None
         if full_recipe:
             for item_data in full_recipe:
@@ -486,8 +564,10 @@ class DishRecipeManagementView(ttk.Frame):
             messagebox.showinfo("Éxito", "Ingrediente añadido a la receta.")
             self._load_recipe_for_selected_dish()
             self._clear_recipe_ingredient_form()
+            self._refresh_dish_costs()
         else:
-            messagebox.showerror("Error", "No se pudo añadir el ingrediente a la receta.\nVerifique que el ingrediente no esté ya en la receta para este plato.")
+            messagebox.showerror("Error", "No se pudo añadir el ingrediente a la receta.\nVerifique que el ingrediente no esté ya en la receta para este plato "
+                                          "y que la unidad se pueda convertir a la del stock (p. ej. g ↔ kg, ml ↔ litros).")
 
     def _update_selected_recipe_ingredient(self):
         if not self.selected_recipe_entry_id:
@@ -508,10 +588,11 @@ class DishRecipeManagementView(ttk.Frame):
             messagebox.showinfo("Éxito", "Ingrediente de la receta actualizado.")
             self._load_recipe_for_selected_dish()
             self._clear_recipe_ingredient_form()
+            self._refresh_dish_costs()
         elif result == 0:
             messagebox.showinfo("Información", "No se realizaron cambios en el ingrediente de la receta.")
         else:
-            messagebox.showerror("Error", "No se pudo actualizar el ingrediente de la receta.")
+            messagebox.showerror("Error", "No se pudo actualizar el ingrediente de la receta.\nVerifique que la unidad se pueda convertir a la del stock.")
 
     def _remove_selected_recipe_ingredient(self):
         if not self.selected_recipe_entry_id:
@@ -525,6 +606,7 @@ class DishRecipeManagementView(ttk.Frame):
                 messagebox.showinfo("Éxito", "Ingrediente eliminado de la receta.")
                 self._load_recipe_for_selected_dish()
                 self._clear_recipe_ingredient_form()
+                self._refresh_dish_costs()
             else:
                 messagebox.showerror("Error", "No se pudo eliminar el ingrediente de la receta.")
 
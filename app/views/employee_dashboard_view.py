@@ -2,24 +2,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-class EmployeeDashboardView(tk.Tk):
-    def __init__(self, employee_user_info):
-        super().__init__()
+class EmployeeDashboardView(ttk.Frame):
+    def __init__(self, parent_container, employee_user_info, on_logout=None, *args, **kwargs):
+        """
+        Args:
+            parent_container: Ventana raíz (o contenedor) donde se coloca el panel.
+            employee_user_info (dict): Datos del empleado que inició sesión.
+            on_logout (callable, optional): Se llama al cerrar sesión; si no se indica, se cierra la ventana.
+        """
+        super().__init__(parent_container, *args, **kwargs)
+        self.on_logout = on_logout
 
         self.employee_user_info = employee_user_info
-        self.title(f"Panel de Empleado - Restaurante (Usuario: {self.employee_user_info.get('nombre', 'Empleado')})")
-        self.geometry("700x500") # Tamaño inicial
-
-        # Estilo ttk
-        style = ttk.Style(self)
-        available_themes = style.theme_names()
-        if 'clam' in available_themes:
-            style.theme_use('clam')
-        elif 'vista' in available_themes: 
-            style.theme_use('vista')
+        window = self.winfo_toplevel()
+        window.title(f"Panel de Empleado - Restaurante (Usuario: {self.employee_user_info.get('nombre', 'Empleado')})")
+        window.geometry("700x500") # Tamaño inicial
         
         self._create_main_widgets()
-        self.protocol("WM_DELETE_WINDOW", self._on_closing)
 
     def _create_main_widgets(self):
         main_content_frame = ttk.Frame(self, padding="20")
@@ -47,20 +46,11 @@ class EmployeeDashboardView(tk.Tk):
 
     def _logout(self):
         if messagebox.askokcancel("Cerrar Sesión", "¿Está seguro de que desea cerrar la sesión?"):
-            self.destroy()
-            # Idealmente, esto debería reiniciar la aplicación o volver a la pantalla de login.
-            # Esto se manejaría en main_app.py si el login devolviera un estado.
-            # Por ahora, simplemente cerramos.
             print("Cierre de sesión de empleado solicitado.")
-            # Para reiniciar el login, necesitaríamos una referencia a la función main de login_view
-            # o una función de controlador principal en main_app.py
-            # from .login_view import main as show_login_screen # Cuidado con importaciones circulares si no se maneja bien
-            # show_login_screen()
-
-
-    def _on_closing(self):
-        if messagebox.askokcancel("Salir", "¿Está seguro de que desea salir de la aplicación?"):
-            self.destroy()
+            if self.on_logout:
+                self.on_logout() # La ventana raíz vuelve a mostrar el login
+            else:
+                self.winfo_toplevel().destroy()
 
 # Para probar este dashboard de forma aislada
 def main_test(employee_info_for_test=None):
@@ -72,8 +62,10 @@ def main_test(employee_info_for_test=None):
             "rol": "mesero"
         }
     
-    dashboard_app = EmployeeDashboardView(employee_info_for_test)
-    dashboard_app.mainloop()
+    root = tk.Tk()
+    dashboard_app = EmployeeDashboardView(root, employee_info_for_test)
+    dashboard_app.pack(expand=True, fill=tk.BOTH)
+    root.mainloop()
 
 if __name__ == '__main__':
     # Para ejecutar esta prueba: python -m app.views.employee_dashboard_view
@@ -6,14 +6,16 @@ from tkinter import ttk, messagebox
 # Si este archivo está en app/views/ y employee_model.py está en app/models/
 try:
     from ..models import employee_model
+    from .background_tasks import BackgroundTaskRunner
 except ImportError:
     # Fallback si la estructura es diferente o se ejecuta directamente
     try:
         # Necesitarías que 'app' esté en PYTHONPATH o que los módulos estén estructurados de otra forma
         from models import employee_model # Si 'models' es un paquete accesible
+        from views.background_tasks import BackgroundTaskRunner
     except ImportError:
         print("Error: No se pudo importar el módulo employee_model.py. Verifica tu estructura y PYTHONPATH.")
-        employee_model = None
+        employee_model = BackgroundTaskRunner = None
 
 class EmployeeView(ttk.Frame):
     def __init__(self, parent_container, *args, **kwargs):
@@ -34,6 +36,7 @@ class EmployeeView(ttk.Frame):
         self.role_var = tk.StringVar()
         self.password_var = tk.StringVar() # Solo para creación
         self.status_var = tk.StringVar()
+        self.tasks = BackgroundTaskRunner(self) # Consultas a los modelos fuera del hilo de Tk
 
         # --- Creación de Widgets ---
         self._create_form_widgets()
@@ -130,12 +133,13 @@ class EmployeeView(ttk.Frame):
     def load_employees_to_treeview(self):
         """ Carga o recarga los empleados desde el modelo al Treeview. """
         if not employee_model: return
+        self.tasks.submit("empleados", employee_model.get_all_employees_list, on_success=self._show_employees_in_treeview)
 
+    def _show_employees_in_treeview(self, employees_list):
         # Limpiar Treeview existente
         for item in self.employees_treeview.get_children():
             self.employees_treeview.delete(item)
         
-        employees_list = employee_model.get_all_employees_list()
         if employees_list:
             for emp in employees_list:
                 # Asegúrate de que los nombres de las claves coincidan con lo que devuelve tu modelo
@@ -0,0 +1,139 @@
+# app/views/kitchen_times_view.py
+import datetime
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+try:
+    from ..models import kitchen_analytics_model
+    from .. import events
+    from .background_tasks import BackgroundTaskRunner
+    from .change_listener import ChangeListener
+except ImportError:
+    try:
+        from models import kitchen_analytics_model
+        import events
+        from views.background_tasks import BackgroundTaskRunner
+        from views.change_listener import ChangeListener
+    except ImportError:
+        print("Error crítico: No se pudieron importar los modelos en KitchenTimesView.")
+        kitchen_analytics_model = events = BackgroundTaskRunner = ChangeListener = None
+
+# Ventanas de análisis que se pueden elegir: etiqueta -> duración hacia atrás desde ahora
+TIME_WINDOWS = {
+    "Última hora": datetime.timedelta(hours=1),
+    "Últimas 4 horas": datetime.timedelta(hours=4),
+    "Hoy (24 h)": datetime.timedelta(hours=24),
+    "Últimos 7 días": datetime.timedelta(days=7),
+}
+GROUPING_LABELS = {"Por plato": 'plato', "Por estación": 'estacion', "Por hora del pedido": 'hora'}
+# Los cambios de estado de las líneas se agrupan antes de recalcular, como en el resumen de inicio.
+EVENT_REFRESH_DELAY_MS = 5000
+# Un p90 de ticket por encima de esto (segundos) se resalta: es donde la cocina se atasca.
+SLOW_TICKET_P90_SECONDS = 20 * 60
+
+
+def format_duration(seconds):
+    """'12:05' (minutos:segundos) o '-' si no hay dato."""
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class KitchenTimesView(ttk.Frame):
+    """
+    Percentiles p50/p90/p99 de los tiempos de ticket (pedido -> listo) y de preparación
+    (en preparación -> listo), por plato, estación o franja horaria (kitchen_analytics_model).
+    Se usa en el panel de cocina y en el de administrador.
+    """
+    def __init__(self, parent_container, *args, **kwargs):
+        super().__init__(parent_container, *args, **kwargs)
+
+        if not kitchen_analytics_model:
+            ttk.Label(self, text="Error: El modelo de tiempos de cocina no está disponible.", foreground="red").pack(pady=20)
+            return
+
+        self.window_var = tk.StringVar(value="Hoy (24 h)")
+        self.grouping_var = tk.StringVar(value="Por plato")
+        self.summary_var = tk.StringVar(value="")
+
+        self._create_widgets()
+        self.tasks = BackgroundTaskRunner(self)
+        self._event_refresh_job = None
+        self.refresh_data()
+        self.changes = ChangeListener(self, [events.TOPIC_ORDER_ITEM, events.TOPIC_ORDER], self._on_change_events)
+
+    def _create_widgets(self):
+        filters_frame = ttk.Frame(self, padding=(0, 5))
+        filters_frame.pack(fill=tk.X)
+
+        ttk.Label(filters_frame, text="Ventana:").pack(side=tk.LEFT, padx=5)
+        window_combobox = ttk.Combobox(filters_frame, textvariable=self.window_var, values=list(TIME_WINDOWS),
+                                       state="readonly", width=16)
+        window_combobox.pack(side=tk.LEFT, padx=5)
+        window_combobox.bind("<<ComboboxSelected>>", lambda event: self.refresh_data())
+
+        ttk.Label(filters_frame, text="Agrupar:").pack(side=tk.LEFT, padx=5)
+        grouping_combobox = ttk.Combobox(filters_frame, textvariable=self.grouping_var, values=list(GROUPING_LABELS),
+                                         state="readonly", width=20)
+        grouping_combobox.pack(side=tk.LEFT, padx=5)
+        grouping_combobox.bind("<<ComboboxSelected>>", lambda event: self.refresh_data())
+
+        ttk.Button(filters_frame, text="Refrescar", command=self.refresh_data).pack(side=tk.RIGHT, padx=5)
+
+        tree_frame = ttk.Frame(self)
+        tree_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        percentile_cols = []
+        for percentile in kitchen_analytics_model.PERCENTILES:
+            percentile_cols.extend([f"ticket_p{percentile}", f"prep_p{percentile}"])
+        cols = ("etiqueta", "lineas", *percentile_cols)
+        self.times_treeview = ttk.Treeview(tree_frame, columns=cols, show="headings", height=12)
+        self.times_treeview.heading("etiqueta", text="Grupo")
+        self.times_treeview.heading("lineas", text="Líneas")
+        self.times_treeview.column("etiqueta", width=180, anchor="w")
+        self.times_treeview.column("lineas", width=60, anchor="center")
+        for percentile in kitchen_analytics_model.PERCENTILES:
+            self.times_treeview.heading(f"ticket_p{percentile}", text=f"Ticket p{percentile}")
+            self.times_treeview.heading(f"prep_p{percentile}", text=f"Prep. p{percentile}")
+            self.times_treeview.column(f"ticket_p{percentile}", width=80, anchor="e")
+            self.times_treeview.column(f"prep_p{percentile}", width=80, anchor="e")
+        self.times_treeview.tag_configure("lento", foreground="red")
+
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.times_treeview.yview)
+        self.times_treeview.configure(yscrollcommand=scrollbar.set)
+        self.times_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        ttk.Label(self, textvariable=self.summary_var, font=("Arial", 9, "italic")).pack(anchor="w", pady=(0, 5))
+
+    def refresh_data(self, show_busy=True):
+        end = datetime.datetime.now()
+        start = end - TIME_WINDOWS.get(self.window_var.get(), datetime.timedelta(hours=24))
+        group_by = GROUPING_LABELS.get(self.grouping_var.get(), 'plato')
+        self.tasks.submit("tiempos_cocina", kitchen_analytics_model.get_kitchen_time_percentiles, group_by, start, end,
+                          on_success=self._show_times, show_busy=show_busy)
+
+    def _on_change_events(self, received):
+        if self._event_refresh_job is None:
+            self._event_refresh_job = self.after(EVENT_REFRESH_DELAY_MS, self._refresh_after_events)
+
+    def _refresh_after_events(self):
+        self._event_refresh_job = None
+        self.refresh_data(show_busy=False)
+
+    def _show_times(self, rows):
+        self.times_treeview.delete(*self.times_treeview.get_children())
+        if rows is None:
+            self.summary_var.set("")
+            messagebox.showerror("Error", "No se pudieron calcular los tiempos de cocina.")
+            return
+        slow_column = f"ticket_p{kitchen_analytics_model.PERCENTILES[1]}"
+        for row in rows:
+            values = [row.get('etiqueta') or row.get('grupo'), row.get('lineas', 0)]
+            for percentile in kitchen_analytics_model.PERCENTILES:
+                values.extend([format_duration(row.get(f"ticket_p{percentile}")), format_duration(row.get(f"prep_p{percentile}"))])
+            slow = row.get(slow_column) is not None and row[slow_column] >= SLOW_TICKET_P90_SECONDS
+            self.times_treeview.insert("", tk.END, values=values, tags=("lento",) if slow else ())
+        total_lines = sum(int(row.get('lineas') or 0) for row in rows)
+        self.summary_var.set(f"{total_lines} líneas listas en la ventana. Tiempos en min:seg; "
+                             f"en rojo los grupos con {slow_column.replace('_', ' ')} ≥ {SLOW_TICKET_P90_SECONDS // 60} min.")
@@ -15,27 +15,18 @@ except ImportError:
             print("Error: No se pudo importar auth_logic.py. Verifica la estructura de tu proyecto.")
             auth_logic = None
 
-# Importar los dashboards
-try:
-    from .admin_dashboard_view import AdminDashboardView
-    from .employee_dashboard_view import EmployeeDashboardView
-except ImportError:
-    try:
-        from admin_dashboard_view import AdminDashboardView
-        from employee_dashboard_view import EmployeeDashboardView
-    except ImportError:
-        print("Error: No se pudieron importar los módulos de Dashboard. Verifica las rutas.")
-        AdminDashboardView = None
-        EmployeeDashboardView = None
-
-
-class LoginView(tk.Tk):
-    def __init__(self, on_login_success_callback=None): # Acepta un callback
-        super().__init__()
+class LoginView(ttk.Frame):
+    """
+    Pantalla de inicio de sesión. Es un Frame que se coloca en la ventana raíz de la aplicación
+    (main.py), que la sustituye por el panel del rol cuando el login es exitoso.
+    """
+    def __init__(self, parent_container, on_login_success_callback=None, *args, **kwargs): # Acepta un callback
+        super().__init__(parent_container, *args, **kwargs)
         self.on_login_success_callback = on_login_success_callback
-        self.title("Inicio de Sesión - Sistema Restaurante")
-        self.geometry("400x270") # Un poco más de alto para el botón
-        self.resizable(False, False)
+        window = self.winfo_toplevel()
+        window.title("Inicio de Sesión - Sistema Restaurante")
+        window.geometry("400x270") # Un poco más de alto para el botón
+        window.resizable(False, False)
 
         style = ttk.Style(self)
         available_themes = style.theme_names()
@@ -51,8 +42,6 @@ class LoginView(tk.Tk):
         elif 'alt' in available_themes:
              style.theme_use('alt')
 
-        
-        self.configure(bg='#f0f0f0') 
 
         main_frame = ttk.Frame(self, padding="20 20 20 20") # No es necesario style='Main.TFrame' si el frame no tiene estilo propio
         main_frame.pack(expand=True, fill=tk.BOTH)
@@ -92,14 +81,16 @@ class LoginView(tk.Tk):
         #                               relief=tk.RAISED, borderwidth=2, padx=10, pady=5)
         # self.login_button.pack(pady=10)
         
-        self.bind('<Return>', self.attempt_login_event)
+        # Enlazado a los campos (no a la ventana) para que no siga activo tras cambiar de pantalla
+        self.employee_id_entry.bind('<Return>', self.attempt_login_event)
+        self.password_entry.bind('<Return>', self.attempt_login_event)
         
-        self.update_idletasks() 
-        width = self.winfo_width()
-        height = self.winfo_height()
-        x = (self.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.winfo_screenheight() // 2) - (height // 2)
-        self.geometry(f'{width}x{height}+{x}+{y}')
+        window.update_idletasks() 
+        width = window.winfo_width()
+        height = window.winfo_height()
+        x = (window.winfo_screenwidth() // 2) - (width // 2)
+        y = (window.winfo_screenheight() // 2) - (height // 2)
+        window.geometry(f'{width}x{height}+{x}+{y}')
 
 
     def attempt_login_event(self, event=None): 
@@ -117,27 +108,14 @@ class LoginView(tk.Tk):
             messagebox.showerror("Error de Configuración", "El módulo de autenticación no está disponible.")
             return
         
-        if not AdminDashboardView or not EmployeeDashboardView:
-            messagebox.showerror("Error de Configuración", "Los módulos de dashboard no están disponibles.")
-            return
-
         authenticated_employee_info = auth_logic.verify_employee_credentials(employee_id, password)
 
         if authenticated_employee_info:
             if self.on_login_success_callback:
-                self.destroy() 
+                # La ventana raíz reemplaza esta pantalla por el panel del rol
                 self.on_login_success_callback(authenticated_employee_info)
             else:
-                self.destroy() 
-                rol = authenticated_employee_info.get("rol")
-                if rol == "administrador":
-                    dashboard = AdminDashboardView(authenticated_employee_info)
-                    dashboard.mainloop()
-                elif rol in ["empleado", "mesero", "cocinero"]: 
-                    dashboard = EmployeeDashboardView(authenticated_employee_info)
-                    dashboard.mainloop()
-                else:
-                    messagebox.showerror("Error de Rol", f"Rol '{rol}' no reconocido. Contacte al administrador.")
+                print(f"Login exitoso sin callback: {authenticated_employee_info.get('nombre')} ({authenticated_employee_info.get('rol')})")
         else:
             messagebox.showerror("Login Fallido", "ID de empleado o contraseña incorrectos, o empleado inactivo.")
             self.password_var.set("") 
@@ -154,8 +132,10 @@ def start_login_view(on_success_callback=None):
             print("Error Crítico: No se pudo cargar el módulo de autenticación. La aplicación no puede continuar.")
         return None 
 
-    app = LoginView(on_login_success_callback=on_success_callback)
-    app.mainloop()
+    root = tk.Tk()
+    app = LoginView(root, on_login_success_callback=on_success_callback)
+    app.pack(expand=True, fill=tk.BOTH)
+    root.mainloop()
     return "login_closed" 
 
 if __name__ == "__main__":
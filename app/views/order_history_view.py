@@ -1,15 +1,22 @@
 # app/views/order_history_view.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 import datetime # Para validación de fechas
 
 try:
     from ..models import order_model, employee_model, table_model # Para poblar filtros
+    from ..models import billing_model
+    from .paged_treeview import KeysetTreeviewPager
+    from .background_tasks import BackgroundTaskRunner
 except ImportError:
     try:
         from models import order_model, employee_model, table_model
+        from models import billing_model
+        from views.paged_treeview import KeysetTreeviewPager
+        from views.background_tasks import BackgroundTaskRunner
     except ImportError:
-        order_model = employee_model = table_model = None
+        order_model = employee_model = table_model = billing_model = None
+        KeysetTreeviewPager = BackgroundTaskRunner = None
 
 class OrderHistoryView(ttk.Frame):
     def __init__(self, parent_container, *args, **kwargs):
@@ -27,6 +34,8 @@ class OrderHistoryView(ttk.Frame):
         self.filter_oh_status_var = tk.StringVar()
         
         self.selected_order_id_for_details = None # Para mostrar detalles de una comanda del historial
+        self.history_filters = {} # Filtros aplicados en la última búsqueda (se reutilizan al paginar)
+        self.tasks = BackgroundTaskRunner(self) # Llamadas a los modelos fuera del hilo de Tk
 
         self._create_widgets()
         self._populate_filter_comboboxes()
@@ -93,7 +102,16 @@ class OrderHistoryView(ttk.Frame):
         self.history_treeview.column("fecha_cierre", width=140)
         
         hist_scroll = ttk.Scrollbar(history_lf, orient=tk.VERTICAL, command=self.history_treeview.yview)
-        self.history_treeview.configure(yscrollcommand=hist_scroll.set)
+        # El pager conecta el scroll y carga la página siguiente al acercarse al final
+        self.history_pager = KeysetTreeviewPager(
+            self.history_treeview, hist_scroll,
+            fetch_page=self._fetch_order_history_page,
+            insert_row=self._insert_order_history_row,
+            cursor_of=order_model.get_orders_history_cursor,
+            on_error=lambda: messagebox.showerror("Error", "No se pudo cargar el historial de comandas."),
+            page_size=100, tasks=self.tasks,
+            on_first_page=self._on_first_history_page
+        )
         self.history_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         hist_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
@@ -105,20 +123,47 @@ class OrderHistoryView(ttk.Frame):
                                               command=self._show_selected_order_details, state=tk.DISABLED)
         self.view_details_button.pack(pady=10)
 
+        # --- Cierre de turno: factura de una vez las comandas que quedaron sin cerrar ---
+        if billing_model:
+            ttk.Button(main_frame, text="Cierre de Turno (facturar comandas servidas)",
+                       command=self._close_shift).pack(pady=(0, 10))
+
+
+    def _close_shift(self):
+        statuses = ", ".join(billing_model.SHIFT_CLOSE_ORDER_STATUSES)
+        if not messagebox.askyesno("Cierre de Turno", f"Facturar todas las comandas en estado {statuses} y liberar sus mesas?"):
+            return
+        payment_method = simpledialog.askstring("Método de Pago", "Método de pago para las facturas:\n" + ", ".join(billing_model.PAYMENT_METHODS),
+                                                parent=self, initialvalue="efectivo")
+        if payment_method is None:
+            return
+        self.tasks.submit("cierre_turno", billing_model.close_shift_orders, payment_method.strip().lower(),
+                          on_success=self._on_shift_closed)
+
+    def _on_shift_closed(self, result):
+        if result is None:
+            messagebox.showerror("Error", "No se pudo realizar el cierre de turno.")
+            return
+        if not result['exito']:
+            messagebox.showwarning("Cierre de Turno", result['mensaje'])
+            return
+        messagebox.showinfo("Cierre de Turno", f"{result['mensaje']}\nTotal facturado: {float(result['total']):.2f}")
+        self._load_order_history()
 
     def _populate_filter_comboboxes(self):
         if table_model:
-            tables = table_model.get_all_tables_list()
-            self.table_combo['values'] = [""] + [t['id_mesa'] for t in tables if tables] if tables else [""]
+            self.tasks.submit("filtro_mesas", table_model.get_all_tables_list,
+                              on_success=lambda tables: self.table_combo.config(
+                                  values=[""] + [t['id_mesa'] for t in tables] if tables else [""]))
         if employee_model:
-            employees = employee_model.get_all_employees_list() # Podrías filtrar por rol mesero
-            self.employee_combo['values'] = [""] + [f"{e['nombre']} {e['apellido']} ({e['id_empleado']})" for e in employees if employees] if employees else [""]
+            # Podrías filtrar por rol mesero
             # Nota: Si usas el nombre + ID, necesitarás parsear el ID al enviar al modelo.
+            self.tasks.submit("filtro_empleados", employee_model.get_all_employees_list,
+                              on_success=lambda employees: self.employee_combo.config(
+                                  values=[""] + [f"{e['nombre']} {e['apellido']} ({e['id_empleado']})" for e in employees] if employees else [""]))
 
     def _load_order_history(self):
         if not order_model: return
-        for item in self.history_treeview.get_children():
-            self.history_treeview.delete(item)
         self.selected_order_id_for_details = None
         self.view_details_button.config(state=tk.DISABLED)
 
@@ -141,28 +186,31 @@ class OrderHistoryView(ttk.Frame):
             try: datetime.datetime.strptime(end_d, "%Y-%m-%d")
             except ValueError: messagebox.showerror("Error Filtro", "Formato 'Hasta' inválido."); return
 
-        history = order_model.get_orders_history(
-            start_date=start_d, end_date=end_d, table_id=table_id_val,
-            employee_id=employee_id_val, order_status=status_val, limit=200
-        )
+        # Filtros vigentes para todas las páginas que se pidan al hacer scroll
+        self.history_filters = dict(start_date=start_d, end_date=end_d, table_id=table_id_val,
+                                    employee_id=employee_id_val, order_status=status_val)
 
-        if history:
-            for order in history:
-                mesero_name = f"{order.get('nombre_mesero','')} {order.get('apellido_mesero','')}".strip()
-                self.history_treeview.insert("", tk.END, iid=order['id_comanda'], values=(
-                    order.get('id_comanda',''),
-                    order.get('fecha_hora_apertura','').strftime('%Y-%m-%d %H:%M') if order.get('fecha_hora_apertura') else '',
-                    order.get('id_mesa',''),
-                    mesero_name or order.get('id_empleado_mesero',''),
-                    order.get('nombre_cliente','') or order.get('id_cliente',''),
-                    order.get('cantidad_personas',''),
-                    order.get('estado_comanda',''),
-                    order.get('fecha_hora_cierre','').strftime('%Y-%m-%d %H:%M') if order.get('fecha_hora_cierre') else 'N/A'
-                ))
-        elif history == []:
+        self.history_pager.reset()
+
+    def _on_first_history_page(self, rows):
+        if rows == []:
             messagebox.showinfo("Historial", "No se encontraron comandas con los filtros aplicados.")
-        else:
-            messagebox.showerror("Error", "No se pudo cargar el historial de comandas.")
+
+    def _fetch_order_history_page(self, after, limit):
+        return order_model.get_orders_history(limit=limit, after=after, **self.history_filters)
+
+    def _insert_order_history_row(self, order):
+        mesero_name = f"{order.get('nombre_mesero','')} {order.get('apellido_mesero','')}".strip()
+        self.history_treeview.insert("", tk.END, iid=order['id_comanda'], values=(
+            order.get('id_comanda',''),
+            order.get('fecha_hora_apertura','').strftime('%Y-%m-%d %H:%M') if order.get('fecha_hora_apertura') else '',
+            order.get('id_mesa',''),
+            mesero_name or order.get('id_empleado_mesero',''),
+            order.get('nombre_cliente','') or order.get('id_cliente',''),
+            order.get('cantidad_personas',''),
+            order.get('estado_comanda',''),
+            order.get('fecha_hora_cierre','').strftime('%Y-%m-%d %H:%M') if order.get('fecha_hora_cierre') else 'N/A'
+        ))
             
     def _clear_order_history_filters(self):
         self.filter_oh_start_date_var.set("")
@@ -184,14 +232,16 @@ class OrderHistoryView(ttk.Frame):
     def _show_selected_order_details(self):
         if not self.selected_order_id_for_details or not order_model:
             return
-        
-        order_full_data = order_model.get_order_by_id(self.selected_order_id_for_details)
+        self.tasks.submit("detalle_comanda", order_model.get_order_by_id, self.selected_order_id_for_details,
+                          on_success=self._open_order_details_window)
+
+    def _open_order_details_window(self, order_full_data):
         if not order_full_data:
             messagebox.showerror("Error", "No se pudieron cargar los detalles de la comanda.")
             return
 
         details_win = tk.Toplevel(self)
-        details_win.title(f"Detalles Comanda: {self.selected_order_id_for_details}")
+        details_win.title(f"Detalles Comanda: {order_full_data.get('id_comanda')}")
         details_win.geometry("600x400")
         
         text_area = tk.Text(details_win, wrap=tk.WORD, font=("Consolas", 10), height=20, width=70)
@@ -1,29 +1,48 @@
+import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import traceback
 
 try:
-    from app.models import table_model, menu_model, order_model, stock_model
+    from app.models import table_model, menu_model, order_model, stock_model, menu_availability_model, billing_model
     from app.auth import auth_logic
+    from app import events
+    from app.views.background_tasks import BackgroundTaskRunner
+    from app.views.change_listener import ChangeListener
+    from app.views.split_bill_dialog import SplitBillDialog
 except ImportError:
     print(
         "Advertencia: Falló la importación principal (app...) en OrderTakingView. Intentando fallback relativo..."
     )
     try:
-        from ..models import table_model, menu_model, order_model, stock_model
+        from ..models import table_model, menu_model, order_model, stock_model, menu_availability_model, billing_model
         from ..auth import auth_logic
+        from .. import events
+        from .background_tasks import BackgroundTaskRunner
+        from .change_listener import ChangeListener
+        from .split_bill_dialog import SplitBillDialog
     except ImportError:
         print(
             "Advertencia: Falló la importación relativa (..) en OrderTakingView. Intentando importación directa..."
         )
         try:
-            from models import table_model, menu_model, order_model, stock_model
+            from models import table_model, menu_model, order_model, stock_model, menu_availability_model, billing_model
             from auth import auth_logic
+            import events
+            from views.background_tasks import BackgroundTaskRunner
+            from views.change_listener import ChangeListener
+            from views.split_bill_dialog import SplitBillDialog
         except ImportError as e:
             print(
                 f"Error CRÍTICO: No se pudieron importar módulos esenciales en OrderTakingView: {e}"
             )
-            table_model = menu_model = order_model = stock_model = auth_logic = None
+            table_model = menu_model = order_model = stock_model = menu_availability_model = billing_model = auth_logic = events = None
+            BackgroundTaskRunner = ChangeListener = SplitBillDialog = None
+
+# Con estas porciones o menos el plato se resalta en el menú como "quedan pocas".
+LOW_PORTIONS_WARNING = 3
+# Mientras la comanda mostrada tenga platos en cocina, su hora de entrega estimada se actualiza cada tanto.
+ETA_REFRESH_INTERVAL_MS = 30000
 
 
 class OrderTakingView(ttk.Frame):
@@ -35,7 +54,10 @@ class OrderTakingView(ttk.Frame):
         self.current_selected_table_id = None
         self.current_active_order_id = None
         self.current_order_status = None
+        self.current_order_party_size = 1
         self.selected_order_detail_id_for_status = None
+        self.menu_portions = {} # id_plato -> porciones disponibles (sin entrada: sin límite de stock)
+        self._eta_refresh_job = None
 
         if not all(
             [table_model, menu_model, order_model, auth_logic, stock_model]
@@ -48,12 +70,19 @@ class OrderTakingView(ttk.Frame):
             error_label.pack(padx=10, pady=10, expand=True, fill=tk.BOTH)
             return
 
+        # Llamadas a los modelos fuera del hilo de Tk; al cambiar el estado de ocupado se refrescan los botones
+        self.tasks = BackgroundTaskRunner(self, on_busy_change=lambda busy: self._update_ui_states())
         self._initialize_variables()
         self._create_layout()
         self._load_initial_data()
         self._update_ui_states()
+        # Cambios de mesas, comandas y stock hechos en otras terminales (o en la cocina)
+        self.changes = ChangeListener(self, [events.TOPIC_TABLE, events.TOPIC_ORDER, events.TOPIC_ORDER_ITEM,
+                                             events.TOPIC_INGREDIENT, events.TOPIC_RECIPE, events.TOPIC_DISH],
+                                      self._on_change_events)
 
     def _initialize_variables(self):
+        self._tables_in_listbox = [] # Filas de get_all_tables_list en el orden del listbox
         self.order_total_var = tk.DoubleVar(value=0.0)
         self.selected_dish_id_var = tk.StringVar()
         self.quantity_var = tk.IntVar(value=1)
@@ -141,16 +170,20 @@ class OrderTakingView(ttk.Frame):
         self.finalize_order_btn.pack(pady=(10, 3), fill=tk.X)
 
     def _create_menu_dishes_widget(self, parent_frame):
-        cols = ("nombre_plato", "categoria", "precio_venta")
+        cols = ("nombre_plato", "categoria", "precio_venta", "disponibles")
         self.menu_treeview = ttk.Treeview(
             parent_frame, columns=cols, show="headings", selectmode="browse", height=7
         )
         self.menu_treeview.heading("nombre_plato", text="Plato")
         self.menu_treeview.heading("categoria", text="Categoría")
         self.menu_treeview.heading("precio_venta", text="Precio")
+        self.menu_treeview.heading("disponibles", text="Disp.")
         self.menu_treeview.column("nombre_plato", width=220, anchor="w")
         self.menu_treeview.column("categoria", width=100, anchor="w")
         self.menu_treeview.column("precio_venta", width=70, anchor="e")
+        self.menu_treeview.column("disponibles", width=60, anchor="center")
+        self.menu_treeview.tag_configure("agotado", foreground="gray")
+        self.menu_treeview.tag_configure("pocas", foreground="darkorange")
 
         menu_scrollbar = ttk.Scrollbar(
             parent_frame, orient=tk.VERTICAL, command=self.menu_treeview.yview
@@ -197,6 +230,7 @@ class OrderTakingView(ttk.Frame):
             "subtotal",
             "estado_plato",
             "obs_plato",
+            "eta",
         )
         self.current_order_treeview = ttk.Treeview(
             parent_frame, columns=order_cols, show="headings", selectmode="browse", height=10
@@ -208,6 +242,7 @@ class OrderTakingView(ttk.Frame):
         self.current_order_treeview.heading("subtotal", text="Subtotal")
         self.current_order_treeview.heading("estado_plato", text="Estado")
         self.current_order_treeview.heading("obs_plato", text="Obs.")
+        self.current_order_treeview.heading("eta", text="Entrega Est.")
 
         self.current_order_treeview.column("id_detalle", width=60, stretch=tk.NO, anchor="center")
         self.current_order_treeview.column("cantidad", width=40, anchor="center")
@@ -216,6 +251,7 @@ class OrderTakingView(ttk.Frame):
         self.current_order_treeview.column("subtotal", width=80, anchor="e")
         self.current_order_treeview.column("estado_plato", width=100)
         self.current_order_treeview.column("obs_plato", width=150)
+        self.current_order_treeview.column("eta", width=110, anchor="center")
 
         order_scrollbar = ttk.Scrollbar(
             parent_frame, orient=tk.VERTICAL, command=self.current_order_treeview.yview
@@ -251,43 +287,171 @@ class OrderTakingView(ttk.Frame):
         self._load_tables_to_listbox()
         self._load_menu_to_treeview()
 
-    def _load_tables_to_listbox(self):
+    def _load_tables_to_listbox(self, reselect_table_id=None):
         if not table_model: return
+        self.tasks.submit("mesas", table_model.get_all_tables_list,
+                          on_success=lambda tables: self._show_tables_in_listbox(tables, reselect_table_id))
+
+    def _show_tables_in_listbox(self, tables, reselect_table_id=None):
         self.tables_listbox.delete(0, tk.END)
-        tables = table_model.get_all_tables_list()
+        self._tables_in_listbox = list(tables or [])
         if tables:
             for table in tables:
-                display_text = f"{table['id_mesa']} - Cap: {table['capacidad']} ({table['estado']})"
-                self.tables_listbox.insert(tk.END, display_text)
+                self.tables_listbox.insert(tk.END, self._table_display_text(table))
         elif tables is None:
             messagebox.showerror("Error", "No se pudieron cargar las mesas.")
         self._clear_selection_and_order_details()
 
+        if reselect_table_id and tables:
+            table_ids = [table['id_mesa'] for table in tables]
+            if reselect_table_id in table_ids:
+                self.tables_listbox.selection_set(table_ids.index(reselect_table_id))
+                self.current_selected_table_id = reselect_table_id
+                self._load_active_order_for_selected_table()
+
+    def _table_display_text(self, table):
+        return f"{table['id_mesa']} - Cap: {table['capacidad']} ({table['estado']})"
+
+    def _update_table_in_listbox(self, table_id, new_status):
+        """Cambia el estado mostrado de una mesa sin recargar la lista. False si la mesa no está en la lista."""
+        for index, table in enumerate(self._tables_in_listbox):
+            if table['id_mesa'] != table_id:
+                continue
+            if new_status and table['estado'] != new_status:
+                table['estado'] = new_status
+                was_selected = index in self.tables_listbox.curselection()
+                self.tables_listbox.delete(index)
+                self.tables_listbox.insert(index, self._table_display_text(table))
+                if was_selected:
+                    self.tables_listbox.selection_set(index)
+            return True
+        return False
+
+    def _update_order_item_status_in_treeview(self, detail_id, new_status):
+        """Cambia el estado mostrado de una línea de la comanda. False si la línea aún no se muestra."""
+        iid = str(detail_id)
+        if not new_status or not self.current_order_treeview.exists(iid):
+            return False
+        values = list(self.current_order_treeview.item(iid, "values"))
+        values[5] = new_status
+        if new_status not in order_model.KITCHEN_ACTIVE_STATUSES:
+            values[7] = self._eta_display(new_status, None)
+        self.current_order_treeview.item(iid, values=values)
+        return True
+
+    def _on_change_events(self, received):
+        """Aplica en el sitio los eventos de app.events; solo recarga lo que no puede actualizar así."""
+        reload_tables = reload_active_order = reload_order_details = refresh_availability = reload_menu = refresh_etas = False
+        for event in received:
+            topic, entity_id, data = event['tema'], event['id_entidad'], event['datos']
+            if topic == events.TOPIC_TABLE:
+                if not self._update_table_in_listbox(entity_id, data.get('estado')):
+                    reload_tables = True # Mesa nueva
+            elif topic == events.TOPIC_ORDER:
+                if self.current_active_order_id and entity_id == self.current_active_order_id:
+                    self.current_order_status = data.get('estado', self.current_order_status)
+                    if self.current_order_status in ('facturada', 'cancelada'):
+                        reload_active_order = True # La mesa ya no tiene esta comanda activa
+                    elif data.get('detalles_en_preparacion'):
+                        reload_order_details = True
+                elif not self.current_active_order_id and self.current_selected_table_id \
+                        and data.get('id_mesa') == self.current_selected_table_id:
+                    reload_active_order = True # Otra terminal abrió comanda en la mesa seleccionada
+            elif topic == events.TOPIC_ORDER_ITEM:
+                if self.current_active_order_id and data.get('id_comanda') == self.current_active_order_id:
+                    if not self._update_order_item_status_in_treeview(entity_id, data.get('estado')):
+                        reload_order_details = True # Línea añadida desde otra terminal
+                    else:
+                        refresh_etas = True # La cola de cocina avanzó
+            elif topic == events.TOPIC_INGREDIENT and menu_availability_model:
+                # Solo memoria: las cantidades y reservas vienen en el evento y se recalculan los platos afectados
+                self._update_menu_availability(menu_availability_model.apply_stock_changes(data.get('cantidades'), data.get('reservadas')))
+            elif topic == events.TOPIC_RECIPE:
+                refresh_availability = True
+            elif topic == events.TOPIC_DISH:
+                reload_menu = True # Alta, baja o cambio de precio en el menú
+
+        if reload_tables:
+            self._load_tables_to_listbox(reselect_table_id=self.current_selected_table_id)
+        elif reload_active_order:
+            self._load_active_order_for_selected_table()
+        elif reload_order_details:
+            self._display_order_details(self.current_active_order_id)
+        elif refresh_etas:
+            self._refresh_order_etas()
+        if reload_menu:
+            menu_model.invalidate_dish_catalog() # Por si el evento llega a la vista antes que al catálogo
+            self._load_menu_to_treeview()
+        elif refresh_availability:
+            self._refresh_menu_availability()
+        self._update_ui_states()
+
     def _load_menu_to_treeview(self):
         if not menu_model: return
+
+        def load_menu_with_portions():
+            # Al abrir el menú se recalcula el índice completo; después se actualiza con los eventos
+            portions = menu_availability_model.get_available_portions(refresh=True) if menu_availability_model else None
+            return menu_model.get_active_dishes(), portions
+
+        self.tasks.submit("menu", load_menu_with_portions, on_success=lambda result: self._show_menu_in_treeview(*result))
+
+    def _show_menu_in_treeview(self, dishes, portions_by_dish=None):
         for item in self.menu_treeview.get_children():
             self.menu_treeview.delete(item)
-        dishes = menu_model.get_active_dishes()
+        self.menu_portions = dict(portions_by_dish or {})
         if dishes:
             for dish in dishes:
-                self.menu_treeview.insert("", tk.END, iid=dish['id_plato'], values=(
-                    dish['nombre_plato'], dish['categoria'], f"{dish['precio_venta']:.2f}"
+                portions_text, tags = self._menu_portions_display(dish['id_plato'])
+                self.menu_treeview.insert("", tk.END, iid=dish['id_plato'], tags=tags, values=(
+                    dish['nombre_plato'], dish['categoria'], f"{dish['precio_venta']:.2f}", portions_text
                 ))
         elif dishes is None:
             messagebox.showerror("Error", "No se pudieron cargar los platos del menú.")
         self.selected_dish_id_var.set("")
 
+    def _menu_portions_display(self, dish_id):
+        """Texto de la columna 'Disp.' y tags de la fila según las porciones disponibles del plato."""
+        portions = self.menu_portions.get(dish_id)
+        if portions is None:
+            return "", ()
+        if portions <= 0:
+            return "Agotado", ("agotado",)
+        if portions <= LOW_PORTIONS_WARNING:
+            return str(portions), ("pocas",)
+        return str(portions), ()
+
+    def _update_menu_availability(self, portions_by_dish):
+        """Actualiza en el sitio la columna de porciones de los platos indicados."""
+        for dish_id, portions in (portions_by_dish or {}).items():
+            self.menu_portions[dish_id] = portions
+            if not self.menu_treeview.exists(dish_id):
+                continue
+            portions_text, tags = self._menu_portions_display(dish_id)
+            values = list(self.menu_treeview.item(dish_id, "values"))
+            values[3] = portions_text
+            self.menu_treeview.item(dish_id, values=values, tags=tags)
+
+    def _refresh_menu_availability(self):
+        if not menu_availability_model: return
+        self.tasks.submit("disponibilidad_menu", menu_availability_model.get_available_portions,
+                          on_success=self._update_menu_availability, show_busy=False)
+
     def _clear_selection_and_order_details(self):
         self.current_selected_table_id = None
         self.current_active_order_id = None
         self.current_order_status = None
         self.selected_order_detail_id_for_status = None
+        # Las cargas pendientes de la mesa anterior ya no aplican
+        self.tasks.cancel("comanda_mesa")
+        self.tasks.cancel("detalle_comanda")
         if self.tables_listbox.curselection():
             self.tables_listbox.selection_clear(0, tk.END)
         self._clear_current_order_display()
         self._update_ui_states()
 
     def _clear_current_order_display(self):
+        self._cancel_eta_refresh()
         for item in self.current_order_treeview.get_children():
             self.current_order_treeview.delete(item)
         self.order_total_var.set(0.0)
@@ -299,8 +463,10 @@ class OrderTakingView(ttk.Frame):
         order_is_open = order_active and self.current_order_status == 'abierta'
         order_is_preparing_or_ready = order_active and self.current_order_status in ['en preparacion', 'lista para servir']
         order_is_served = order_active and self.current_order_status == 'servida'
+        # Mientras haya una consulta o acción en curso no se permiten nuevas acciones sobre la comanda
+        idle = not self.tasks.busy
 
-        self.manage_order_btn.config(state=tk.NORMAL if table_selected else tk.DISABLED)
+        self.manage_order_btn.config(state=tk.NORMAL if table_selected and idle else tk.DISABLED)
         if order_active:
             self.manage_order_btn.config(text=f"Ver/Mod. Comanda: {self.current_active_order_id[:12]}...")
         elif table_selected:
@@ -308,11 +474,11 @@ class OrderTakingView(ttk.Frame):
         else:
             self.manage_order_btn.config(text="Seleccione una Mesa")
 
-        self.send_to_kitchen_btn.config(state=tk.NORMAL if order_is_open and self.current_order_treeview.get_children() else tk.DISABLED)
-        self.request_bill_btn.config(state=tk.NORMAL if order_is_preparing_or_ready or order_is_served else tk.DISABLED)
-        self.finalize_order_btn.config(state=tk.NORMAL if order_is_served else tk.DISABLED)
+        self.send_to_kitchen_btn.config(state=tk.NORMAL if idle and order_is_open and self.current_order_treeview.get_children() else tk.DISABLED)
+        self.request_bill_btn.config(state=tk.NORMAL if idle and (order_is_preparing_or_ready or order_is_served) else tk.DISABLED)
+        self.finalize_order_btn.config(state=tk.NORMAL if idle and order_is_served else tk.DISABLED)
 
-        self.add_dish_btn.config(state=tk.NORMAL if order_is_open else tk.DISABLED)
+        self.add_dish_btn.config(state=tk.NORMAL if idle and order_is_open else tk.DISABLED)
         self.quantity_spinbox.config(state=tk.NORMAL if order_is_open else tk.DISABLED)
         self.dish_obs_entry.config(state=tk.NORMAL if order_is_open else tk.DISABLED)
 
@@ -326,7 +492,7 @@ class OrderTakingView(ttk.Frame):
                         can_mark_delivered = True
             except tk.TclError: pass
             except IndexError: pass
-        self.mark_delivered_btn.config(state=tk.NORMAL if can_mark_delivered else tk.DISABLED)
+        self.mark_delivered_btn.config(state=tk.NORMAL if idle and can_mark_delivered else tk.DISABLED)
 
     def _on_table_selected_from_list(self, event=None):
         selection_indices = self.tables_listbox.curselection()
@@ -343,19 +509,33 @@ class OrderTakingView(ttk.Frame):
         self._clear_current_order_display()
         self.current_active_order_id = None
         self.current_order_status = None
+        self.tasks.cancel("detalle_comanda")
 
         if not self.current_selected_table_id or not order_model:
             self._update_ui_states()
             return
 
-        active_orders = order_model.get_active_orders_for_table(self.current_selected_table_id)
-        if active_orders:
-            self.current_active_order_id = active_orders[0]['id_comanda']
-            self.current_order_status = active_orders[0]['estado_comanda']
-            print(f"INFO: Comanda activa: {self.current_active_order_id} (Estado: {self.current_order_status}) para mesa {self.current_selected_table_id}")
-            self._display_order_details(self.current_active_order_id)
+        table_id = self.current_selected_table_id
+
+        def fetch_active_order():
+            active_orders = order_model.get_active_orders_for_table(table_id)
+            if not active_orders:
+                return None, None
+            return active_orders[0], order_model.get_order_by_id(active_orders[0]['id_comanda'])
+
+        # Si el mesero cambia de mesa antes de que llegue la respuesta, la anterior se descarta
+        self.tasks.submit("comanda_mesa", fetch_active_order,
+                          on_success=lambda result: self._on_active_order_loaded(table_id, *result))
+        self._update_ui_states()
+
+    def _on_active_order_loaded(self, table_id, active_order, order_data):
+        if active_order:
+            self.current_active_order_id = active_order['id_comanda']
+            self.current_order_status = active_order['estado_comanda']
+            print(f"INFO: Comanda activa: {self.current_active_order_id} (Estado: {self.current_order_status}) para mesa {table_id}")
+            self._show_order_details(self.current_active_order_id, order_data)
         else:
-            print(f"INFO: No hay comanda activa para la mesa {self.current_selected_table_id}.")
+            print(f"INFO: No hay comanda activa para la mesa {table_id}.")
         self._update_ui_states()
 
     def _handle_manage_order_button(self):
@@ -382,15 +562,18 @@ class OrderTakingView(ttk.Frame):
             messagebox.showerror("Error de Autenticación", "No se pudo identificar al empleado logueado.")
             return
 
-        new_order_id = order_model.create_new_order(self.current_selected_table_id, employee_id, num_people=num_people)
+        table_id = self.current_selected_table_id
+        self.tasks.submit("abrir_comanda", order_model.create_new_order, table_id, employee_id, num_people=num_people,
+                          on_success=lambda new_order_id: self._on_new_order_opened(table_id, new_order_id))
+        self._update_ui_states()
+
+    def _on_new_order_opened(self, table_id, new_order_id):
         if new_order_id:
-            self.current_active_order_id = new_order_id
-            self.current_order_status = 'abierta'
-            messagebox.showinfo("Éxito", f"Nueva comanda '{new_order_id}' abierta para la mesa '{self.current_selected_table_id}'.")
-            self._load_tables_to_listbox()
-            self._display_order_details(new_order_id)
+            messagebox.showinfo("Éxito", f"Nueva comanda '{new_order_id}' abierta para la mesa '{table_id}'.")
+            # Recargar la lista limpia la selección; se vuelve a seleccionar la mesa para mostrar la comanda recién abierta
+            self._load_tables_to_listbox(reselect_table_id=table_id)
         else:
-            messagebox.showerror("Error", f"No se pudo abrir una nueva comanda para la mesa '{self.current_selected_table_id}'. Verifique el estado de la mesa.")
+            messagebox.showerror("Error", f"No se pudo abrir una nueva comanda para la mesa '{table_id}'. Verifique el estado de la mesa.")
         self._update_ui_states()
 
     def _on_dish_selected_from_menu(self, event=None):
@@ -422,57 +605,72 @@ class OrderTakingView(ttk.Frame):
             messagebox.showerror("Error de Cantidad", "La cantidad ingresada no es válida.")
             return
 
+        if self.menu_portions.get(dish_id) == 0:
+            messagebox.showwarning("Plato Agotado", "No hay stock para preparar este plato en este momento.")
+            return
+
         observations = self.dish_observations_var.get().strip()
+        order_id = self.current_active_order_id
 
-        if stock_model:
-            print(f"DEBUG: Verificando stock para dish_id: {dish_id}, quantity: {quantity}")
-            try:
-                stock_check_result = stock_model.check_stock_for_dish(dish_id, quantity)
-                print(f"DEBUG: stock_check_result: {stock_check_result}")
+        if not stock_model:
+            messagebox.showwarning("Advertencia del Sistema", "No se pudo verificar el stock (módulo de stock no disponible). El plato se añadirá sin confirmación de stock.")
 
+        def check_stock_and_add():
+            # Se ejecuta en segundo plano: verificación de stock y alta del plato en una sola tarea.
+            # Lo pendiente de la comanda ya tiene su stock reservado; add_dish_to_order reserva el del plato nuevo.
+            if stock_model:
+                stock_check_result = stock_model.check_stock_for_dish(dish_id, quantity)
                 if stock_check_result is None:
-                    messagebox.showerror("Error de Sistema", "No se pudo verificar el stock del plato (resultado nulo). Intente de nuevo o contacte al administrador.")
-                    return
-
+                    return 'error_verificacion', None
                 if not stock_check_result['can_prepare']:
-                    missing_items_str = "No hay suficiente stock para preparar este plato:\n"
-                    for item in stock_check_result['missing_items']:
-                        missing_items_str += (
-                            f"- {item.get('nombre_ingrediente', 'Desconocido')}: Necesita {item.get('needed', 0):.3f}, "
-                            f"Disponible: {item.get('available', 0):.3f} {item.get('unit', '')}\n"
-                        )
-                    messagebox.showwarning("Stock Insuficiente", missing_items_str)
-                    return
-            except Exception as e_stock_check:
-                print(f"ERROR EXCEPCIÓN durante la verificación de stock: {e_stock_check}")
-                traceback.print_exc()
-                messagebox.showerror("Error de Verificación de Stock", f"Ocurrió un error al verificar el stock: {e_stock_check}")
-                return
-        else:
-            messagebox.showwarning("Advertencia del Sistema", "No se pudo verificar el stock (módulo de stock no disponible). El plato se añadirá sin confirmación de stock.")
+                    return 'sin_stock', stock_check_result
+            return 'anadido', order_model.add_dish_to_order(order_id, dish_id, quantity, observations)
 
-        if order_model:
-            detail_id = order_model.add_dish_to_order(self.current_active_order_id, dish_id, quantity, observations)
-            if detail_id:
-                self._display_order_details(self.current_active_order_id)
-                self.quantity_var.set(1)
-                self.dish_observations_var.set("")
-                if self.menu_treeview.selection():
-                    self.menu_treeview.selection_remove(self.menu_treeview.selection()[0])
-                self.selected_dish_id_var.set("")
-            else:
-                messagebox.showerror("Error", "No se pudo añadir el plato a la comanda (después de la verificación de stock).")
+        self.tasks.submit("anadir_plato", check_stock_and_add,
+                          on_success=lambda result: self._on_dish_added(order_id, *result),
+                          on_error=self._on_stock_check_error)
+        self._update_ui_states()
+
+    def _on_stock_check_error(self, error):
+        print(f"ERROR EXCEPCIÓN durante la verificación de stock: {error}")
+        messagebox.showerror("Error de Verificación de Stock", f"Ocurrió un error al verificar el stock: {error}")
+        self._update_ui_states()
+
+    def _on_dish_added(self, order_id, outcome, value):
+        if outcome == 'error_verificacion':
+            messagebox.showerror("Error de Sistema", "No se pudo verificar el stock del plato (resultado nulo). Intente de nuevo o contacte al administrador.")
+        elif outcome == 'sin_stock':
+            missing_items_str = "No hay suficiente stock para preparar este plato:\n"
+            for item in value['missing_items']:
+                missing_items_str += (
+                    f"- {item.get('nombre_ingrediente', 'Desconocido')}: Necesita {item.get('needed', 0):.3f}, "
+                    f"Disponible: {item.get('available', 0):.3f} {item.get('unit', '')}\n"
+                )
+            messagebox.showwarning("Stock Insuficiente", missing_items_str)
+        elif value:
+            self._display_order_details(order_id)
+            self.quantity_var.set(1)
+            self.dish_observations_var.set("")
+            if self.menu_treeview.selection():
+                self.menu_treeview.selection_remove(self.menu_treeview.selection()[0])
+            self.selected_dish_id_var.set("")
+        else:
+            messagebox.showerror("Error", "No se pudo añadir el plato a la comanda. Es posible que otra terminal haya reservado el stock disponible.")
         self._update_ui_states()
 
     def _display_order_details(self, order_id_to_display):
-        self._clear_current_order_display()
         if not order_model or not order_id_to_display:
+            self._clear_current_order_display()
             self._update_ui_states()
             return
+        self.tasks.submit("detalle_comanda", order_model.get_order_by_id, order_id_to_display,
+                          on_success=lambda order_data: self._show_order_details(order_id_to_display, order_data))
 
-        order_data = order_model.get_order_by_id(order_id_to_display)
+    def _show_order_details(self, order_id_to_display, order_data):
+        self._clear_current_order_display()
         if order_data:
             self.current_order_status = order_data.get('estado_comanda', 'desconocido')
+            self.current_order_party_size = order_data.get('cantidad_personas') or 1
             current_total = 0.0
             if order_data.get('detalles'):
                 for detail in order_data['detalles']:
@@ -483,16 +681,63 @@ class OrderTakingView(ttk.Frame):
                         f"{float(detail['precio_unitario_momento']):.2f}",
                         f"{float(detail['subtotal_detalle']):.2f}",
                         detail['estado_plato'],
-                        detail.get('observaciones_plato', '')
+                        detail.get('observaciones_plato', ''),
+                        self._eta_display(detail['estado_plato'], detail.get('hora_entrega_estimada'))
                     ))
                     current_total += float(detail['subtotal_detalle'])
             self.order_total_var.set(round(current_total, 2))
+            self._refresh_order_etas()
         else:
             messagebox.showerror("Error", f"No se pudo cargar la comanda con ID {order_id_to_display}.")
             self.current_active_order_id = None
             self.current_order_status = None
         self._update_ui_states()
 
+    def _eta_display(self, item_status, eta):
+        """Texto de la columna 'Entrega Est.': hora y minutos que faltan, o el estado si ya salió de cocina."""
+        if item_status == 'listo':
+            return "Listo"
+        if item_status not in order_model.KITCHEN_ACTIVE_STATUSES or not eta:
+            return "-"
+        minutes_left = max(0, int((eta - datetime.datetime.now()).total_seconds() // 60))
+        return f"{eta.strftime('%H:%M')} ({minutes_left} min)"
+
+    def _cancel_eta_refresh(self):
+        if self._eta_refresh_job:
+            self.after_cancel(self._eta_refresh_job)
+            self._eta_refresh_job = None
+        self.tasks.cancel("eta_comanda")
+
+    def _refresh_order_etas(self):
+        """Recalcula las ETA de la comanda mostrada con la cola de cocina (order_model.estimate_order_etas)."""
+        self._cancel_eta_refresh()
+        order_id = self.current_active_order_id
+        if not order_id or not self.winfo_exists():
+            return
+        in_kitchen = [iid for iid in self.current_order_treeview.get_children()
+                      if self.current_order_treeview.item(iid, "values")[5] in order_model.KITCHEN_ACTIVE_STATUSES]
+        if not in_kitchen:
+            return
+        self.tasks.submit("eta_comanda", order_model.estimate_order_etas, order_id,
+                          on_success=lambda etas: self._show_order_etas(order_id, etas),
+                          on_error=lambda error: self._schedule_eta_refresh(),
+                          show_busy=False)
+
+    def _schedule_eta_refresh(self):
+        self._eta_refresh_job = self.after(ETA_REFRESH_INTERVAL_MS, self._refresh_order_etas)
+
+    def _show_order_etas(self, order_id, etas):
+        if order_id != self.current_active_order_id:
+            return
+        for detail_id, eta in (etas or {}).items():
+            iid = str(detail_id)
+            if not self.current_order_treeview.exists(iid):
+                continue
+            values = list(self.current_order_treeview.item(iid, "values"))
+            values[7] = self._eta_display(values[5], eta)
+            self.current_order_treeview.item(iid, values=values)
+        self._schedule_eta_refresh()
+
     def _on_order_item_selected(self, event=None):
         selected = self.current_order_treeview.selection()
         if selected:
@@ -512,13 +757,18 @@ class OrderTakingView(ttk.Frame):
              return
 
         if messagebox.askyesno("Confirmar Entrega", "Marcar el plato seleccionado como 'ENTREGADO' al cliente?"):
-            result = order_model.update_order_item_status(self.selected_order_detail_id_for_status, 'entregado')
-            if result is not None and result > 0:
-                messagebox.showinfo("Éxito", "Plato marcado como 'entregado'.")
-                if self.current_active_order_id:
-                    self._display_order_details(self.current_active_order_id)
-            else:
-                messagebox.showerror("Error", "No se pudo actualizar el estado del plato a 'entregado'.")
+            order_id = self.current_active_order_id
+            self.tasks.submit("entregar_plato", order_model.update_order_item_status, self.selected_order_detail_id_for_status, 'entregado',
+                              on_success=lambda result: self._on_item_delivered(order_id, result))
+        self._update_ui_states()
+
+    def _on_item_delivered(self, order_id, result):
+        if result is not None and result > 0:
+            messagebox.showinfo("Éxito", "Plato marcado como 'entregado'.")
+            if order_id:
+                self._display_order_details(order_id)
+        else:
+            messagebox.showerror("Error", "No se pudo actualizar el estado del plato a 'entregado'.")
         self._update_ui_states()
 
     def _request_bill(self):
@@ -531,12 +781,17 @@ class OrderTakingView(ttk.Frame):
             return
 
         if messagebox.askyesno("Solicitar Cuenta", f"Marcar la comanda {self.current_active_order_id} como 'servida' (lista para facturar)?"):
-            result = order_model.update_order_status(self.current_active_order_id, 'servida')
-            if result is not None and result > 0:
-                messagebox.showinfo("Cuenta Solicitada", f"Comanda {self.current_active_order_id} marcada como 'servida'.")
-                self._display_order_details(self.current_active_order_id)
-            else:
-                messagebox.showerror("Error", "No se pudo actualizar el estado de la comanda.")
+            order_id = self.current_active_order_id
+            self.tasks.submit("solicitar_cuenta", order_model.update_order_status, order_id, 'servida',
+                              on_success=lambda result: self._on_bill_requested(order_id, result))
+        self._update_ui_states()
+
+    def _on_bill_requested(self, order_id, result):
+        if result is not None and result > 0:
+            messagebox.showinfo("Cuenta Solicitada", f"Comanda {order_id} marcada como 'servida'.")
+            self._display_order_details(order_id)
+        else:
+            messagebox.showerror("Error", "No se pudo actualizar el estado de la comanda.")
         self._update_ui_states()
 
     def _send_order_to_kitchen(self):
@@ -548,27 +803,24 @@ class OrderTakingView(ttk.Frame):
             return
 
         if messagebox.askyesno("Confirmar Envío", f"Enviar la comanda {self.current_active_order_id} a cocina?"):
-            all_items_processed_successfully = True
-            order_data = order_model.get_order_by_id(self.current_active_order_id)
+            order_id = self.current_active_order_id
+            id_empleado_resp = self.logged_in_employee_info.get('id_empleado')
+            self.tasks.submit("enviar_cocina", order_model.send_order_to_kitchen, order_id, id_employee_responsible=id_empleado_resp,
+                              on_success=lambda result: self._on_order_sent_to_kitchen(order_id, result))
+        self._update_ui_states()
 
-            if order_data and order_data.get('detalles'):
-                id_empleado_resp = self.logged_in_employee_info.get('id_empleado')
-                for detail in order_data['detalles']:
-                    if detail['estado_plato'] == 'pendiente':
-                        res_item = order_model.update_order_item_status(detail['id_detalle_comanda'], 'en preparacion', id_employee_responsible=id_empleado_resp)
-                        if not res_item:
-                            all_items_processed_successfully = False
-                            messagebox.showerror("Error de Stock/Proceso", f"No se pudo procesar el plato '{detail['nombre_plato']}' para cocina (posible falta de stock o error). La comanda no se envió completamente.")
-                            break
-
-            if all_items_processed_successfully:
-                result_comanda = order_model.update_order_status(self.current_active_order_id, 'en preparacion')
-                if result_comanda:
-                    messagebox.showinfo("Éxito", f"Comanda {self.current_active_order_id} y sus platos pendientes enviados a cocina.")
-                else:
-                    messagebox.showerror("Error", f"Se procesaron los platos, pero no se pudo actualizar el estado general de la comanda {self.current_active_order_id}.")
+    def _on_order_sent_to_kitchen(self, order_id, result):
+        if result is None:
+            messagebox.showerror("Error", f"Error de base de datos al enviar la comanda {order_id} a cocina.")
+        elif result['exito']:
+            messagebox.showinfo("Éxito", f"Comanda {order_id} y sus platos pendientes enviados a cocina.")
+        else:
+            failed_lines = [f"- {line['nombre_plato']}: {line['mensaje']}" for line in result['lineas'] if not line['exito']]
+            detail_text = "\n".join(failed_lines)
+            messagebox.showerror("Error de Stock/Proceso",
+                                 f"{result['mensaje']}\nNo se envió ningún plato.\n\n{detail_text}".rstrip())
 
-            self._display_order_details(self.current_active_order_id)
+        self._display_order_details(order_id)
         self._update_ui_states()
 
     def _finalize_order_and_free_table(self):
@@ -578,22 +830,83 @@ class OrderTakingView(ttk.Frame):
 
         action = simpledialog.askstring("Finalizar Comanda",
                                         f"Comanda: {self.current_active_order_id}\nEstado actual: Servida\n\n"
-                                        "Acción: 'facturar' o 'cancelar'",
+                                        "Acción: 'facturar', 'dividir' (cuenta por separado) o 'cancelar'",
                                         parent=self, initialvalue="facturar")
 
-        if action and action.lower() in ['facturar', 'cancelar']:
-            new_final_status = 'facturada' if action.lower() == 'facturar' else 'cancelada'
-
-            result = order_model.update_order_status(self.current_active_order_id, new_final_status)
-            if result is not None and result > 0:
-                messagebox.showinfo("Comanda Finalizada", f"Comanda {self.current_active_order_id} marcada como '{new_final_status}'.\nMesa {self.current_selected_table_id} liberada.")
-                self._load_tables_to_listbox()
-                self._clear_selection_and_order_details()
-            else:
-                messagebox.showerror("Error", f"No se pudo finalizar la comanda {self.current_active_order_id}.")
+        if action and action.lower() == 'facturar':
+            self._bill_current_order()
+        elif action and action.lower() == 'dividir':
+            self._split_current_order_bill()
+        elif action and action.lower() == 'cancelar':
+            order_id, table_id = self.current_active_order_id, self.current_selected_table_id
+            self.tasks.submit("finalizar_comanda", order_model.update_order_status, order_id, 'cancelada',
+                              on_success=lambda result: self._on_order_finalized(order_id, table_id, 'cancelada', result))
         elif action is not None:
-            messagebox.showwarning("Acción Inválida", "Por favor, ingrese 'facturar' o 'cancelar'.")
+            messagebox.showwarning("Acción Inválida", "Por favor, ingrese 'facturar', 'dividir' o 'cancelar'.")
+
+        self._update_ui_states()
 
+    def _bill_current_order(self):
+        """Pide método de pago y descuento y factura la comanda (billing_model.bill_order)."""
+        if not billing_model:
+            messagebox.showerror("Error", "El módulo de facturación no está disponible.")
+            return
+        payment_method = simpledialog.askstring("Método de Pago", "Método de pago:\n" + ", ".join(billing_model.PAYMENT_METHODS),
+                                                parent=self, initialvalue="efectivo")
+        if payment_method is None:
+            return
+        payment_method = payment_method.strip().lower()
+        if payment_method not in billing_model.PAYMENT_METHODS:
+            messagebox.showwarning("Método Inválido", f"'{payment_method}' no es un método de pago válido.")
+            return
+        discount_percent = 0
+        if payment_method != 'cortesia':
+            discount_percent = simpledialog.askfloat("Descuento", "Descuento (%):", parent=self,
+                                                     minvalue=0, maxvalue=100, initialvalue=0)
+            if discount_percent is None:
+                return
+        order_id, table_id = self.current_active_order_id, self.current_selected_table_id
+        self.tasks.submit("finalizar_comanda", billing_model.bill_order, order_id, payment_method,
+                          discount_percent=discount_percent,
+                          on_success=lambda result: self._on_order_billed(order_id, table_id, result))
+
+    def _split_current_order_bill(self):
+        """Abre la división de la cuenta (una factura por pagador, split_bill_model)."""
+        if not SplitBillDialog:
+            messagebox.showerror("Error", "El módulo de división de cuentas no está disponible.")
+            return
+        table_id = self.current_selected_table_id
+        SplitBillDialog(self, self.current_active_order_id, self.current_order_party_size,
+                        on_billed=lambda result: self._on_split_bill_done(table_id))
+
+    def _on_split_bill_done(self, table_id):
+        messagebox.showinfo("Mesa Liberada", f"Mesa {table_id} liberada.")
+        self._load_tables_to_listbox()
+        self._clear_selection_and_order_details()
+        self._update_ui_states()
+
+    def _on_order_billed(self, order_id, table_id, result):
+        if result is None:
+            messagebox.showerror("Error", f"No se pudo facturar la comanda {order_id}.")
+        elif not result['exito']:
+            messagebox.showwarning("Facturación", result['mensaje'])
+        else:
+            invoice = result['factura']
+            messagebox.showinfo("Comanda Facturada",
+                                f"Factura {invoice['id_factura']} ({invoice['metodo_pago']})\n"
+                                f"Subtotal: {invoice['subtotal']:.2f}\nDescuentos: {invoice['descuentos']:.2f}\n"
+                                f"Impuestos: {invoice['impuestos']:.2f}\nTotal: {invoice['total']:.2f}\n\nMesa {table_id} liberada.")
+            self._load_tables_to_listbox()
+            self._clear_selection_and_order_details()
+        self._update_ui_states()
+
+    def _on_order_finalized(self, order_id, table_id, new_final_status, result):
+        if result is not None and result > 0:
+            messagebox.showinfo("Comanda Finalizada", f"Comanda {order_id} marcada como '{new_final_status}'.\nMesa {table_id} liberada.")
+            self._load_tables_to_listbox()
+            self._clear_selection_and_order_details()
+        else:
+            messagebox.showerror("Error", f"No se pudo finalizar la comanda {order_id}.")
         self._update_ui_states()
 
 if __name__ == '__main__':
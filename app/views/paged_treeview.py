@@ -0,0 +1,92 @@
+# app/views/paged_treeview.py
+
+
+class KeysetTreeviewPager:
+    """
+    Carga un Treeview por páginas a medida que el usuario se acerca al final del scroll.
+    Cada página se pide al modelo con el cursor (fecha, id) de la última fila cargada, de modo
+    que nunca se recorre el historial con OFFSET ni se cargan todas las filas en Tk a la vez.
+
+    Args:
+        treeview (ttk.Treeview): Treeview a llenar.
+        scrollbar (ttk.Scrollbar): Scrollbar vertical asociado al treeview.
+        fetch_page (callable): fetch_page(after, limit) -> lista de filas, [] si no hay más o None si hay error.
+        insert_row (callable): insert_row(row) inserta una fila en el treeview.
+        cursor_of (callable): cursor_of(row) -> cursor (fecha, id) de la fila.
+        on_error (callable, optional): Se llama si fetch_page devuelve None.
+        page_size (int): Filas por página.
+        tasks (BackgroundTaskRunner, optional): Si se indica, cada página se pide en segundo plano y se
+            inserta al llegar; una búsqueda nueva (reset) descarta la página que estuviera en camino.
+        on_first_page (callable, optional): on_first_page(rows) al recibir la primera página tras reset().
+    """
+    LOAD_THRESHOLD = 0.9 # Fracción del scroll a partir de la cual se pide la página siguiente
+
+    def __init__(self, treeview, scrollbar, fetch_page, insert_row, cursor_of, on_error=None, page_size=100,
+                 tasks=None, on_first_page=None):
+        self.treeview = treeview
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.insert_row = insert_row
+        self.cursor_of = cursor_of
+        self.on_error = on_error
+        self.page_size = page_size
+        self.tasks = tasks
+        self.on_first_page = on_first_page
+
+        self.last_cursor = None
+        self.exhausted = False
+        self._loading = False
+        self._load_scheduled = False
+        self.treeview.configure(yscrollcommand=self._on_treeview_scrolled)
+
+    def reset(self):
+        """Vacía el treeview y carga la primera página (por ejemplo, al cambiar los filtros)."""
+        self.treeview.delete(*self.treeview.get_children())
+        self.last_cursor = None
+        self.exhausted = False
+        self._loading = False
+        self.load_next_page()
+
+    def load_next_page(self):
+        """Pide la página siguiente a partir del cursor de la última fila cargada."""
+        if self._loading or self.exhausted:
+            return
+        self._loading = True
+        is_first_page = self.last_cursor is None
+        if self.tasks:
+            # Clave propia del treeview: un reset() mientras llega una página descarta la anterior
+            self.tasks.submit(f"pagina_{self.treeview}", self.fetch_page, self.last_cursor, self.page_size,
+                              on_success=lambda rows: self._on_page_fetched(rows, is_first_page),
+                              on_error=lambda error: self._on_page_fetched(None, is_first_page))
+        else:
+            self._on_page_fetched(self.fetch_page(self.last_cursor, self.page_size), is_first_page)
+
+    def _on_page_fetched(self, rows, is_first_page):
+        self._loading = False
+        if rows is None:
+            self.exhausted = True
+            if self.on_error:
+                self.on_error()
+            return
+        for row in rows:
+            self.insert_row(row)
+        if rows:
+            self.last_cursor = self.cursor_of(rows[-1])
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if is_first_page and self.on_first_page:
+            self.on_first_page(rows)
+
+    def _on_treeview_scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.exhausted or self._loading or self._load_scheduled:
+            return
+        if float(last) >= self.LOAD_THRESHOLD:
+            # Se difiere para no insertar filas dentro del propio callback de scroll de Tk
+            self._load_scheduled = True
+            self.treeview.after_idle(self._load_scheduled_page)
+
+    def _load_scheduled_page(self):
+        self._load_scheduled = False
+        if self.treeview.winfo_exists() and self.treeview.yview()[1] >= self.LOAD_THRESHOLD:
+            self.load_next_page()
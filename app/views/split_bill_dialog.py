@@ -0,0 +1,203 @@
+# app/views/split_bill_dialog.py
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+
+try:
+    from ..models import split_bill_model, billing_model
+    from .. import events
+    from .background_tasks import BackgroundTaskRunner
+    from .change_listener import ChangeListener
+except ImportError:
+    try:
+        from models import split_bill_model, billing_model
+        import events
+        from views.background_tasks import BackgroundTaskRunner
+        from views.change_listener import ChangeListener
+    except ImportError:
+        print("Error crítico: No se pudieron importar los modelos en SplitBillDialog.")
+        split_bill_model = billing_model = events = BackgroundTaskRunner = ChangeListener = None
+
+
+def format_cents(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class SplitBillDialog(tk.Toplevel):
+    """
+    División de la cuenta de una comanda (split_bill_model): cada plato se asigna a uno o varios
+    pagadores (por defecto un asiento por comensal) y se factura una cuenta por pagador.
+    Los platos que se añadan después se reparten entre los pagadores ya existentes sin tocar el resto.
+    """
+    def __init__(self, parent, order_id, party_size=1, on_billed=None):
+        super().__init__(parent)
+        self.title(f"Dividir Cuenta: {order_id}")
+        self.geometry("760x480")
+        self.order_id = order_id
+        self.on_billed = on_billed
+        self.payers = [f"Asiento {seat}" for seat in range(1, max(1, int(party_size or 1)) + 1)]
+        self.payment_method_var = tk.StringVar(value="efectivo")
+        self.discount_var = tk.DoubleVar(value=0)
+        self.summary_var = tk.StringVar(value="")
+        self.unassigned_lines = []
+
+        self._create_widgets()
+        self.tasks = BackgroundTaskRunner(self)
+        self.refresh_data()
+        self.changes = ChangeListener(self, [events.TOPIC_ORDER_ITEM], self._on_order_item_events)
+        self.transient(parent)
+        self.grab_set()
+
+    def _create_widgets(self):
+        panes = ttk.Frame(self, padding=5)
+        panes.pack(expand=True, fill=tk.BOTH)
+
+        # --- Platos y su reparto ---
+        lines_frame = ttk.LabelFrame(panes, text="Platos", padding=5)
+        lines_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+        self.lines_treeview = ttk.Treeview(lines_frame, columns=("plato", "subtotal", "reparto"), show="headings",
+                                           selectmode="extended", height=14)
+        self.lines_treeview.heading("plato", text="Plato")
+        self.lines_treeview.heading("subtotal", text="Subtotal")
+        self.lines_treeview.heading("reparto", text="Pagadores")
+        self.lines_treeview.column("plato", width=170, anchor="w")
+        self.lines_treeview.column("subtotal", width=70, anchor="e")
+        self.lines_treeview.column("reparto", width=220, anchor="w")
+        self.lines_treeview.tag_configure("sin_asignar", foreground="red")
+        self.lines_treeview.pack(fill=tk.BOTH, expand=True)
+
+        # --- Pagadores ---
+        payers_frame = ttk.LabelFrame(panes, text="Pagadores", padding=5)
+        payers_frame.pack(side=tk.LEFT, fill=tk.BOTH)
+        self.payers_listbox = tk.Listbox(payers_frame, selectmode=tk.EXTENDED, exportselection=False, height=8, width=18)
+        self.payers_listbox.pack(fill=tk.X)
+        ttk.Button(payers_frame, text="Añadir Pagador", command=self._add_payer).pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(payers_frame, text="Asignar Platos Seleccionados", command=self._assign_selected_lines).pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(payers_frame, text="Repartir Sin Asignar", command=self._split_unassigned_lines).pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(payers_frame, text="Quitar Reparto", command=self._clear_split).pack(fill=tk.X, pady=(5, 0))
+
+        self.summary_treeview = ttk.Treeview(payers_frame, columns=("pagador", "impuestos", "total"), show="headings", height=6)
+        self.summary_treeview.heading("pagador", text="Pagador")
+        self.summary_treeview.heading("impuestos", text="Impuestos")
+        self.summary_treeview.heading("total", text="Total")
+        self.summary_treeview.column("pagador", width=90, anchor="w")
+        self.summary_treeview.column("impuestos", width=70, anchor="e")
+        self.summary_treeview.column("total", width=70, anchor="e")
+        self.summary_treeview.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        self._show_payers()
+
+        # --- Facturación ---
+        billing_frame = ttk.Frame(self, padding=5)
+        billing_frame.pack(fill=tk.X)
+        ttk.Label(billing_frame, text="Método de pago:").pack(side=tk.LEFT)
+        ttk.Combobox(billing_frame, textvariable=self.payment_method_var, values=list(billing_model.PAYMENT_METHODS),
+                     state="readonly", width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Label(billing_frame, text="Descuento (%):").pack(side=tk.LEFT)
+        ttk.Spinbox(billing_frame, from_=0, to=100, textvariable=self.discount_var, width=6,
+                    command=self.refresh_data).pack(side=tk.LEFT, padx=5)
+        ttk.Button(billing_frame, text="Cerrar", command=self.destroy).pack(side=tk.RIGHT)
+        ttk.Button(billing_frame, text="Facturar por Separado", command=self._bill_split).pack(side=tk.RIGHT, padx=5)
+        ttk.Label(self, textvariable=self.summary_var, font=("Arial", 9, "italic")).pack(anchor="w", padx=5, pady=(0, 5))
+
+    def _show_payers(self):
+        self.payers_listbox.delete(0, tk.END)
+        for payer in self.payers:
+            self.payers_listbox.insert(tk.END, payer)
+
+    def _discount_percent(self):
+        try:
+            return max(0.0, min(100.0, float(self.discount_var.get())))
+        except (tk.TclError, ValueError):
+            return 0.0
+
+    def refresh_data(self, show_busy=True):
+        self.tasks.submit("division_cuenta", split_bill_model.get_split_summary, self.order_id,
+                          self.payment_method_var.get(), self._discount_percent(),
+                          on_success=self._show_split, show_busy=show_busy)
+
+    def _on_order_item_events(self, received):
+        if any((event.get('datos') or {}).get('id_comanda') == self.order_id for event in received):
+            self.refresh_data(show_busy=False)
+
+    def _show_split(self, summary):
+        if summary is None:
+            messagebox.showerror("Error", "No se pudo cargar la división de la cuenta.", parent=self)
+            return
+        # Los pagadores que ya tienen platos se conservan aunque no estén en la lista inicial
+        for payer in [row['pagador'] for row in summary['pagadores']]:
+            if payer not in self.payers:
+                self.payers.append(payer)
+                self.payers_listbox.insert(tk.END, payer)
+
+        selected = set(self.lines_treeview.selection())
+        self.lines_treeview.delete(*self.lines_treeview.get_children())
+        for line in summary['lineas']:
+            shares = ", ".join(f"{payer} {format_cents(cents)}" for payer, cents in line['reparto'].items())
+            unassigned = line['id_detalle_comanda'] in summary['sin_asignar']
+            self.lines_treeview.insert("", tk.END, iid=line['id_detalle_comanda'], values=(
+                f"{line['cantidad']}x {line['nombre_plato']}", f"{float(line['subtotal_detalle']):.2f}",
+                shares or "Sin asignar"), tags=("sin_asignar",) if unassigned else ())
+        self.lines_treeview.selection_set([iid for iid in self.lines_treeview.get_children() if iid in selected])
+
+        self.summary_treeview.delete(*self.summary_treeview.get_children())
+        for row in summary['pagadores']:
+            self.summary_treeview.insert("", tk.END, values=(row['pagador'], format_cents(row['impuestos_centimos']),
+                                                            format_cents(row['total_centimos'])))
+        self.unassigned_lines = summary['sin_asignar']
+        total = sum(row['total_centimos'] for row in summary['pagadores'])
+        pending = f" {len(self.unassigned_lines)} plato(s) sin asignar." if self.unassigned_lines else ""
+        self.summary_var.set(f"Total repartido: {format_cents(total)}.{pending}")
+
+    def _add_payer(self):
+        name = simpledialog.askstring("Añadir Pagador", "Nombre del pagador:", parent=self)
+        if name and name.strip() and name.strip() not in self.payers:
+            self.payers.append(name.strip())
+            self.payers_listbox.insert(tk.END, name.strip())
+
+    def _selected_payers(self):
+        return [self.payers_listbox.get(index) for index in self.payers_listbox.curselection()]
+
+    def _assign_selected_lines(self):
+        detail_ids = self.lines_treeview.selection()
+        payers = self._selected_payers()
+        if not detail_ids or not payers:
+            messagebox.showwarning("Sin Selección", "Seleccione uno o más platos y los pagadores que los comparten.", parent=self)
+            return
+        self.tasks.submit("asignar_division", split_bill_model.assign_lines, detail_ids, payers,
+                          on_success=self._on_split_changed)
+
+    def _split_unassigned_lines(self):
+        payers = self._selected_payers() or self.payers
+        self.tasks.submit("asignar_division", split_bill_model.split_unassigned_lines, self.order_id, payers,
+                          on_success=self._on_split_changed)
+
+    def _clear_split(self):
+        if messagebox.askyesno("Quitar Reparto", "¿Quitar la asignación de todos los platos?", parent=self):
+            self.tasks.submit("asignar_division", split_bill_model.clear_split, self.order_id,
+                              on_success=self._on_split_changed)
+
+    def _on_split_changed(self, result):
+        if result is None:
+            messagebox.showerror("Error", "No se pudo actualizar la división de la cuenta; no se cambió ningún plato.", parent=self)
+        self.refresh_data(show_busy=False)
+
+    def _bill_split(self):
+        if self.unassigned_lines:
+            messagebox.showwarning("Platos Sin Asignar", "Asigne todos los platos antes de facturar.", parent=self)
+            return
+        self.tasks.submit("facturar_division", split_bill_model.bill_split, self.order_id, self.payment_method_var.get(),
+                          self._discount_percent(), on_success=self._on_split_billed)
+
+    def _on_split_billed(self, result):
+        if result is None:
+            messagebox.showerror("Error", f"No se pudo facturar la comanda {self.order_id}.", parent=self)
+            return
+        if not result['exito']:
+            messagebox.showwarning("Facturación", result['mensaje'], parent=self)
+            self.refresh_data(show_busy=False)
+            return
+        invoices_text = "\n".join(f"{invoice['id_factura']} ({invoice['pagador']}): {invoice['total']:.2f}"
+                                  for invoice in result['facturas'])
+        messagebox.showinfo("Comanda Facturada", f"{result['mensaje']}\n\n{invoices_text}", parent=self)
+        if self.on_billed:
+            self.on_billed(result)
+        self.destroy()
@@ -0,0 +1,164 @@
+# app/views/station_config_view.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+try:
+    from ..models import station_model
+    from .. import events
+    from .background_tasks import BackgroundTaskRunner
+    from .change_listener import ChangeListener
+except ImportError:
+    try:
+        from models import station_model
+        import events
+        from views.background_tasks import BackgroundTaskRunner
+        from views.change_listener import ChangeListener
+    except ImportError:
+        print("Error crítico: No se pudieron importar los modelos en StationConfigView.")
+        station_model = events = BackgroundTaskRunner = ChangeListener = None
+
+# Opción del plato que sigue la estación de su categoría (Plato.id_estacion = NULL)
+FOLLOW_CATEGORY_LABEL = "(según categoría)"
+
+
+class StationConfigView(ttk.Frame):
+    """
+    Enrutado de platos a estaciones de cocina (station_model): estación por categoría y, si hace falta,
+    una estación propia por plato. Los cambios reenrutan las líneas activas de la cola de cocina.
+    """
+    def __init__(self, parent_container, *args, **kwargs):
+        super().__init__(parent_container, *args, **kwargs)
+
+        if not station_model:
+            ttk.Label(self, text="Error: El modelo de estaciones de cocina no está disponible.", foreground="red").pack(pady=20)
+            return
+
+        self.station_names = {} # id_estacion -> nombre
+        self.station_ids_by_name = {}
+        self.category_station_var = tk.StringVar()
+        self.dish_station_var = tk.StringVar()
+
+        self._create_widgets()
+        self.tasks = BackgroundTaskRunner(self)
+        self.refresh_data()
+        self.changes = ChangeListener(self, [events.TOPIC_STATION, events.TOPIC_DISH], lambda received: self.refresh_data(show_busy=False))
+
+    def _create_widgets(self):
+        panes = ttk.Frame(self)
+        panes.pack(expand=True, fill=tk.BOTH)
+
+        # --- Estación por categoría ---
+        category_frame = ttk.LabelFrame(panes, text="Estación por categoría", padding=5)
+        category_frame.pack(side=tk.LEFT, fill=tk.BOTH, padx=(0, 5))
+        self.category_treeview = ttk.Treeview(category_frame, columns=("categoria", "estacion"), show="headings",
+                                              selectmode="browse", height=12)
+        self.category_treeview.heading("categoria", text="Categoría")
+        self.category_treeview.heading("estacion", text="Estación")
+        self.category_treeview.column("categoria", width=130, anchor="w")
+        self.category_treeview.column("estacion", width=150, anchor="w")
+        self.category_treeview.pack(fill=tk.BOTH, expand=True)
+        self.category_treeview.bind("<<TreeviewSelect>>", self._on_category_selected)
+
+        category_actions = ttk.Frame(category_frame, padding=(0, 5))
+        category_actions.pack(fill=tk.X)
+        self.category_station_combobox = ttk.Combobox(category_actions, textvariable=self.category_station_var,
+                                                      state="readonly", width=20)
+        self.category_station_combobox.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(category_actions, text="Asignar", command=self._assign_category_station).pack(side=tk.LEFT)
+
+        # --- Estación por plato ---
+        dish_frame = ttk.LabelFrame(panes, text="Estación por plato", padding=5)
+        dish_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tree_frame = ttk.Frame(dish_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.dish_treeview = ttk.Treeview(tree_frame, columns=("plato", "categoria", "propia", "estacion"), show="headings",
+                                          selectmode="browse", height=12)
+        self.dish_treeview.heading("plato", text="Plato")
+        self.dish_treeview.heading("categoria", text="Categoría")
+        self.dish_treeview.heading("propia", text="Estación propia")
+        self.dish_treeview.heading("estacion", text="Va a")
+        self.dish_treeview.column("plato", width=180, anchor="w")
+        self.dish_treeview.column("categoria", width=100, anchor="w")
+        self.dish_treeview.column("propia", width=130, anchor="w")
+        self.dish_treeview.column("estacion", width=130, anchor="w")
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.dish_treeview.yview)
+        self.dish_treeview.configure(yscrollcommand=scrollbar.set)
+        self.dish_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.dish_treeview.bind("<<TreeviewSelect>>", self._on_dish_selected)
+
+        dish_actions = ttk.Frame(dish_frame, padding=(0, 5))
+        dish_actions.pack(fill=tk.X)
+        self.dish_station_combobox = ttk.Combobox(dish_actions, textvariable=self.dish_station_var,
+                                                  state="readonly", width=20)
+        self.dish_station_combobox.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(dish_actions, text="Asignar", command=self._assign_dish_station).pack(side=tk.LEFT)
+        ttk.Button(dish_actions, text="Refrescar", command=self.refresh_data).pack(side=tk.RIGHT)
+
+    def refresh_data(self, show_busy=True):
+        def load():
+            return station_model.get_stations(), station_model.get_category_stations(), station_model.get_dish_stations()
+        self.tasks.submit("estaciones", load, on_success=self._show_data, show_busy=show_busy)
+
+    def _show_data(self, result):
+        stations, category_stations, dish_stations = result
+        if stations is None or category_stations is None or dish_stations is None:
+            messagebox.showerror("Error", "No se pudo cargar la configuración de estaciones de cocina.")
+            return
+        self.station_names = {station['id_estacion']: station['nombre'] for station in stations}
+        self.station_ids_by_name = {name: station_id for station_id, name in self.station_names.items()}
+        self.category_station_combobox['values'] = list(self.station_ids_by_name)
+        self.dish_station_combobox['values'] = [FOLLOW_CATEGORY_LABEL] + list(self.station_ids_by_name)
+
+        categories = sorted(set(category_stations) | {dish['categoria'] for dish in dish_stations})
+        self.category_treeview.delete(*self.category_treeview.get_children())
+        for category in categories:
+            self.category_treeview.insert("", tk.END, iid=category,
+                                          values=(category, self._station_label(category_stations.get(category))))
+
+        self.dish_treeview.delete(*self.dish_treeview.get_children())
+        for dish in dish_stations:
+            own_station = self.station_names.get(dish['id_estacion_plato'], FOLLOW_CATEGORY_LABEL)
+            self.dish_treeview.insert("", tk.END, iid=dish['id_plato'],
+                                      values=(dish['nombre_plato'], dish['categoria'], own_station,
+                                              self._station_label(dish['id_estacion'])))
+
+    def _station_label(self, station_id):
+        if not station_id:
+            return "Sin estación"
+        return self.station_names.get(station_id, station_id)
+
+    def _on_category_selected(self, event=None):
+        selected = self.category_treeview.selection()
+        if selected:
+            self.category_station_var.set(self.category_treeview.item(selected[0], "values")[1])
+
+    def _on_dish_selected(self, event=None):
+        selected = self.dish_treeview.selection()
+        if selected:
+            self.dish_station_var.set(self.dish_treeview.item(selected[0], "values")[2])
+
+    def _assign_category_station(self):
+        selected = self.category_treeview.selection()
+        station_id = self.station_ids_by_name.get(self.category_station_var.get())
+        if not selected or not station_id:
+            messagebox.showwarning("Sin Selección", "Seleccione una categoría y una estación.")
+            return
+        self.tasks.submit("asignar_estacion", station_model.set_category_station, selected[0], station_id,
+                          on_success=self._on_station_assigned)
+
+    def _assign_dish_station(self):
+        selected = self.dish_treeview.selection()
+        station_name = self.dish_station_var.get()
+        if not selected or not station_name:
+            messagebox.showwarning("Sin Selección", "Seleccione un plato y una estación.")
+            return
+        station_id = None if station_name == FOLLOW_CATEGORY_LABEL else self.station_ids_by_name.get(station_name)
+        self.tasks.submit("asignar_estacion", station_model.set_dish_station, selected[0], station_id,
+                          on_success=self._on_station_assigned)
+
+    def _on_station_assigned(self, result):
+        if not result:
+            messagebox.showerror("Error", "No se pudo asignar la estación.")
+            return
+        self.refresh_data(show_busy=False)
@@ -7,16 +7,23 @@ import traceback
 try:
     from app.models import stock_model
     from app.models import supplier_model # Para el combobox de proveedores
+    from app.views.paged_treeview import KeysetTreeviewPager
+    from app.views.background_tasks import BackgroundTaskRunner
 except ImportError:
     print("Advertencia: Falló la importación principal en StockManagementView. Intentando fallback...")
     try:
         from ..models import stock_model, supplier_model
+        from .paged_treeview import KeysetTreeviewPager
+        from .background_tasks import BackgroundTaskRunner
     except ImportError:
         try:
             from models import stock_model, supplier_model
+            from views.paged_treeview import KeysetTreeviewPager
+            from views.background_tasks import BackgroundTaskRunner
         except ImportError as e:
             print(f"Error CRÍTICO: No se pudieron importar modelos en StockManagementView: {e}")
             stock_model = supplier_model = None
+            KeysetTreeviewPager = BackgroundTaskRunner = None
 
 class StockManagementView(ttk.Frame):
     def __init__(self, parent_container, *args, **kwargs):
@@ -50,6 +57,8 @@ class StockManagementView(ttk.Frame):
         self.filter_hist_start_date_var = tk.StringVar()
         self.filter_hist_end_date_var = tk.StringVar()
         self.filter_hist_type_var = tk.StringVar()
+        self.stock_history_filters = {} # Filtros aplicados en la última búsqueda (se reutilizan al paginar)
+        self.tasks = BackgroundTaskRunner(self) # Consultas a los modelos fuera del hilo de Tk
 
         self._create_layout()
         self._load_suppliers_to_combobox()
@@ -294,7 +303,15 @@ class StockManagementView(ttk.Frame):
 
 
         hist_scrollbar = ttk.Scrollbar(history_tree_frame, orient=tk.VERTICAL, command=self.stock_history_treeview.yview)
-        self.stock_history_treeview.configure(yscrollcommand=hist_scrollbar.set)
+        # El pager conecta el scroll y carga la página siguiente al acercarse al final
+        self.stock_history_pager = KeysetTreeviewPager(
+            self.stock_history_treeview, hist_scrollbar,
+            fetch_page=self._fetch_stock_movements_page,
+            insert_row=self._insert_stock_movement_row,
+            cursor_of=stock_model.get_stock_movements_history_cursor,
+            on_error=lambda: messagebox.showerror("Error", "No se pudo cargar el historial de movimientos de stock."),
+            page_size=100, tasks=self.tasks
+        )
         self.stock_history_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         hist_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
@@ -302,8 +319,9 @@ class StockManagementView(ttk.Frame):
         if not supplier_model:
             self.product_supplier_combobox['values'] = ["(Error al cargar)"]
             return
-        
-        suppliers = supplier_model.get_all_suppliers_list()
+        self.tasks.submit("proveedores", supplier_model.get_all_suppliers_list, on_success=self._show_suppliers_in_combobox)
+
+    def _show_suppliers_in_combobox(self, suppliers):
         self.supplier_display_to_id_map = {"(Ninguno)": None}
         display_values = ["(Ninguno)"]
         if suppliers:
@@ -317,13 +335,15 @@ class StockManagementView(ttk.Frame):
 
     def _load_products_to_treeview(self):
         if not stock_model: return
+        self.tasks.submit("productos", stock_model.get_all_products_list, on_success=self._show_products_in_treeview)
+
+    def _show_products_in_treeview(self, products):
         current_selection_id = None
         if self.products_treeview.selection():
             current_selection_id = self.products_treeview.selection()[0]
 
         for item in self.products_treeview.get_children():
             self.products_treeview.delete(item)
-        products = stock_model.get_all_products_list()
         if products:
             for prod in products:
                 self.products_treeview.insert("", tk.END, iid=prod['id_producto'], values=(
@@ -341,13 +361,15 @@ class StockManagementView(ttk.Frame):
 
     def _load_ingredients_to_treeview(self):
         if not stock_model: return
+        self.tasks.submit("ingredientes", stock_model.get_all_ingredients_list, on_success=self._show_ingredients_in_treeview)
+
+    def _show_ingredients_in_treeview(self, ingredients):
         current_selection_id = None
         if self.ingredients_treeview.selection():
             current_selection_id = self.ingredients_treeview.selection()[0]
 
         for item in self.ingredients_treeview.get_children():
             self.ingredients_treeview.delete(item)
-        ingredients = stock_model.get_all_ingredients_list()
         if ingredients:
             for ingr in ingredients:
                 fecha_act = ingr.get("ultima_actualizacion")
@@ -403,8 +425,11 @@ class StockManagementView(ttk.Frame):
             return
 
         self._selected_product_id_for_edit = selected_items[0]
-        product_data = stock_model.get_product_by_id(self._selected_product_id_for_edit)
-        
+        # Si se selecciona otro producto antes de que llegue la respuesta, la anterior se descarta
+        self.tasks.submit("producto_seleccionado", stock_model.get_product_by_id, self._selected_product_id_for_edit,
+                          on_success=self._show_selected_product)
+
+    def _show_selected_product(self, product_data):
         if product_data:
             self.product_id_var.set(product_data.get("id_producto", ""))
             self.product_name_var.set(product_data.get("nombre", ""))
@@ -631,7 +656,7 @@ class StockManagementView(ttk.Frame):
             elif result == 0 and not is_deduction: # Si se añadió 0
                  messagebox.showinfo("Información", "No se realizó cambio en el stock (cantidad cero o el ingrediente no cambió).")
             else: # result es None (fallo, ej. stock insuficiente) o 0 en una deducción (no debería pasar si hay error)
-                messagebox.showerror("Error", f"No se pudo registrar el movimiento para '{ingredient_id}'. Verifique el stock o los logs de consola.")
+                messagebox.showerror("Error", f"No se pudo registrar el movimiento para '{ingredient_id}'. Verifique el stock libre (sin lo reservado para comandas) o los logs de consola.")
             
             self._load_ingredients_to_treeview()
             self._load_stock_movements_history()
@@ -639,8 +664,6 @@ class StockManagementView(ttk.Frame):
     
     def _load_stock_movements_history(self):
         if not stock_model: return
-        for item in self.stock_history_treeview.get_children():
-            self.stock_history_treeview.delete(item)
 
         ingr_id = self.filter_hist_ingr_id_var.get().strip() or None
         start_d = self.filter_hist_start_date_var.get().strip() or None
@@ -654,27 +677,25 @@ class StockManagementView(ttk.Frame):
             try: datetime.datetime.strptime(end_d, "%Y-%m-%d")
             except ValueError: messagebox.showerror("Error Filtro", "Formato de 'Fecha Hasta' inválido. Use YYYY-MM-DD."); return
 
-        history_data = stock_model.get_stock_movements_history(
-            ingredient_id=ingr_id, start_date=start_d, end_date=end_d,
-            movement_type=mov_type, limit=200
-        )
-        if history_data:
-            for mov in history_data:
-                emp_name = f"{mov.get('nombre_empleado','')} {mov.get('apellido_empleado','')}".strip()
-                fecha_hora_f = mov.get('fecha_hora', '').strftime('%Y-%m-%d %H:%M:%S') if mov.get('fecha_hora') else ''
-                self.stock_history_treeview.insert("", tk.END, values=(
-                    fecha_hora_f, mov.get('id_ingrediente', ''),
-                    mov.get('nombre_ingrediente', ''), mov.get('tipo_movimiento', ''),
-                    f"{mov.get('cantidad_cambio', 0.0):.3f}", f"{mov.get('cantidad_nueva', 0.0):.3f}",
-                    mov.get('descripcion_motivo', ''),
-                    emp_name or mov.get('id_empleado_responsable', 'N/A'),
-                    mov.get('id_referencia_origen', '')
-                ))
-        elif history_data == []:
-            # No mostrar messagebox si está vacío, el treeview vacío es suficiente indicación
-            pass 
-        else: 
-            messagebox.showerror("Error", "No se pudo cargar el historial de movimientos de stock.")
+        # Filtros vigentes para todas las páginas que se pidan al hacer scroll.
+        # Si la primera página está vacía, el treeview vacío es suficiente indicación.
+        self.stock_history_filters = dict(ingredient_id=ingr_id, start_date=start_d, end_date=end_d, movement_type=mov_type)
+        self.stock_history_pager.reset()
+
+    def _fetch_stock_movements_page(self, after, limit):
+        return stock_model.get_stock_movements_history(limit=limit, after=after, **self.stock_history_filters)
+
+    def _insert_stock_movement_row(self, mov):
+        emp_name = f"{mov.get('nombre_empleado','')} {mov.get('apellido_empleado','')}".strip()
+        fecha_hora_f = mov.get('fecha_hora', '').strftime('%Y-%m-%d %H:%M:%S') if mov.get('fecha_hora') else ''
+        self.stock_history_treeview.insert("", tk.END, values=(
+            fecha_hora_f, mov.get('id_ingrediente', ''),
+            mov.get('nombre_ingrediente', ''), mov.get('tipo_movimiento', ''),
+            f"{mov.get('cantidad_cambio', 0.0):.3f}", f"{mov.get('cantidad_nueva', 0.0):.3f}",
+            mov.get('descripcion_motivo', ''),
+            emp_name or mov.get('id_empleado_responsable', 'N/A'),
+            mov.get('id_referencia_origen', '')
+        ))
             
     def _clear_history_filters(self):
         self.filter_hist_ingr_id_var.set("")
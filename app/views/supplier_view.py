@@ -6,15 +6,18 @@ import traceback # Para imprimir tracebacks completos
 # Ajusta la ruta de importación según tu estructura de proyecto.
 try:
     from app.models import supplier_model 
+    from app.views.background_tasks import BackgroundTaskRunner
 except ImportError:
     try:
         from ..models import supplier_model
+        from .background_tasks import BackgroundTaskRunner
     except ImportError:
         try:
             from models import supplier_model
+            from views.background_tasks import BackgroundTaskRunner
         except ImportError as e:
             print(f"Error CRÍTICO: No se pudo importar el módulo supplier_model.py en SupplierView: {e}")
-            supplier_model = None
+            supplier_model = BackgroundTaskRunner = None
 
 class SupplierView(ttk.Frame):
     def __init__(self, parent_container, *args, **kwargs):
@@ -35,6 +38,7 @@ class SupplierView(ttk.Frame):
 
         # Variable para rastrear el ID del proveedor actualmente seleccionado para edición/actualización
         self._selected_supplier_id_for_edit = None 
+        self.tasks = BackgroundTaskRunner(self) # Consultas a los modelos fuera del hilo de Tk
 
         self._create_widgets()
         self.load_suppliers_to_treeview()
@@ -113,7 +117,9 @@ class SupplierView(ttk.Frame):
 
     def load_suppliers_to_treeview(self):
         if not supplier_model: return
-        
+        self.tasks.submit("proveedores", supplier_model.get_all_suppliers_list, on_success=self._show_suppliers_in_treeview)
+
+    def _show_suppliers_in_treeview(self, suppliers_list):
         current_selection_id = None
         if self.suppliers_treeview.selection():
             try:
@@ -124,7 +130,6 @@ class SupplierView(ttk.Frame):
         for item in self.suppliers_treeview.get_children():
             self.suppliers_treeview.delete(item)
         
-        suppliers_list = supplier_model.get_all_suppliers_list()
         if suppliers_list:
             for sup in suppliers_list:
                 self.suppliers_treeview.insert("", tk.END, iid=sup['id_proveedor'], values=(
@@ -150,8 +155,11 @@ class SupplierView(ttk.Frame):
             return 
 
         self._selected_supplier_id_for_edit = selected_items[0]
-        supplier_data = supplier_model.get_supplier_by_id(self._selected_supplier_id_for_edit)
+        # Si se selecciona otro proveedor antes de que llegue la respuesta, la anterior se descarta
+        self.tasks.submit("proveedor_seleccionado", supplier_model.get_supplier_by_id, self._selected_supplier_id_for_edit,
+                          on_success=self._show_selected_supplier)
 
+    def _show_selected_supplier(self, supplier_data):
         if supplier_data:
             self.supplier_id_var.set(supplier_data.get("id_proveedor", ""))
             self.supplier_name_var.set(supplier_data.get("nombre", ""))
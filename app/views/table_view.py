@@ -7,18 +7,21 @@ try:
     # Asumiendo que table_view.py está en app/views/ y table_model.py está en app/models/
     # y que 'app' es un paquete reconocido (ej. main.py está un nivel arriba)
     from app.models import table_model
+    from app.views.background_tasks import BackgroundTaskRunner
 except ImportError:
     # Fallback si la estructura es diferente o se ejecuta directamente
     # y 'models' es un paquete hermano o accesible
     try:
         from ..models import table_model
+        from .background_tasks import BackgroundTaskRunner
     except ImportError:
         # Fallback si 'models' está en el mismo nivel (menos común para esta estructura)
         try:
             from models import table_model
+            from views.background_tasks import BackgroundTaskRunner
         except ImportError:
             print("Error CRÍTICO: No se pudo importar el módulo table_model.py en TableView. Verifica tu estructura y PYTHONPATH.")
-            table_model = None
+            table_model = BackgroundTaskRunner = None
 
 # Constantes para el canvas
 TABLE_WIDTH = 80
@@ -60,6 +63,7 @@ class TableView(ttk.Frame):
 
         # Variable para rastrear si estamos en modo "creación"
         self._is_new_table_mode = False
+        self.tasks = BackgroundTaskRunner(self) # Consultas a los modelos fuera del hilo de Tk
 
         self._create_layout()
         self._load_tables_to_ui()
@@ -164,12 +168,10 @@ class TableView(ttk.Frame):
         self.tables_canvas.bind("<B1-Motion>", self._on_canvas_drag)
         self.tables_canvas.bind("<ButtonRelease-1>", self._on_canvas_button_release)
 
-    def _draw_tables_on_canvas(self):
-        if not table_model: return
+    def _draw_tables_on_canvas(self, tables_list):
         self.tables_canvas.delete("all_tables_group")
         self._table_canvas_objects.clear()
 
-        tables_list = table_model.get_all_tables_list()
         if tables_list:
             for table_data in tables_list:
                 # Determinar si esta mesa es la actualmente seleccionada en el canvas
@@ -294,11 +296,15 @@ class TableView(ttk.Frame):
 
 
     def _load_tables_to_ui(self):
-        self._load_tables_to_treeview()
-        self._draw_tables_on_canvas()
-
-    def _load_tables_to_treeview(self):
         if not table_model: return
+        # Una sola consulta alimenta el listado y el canvas
+        self.tasks.submit("mesas", table_model.get_all_tables_list, on_success=self._show_tables_in_ui)
+
+    def _show_tables_in_ui(self, tables_list):
+        self._load_tables_to_treeview(tables_list)
+        self._draw_tables_on_canvas(tables_list)
+
+    def _load_tables_to_treeview(self, tables_list):
         current_selection_tree_id = None
         if self.tables_treeview.selection():
             current_selection_tree_id = self.tables_treeview.selection()[0]
@@ -306,7 +312,6 @@ class TableView(ttk.Frame):
         for item in self.tables_treeview.get_children():
             self.tables_treeview.delete(item)
         
-        tables_list = table_model.get_all_tables_list()
         if tables_list:
             for tbl in tables_list:
                 self.tables_treeview.insert("", tk.END, iid=tbl.get("id_mesa"), values=(
@@ -360,7 +365,10 @@ class TableView(ttk.Frame):
     def _load_table_data_to_form(self, table_id_from_db):
         self._is_new_table_mode = False
         if not table_model: return
-        table_data = table_model.get_table_by_id(table_id_from_db)
+        self.tasks.submit("mesa_seleccionada", table_model.get_table_by_id, table_id_from_db,
+                          on_success=lambda table_data: self._show_table_data_in_form(table_id_from_db, table_data))
+
+    def _show_table_data_in_form(self, table_id_from_db, table_data):
         if table_data:
             self.table_id_var.set(table_data.get("id_mesa", ""))
             self.capacity_var.set(int(table_data.get("capacidad", 0)))
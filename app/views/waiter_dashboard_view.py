@@ -5,35 +5,45 @@ from tkinter import ttk, messagebox
 # Importar OrderTakingView y modelos si es necesario para otras funcionalidades
 try:
     from .order_taking_view import OrderTakingView
+    from .background_tasks import BackgroundTaskRunner
+    from .change_listener import ChangeListener
     from ..models import order_model # Para la lista de "Mis Comandas"
+    from .. import events
 except ImportError:
     try:
         from order_taking_view import OrderTakingView
+        from background_tasks import BackgroundTaskRunner
+        from change_listener import ChangeListener
         from models import order_model
+        import events
     except ImportError:
-        OrderTakingView = None
-        order_model = None
+        OrderTakingView = BackgroundTaskRunner = ChangeListener = None
+        order_model = events = None
         print("Error crítico: No se pudo importar OrderTakingView o order_model.")
 
-class WaiterDashboardView(tk.Tk):
-    def __init__(self, waiter_user_info):
-        super().__init__()
+class WaiterDashboardView(ttk.Frame):
+    def __init__(self, parent_container, waiter_user_info, on_logout=None, *args, **kwargs):
+        """
+        Args:
+            parent_container: Ventana raíz (o contenedor) donde se coloca el panel.
+            waiter_user_info (dict): Datos del mesero que inició sesión.
+            on_logout (callable, optional): Se llama al cerrar sesión; si no se indica, se cierra la ventana.
+        """
+        super().__init__(parent_container, *args, **kwargs)
+        self.on_logout = on_logout
 
         if not OrderTakingView:
-            self.withdraw()
             messagebox.showerror("Error Crítico", "No se pudo cargar el módulo de toma de comandas.")
-            self.destroy()
+            ttk.Label(self, text="Error crítico: la toma de comandas no está disponible.", foreground="red").pack(padx=10, pady=10)
             return
 
         self.waiter_user_info = waiter_user_info
-        self.title(f"Panel de Mesero - (Usuario: {self.waiter_user_info.get('nombre', 'Mesero')})")
-        self.geometry("1150x750") # Similar a OrderTakingView
-
-        style = ttk.Style(self)
-        if 'clam' in style.theme_names(): style.theme_use('clam')
+        window = self.winfo_toplevel()
+        window.title(f"Panel de Mesero - (Usuario: {self.waiter_user_info.get('nombre', 'Mesero')})")
+        window.geometry("1150x750") # Similar a OrderTakingView
 
+        self.tasks = BackgroundTaskRunner(self) # Llamadas a los modelos fuera del hilo de Tk
         self._create_main_widgets()
-        self.protocol("WM_DELETE_WINDOW", self._on_closing)
 
     def _create_main_widgets(self):
         main_notebook = ttk.Notebook(self)
@@ -85,16 +95,21 @@ class WaiterDashboardView(tk.Tk):
         refresh_my_orders_btn.pack(pady=5)
         
         self._load_my_active_orders() # Carga inicial
+        # Cualquier cambio de estado de una comanda puede sacar o meter filas en la lista
+        self.changes = ChangeListener(self, [events.TOPIC_ORDER], lambda received: self._load_my_active_orders(show_busy=False))
 
-    def _load_my_active_orders(self):
+    def _load_my_active_orders(self, show_busy=True):
         if not order_model or not hasattr(self, 'my_orders_treeview'): return
-        for item in self.my_orders_treeview.get_children():
-            self.my_orders_treeview.delete(item)
-            
         mesero_id = self.waiter_user_info.get('id_empleado')
         if not mesero_id: return
 
-        my_active_orders = order_model.get_active_orders_for_waiter(mesero_id)
+        self.tasks.submit("mis_comandas", order_model.get_active_orders_for_waiter, mesero_id,
+                          on_success=self._show_my_active_orders, show_busy=show_busy)
+
+    def _show_my_active_orders(self, my_active_orders):
+        for item in self.my_orders_treeview.get_children():
+            self.my_orders_treeview.delete(item)
+
         if my_active_orders:
             for order in my_active_orders:
                 apertura_f = order.get('fecha_hora_apertura','').strftime('%Y-%m-%d %H:%M') if order.get('fecha_hora_apertura') else ''
@@ -113,11 +128,11 @@ class WaiterDashboardView(tk.Tk):
 
     def _logout(self):
         if messagebox.askokcancel("Cerrar Sesión", "¿Está seguro de que desea cerrar la sesión?"):
-            self.destroy()
-
-    def _on_closing(self):
-        if messagebox.askokcancel("Salir", "¿Está seguro de que desea salir de la aplicación?"):
-            self.destroy()
+            self.tasks.cancel_all()
+            if self.on_logout:
+                self.on_logout() # La ventana raíz vuelve a mostrar el login
+            else:
+                self.winfo_toplevel().destroy()
 
 # Para probar esta vista de forma aislada
 if __name__ == '__main__':
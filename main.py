@@ -1,8 +1,9 @@
 # main_app.py
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import ttk, messagebox
 import sys
 import os
+import time
 
 # Importar las vistas necesarias usando rutas absolutas
 try:
@@ -11,6 +12,8 @@ try:
     from app.views import employee_dashboard_view
     from app.views import cook_dashboard_view
     from app.views import waiter_dashboard_view
+    from app.views import background_tasks
+    from app import db
 except ImportError as e:
     # Manejo de error si las importaciones fallan al inicio
     root_error = tk.Tk()
@@ -21,81 +24,98 @@ except ImportError as e:
     root_error.destroy()
     sys.exit(f"Error de importación: {e}")
 
-class MainApplication:
+class MainApplication(tk.Tk):
+    """
+    Ventana raíz única de la aplicación. La pantalla de login y los paneles de cada rol son Frames
+    que se intercambian dentro de ella: cerrar sesión no crea un nuevo intérprete Tk ni anida
+    llamadas login -> panel -> login, y el pool de conexiones, los hilos de las vistas y las
+    cachés de los modelos siguen vivos entre sesiones.
+    """
     def __init__(self):
+        super().__init__()
         self.current_user_info = None
+        self.current_screen = None # Frame visible (login o panel de un rol)
+
+        style = ttk.Style(self)
+        available_themes = style.theme_names()
+        if 'clam' in available_themes:
+            style.theme_use('clam')
+        elif 'vista' in available_themes:
+            style.theme_use('vista')
+
+        self.protocol("WM_DELETE_WINDOW", self._on_closing)
         self.show_login_screen()
 
+    def _show_screen(self, screen):
+        """Reemplaza la pantalla actual por 'screen' (destruyendo la anterior y sus widgets)."""
+        if self.current_screen is not None:
+            self.current_screen.destroy()
+        self.current_screen = screen
+        screen.pack(expand=True, fill=tk.BOTH)
+
     def show_login_screen(self):
         # Limpiar cualquier información de usuario anterior
-        self.current_user_info = None 
-        
-        # La vista de login ahora maneja la apertura del dashboard correcto internamente
-        # a través de su propio mainloop.
-        # Pasamos un callback para que el login nos notifique del éxito.
-        login_view.start_login_view(on_success_callback=self.handle_login_success)
-        
-        # Después de que login_view.start_login_view() termina (es decir, su mainloop se cierra),
-        # verificamos si hubo un login exitoso. Si no, la aplicación podría terminar.
-        if not self.current_user_info:
-            print("La ventana de login se cerró sin un inicio de sesión exitoso. Saliendo de la aplicación.")
-            # Aquí podrías decidir si quieres que la aplicación se cierre completamente
-            # o si quieres reintentar el login (lo cual sería un bucle más complejo).
-            # Por simplicidad, la aplicación terminará si el login se cierra sin éxito.
+        self.current_user_info = None
+        if self.current_screen is not None:
+            self.current_screen.destroy()
+            self.current_screen = None
+        self._show_screen(login_view.LoginView(self, on_login_success_callback=self.handle_login_success))
 
     def handle_login_success(self, user_info):
         """
         Este callback es llamado por LoginView cuando el login es exitoso.
-        Se encarga de cerrar la ventana de login y abrir el dashboard apropiado.
+        Sustituye la pantalla de login por el panel del rol dentro de la misma ventana.
         """
         self.current_user_info = user_info
+        login_succeeded_at = time.perf_counter() # Para medir el tiempo hasta que el panel se pinta
         print(f"Login exitoso para: {self.current_user_info.get('nombre')}, Rol: {self.current_user_info.get('rol')}")
 
-        # LoginView ya se destruyó a sí mismo. Ahora abrimos el dashboard.
         rol = self.current_user_info.get("rol")
-        
-        dashboard_to_open = None
-        
+        dashboard_class = None
+        dashboard_kwargs = {}
+
         if rol == "administrador":
-            if admin_dashboard_view.AdminDashboardView:
-                dashboard_to_open = admin_dashboard_view.AdminDashboardView(self.current_user_info)
-            else:
-                messagebox.showerror("Error de Carga", "No se pudo cargar el Dashboard de Administrador.")
-        
-        elif rol == "cocinero": # <--- NUEVA CONDICIÓN
-            if cook_dashboard_view.CookDashboardView:
-                dashboard_to_open = cook_dashboard_view.CookDashboardView(self.current_user_info)
-            else:
-                messagebox.showerror("Error de Carga", "No se pudo cargar el Dashboard de Cocina.")
-        elif rol == "mesero": # <--- NUEVA CONDICIÓN
-            if waiter_dashboard_view.WaiterDashboardView:
-                dashboard_to_open = waiter_dashboard_view.WaiterDashboardView(self.current_user_info)
-            else:
-                messagebox.showerror("Error de Carga", "No se pudo cargar el Dashboard de Mesero.")       
-        elif rol in ["empleado", "mesero"]: # Otros roles de empleado (sin dashboard de cocina)
-            if employee_dashboard_view.EmployeeDashboardView:
-                dashboard_to_open = employee_dashboard_view.EmployeeDashboardView(self.current_user_info)
-            else:
-                messagebox.showerror("Error de Carga", "No se pudo cargar el Dashboard de Empleado.")
+            dashboard_class = admin_dashboard_view.AdminDashboardView
+            dashboard_kwargs = {"startup_started_at": login_succeeded_at}
+            error_message = "No se pudo cargar el Dashboard de Administrador."
+        elif rol == "cocinero":
+            dashboard_class = cook_dashboard_view.CookDashboardView
+            error_message = "No se pudo cargar el Dashboard de Cocina."
+        elif rol == "mesero":
+            dashboard_class = waiter_dashboard_view.WaiterDashboardView
+            error_message = "No se pudo cargar el Dashboard de Mesero."
+        elif rol == "empleado": # Otros roles de empleado (sin dashboard propio)
+            dashboard_class = employee_dashboard_view.EmployeeDashboardView
+            error_message = "No se pudo cargar el Dashboard de Empleado."
         else:
             messagebox.showerror("Error de Rol", f"Rol '{rol}' no reconocido. Contacte al administrador.")
-            self.show_login_screen() 
+            self.show_login_screen()
             return
 
-        if dashboard_to_open:
-            # El mainloop del dashboard tomará el control.
-            # Cuando el dashboard se cierre, su mainloop terminará.
-            # Podríamos querer volver al login después de que un dashboard se cierre (ej. por logout).
-            dashboard_to_open.mainloop() 
-            
-            # Después de que el dashboard se cierra (ej. por logout o cierre de ventana):
-            print(f"Dashboard para {rol} cerrado.")
-            # Volver a mostrar la pantalla de login para un nuevo inicio de sesión o para salir.
-            self.show_login_screen() 
-        else:
+        if not dashboard_class:
             # Si no se pudo abrir un dashboard por alguna razón (ej. error de importación ya manejado)
             # volver al login.
+            messagebox.showerror("Error de Carga", error_message)
             self.show_login_screen()
+            return
+
+        # El login se destruye antes de construir el panel para que este fije título y tamaño de la ventana
+        self.current_screen.destroy()
+        self.current_screen = None
+        self.resizable(True, True)
+        self._show_screen(dashboard_class(self, self.current_user_info, on_logout=self.handle_logout, **dashboard_kwargs))
+
+    def handle_logout(self):
+        """Llamado por el panel al cerrar sesión: vuelve al login sin salir del mainloop."""
+        print(f"Sesión de {self.current_user_info.get('nombre') if self.current_user_info else 'usuario'} cerrada.")
+        self.show_login_screen()
+
+    def _on_closing(self):
+        # En la pantalla de login se sale directamente; con una sesión abierta se pide confirmación
+        if self.current_user_info and not messagebox.askokcancel("Salir", "¿Está seguro de que desea salir de la aplicación?"):
+            return
+        print("Cierre de aplicación solicitado.")
+        self.destroy()
 
 
 if __name__ == "__main__":
@@ -106,6 +126,10 @@ if __name__ == "__main__":
         print("Saliendo debido a errores de importación de módulos de vista.")
     else:
         app = MainApplication()
-        # El constructor de MainApplication inicia el ciclo con show_login_screen()
-        # No se necesita app.mainloop() aquí porque las ventanas Tk (LoginView, Dashboards)
-        # tienen sus propios mainloops.
+        # Un único mainloop para toda la vida de la aplicación; las sesiones se alternan dentro de él
+        app.mainloop()
+        background_tasks.shutdown_executor() # Descarta consultas de vistas que quedaran en cola
+        cache_stats = db.get_query_cache().stats()
+        print(f"Caché de consultas: {cache_stats['aciertos']} aciertos, {cache_stats['fallos']} fallos "
+              f"({cache_stats['tasa_aciertos']:.0%}), {cache_stats['invalidaciones']} invalidaciones, "
+              f"{cache_stats['descartes_lru']} descartes LRU.")
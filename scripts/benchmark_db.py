@@ -0,0 +1,261 @@
+# scripts/benchmark_db.py
+# Mide la latencia de las operaciones de base de datos contra el MySQL de docker-compose.
+# Uso (desde la raíz del proyecto, con el contenedor levantado):
+#     python scripts/benchmark_db.py pool
+#     python scripts/benchmark_db.py consumo
+#     python scripts/benchmark_db.py movimientos_hoy
+#     python scripts/benchmark_db.py verificacion_stock
+#     python scripts/benchmark_db.py cache_consultas
+import sys
+import os
+import time
+import random
+import datetime
+import statistics
+
+# Añadimos la raíz del proyecto al sys.path para poder importar el paquete 'app'.
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from app import db
+    from app.models import stock_model
+    from app.models import recipe_model, unit_model
+    from app.models import table_model, employee_model, supplier_model
+except ImportError as e:
+    print(f"Error crítico: No se pudo importar app.db o los modelos: {e}")
+    sys.exit(1)
+
+
+def _print_stats(label, samples_seconds):
+    samples_ms = sorted(s * 1000 for s in samples_seconds)
+    p95_index = max(0, int(len(samples_ms) * 0.95) - 1)
+    print(f"{label:<40} n={len(samples_ms):<5} "
+          f"media={statistics.mean(samples_ms):8.3f} ms  "
+          f"p50={statistics.median(samples_ms):8.3f} ms  "
+          f"p95={samples_ms[p95_index]:8.3f} ms")
+
+
+def _time_calls(function, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def benchmark_pool(iterations=200):
+    """Compara una consulta trivial abriendo una conexión por llamada vs. usando el pool."""
+    query = "SELECT 1 AS uno"
+
+    def per_call_connection():
+        conn = db._open_raw_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query)
+        cursor.fetchall()
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def pooled_connection():
+        db.fetch_all(query)
+
+    print(f"\n--- Latencia por llamada ({iterations} iteraciones, '{query}') ---")
+    db.fetch_all(query) # Calentar el pool (primer handshake)
+    _print_stats("Sin pool (connect por llamada)", _time_calls(per_call_connection, iterations))
+    _print_stats("Con pool (db.fetch_all)", _time_calls(pooled_connection, iterations))
+
+
+class _CountingCursor:
+    """Envuelve un cursor para contar las sentencias enviadas al servidor."""
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = 0
+
+    def execute(self, query, params=None):
+        self.statements += 1
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _seed_bench_ingredients(tx, count, prefix="BENCH-ING"):
+    """Crea 'count' productos/ingredientes temporales dentro de la transacción (se deshacen al final)."""
+    ingredient_ids = []
+    for i in range(count):
+        id_producto = f"{prefix}-P{i:03d}"
+        id_ingrediente = f"{prefix}-{i:03d}"
+        tx.execute("INSERT INTO Producto (id_producto, nombre, unidad_medida, costo_unitario) VALUES (%s, %s, 'g', 1.00)",
+                   (id_producto, f"Benchmark {prefix} {i:03d}"))
+        tx.execute("INSERT INTO Ingrediente (id_ingrediente, id_producto, cantidad_disponible) VALUES (%s, %s, 1000000)",
+                   (id_ingrediente, id_producto))
+        ingredient_ids.append(id_ingrediente)
+    return ingredient_ids
+
+
+def benchmark_consumo(iterations=100, ingredient_count=10):
+    """Descuento de stock de una receta de 10 ingredientes: por ingrediente (3xN sentencias) vs. en bloque (3)."""
+    with db.transaction() as tx:
+        ingredient_ids = _seed_bench_ingredients(tx, ingredient_count)
+        required = {id_ing: 0.125 for id_ing in ingredient_ids}
+
+        def per_ingredient(cursor):
+            for id_ing, needed in required.items():
+                cursor.execute("SELECT cantidad_disponible FROM Ingrediente WHERE id_ingrediente = %s FOR UPDATE", (id_ing,))
+                before = float(cursor.fetchone()['cantidad_disponible'])
+                cursor.execute("UPDATE Ingrediente SET cantidad_disponible = %s WHERE id_ingrediente = %s", (before - needed, id_ing))
+                cursor.execute("""
+                    INSERT INTO MovimientoStock (id_ingrediente, tipo_movimiento, cantidad_cambio, cantidad_anterior, cantidad_nueva, descripcion_motivo)
+                    VALUES (%s, 'BENCHMARK', %s, %s, %s, 'benchmark')
+                """, (id_ing, -needed, before, before - needed))
+
+        def set_based(cursor):
+            locked = stock_model._lock_ingredients_for_update(cursor, required)
+            stock_model._apply_stock_consumption(cursor, required, locked, "BENCHMARK", descripcion_motivo="benchmark")
+
+        print(f"\n--- Descuento de stock, receta de {ingredient_count} ingredientes ({iterations} iteraciones) ---")
+        for label, consume in (("Por ingrediente (legado)", per_ingredient), ("En bloque (set-based)", set_based)):
+            counting_cursor = _CountingCursor(tx.cursor)
+            consume(counting_cursor)
+            statements = counting_cursor.statements
+            _print_stats(f"{label} [{statements} sentencias]", _time_calls(lambda: consume(tx.cursor), iterations))
+
+        tx.mark_failed() # Deshacer los datos temporales y los movimientos generados
+
+
+def benchmark_movimientos_hoy(total_rows=1_000_000, checkpoints=(10_000, 100_000, 1_000_000), iterations=20, batch_size=5_000):
+    """
+    Contador "movimientos de hoy" del panel de inicio a medida que crece el histórico de MovimientoStock.
+    Inserta hasta 'total_rows' movimientos de días anteriores (semilla fija) sobre un ingrediente temporal
+    y, en cada punto de control, compara el filtro DATE(fecha_hora) = hoy con el rango semiabierto
+    de stock_model.get_todays_stock_movements_count. Al terminar borra el ingrediente y sus movimientos.
+    """
+    rng = random.Random(42)
+    prefix = "BENCH-HIST"
+    today = datetime.date.today()
+    legacy_query = "SELECT COUNT(*) AS count FROM MovimientoStock WHERE DATE(fecha_hora) = %s"
+
+    with db.transaction() as tx:
+        id_ingrediente = _seed_bench_ingredients(tx, 1, prefix=prefix)[0]
+    insert_query = """
+        INSERT INTO MovimientoStock (id_ingrediente, tipo_movimiento, cantidad_cambio, cantidad_anterior, cantidad_nueva, fecha_hora)
+        VALUES (%s, 'BENCHMARK', -1, 1, 0, %s)
+    """
+
+    print(f"\n--- Contador de movimientos de hoy vs. tamaño del histórico ({iterations} iteraciones por punto) ---")
+    try:
+        inserted = 0
+        for checkpoint in sorted(c for c in checkpoints if c <= total_rows):
+            while inserted < checkpoint:
+                batch = min(batch_size, checkpoint - inserted)
+                rows = [(id_ingrediente, datetime.datetime.combine(today - datetime.timedelta(days=rng.randint(1, 1095)),
+                                                                 datetime.time(rng.randint(0, 23), rng.randint(0, 59))))
+                        for _ in range(batch)]
+                with db.transaction() as tx:
+                    tx.executemany(insert_query, rows)
+                inserted += batch
+            print(f"Histórico sembrado: {inserted} filas")
+            _print_stats("  DATE(fecha_hora) = hoy (legado)", _time_calls(lambda: db.fetch_one(legacy_query, (today,)), iterations))
+            _print_stats("  Rango semiabierto (modelo)", _time_calls(stock_model.get_todays_stock_movements_count, iterations))
+    finally:
+        with db.transaction() as tx:
+            tx.execute("DELETE FROM Ingrediente WHERE id_ingrediente = %s", (id_ingrediente,)) # Borra en cascada sus movimientos
+            tx.execute("DELETE FROM Producto WHERE id_producto LIKE %s", (f"{prefix}-P%",))
+
+
+def benchmark_verificacion_stock(iterations=200, ingredient_count=20, dish_count=3):
+    """
+    Verificación de stock al añadir platos con recetas de 20 ingredientes: receta + un
+    get_ingredient_by_id por ingrediente (1+N consultas, legado) vs. la consulta agregada de
+    stock_model.check_stock_for_items, para un plato y para un carrito de platos que comparten la
+    mitad de sus ingredientes.
+    """
+    prefix = "BENCH-VER"
+    overlap = ingredient_count // 2
+    with db.transaction() as tx:
+        ingredient_ids = _seed_bench_ingredients(tx, ingredient_count + overlap * (dish_count - 1), prefix=prefix)
+        dish_ids = []
+        for d in range(dish_count):
+            id_plato = f"{prefix}-PLATO-{d}"
+            tx.execute("INSERT INTO Plato (id_plato, nombre_plato, categoria, precio_venta) VALUES (%s, %s, 'principal', 10.00)",
+                       (id_plato, f"Benchmark {prefix} plato {d}"))
+            recipe_ingredients = ingredient_ids[d * overlap:d * overlap + ingredient_count]
+            tx.executemany("""
+                INSERT INTO Receta (id_plato, id_ingrediente, cantidad_necesaria, cantidad_stock, unidad_medida_receta)
+                VALUES (%s, %s, 0.125, 0.125, 'g')
+            """, [(id_plato, id_ing) for id_ing in recipe_ingredients])
+            dish_ids.append(id_plato)
+        unit_model.normalize_recipe_lines(dish_ids=dish_ids) # cantidad_stock de las líneas insertadas a mano
+        cart = [(id_plato, 2) for id_plato in dish_ids]
+
+        def legacy_check(id_plato, quantity):
+            can_prepare = True
+            for item in recipe_model.get_recipe_for_dish(id_plato):
+                stock = stock_model.get_ingredient_by_id(item['id_ingrediente'])
+                if float(stock['cantidad_disponible']) < float(item['cantidad_necesaria']) * quantity:
+                    can_prepare = False
+            return can_prepare
+
+        def legacy_cart():
+            for id_plato, quantity in cart:
+                legacy_check(id_plato, quantity)
+
+        print(f"\n--- Verificación de stock, recetas de {ingredient_count} ingredientes ({iterations} iteraciones) ---")
+        # Las dos formas deben dar el mismo resultado (las recetas de prueba ya están en la unidad del stock)
+        legacy_result = legacy_check(dish_ids[0], 2)
+        new_result = stock_model.check_stock_for_dish(dish_ids[0], 2)
+        if new_result is None or new_result['can_prepare'] != legacy_result:
+            print(f"ERROR: La verificación agregada no coincide con la legada (legado: {legacy_result}, agregada: {new_result}).")
+        _print_stats(f"Un plato, 1+N (legado) [{1 + ingredient_count} consultas]",
+                     _time_calls(lambda: legacy_check(dish_ids[0], 2), iterations))
+        _print_stats("Un plato, consulta agregada [1 consulta]",
+                     _time_calls(lambda: stock_model.check_stock_for_dish(dish_ids[0], 2), iterations))
+        _print_stats(f"Carrito de {dish_count}, 1+N (legado) [{dish_count * (1 + ingredient_count)} consultas]",
+                     _time_calls(legacy_cart, iterations))
+        _print_stats(f"Carrito de {dish_count}, consulta agregada [1 consulta]",
+                     _time_calls(lambda: stock_model.check_stock_for_items(cart), iterations))
+
+        tx.mark_failed() # Deshacer los datos temporales
+
+
+def benchmark_cache_consultas(iterations=500):
+    """Listados repetidos por varias vistas (mesas, empleados, proveedores, ingredientes): sin caché vs. con caché de resultados."""
+    listings = (
+        ("Mesas", table_model.get_all_tables_list),
+        ("Empleados", employee_model.get_all_employees_list),
+        ("Proveedores", supplier_model.get_all_suppliers_list),
+        ("Ingredientes", stock_model.get_all_ingredients_list),
+    )
+    cache = db.get_query_cache()
+    print(f"\n--- Caché de resultados de db.fetch_all ({iterations} iteraciones) ---")
+    cache_was_enabled = db.DB_QUERY_CACHE_ENABLED
+    try:
+        for label, listing in listings:
+            db.DB_QUERY_CACHE_ENABLED = False
+            _print_stats(f"{label}, sin caché", _time_calls(listing, iterations))
+            db.DB_QUERY_CACHE_ENABLED = True
+            cache.clear()
+            _print_stats(f"{label}, con caché", _time_calls(listing, iterations))
+    finally:
+        db.DB_QUERY_CACHE_ENABLED = cache_was_enabled
+    print(f"Contadores: {cache.stats()}")
+
+
+BENCHMARKS = {
+    "pool": benchmark_pool,
+    "consumo": benchmark_consumo,
+    "movimientos_hoy": benchmark_movimientos_hoy,
+    "verificacion_stock": benchmark_verificacion_stock,
+    "cache_consultas": benchmark_cache_consultas,
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Benchmark '{name}' no reconocido. Disponibles: {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
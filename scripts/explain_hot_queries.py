@@ -0,0 +1,88 @@
+# scripts/explain_hot_queries.py
+# Verifica con EXPLAIN que las consultas frecuentes de los modelos usan los índices de las migraciones.
+# Las consultas se obtienen llamando a las funciones reales de los modelos: mientras dura la
+# verificación, db.fetch_all/db.fetch_one ejecutan "EXPLAIN <consulta>" en lugar de la consulta.
+# Uso (desde la raíz del proyecto, con la BD migrada y con datos representativos; sobre tablas
+# casi vacías el optimizador puede preferir un recorrido completo):
+#     python scripts/explain_hot_queries.py
+import sys
+import os
+import contextlib
+import datetime
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    from app import db
+    from app.models import order_model
+    from app.models import stock_model
+except ImportError as e:
+    print(f"Error crítico: No se pudo importar app.db o los modelos: {e}")
+    sys.exit(1)
+
+
+# (descripción, llamada al modelo, alias de tabla en la consulta, índices aceptados)
+HOT_QUERY_CHECKS = [
+    ("get_dishes_for_kitchen_view", lambda: order_model.get_dishes_for_kitchen_view(),
+     "dc", {"idx_detalle_estado_hora", "idx_detalle_estado_disparo"}),
+    ("get_dishes_for_kitchen_view (por estación)", lambda: order_model.get_dishes_for_kitchen_view(station_id="barra"),
+     "dc", {"idx_detalle_estacion_cola"}),
+    ("get_kitchen_changes_since (delta)", lambda: order_model.get_kitchen_changes_since(datetime.datetime.now()),
+     "dc", {"idx_detalle_modificacion"}),
+    ("get_active_orders_summary", lambda: order_model.get_active_orders_summary(),
+     "Comanda", {"idx_comanda_estado_apertura"}),
+    ("get_orders_history (sin filtros)", lambda: order_model.get_orders_history(limit=100),
+     "c", {"idx_comanda_apertura"}),
+    ("get_orders_history (por estado)", lambda: order_model.get_orders_history(order_status="facturada", limit=100),
+     "c", {"idx_comanda_estado_apertura"}),
+    ("get_stock_movements_history (sin filtros)", lambda: stock_model.get_stock_movements_history(limit=100),
+     "ms", {"idx_movimiento_fecha"}),
+    ("get_stock_movements_history (por tipo)", lambda: stock_model.get_stock_movements_history(movement_type="CONSUMO_COMANDA", limit=100),
+     "ms", {"idx_movimiento_tipo_fecha"}),
+]
+
+
+@contextlib.contextmanager
+def explain_instead_of_execute(plans):
+    """Sustituye temporalmente db.fetch_all/db.fetch_one para guardar el plan de cada consulta."""
+    original_fetch_all, original_fetch_one = db.fetch_all, db.fetch_one
+
+    def explain(query, params=None):
+        rows = original_fetch_all("EXPLAIN " + query.strip().rstrip(";"), params)
+        plans.append(rows or [])
+        return []
+
+    db.fetch_all = explain
+    db.fetch_one = lambda query, params=None: (explain(query, params) or None)
+    try:
+        yield
+    finally:
+        db.fetch_all, db.fetch_one = original_fetch_all, original_fetch_one
+
+
+def check_query_plan(label, model_call, table_alias, expected_indexes):
+    plans = []
+    with explain_instead_of_execute(plans):
+        model_call()
+    if not plans:
+        print(f"[FALLO] {label}: el modelo no ejecutó ninguna consulta.")
+        return False
+
+    plan_rows = plans[0]
+    table_row = next((row for row in plan_rows if row.get('table') == table_alias), None)
+    used_key = table_row.get('key') if table_row else None
+    ok = used_key in expected_indexes
+    print(f"[{'OK' if ok else 'FALLO'}] {label}: tabla '{table_alias}' usa índice '{used_key}' "
+          f"(esperado: {', '.join(sorted(expected_indexes))})")
+    if not ok:
+        for row in plan_rows:
+            print(f"        {row}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [check_query_plan(*check) for check in HOT_QUERY_CHECKS]
+    print(f"\n{sum(results)}/{len(results)} consultas usan el índice esperado.")
+    sys.exit(0 if all(results) else 1)
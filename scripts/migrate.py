@@ -0,0 +1,140 @@
+# scripts/migrate.py
+# Ejecuta las migraciones versionadas de scripts/migrations/ sobre una base de datos existente.
+# Cada archivo se llama NNNN_descripcion.sql y se aplica una sola vez, en orden de versión;
+# las versiones aplicadas se registran en la tabla schema_version.
+# Uso (desde la raíz del proyecto):
+#     python scripts/migrate.py          -> aplica las migraciones pendientes
+#     python scripts/migrate.py estado   -> muestra las migraciones aplicadas y pendientes
+import os
+import re
+import sys
+import mysql.connector
+from dotenv import load_dotenv
+from mysql.connector import errorcode
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_NAME")
+}
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_([\w\-]+)\.sql$")
+
+SCHEMA_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    nombre VARCHAR(255) NOT NULL,
+    fecha_aplicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+
+def discover_migrations(migrations_dir=MIGRATIONS_DIR):
+    """
+    Devuelve las migraciones disponibles ordenadas por versión.
+    Returns:
+        list: [(version, nombre, ruta_archivo), ...]
+    """
+    migrations = []
+    for file_name in os.listdir(migrations_dir):
+        match = MIGRATION_FILE_PATTERN.match(file_name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(migrations_dir, file_name)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Hay dos archivos de migración con el mismo número de versión.")
+    return migrations
+
+
+def split_sql_statements(sql_text):
+    """Separa un archivo .sql en sentencias (por ';'), ignorando las líneas de comentario '--'."""
+    lines = [line for line in sql_text.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def get_applied_versions(cursor):
+    cursor.execute(SCHEMA_VERSION_TABLE_SQL)
+    cursor.execute("SELECT version FROM schema_version")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_migrations(db_config, migrations_dir=MIGRATIONS_DIR):
+    """
+    Aplica, en orden, las migraciones que aún no figuran en schema_version.
+    En MySQL el DDL hace commit implícito, así que cada migración se registra justo después
+    de ejecutar sus sentencias; si una sentencia falla se detiene el proceso sin registrarla.
+    Returns:
+        bool: True si no quedó ninguna migración pendiente con error.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = mysql.connector.connect(**db_config)
+        cursor = conn.cursor()
+        applied_versions = get_applied_versions(cursor)
+        pending = [m for m in discover_migrations(migrations_dir) if m[0] not in applied_versions]
+
+        if not pending:
+            print("Esquema al día: no hay migraciones pendientes.")
+            return True
+
+        for version, name, path in pending:
+            print(f"Aplicando migración {version:04d}_{name}...")
+            with open(path, encoding="utf-8") as sql_file:
+                statements = split_sql_statements(sql_file.read())
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute("INSERT INTO schema_version (version, nombre) VALUES (%s, %s)", (version, name))
+                conn.commit()
+                print(f"Migración {version:04d}_{name} aplicada ({len(statements)} sentencias).")
+            except mysql.connector.Error as err:
+                conn.rollback()
+                print(f"Error al aplicar la migración {version:04d}_{name}: {err}")
+                print("Proceso de migración detenido. Corrija el error y vuelva a ejecutar el script.")
+                return False
+
+        print("\nMigraciones completadas.")
+        return True
+
+    except mysql.connector.Error as err:
+        if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
+            print("Error de acceso: Usuario o contraseña incorrectos.")
+        elif err.errno == errorcode.ER_BAD_DB_ERROR:
+            print(f"La base de datos '{db_config['database']}' no existe. Ejecute primero scripts/setup_db.py.")
+        else:
+            print(f"Error de MySQL al ejecutar las migraciones: {err}")
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def print_migration_status(db_config, migrations_dir=MIGRATIONS_DIR):
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor()
+    try:
+        applied_versions = get_applied_versions(cursor)
+        conn.commit()
+        for version, name, _ in discover_migrations(migrations_dir):
+            state = "aplicada" if version in applied_versions else "PENDIENTE"
+            print(f"{version:04d}_{name:<50} {state}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "estado":
+        print_migration_status(DB_CONFIG)
+    else:
+        sys.exit(0 if run_migrations(DB_CONFIG) else 1)
@@ -0,0 +1,18 @@
+-- 0001: Índices compuestos para las consultas más frecuentes de la aplicación.
+
+-- order_model.get_dishes_for_kitchen_view:
+--   WHERE dc.estado_plato IN ('pendiente', 'en preparacion') ORDER BY dc.hora_pedido, dc.id_comanda
+CREATE INDEX idx_detalle_estado_hora ON DetalleComanda (estado_plato, hora_pedido, id_comanda);
+
+-- order_model.get_active_orders_summary (WHERE estado_comanda IN (...) GROUP BY estado_comanda)
+-- y el filtro por estado de get_orders_history (ORDER BY fecha_hora_apertura DESC).
+CREATE INDEX idx_comanda_estado_apertura ON Comanda (estado_comanda, fecha_hora_apertura);
+
+-- order_model.get_orders_history sin filtros: ORDER BY fecha_hora_apertura DESC, id_comanda DESC LIMIT n
+CREATE INDEX idx_comanda_apertura ON Comanda (fecha_hora_apertura, id_comanda);
+
+-- stock_model.get_stock_movements_history: ORDER BY fecha_hora DESC, id_movimiento DESC LIMIT n,
+-- con filtros opcionales por tipo de movimiento o por ingrediente.
+CREATE INDEX idx_movimiento_fecha ON MovimientoStock (fecha_hora, id_movimiento);
+CREATE INDEX idx_movimiento_tipo_fecha ON MovimientoStock (tipo_movimiento, fecha_hora);
+CREATE INDEX idx_movimiento_ingrediente_fecha ON MovimientoStock (id_ingrediente, fecha_hora);
@@ -0,0 +1,10 @@
+-- 0002: Marca de modificación en DetalleComanda para el feed incremental de cocina.
+
+-- order_model.get_kitchen_changes_since: MySQL actualiza la columna en cada INSERT/UPDATE de la
+-- línea, así la pantalla de cocina pide solo las líneas nuevas o cambiadas desde el último sondeo.
+ALTER TABLE DetalleComanda
+    ADD COLUMN fecha_modificacion DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+-- WHERE dc.fecha_modificacion >= %s ORDER BY dc.fecha_modificacion, dc.id_detalle_comanda
+-- (y MAX(fecha_modificacion) para el cursor inicial).
+CREATE INDEX idx_detalle_modificacion ON DetalleComanda (fecha_modificacion, id_detalle_comanda);
@@ -0,0 +1,14 @@
+-- 0003: Registro de eventos de cambio para notificar a las demás terminales (app/events.py).
+
+-- Cada escritura relevante de los modelos inserta aquí un evento compacto en su misma transacción;
+-- un hilo por proceso lee WHERE id_evento > ultimo_id y reparte los eventos a las vistas suscritas.
+CREATE TABLE IF NOT EXISTS EventoCambio (
+    id_evento BIGINT AUTO_INCREMENT PRIMARY KEY,
+    tema VARCHAR(50) NOT NULL COMMENT 'comanda, detalle_comanda, ingrediente, mesa',
+    id_entidad VARCHAR(100) NULL,
+    datos JSON NULL,
+    fecha_hora DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Purga periódica: DELETE ... WHERE fecha_hora < NOW(6) - INTERVAL n HOUR
+CREATE INDEX idx_evento_fecha ON EventoCambio (fecha_hora);
@@ -0,0 +1,20 @@
+-- 0004: Reservas de stock de las líneas de comanda aún no enviadas a cocina (stock_model).
+
+-- Al añadir un plato a una comanda abierta se reserva lo que pide su receta. Las verificaciones de
+-- stock restan las reservas de cantidad_disponible; al enviar la línea a cocina la reserva se
+-- convierte en consumo y al cancelar la línea o la comanda se borra.
+CREATE TABLE IF NOT EXISTS ReservaStock (
+    id_reserva INT AUTO_INCREMENT PRIMARY KEY,
+    id_detalle_comanda INT NOT NULL,
+    id_comanda VARCHAR(50) NOT NULL,
+    id_ingrediente VARCHAR(50) NOT NULL,
+    cantidad_reservada DECIMAL(10, 3) NOT NULL CHECK (cantidad_reservada > 0),
+    fecha_hora DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (id_detalle_comanda, id_ingrediente),
+    CONSTRAINT fk_detalle_reserva FOREIGN KEY (id_detalle_comanda) REFERENCES DetalleComanda(id_detalle_comanda) ON DELETE CASCADE,
+    CONSTRAINT fk_ingrediente_reserva FOREIGN KEY (id_ingrediente) REFERENCES Ingrediente(id_ingrediente) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Total reservado por ingrediente (verificación de stock) y liberación por comanda (cancelar/facturar)
+CREATE INDEX idx_reserva_ingrediente ON ReservaStock (id_ingrediente, cantidad_reservada);
+CREATE INDEX idx_reserva_comanda ON ReservaStock (id_comanda);
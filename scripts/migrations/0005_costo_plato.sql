@@ -0,0 +1,36 @@
+-- 0005: Costo de receta y margen por plato, materializados (app/models/cost_model.py).
+
+-- Se recalcula solo para los platos afectados al cambiar una receta, el costo de un producto o el
+-- precio de un plato, siempre con una sentencia INSERT ... SELECT agregada.
+CREATE TABLE IF NOT EXISTS CostoPlato (
+    id_plato VARCHAR(50) PRIMARY KEY,
+    costo_receta DECIMAL(14, 4) NOT NULL DEFAULT 0,
+    precio_venta DECIMAL(10, 2) NOT NULL,
+    margen DECIMAL(14, 4) NOT NULL,
+    margen_porcentaje DECIMAL(9, 2) NULL COMMENT 'NULL si el precio de venta es 0',
+    lineas_receta INT NOT NULL DEFAULT 0,
+    fecha_calculo DATETIME NOT NULL,
+    CONSTRAINT fk_plato_costo FOREIGN KEY (id_plato) REFERENCES Plato(id_plato) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Carga inicial de todo el menú en una sola pasada
+INSERT INTO CostoPlato (id_plato, costo_receta, precio_venta, margen, margen_porcentaje, lineas_receta, fecha_calculo)
+SELECT calc.id_plato, calc.costo_receta, calc.precio_venta, calc.margen, calc.margen_porcentaje, calc.lineas_receta, NOW()
+FROM (
+    SELECT pl.id_plato,
+           COALESCE(SUM(r.cantidad_necesaria * pr.costo_unitario), 0) AS costo_receta,
+           pl.precio_venta,
+           pl.precio_venta - COALESCE(SUM(r.cantidad_necesaria * pr.costo_unitario), 0) AS margen,
+           CASE WHEN pl.precio_venta > 0
+                THEN (pl.precio_venta - COALESCE(SUM(r.cantidad_necesaria * pr.costo_unitario), 0)) / pl.precio_venta * 100
+           END AS margen_porcentaje,
+           COUNT(r.id_receta) AS lineas_receta
+    FROM Plato pl
+    LEFT JOIN Receta r ON r.id_plato = pl.id_plato
+    LEFT JOIN Ingrediente i ON i.id_ingrediente = r.id_ingrediente
+    LEFT JOIN Producto pr ON pr.id_producto = i.id_producto
+    GROUP BY pl.id_plato, pl.precio_venta
+) AS calc
+ON DUPLICATE KEY UPDATE
+    costo_receta = calc.costo_receta, precio_venta = calc.precio_venta, margen = calc.margen,
+    margen_porcentaje = calc.margen_porcentaje, lineas_receta = calc.lineas_receta, fecha_calculo = NOW();
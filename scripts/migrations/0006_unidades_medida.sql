@@ -0,0 +1,62 @@
+-- 0006: Conversión de unidades de medida (app/models/unit_model.py).
+
+-- Cada unidad tiene una dimensión y un factor a la unidad base de esa dimensión (g, ml, unidad).
+-- Dos unidades solo se pueden convertir entre sí si son de la misma dimensión.
+CREATE TABLE IF NOT EXISTS UnidadMedida (
+    unidad VARCHAR(20) PRIMARY KEY,
+    dimension VARCHAR(20) NOT NULL,
+    factor_base DECIMAL(18, 9) NOT NULL CHECK (factor_base > 0)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO UnidadMedida (unidad, dimension, factor_base) VALUES
+    ('g', 'masa', 1), ('kg', 'masa', 1000), ('pizca', 'masa', 0.5),
+    ('ml', 'volumen', 1), ('L', 'volumen', 1000), ('litros', 'volumen', 1000),
+    ('cucharada', 'volumen', 15), ('taza', 'volumen', 240),
+    ('unidades', 'conteo', 1), ('unidad', 'conteo', 1), ('pieza', 'conteo', 1),
+    ('botella', 'botella', 1), ('lata', 'lata', 1);
+
+-- Factor de la unidad del stock de cada producto
+ALTER TABLE Producto ADD COLUMN factor_base DECIMAL(18, 9) NULL COMMENT 'Factor de unidad_medida a la unidad base (UnidadMedida)';
+
+-- Cantidades normalizadas de cada línea de receta:
+--   cantidad_base  = cantidad_necesaria en la unidad base de su dimensión
+--   cantidad_stock = cantidad_necesaria en la unidad del stock del producto (la que se compara con
+--                    Ingrediente.cantidad_disponible, se descuenta, se reserva y se multiplica por el costo)
+ALTER TABLE Receta
+    ADD COLUMN factor_base DECIMAL(18, 9) NULL COMMENT 'Factor de unidad_medida_receta a la unidad base',
+    ADD COLUMN cantidad_base DECIMAL(18, 6) NULL,
+    ADD COLUMN cantidad_stock DECIMAL(18, 6) NULL;
+
+UPDATE Producto p
+LEFT JOIN UnidadMedida u ON u.unidad = p.unidad_medida
+SET p.factor_base = u.factor_base;
+
+-- Las líneas existentes con unidades incompatibles (o desconocidas) conservan la suposición anterior:
+-- la cantidad de la receta ya está en la unidad del stock. Las altas y cambios nuevos se validan.
+UPDATE Receta r
+JOIN Ingrediente i ON i.id_ingrediente = r.id_ingrediente
+JOIN Producto p ON p.id_producto = i.id_producto
+LEFT JOIN UnidadMedida ur ON ur.unidad = r.unidad_medida_receta
+LEFT JOIN UnidadMedida up ON up.unidad = p.unidad_medida
+SET r.factor_base = ur.factor_base,
+    r.cantidad_base = r.cantidad_necesaria * COALESCE(ur.factor_base, 1),
+    r.cantidad_stock = CASE
+        WHEN r.unidad_medida_receta = p.unidad_medida THEN r.cantidad_necesaria
+        WHEN ur.dimension = up.dimension THEN r.cantidad_necesaria * ur.factor_base / up.factor_base
+        ELSE r.cantidad_necesaria
+    END;
+
+-- Costos de la migración 0005 recalculados con las cantidades ya convertidas
+UPDATE CostoPlato c
+JOIN (
+    SELECT pl.id_plato, COALESCE(SUM(r.cantidad_stock * pr.costo_unitario), 0) AS costo_receta
+    FROM Plato pl
+    LEFT JOIN Receta r ON r.id_plato = pl.id_plato
+    LEFT JOIN Ingrediente i ON i.id_ingrediente = r.id_ingrediente
+    LEFT JOIN Producto pr ON pr.id_producto = i.id_producto
+    GROUP BY pl.id_plato
+) calc ON calc.id_plato = c.id_plato
+SET c.costo_receta = calc.costo_receta,
+    c.margen = c.precio_venta - calc.costo_receta,
+    c.margen_porcentaje = CASE WHEN c.precio_venta > 0 THEN (c.precio_venta - calc.costo_receta) / c.precio_venta * 100 END,
+    c.fecha_calculo = NOW();
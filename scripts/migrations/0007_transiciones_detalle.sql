@@ -0,0 +1,23 @@
+-- 0007: Registro de cambios de estado de las líneas de comanda (tiempos de cocina).
+
+-- Una fila por transición: la línea, su plato (para agregar sin JOIN) y el estado al que pasó.
+-- El estado anterior es la fila previa de la misma línea. order_model escribe en la misma transacción
+-- que el cambio y kitchen_analytics_model calcula los percentiles de tiempos sobre esta tabla.
+CREATE TABLE IF NOT EXISTS TransicionDetalleComanda (
+    id_transicion BIGINT AUTO_INCREMENT PRIMARY KEY,
+    id_detalle_comanda INT NOT NULL,
+    id_plato VARCHAR(50) NOT NULL,
+    estado_nuevo ENUM('pendiente', 'en preparacion', 'listo', 'entregado', 'cancelado') NOT NULL,
+    fecha_hora DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    CONSTRAINT fk_detalle_transicion FOREIGN KEY (id_detalle_comanda) REFERENCES DetalleComanda(id_detalle_comanda) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Ventanas de análisis: líneas que llegaron a un estado en un rango de tiempo
+CREATE INDEX idx_transicion_estado_fecha ON TransicionDetalleComanda (estado_nuevo, fecha_hora);
+-- Todas las transiciones de una línea, en orden
+CREATE INDEX idx_transicion_detalle ON TransicionDetalleComanda (id_detalle_comanda, fecha_hora);
+
+-- Las líneas existentes solo tienen registrada la hora del pedido
+INSERT INTO TransicionDetalleComanda (id_detalle_comanda, id_plato, estado_nuevo, fecha_hora)
+SELECT dc.id_detalle_comanda, dc.id_plato, 'pendiente', COALESCE(dc.hora_pedido, dc.fecha_modificacion)
+FROM DetalleComanda dc;
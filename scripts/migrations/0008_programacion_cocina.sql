@@ -0,0 +1,8 @@
+-- 0008: Programación de la cocina (app/models/kitchen_scheduler_model.py).
+
+-- hora_disparo: cuándo debe empezar a prepararse la línea para que todos los platos de la comanda
+-- terminen a la vez (hora_entrega_estimada). La cola de cocina se ordena por esta columna.
+ALTER TABLE DetalleComanda ADD COLUMN hora_disparo DATETIME NULL DEFAULT NULL AFTER hora_pedido;
+
+-- Cola priorizada: líneas activas por hora de disparo
+CREATE INDEX idx_detalle_estado_disparo ON DetalleComanda (estado_plato, hora_disparo);
@@ -0,0 +1,46 @@
+-- 0009: Estaciones de cocina (parrilla, fría, pastelería, barra...) y enrutado de las líneas de comanda.
+
+CREATE TABLE IF NOT EXISTS EstacionCocina (
+    id_estacion VARCHAR(20) PRIMARY KEY,
+    nombre VARCHAR(50) NOT NULL UNIQUE,
+    orden TINYINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO EstacionCocina (id_estacion, nombre, orden) VALUES
+    ('parrilla', 'Parrilla / Caliente', 1),
+    ('fria', 'Cocina Fría', 2),
+    ('pasteleria', 'Pastelería', 3),
+    ('barra', 'Barra', 4);
+
+-- Estación por defecto de cada categoría de plato
+CREATE TABLE IF NOT EXISTS EstacionCategoria (
+    categoria VARCHAR(50) PRIMARY KEY,
+    id_estacion VARCHAR(20) NOT NULL,
+    CONSTRAINT fk_categoria_estacion FOREIGN KEY (id_estacion) REFERENCES EstacionCocina(id_estacion) ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO EstacionCategoria (categoria, id_estacion) VALUES
+    ('principal', 'parrilla'),
+    ('acompañamiento', 'parrilla'),
+    ('entrada', 'fria'),
+    ('snack', 'fria'),
+    ('postre', 'pasteleria'),
+    ('bebida', 'barra');
+
+-- Estación propia de un plato; NULL = la de su categoría
+ALTER TABLE Plato
+    ADD COLUMN id_estacion VARCHAR(20) NULL DEFAULT NULL,
+    ADD CONSTRAINT fk_plato_estacion FOREIGN KEY (id_estacion) REFERENCES EstacionCocina(id_estacion)
+        ON DELETE SET NULL ON UPDATE CASCADE;
+
+-- Estación resuelta al pedir la línea: cada pantalla de estación lee solo su parte de la cola
+ALTER TABLE DetalleComanda
+    ADD COLUMN id_estacion VARCHAR(20) NULL DEFAULT NULL AFTER id_plato,
+    ADD CONSTRAINT fk_detalle_estacion FOREIGN KEY (id_estacion) REFERENCES EstacionCocina(id_estacion)
+        ON DELETE SET NULL ON UPDATE CASCADE;
+CREATE INDEX idx_detalle_estacion_cola ON DetalleComanda (id_estacion, estado_plato, hora_disparo);
+
+UPDATE DetalleComanda dc
+JOIN Plato p ON p.id_plato = dc.id_plato
+LEFT JOIN EstacionCategoria ec ON ec.categoria = p.categoria
+SET dc.id_estacion = COALESCE(p.id_estacion, ec.id_estacion);
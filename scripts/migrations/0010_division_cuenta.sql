@@ -0,0 +1,25 @@
+-- 0010: División de la cuenta entre pagadores (app/models/split_bill_model.py).
+
+-- Una comanda puede tener varias facturas, una por pagador (Factura.pagador; NULL = factura única).
+-- El índice nuevo empieza por id_comanda y sirve a fk_comanda_factura antes de quitar el único.
+ALTER TABLE Factura ADD COLUMN pagador VARCHAR(50) NULL DEFAULT NULL AFTER id_comanda;
+ALTER TABLE Factura ADD CONSTRAINT uq_factura_comanda_pagador UNIQUE (id_comanda, pagador);
+ALTER TABLE Factura DROP INDEX id_comanda;
+
+-- Reparto de cada línea de comanda entre pagadores (asientos o nombres). Una línea se puede repartir
+-- en fracciones: a cada pagador le toca partes / SUM(partes) de la línea. importe_centimos es su parte
+-- del subtotal de la línea, en céntimos enteros, ya redondeada de modo que las partes de una línea
+-- suman exactamente su subtotal. Se recalcula solo la línea que cambia.
+CREATE TABLE IF NOT EXISTS DivisionCuenta (
+    id_detalle_comanda INT NOT NULL,
+    pagador VARCHAR(50) NOT NULL,
+    id_comanda VARCHAR(50) NOT NULL,
+    partes INT NOT NULL DEFAULT 1 CHECK (partes > 0),
+    importe_centimos BIGINT NOT NULL,
+    PRIMARY KEY (id_detalle_comanda, pagador),
+    CONSTRAINT fk_division_detalle FOREIGN KEY (id_detalle_comanda) REFERENCES DetalleComanda(id_detalle_comanda) ON DELETE CASCADE,
+    CONSTRAINT fk_division_comanda FOREIGN KEY (id_comanda) REFERENCES Comanda(id_comanda) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Totales por pagador de una comanda
+CREATE INDEX idx_division_comanda_pagador ON DivisionCuenta (id_comanda, pagador);
@@ -0,0 +1,7 @@
+-- 0011: Receta.cantidad_stock obligatoria (app/models/unit_model.py).
+
+-- Toda línea de receta tiene su cantidad en la unidad del stock. Las que no se pudieron convertir
+-- conservan la suposición de la migración 0006: la cantidad de la receta ya está en la unidad del stock.
+UPDATE Receta SET cantidad_stock = cantidad_necesaria WHERE cantidad_stock IS NULL;
+
+ALTER TABLE Receta MODIFY COLUMN cantidad_stock DECIMAL(18, 6) NOT NULL;
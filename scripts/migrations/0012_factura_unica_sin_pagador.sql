@@ -0,0 +1,8 @@
+-- 0012: Una sola factura sin pagador por comanda (app/models/billing_model.py, split_bill_model.py).
+
+-- UNIQUE (id_comanda, pagador) admite varias filas con pagador NULL (la factura única de
+-- billing_model.bill_order). pagador_clave convierte NULL en '' para que el índice único cubra también
+-- ese caso; los pagadores de una cuenta dividida nunca son cadenas vacías.
+ALTER TABLE Factura ADD COLUMN pagador_clave VARCHAR(50) AS (COALESCE(pagador, '')) STORED AFTER pagador;
+ALTER TABLE Factura ADD CONSTRAINT uq_factura_comanda_pagador_clave UNIQUE (id_comanda, pagador_clave);
+ALTER TABLE Factura DROP INDEX uq_factura_comanda_pagador;
@@ -0,0 +1,14 @@
+-- 0013: Misma precisión para las cantidades de stock que para Receta.cantidad_stock (DECIMAL(18, 6)).
+
+-- cantidad_stock es la cantidad de la receta convertida a la unidad del stock (migración 0006): una
+-- cantidad pequeña en una unidad grande (0.4 g de un ingrediente en kg = 0.0004 kg) se redondeaba a
+-- 0.000 al guardarla en DECIMAL(10, 3), y la reserva violaba su CHECK (> 0) o el consumo descontaba 0.
+-- Se amplían las columnas donde se escribe; los CHECK existentes se conservan.
+ALTER TABLE Ingrediente MODIFY COLUMN cantidad_disponible DECIMAL(18, 6) NOT NULL DEFAULT 0;
+
+ALTER TABLE ReservaStock MODIFY COLUMN cantidad_reservada DECIMAL(18, 6) NOT NULL;
+
+ALTER TABLE MovimientoStock
+    MODIFY COLUMN cantidad_cambio DECIMAL(18, 6) NOT NULL COMMENT 'Positivo para aumento, negativo para disminución',
+    MODIFY COLUMN cantidad_anterior DECIMAL(18, 6) NOT NULL,
+    MODIFY COLUMN cantidad_nueva DECIMAL(18, 6) NOT NULL;
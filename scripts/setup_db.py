@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 from mysql.connector import errorcode
 import os
 
+from migrate import run_migrations
+
 load_dotenv()
 
 DB_CONFIG = {
@@ -94,7 +96,7 @@ TABLE_DEFINITIONS = [
     CREATE TABLE IF NOT EXISTS Ingrediente (
         id_ingrediente VARCHAR(50) PRIMARY KEY,
         id_producto VARCHAR(50) NOT NULL UNIQUE,
-        cantidad_disponible DECIMAL(10, 3) NOT NULL DEFAULT 0.000 CHECK (cantidad_disponible >= 0),
+        cantidad_disponible DECIMAL(18, 6) NOT NULL DEFAULT 0 CHECK (cantidad_disponible >= 0),
         ultima_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
         CONSTRAINT fk_producto_ingrediente FOREIGN KEY (id_producto) REFERENCES Producto(id_producto) ON DELETE CASCADE
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -224,9 +226,9 @@ TABLE_DEFINITIONS = [
         id_ingrediente VARCHAR(50) NOT NULL,
         fecha_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         tipo_movimiento VARCHAR(50) NOT NULL COMMENT 'INGRESO, CONSUMO_COMANDA, MERMA, AJUSTE_MANUAL, INVENTARIO_INICIAL, etc.',
-        cantidad_cambio DECIMAL(10, 3) NOT NULL COMMENT 'Positivo para aumento, negativo para disminución',
-        cantidad_anterior DECIMAL(10, 3) NOT NULL,
-        cantidad_nueva DECIMAL(10, 3) NOT NULL,
+        cantidad_cambio DECIMAL(18, 6) NOT NULL COMMENT 'Positivo para aumento, negativo para disminución',
+        cantidad_anterior DECIMAL(18, 6) NOT NULL,
+        cantidad_nueva DECIMAL(18, 6) NOT NULL,
         id_referencia_origen VARCHAR(100) NULL COMMENT 'ID de OrdenCompra, Comanda, Merma, etc.',
         descripcion_motivo TEXT,
         id_empleado_responsable VARCHAR(50) NULL,
@@ -316,6 +318,10 @@ if __name__ == "__main__":
     else:
         # 2. Conectarse a la base de datos (ahora con el nombre) y crear las tablas
         if create_tables(DB_CONFIG):
-            print("Configuración de la base de datos MySQL completada.")
+            # 3. Aplicar las migraciones versionadas (índices y cambios de esquema posteriores)
+            if run_migrations(DB_CONFIG):
+                print("Configuración de la base de datos MySQL completada.")
+            else:
+                print("Tablas creadas, pero falló la aplicación de migraciones.")
         else:
             print("Falló la configuración de las tablas de la base de datos MySQL.")